@@ -0,0 +1,28 @@
+"""Add JSON values column to indicators
+
+Revision ID: 3f1c2a9d8e41
+Revises: 6b7eede71597
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d8e41'
+down_revision: Union[str, None] = '6b7eede71597'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('indicators', sa.Column('values', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('indicators', 'values')
@@ -0,0 +1,29 @@
+"""Unique (symbol, timestamp) on indicators
+
+Revision ID: 8a7d4e2b9c10
+Revises: 3f1c2a9d8e41
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a7d4e2b9c10'
+down_revision: Union[str, None] = '3f1c2a9d8e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_unique_constraint(
+        'uq_indicators_symbol_timestamp', 'indicators', ['symbol', 'timestamp']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_indicators_symbol_timestamp', 'indicators', type_='unique')
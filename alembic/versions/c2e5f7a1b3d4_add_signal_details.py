@@ -0,0 +1,28 @@
+"""Add JSON details column to signals
+
+Revision ID: c2e5f7a1b3d4
+Revises: 8a7d4e2b9c10
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e5f7a1b3d4'
+down_revision: Union[str, None] = '8a7d4e2b9c10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('signals', sa.Column('details', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('signals', 'details')
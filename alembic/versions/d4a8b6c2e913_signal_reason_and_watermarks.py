@@ -0,0 +1,41 @@
+"""Add signal reason key and per-symbol signal watermarks
+
+Revision ID: d4a8b6c2e913
+Revises: c2e5f7a1b3d4
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8b6c2e913'
+down_revision: Union[str, None] = 'c2e5f7a1b3d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('signals', sa.Column('reason', sa.String(), nullable=True))
+    op.create_unique_constraint(
+        'uq_signals_symbol_timestamp_reason',
+        'signals',
+        ['symbol', 'timestamp', 'reason'],
+    )
+    op.create_table(
+        'signal_watermarks',
+        sa.Column('symbol', sa.String(), nullable=False),
+        sa.Column('last_timestamp', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('symbol'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('signal_watermarks')
+    op.drop_constraint('uq_signals_symbol_timestamp_reason', 'signals', type_='unique')
+    op.drop_column('signals', 'reason')
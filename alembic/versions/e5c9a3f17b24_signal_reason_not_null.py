@@ -0,0 +1,45 @@
+"""Backfill signal reasons and make reason NOT NULL
+
+Revision ID: e5c9a3f17b24
+Revises: d4a8b6c2e913
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c9a3f17b24'
+down_revision: Union[str, None] = 'd4a8b6c2e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL reasons never conflict in the unique key; use the reason the
+    # signal engine kept in details, or MANUAL
+    if op.get_bind().dialect.name == 'postgresql':
+        stored_reason = "details->>'reason'"
+    else:
+        stored_reason = "json_extract(details, '$.reason')"
+    op.execute(
+        f"UPDATE signals SET reason = COALESCE({stored_reason}, 'MANUAL') "
+        "WHERE reason IS NULL"
+    )
+    # Keep the first of any signals the backfill made duplicates
+    op.execute(
+        "DELETE FROM signals WHERE id NOT IN "
+        "(SELECT MIN(id) FROM signals GROUP BY symbol, timestamp, reason)"
+    )
+    with op.batch_alter_table('signals') as batch_op:
+        batch_op.alter_column('reason', existing_type=sa.String(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('signals') as batch_op:
+        batch_op.alter_column('reason', existing_type=sa.String(), nullable=True)
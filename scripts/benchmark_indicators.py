@@ -0,0 +1,93 @@
+"""
+Scaling benchmark for parallel indicator computation.
+
+Runs update_indicators_parallel over the same symbol universe with 1, 2, 4, 8
+and 16 workers and prints wall-clock time and speedup for each run.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmark_indicators.py --symbols 500 --seed
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from stockapp.db_models import Base, Indicator, RawPrice
+from stockapp.indicators import update_indicators_parallel
+
+WORKER_COUNTS = [1, 2, 4, 8, 16]
+
+
+def seed_prices(database_url, symbols, days):
+    """Insert synthetic daily bars for every symbol."""
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days)
+    rng = np.random.default_rng(0)
+    for symbol in symbols:
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        session.bulk_insert_mappings(
+            RawPrice,
+            [
+                {
+                    "symbol": symbol,
+                    "timestamp": ts.to_pydatetime(),
+                    "open": c,
+                    "high": c * 1.01,
+                    "low": c * 0.99,
+                    "close": c,
+                    "volume": 1_000_000,
+                }
+                for ts, c in zip(dates, closes)
+            ],
+        )
+    session.commit()
+    session.close()
+
+
+def clear_indicators(database_url):
+    """Drop indicator rows so every run does the same amount of work."""
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(Indicator.__table__.delete())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument(
+        "--seed", action="store_true", help="Insert synthetic price data first"
+    )
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    if args.seed:
+        seed_prices(args.database_url, symbols, args.days)
+
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    for workers in WORKER_COUNTS:
+        clear_indicators(args.database_url)
+        start = time.perf_counter()
+        update_indicators_parallel(
+            symbols,
+            workers=workers,
+            chunk_size=args.chunk_size,
+            database_url=args.database_url,
+        )
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark for the pre-market scanner.
+
+Builds a synthetic universe, times a full vectorized scan, a stream of
+single-symbol quote updates, and the intraday scanner over a session of minute
+bars, and prints the results.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmark_scanner.py --symbols 2500
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from stockapp.panel import to_panel
+from stockapp.scanner import (
+    CRITERIA,
+    INTRADAY_CRITERIA,
+    IntradayScanner,
+    PremarketScanner,
+)
+
+
+def synthetic_universe(count, seed=0):
+    """Baseline and a first round of quotes for count symbols."""
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i:04d}" for i in range(count)]
+    prev_close = rng.uniform(5, 500, count)
+    baseline = pd.DataFrame(
+        {"prev_close": prev_close, "avg_volume": rng.uniform(1e5, 1e7, count)},
+        index=symbols,
+    )
+    quotes = pd.DataFrame(
+        {
+            "price": prev_close * (1 + rng.normal(0, 0.03, count)),
+            "volume": rng.uniform(0, 1e6, count),
+        },
+        index=symbols,
+    )
+    return baseline, quotes
+
+
+def synthetic_session(baseline, minutes, seed=2):
+    """One session of random-walk minute bars for every baseline symbol."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-02 09:30", periods=minutes, freq="min")
+    frames = {}
+    for symbol, prev_close in baseline["prev_close"].items():
+        close = prev_close * np.cumprod(1 + rng.normal(0, 0.002, minutes))
+        frames[symbol] = pd.DataFrame(
+            {
+                "high": close * 1.001,
+                "low": close * 0.999,
+                "close": close,
+                "volume": rng.uniform(100, 10_000, minutes),
+            },
+            index=index,
+        )
+    return to_panel(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=2500)
+    parser.add_argument("--updates", type=int, default=100_000)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    baseline, quotes = synthetic_universe(args.symbols)
+    scanner = PremarketScanner(baseline, criteria=list(CRITERIA), top_n=args.top)
+
+    start = time.perf_counter()
+    scanner.scan(quotes)
+    elapsed = time.perf_counter() - start
+    print(f"full scan of {args.symbols} symbols: {elapsed * 1000:.1f} ms")
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, args.symbols, args.updates)
+    moves = 1 + rng.normal(0, 0.005, args.updates)
+    symbols = baseline.index.to_numpy()
+    prices = quotes["price"].to_numpy().copy()
+    volumes = quotes["volume"].to_numpy().copy()
+    start = time.perf_counter()
+    for i, move in zip(picks, moves):
+        prices[i] *= move
+        volumes[i] += 100
+        scanner.on_quote(symbols[i], prices[i], volumes[i])
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.updates} streamed quotes: {elapsed:.2f} s "
+        f"({args.updates / elapsed:,.0f} quotes/s)"
+    )
+
+    panel = synthetic_session(baseline, args.minutes)
+    intraday = IntradayScanner(
+        baseline, criteria=list(INTRADAY_CRITERIA), top_n=args.top
+    )
+    changes = []
+    intraday.subscribe(lambda criterion, ranked: changes.append(criterion))
+    start = time.perf_counter()
+    bars = intraday.feed_panel(panel)
+    elapsed = time.perf_counter() - start
+    print(
+        f"intraday scanner, {args.minutes} minutes x {args.symbols} symbols: "
+        f"{elapsed:.2f} s ({bars / elapsed:,.0f} bars/s, "
+        f"{len(changes)} ranking changes pushed)"
+    )
+
+    # The same session streamed one symbol bar at a time
+    intraday = IntradayScanner(
+        baseline, criteria=list(INTRADAY_CRITERIA), top_n=args.top
+    )
+    frames = {
+        field: panel[field][symbols].to_numpy()
+        for field in ("high", "low", "close", "volume")
+    }
+    start = time.perf_counter()
+    for t, timestamp in enumerate(panel.index):
+        for s, symbol in enumerate(symbols):
+            bar = {field: values[t, s] for field, values in frames.items()}
+            intraday.on_bar(symbol, timestamp, bar)
+    elapsed = time.perf_counter() - start
+    print(
+        f"intraday scanner, streamed bars: {intraday.bars_processed / elapsed:,.0f} "
+        "bars/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,25 @@ Backtesting Module
 
 This module is responsible for running historical backtests using the same logic as the signal engine,
 generating performance metrics, and comparing results with the signals table.
+Portfolio simulation is vectorized: entry and exit signals over a (time, symbol)
+grid become positions, cash and equity curves with array operations.
 """
 
 # Historical backtesting script
 import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
+from sqlalchemy import func
 
 from stockapp.db_models import Indicator, RawPrice, get_db
-from stockapp.signal_engine import detect_ma_crossover, detect_rsi_signals
+from stockapp.indicator_cache import indicator_cache
+from stockapp.indicators import INDICATOR_SET, STORED_TIMEFRAME
+from stockapp.panel import panel_symbols, to_panel
+from stockapp.signal_engine import detect_signal_events
+from stockapp.strategies import StrategyRunner
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +30,296 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+PRICE_FIELDS = ["open", "high", "low", "close"]
+TRADE_COLUMNS = [
+    "symbol",
+    "entry_time",
+    "exit_time",
+    "entry_price",
+    "exit_price",
+    "shares",
+    "position_size",
+    "pnl",
+    "return",
+]
+PERIODS_PER_YEAR = 252
+
+Signals = Union[pd.DataFrame, pd.Series, np.ndarray]
+
+
+@dataclass
+class BacktestResult:
+    """Equity curve, trades and performance metrics of one backtest."""
+
+    portfolio_value: pd.Series
+    returns: pd.Series
+    trades: pd.DataFrame
+    positions: pd.DataFrame
+    initial_cash: float
+    periods_per_year: int = PERIODS_PER_YEAR
+    metrics: Dict[str, float] = field(init=False)
+
+    def __post_init__(self):
+        self.metrics = compute_metrics(
+            self.portfolio_value,
+            self.returns,
+            self.trades,
+            self.initial_cash,
+            self.periods_per_year,
+        )
+
+    @property
+    def total_return(self) -> float:
+        return self.metrics["total_return"]
+
+    @property
+    def cagr(self) -> float:
+        return self.metrics["cagr"]
+
+    @property
+    def sharpe_ratio(self) -> float:
+        return self.metrics["sharpe_ratio"]
+
+    @property
+    def max_drawdown(self) -> float:
+        return self.metrics["max_drawdown"]
+
+    @property
+    def win_rate(self) -> float:
+        return self.metrics["win_rate"]
+
+    def compare(self, other: "BacktestResult") -> Dict[str, float]:
+        """
+        Differences between this result's metrics and another's (self - other).
+        """
+        return {
+            "return_diff": self.total_return - other.total_return,
+            "cagr_diff": self.cagr - other.cagr,
+            "sharpe_diff": self.sharpe_ratio - other.sharpe_ratio,
+            "drawdown_diff": self.max_drawdown - other.max_drawdown,
+            "win_rate_diff": self.win_rate - other.win_rate,
+        }
+
+
+def compute_metrics(
+    portfolio_value: pd.Series,
+    returns: pd.Series,
+    trades: pd.DataFrame,
+    initial_cash: float,
+    periods_per_year: int = PERIODS_PER_YEAR,
+) -> Dict[str, float]:
+    """
+    Total return, CAGR, annualized Sharpe ratio, max drawdown (0-1), win rate
+    and trade count of an equity curve.
+    """
+    values = portfolio_value.to_numpy(dtype=float)
+    total_return = values[-1] / initial_cash - 1
+    index = portfolio_value.index
+    if isinstance(index, pd.DatetimeIndex) and len(index) > 1:
+        years = (index[-1] - index[0]).days / 365.25
+    else:
+        years = len(values) / periods_per_year
+    cagr = (values[-1] / initial_cash) ** (1 / years) - 1 if years > 0 else 0.0
+    period_returns = returns.to_numpy(dtype=float)
+    std = period_returns.std(ddof=1) if len(period_returns) > 1 else 0.0
+    sharpe = period_returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else 0.0
+    drawdown = 1 - values / np.maximum.accumulate(values)
+    return {
+        "total_return": float(total_return),
+        "cagr": float(cagr),
+        "sharpe_ratio": float(sharpe),
+        "max_drawdown": float(drawdown.max()),
+        "win_rate": float((trades["pnl"] > 0).mean()) if len(trades) else 0.0,
+        "trades": len(trades),
+    }
+
+
+def _as_grid(
+    signals: Optional[Signals], index: pd.Index, symbols: List[str]
+) -> Optional[np.ndarray]:
+    """
+    Align entry or exit signals to a (time, symbol) boolean array.
+    """
+    if signals is None:
+        return None
+    if isinstance(signals, pd.Series):
+        signals = signals.to_frame(symbols[0])
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.reindex(index=index, columns=symbols)
+        return signals.fillna(False).to_numpy(dtype=bool)
+    grid = np.asarray(signals, dtype=bool)
+    return grid.reshape(len(index), len(symbols))
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """
+    Forward-fill NaN down each column.
+    """
+    return pd.DataFrame(values).ffill().to_numpy()
+
+
+class Backtest:
+    """
+    Vectorized long-only backtest of entry and exit signals.
+
+    Each symbol trades its own equal share of initial_cash. On an entry signal
+    position_size of that sleeve's equity pays for shares bought at the close
+    and their commission, so a fully invested sleeve never goes below zero
+    cash; they are sold at the close of the next exit signal, and positions
+    still open on the last bar are closed there. commission is a fraction of
+    the traded value charged on both sides. Without signals every symbol is
+    bought on its first bar and held, which gives a buy-and-hold baseline.
+    """
+
+    def __init__(
+        self,
+        initial_cash: float = 10000.0,
+        position_size: float = 1.0,
+        commission: float = 0.0,
+        periods_per_year: int = PERIODS_PER_YEAR,
+    ):
+        if initial_cash <= 0:
+            raise ValueError("initial_cash must be positive")
+        if not 0 < position_size <= 1:
+            raise ValueError("position_size must be in (0, 1]")
+        if not 0 <= commission < 1:
+            raise ValueError("commission must be in [0, 1)")
+        self.initial_cash = float(initial_cash)
+        self.position_size = float(position_size)
+        self.commission = float(commission)
+        self.periods_per_year = periods_per_year
+
+    @staticmethod
+    def prepare(data: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Validate price data and return it as a (field, symbol) panel.
+        Accepts a panel or a single-symbol OHLCV frame with any column case.
+        """
+        if data is None or data.empty:
+            raise ValueError("No price data to backtest")
+        if not isinstance(data.columns, pd.MultiIndex):
+            data = to_panel({"symbol": data.rename(columns=str.lower)})
+        fields = set(data.columns.get_level_values(0))
+        if "close" not in fields:
+            raise ValueError("Price data must have a close column")
+        prices = data[[f for f in PRICE_FIELDS if f in fields]]
+        if (prices.to_numpy(dtype=float) <= 0).any():
+            raise ValueError("Prices must be positive")
+        return data.sort_index(), panel_symbols(data)
+
+    def run(
+        self,
+        data: pd.DataFrame,
+        entries: Optional[Signals] = None,
+        exits: Optional[Signals] = None,
+    ) -> BacktestResult:
+        """
+        Simulate the portfolio. entries and exits are boolean signals aligned
+        to data: a Series for one symbol, or a time x symbol frame or array.
+        """
+        panel, symbols = self.prepare(data)
+        index = panel.index
+        raw_close = panel["close"].reindex(columns=symbols).to_numpy(dtype=float)
+        close = _ffill(raw_close)
+        traded = ~np.isnan(raw_close)
+        entries = _as_grid(entries, index, symbols)
+        exits = _as_grid(exits, index, symbols)
+        if entries is None:
+            first = np.argmax(traded, axis=0)
+            entries = np.zeros_like(traded)
+            entries[first, np.arange(len(symbols))] = traded.any(axis=0)
+        if exits is None:
+            exits = np.zeros_like(traded)
+        entries = entries & traded
+        exits = exits & traded
+
+        # Position state: 1 from an entry until the next exit (exits win ties)
+        state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+        state = np.nan_to_num(_ffill(state))
+        state[-1] = 0
+        previous = np.vstack([np.zeros((1, len(symbols))), state[:-1]])
+        # Trades in (symbol, time) order; starts and ends pair up per symbol
+        start_s, start_t = np.nonzero(((state == 1) & (previous == 0)).T)
+        end_s, end_t = np.nonzero(((state == 0) & (previous == 1)).T)
+        entry_price = close[start_t, start_s]
+        exit_price = close[end_t, end_s]
+
+        f, c = self.position_size, self.commission
+        # Shares worth f / (1 + c) of equity cost f of it with commission
+        notional = f / (1 + c)
+        growth = 1 - f + notional * (exit_price / entry_price) * (1 - c)
+        sleeve = self.initial_cash / len(symbols)
+        # Sleeve equity before each trade: product of earlier trade growth
+        after = pd.Series(growth).groupby(start_s).cumprod()
+        before = after.groupby(start_s).shift(fill_value=1.0).to_numpy()
+        after = after.to_numpy()
+        equity_entry = sleeve * before
+        equity_after = sleeve * after
+
+        # Equity of every sleeve on every bar from the trade in force
+        trade_id = np.full(state.shape, np.nan)
+        trade_id[start_t, start_s] = np.arange(len(start_t))
+        trade_id = _ffill(trade_id)
+        open_trade = state == 1
+        known = ~np.isnan(trade_id)
+        k = np.where(known, trade_id, 0).astype(int)
+        if len(start_t):
+            holding = equity_entry[k] * (1 - f + notional * close / entry_price[k])
+            flat = np.where(known, equity_after[k], sleeve)
+            equity = np.where(open_trade & known, holding, flat)
+        else:
+            equity = np.full(state.shape, sleeve)
+
+        portfolio_value = pd.Series(equity.sum(axis=1), index=index, name="equity")
+        returns = portfolio_value.pct_change().rename("returns")
+        # The first bar's return is measured from the starting cash, so any
+        # entry commission on it is included and returns compound to equity
+        returns.iloc[0] = portfolio_value.iloc[0] / self.initial_cash - 1
+        trades = pd.DataFrame(
+            {
+                "symbol": np.asarray(symbols, dtype=object)[start_s],
+                "entry_time": index[start_t],
+                "exit_time": index[end_t],
+                "entry_price": entry_price,
+                "exit_price": exit_price,
+                "shares": notional * equity_entry / entry_price,
+                "position_size": f,
+                "pnl": equity_after - equity_entry,
+                "return": growth - 1,
+            },
+            columns=TRADE_COLUMNS,
+        )
+        trades = trades.sort_values(["entry_time", "symbol"], kind="stable")
+        positions = pd.DataFrame(state, index=index, columns=symbols)
+        return BacktestResult(
+            portfolio_value,
+            returns,
+            trades.reset_index(drop=True),
+            positions,
+            self.initial_cash,
+            self.periods_per_year,
+        )
+
+
+def signal_masks(
+    events: pd.DataFrame, index: pd.Index, symbols: List[str]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Turn signal events (EVENT_COLUMNS) into time x symbol entry (BUY) and
+    exit (SELL) frames for Backtest.run.
+    """
+    masks = []
+    for signal_type in ("BUY", "SELL"):
+        mask = np.zeros((len(index), len(symbols)), dtype=bool)
+        hits = events[events["signal_type"] == signal_type]
+        rows = index.get_indexer(hits["timestamp"])
+        cols = pd.Index(symbols).get_indexer(hits["symbol"])
+        keep = (rows >= 0) & (cols >= 0)
+        mask[rows[keep], cols[keep]] = True
+        masks.append(pd.DataFrame(mask, index=index, columns=symbols))
+    return masks[0], masks[1]
+
+
 def load_historical_data(db, symbol, start_date, end_date):
     """
     Load historical price and indicator data for backtesting.
@@ -66,32 +366,135 @@ def load_historical_data(db, symbol, start_date, end_date):
     return price_df, ind_df
 
 
-def run_backtest(db, symbol, start_date, end_date):
+def run_backtest(db, symbol, start_date, end_date, backtest=None):
     """
-    Run a simple backtest using the same logic as the signal engine.
+    Run a backtest using the same logic as the signal engine: buy on BUY
+    signals, sell on SELL signals. Returns a BacktestResult, or None without data.
     """
     logger.info(f"Running backtest for {symbol} from {start_date} to {end_date}")
     price_df, ind_df = load_historical_data(db, symbol, start_date, end_date)
-    if ind_df.empty:
+    if ind_df.empty or price_df.empty:
         logger.warning(f"No indicator data for {symbol} in backtest range.")
-        return
-    signals = []
-    for i in range(1, len(ind_df)):
-        window = ind_df.iloc[i - 1 : i + 1]
-        ma_signals = detect_ma_crossover(window)
-        rsi_signals = detect_rsi_signals(window)
-        for sig in ma_signals + rsi_signals:
-            signals.append(
-                {
-                    "timestamp": window.index[-1],
-                    "signal_type": sig["signal_type"],
-                    "reason": sig["reason"],
-                    "values": sig["values"],
-                }
+        return None
+    events = detect_signal_events(ind_df)
+    events["symbol"] = symbol
+    logger.info(f"Backtest for {symbol}: {len(events)} signals generated.")
+    entries, exits = signal_masks(events, price_df.index, [symbol])
+    result = (backtest or Backtest()).run(to_panel({symbol: price_df}), entries, exits)
+    log_metrics(symbol, result)
+    return result
+
+
+def log_metrics(name: str, result: BacktestResult) -> None:
+    metrics = result.metrics
+    logger.info(
+        f"{name}: return {metrics['total_return']:.2%}, CAGR {metrics['cagr']:.2%}, "
+        f"Sharpe {metrics['sharpe_ratio']:.2f}, max drawdown "
+        f"{metrics['max_drawdown']:.2%}, win rate {metrics['win_rate']:.0%} "
+        f"over {metrics['trades']} trades"
+    )
+
+
+def load_backtest_frame(db, symbol: str, start_date, end_date) -> pd.DataFrame:
+    """
+    Prices joined with stored indicators for one symbol, served from the
+    shared indicator cache. When the frame is cached only the range's last
+    price and indicator timestamps are queried; new bars or indicator rows
+    change the key.
+    """
+
+    def last(column):
+        return (
+            db.query(func.max(column.timestamp))
+            .filter(
+                column.symbol == symbol,
+                column.timestamp >= start_date,
+                column.timestamp <= end_date,
             )
-    logger.info(f"Backtest for {symbol}: {len(signals)} signals generated.")
-    # Placeholder: Add portfolio simulation, P&L, and performance metrics here
-    return signals
+            .scalar()
+        )
+
+    def compute():
+        price_df, ind_df = load_historical_data(db, symbol, start_date, end_date)
+        return price_df.join(ind_df) if not ind_df.empty else price_df
+
+    last_bar = last(RawPrice)
+    if last_bar is None:
+        return pd.DataFrame()
+    params = {
+        "source": "stored",
+        "start": pd.Timestamp(start_date),
+        "end": pd.Timestamp(end_date),
+        "indicators_through": last(Indicator),
+    }
+    return indicator_cache.get_or_compute(
+        symbol, STORED_TIMEFRAME, last_bar, INDICATOR_SET, params, compute
+    )
+
+
+def load_backtest_panel(db, symbols: List[str], start_date, end_date) -> pd.DataFrame:
+    """
+    Prices joined with indicators for several symbols, as a (field, symbol) panel.
+    """
+    frames = {}
+    for symbol in symbols:
+        frame = load_backtest_frame(db, symbol, start_date, end_date)
+        if frame.empty:
+            logger.warning(f"No price data for {symbol} in backtest range.")
+            continue
+        frames[symbol] = frame
+    return to_panel(frames)
+
+
+def run_strategy_backtest(
+    db,
+    symbols: List[str],
+    start_date,
+    end_date,
+    runner: Optional[StrategyRunner] = None,
+) -> pd.DataFrame:
+    """
+    Run the enabled strategy plugins over historical data for several symbols.
+    Uses the same StrategyRunner code as live mode, evaluated over the whole range.
+    Returns one row per signal event with the strategy that produced it.
+    """
+    runner = runner or StrategyRunner.from_settings()
+    panel = load_backtest_panel(db, symbols, start_date, end_date)
+    return _evaluate_strategies(runner, panel)
+
+
+def _evaluate_strategies(runner: StrategyRunner, panel: pd.DataFrame) -> pd.DataFrame:
+    events = runner.evaluate(panel)
+    logger.info(
+        f"Strategy backtest over {len(panel_symbols(panel))} symbols: "
+        f"{len(events)} signals generated"
+    )
+    for row in runner.timing_report():
+        logger.info(f"{row['strategy']}: {row['total_ms']:.1f}ms")
+    return events
+
+
+def run_portfolio_backtest(
+    db,
+    symbols: List[str],
+    start_date,
+    end_date,
+    runner: Optional[StrategyRunner] = None,
+    backtest: Optional[Backtest] = None,
+) -> Optional[BacktestResult]:
+    """
+    Simulate trading the enabled strategy plugins' BUY and SELL signals across
+    several symbols. Returns a BacktestResult, or None without price data.
+    """
+    runner = runner or StrategyRunner.from_settings()
+    panel = load_backtest_panel(db, symbols, start_date, end_date)
+    if panel.empty:
+        return None
+    events = _evaluate_strategies(runner, panel)
+    entries, exits = signal_masks(events, panel.index, panel_symbols(panel))
+    result = (backtest or Backtest()).run(panel, entries, exits)
+    log_metrics("Portfolio", result)
+    return result
 
 
 # Example usage
@@ -0,0 +1,378 @@
+"""
+Backtest Cache Module
+
+This module stores backtest results on disk under a key derived from the
+run's inputs: a fingerprint of each symbol's data, the source of the strategy
+and backtest code, and their parameters. Identical runs are served from the
+cache, and portfolio runs cache each symbol's sleeve separately so a rerun
+only recomputes the symbols whose data changed. Least recently used entries
+are evicted when the directory grows past its size limit.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle  # nosec B403 - only used for results this application wrote itself
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from stockapp.backtest import (
+    TRADE_COLUMNS,
+    Backtest,
+    BacktestResult,
+    _evaluate_strategies,
+    log_metrics,
+    signal_masks,
+)
+from stockapp.panel import panel_symbols, to_panel
+from stockapp.strategies import StrategyRunner
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", "data/backtest_cache")
+DEFAULT_MAX_BYTES = int(os.getenv("BACKTEST_CACHE_MAX_MB", "512")) * 1024 * 1024
+SUFFIX = ".pkl"
+
+
+def _sha1(payload: bytes) -> str:
+    return hashlib.sha1(payload).hexdigest()  # nosec B324 - cache key
+
+
+def data_fingerprint(frame: pd.DataFrame) -> str:
+    """
+    Hash of a frame's index, column names and values.
+    """
+    digest = hashlib.sha1()  # nosec B324 - cache key
+    digest.update(json.dumps([str(c) for c in frame.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def code_version(*objects: Any) -> str:
+    """
+    Hash of the source of the modules defining objects and of every stockapp
+    module they import from, directly or through other stockapp modules, so
+    editing a strategy or any helper it depends on changes the version.
+    """
+    modules = {}
+    pending = [inspect.getmodule(obj) for obj in objects]
+    while pending:
+        module = pending.pop()
+        if module is None or module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        for value in vars(module).values():
+            dependency = inspect.getmodule(value)
+            if dependency is not None and dependency.__name__.startswith("stockapp"):
+                pending.append(dependency)
+    digest = hashlib.sha1()  # nosec B324 - cache key
+    for name in sorted(modules):
+        try:
+            source = inspect.getsource(modules[name])
+        except (OSError, TypeError):
+            source = name
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def strategy_inputs(strategy: Any) -> Dict[str, Any]:
+    """
+    A strategy's params plus a hash of each file a param names, such as a
+    rules file or a saved volume profile, so editing the file changes the key.
+    """
+    inputs = dict(strategy.params)
+    for name, value in strategy.params.items():
+        if isinstance(value, (str, Path)) and Path(value).is_file():
+            inputs[f"{name}_sha1"] = _sha1(Path(value).read_bytes())
+    return inputs
+
+
+def run_key(*parts: Any) -> str:
+    """
+    Cache key of a run from JSON-serializable inputs.
+    """
+    return _sha1(json.dumps(parts, sort_keys=True, default=str).encode())
+
+
+class BacktestCache:
+    """
+    Directory of pickled results, one file per key, evicted least recently
+    used first once the files exceed max_bytes.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{SUFFIX}"
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def __len__(self) -> int:
+        return len(self._files())
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)  # nosec B301 - written by put()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable backtest cache entry {key}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a value, then evict old entries if the cache is over its limit.
+        """
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            logger.debug(f"Backtest result {key} larger than cache, not stored")
+            return
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, self._path(key))
+        self._touch(self._path(key))
+        self._evict()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def clear(self) -> int:
+        """
+        Remove every entry. Returns the number removed.
+        """
+        files = self._files()
+        for path in files:
+            path.unlink(missing_ok=True)
+        return len(files)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss/eviction counters and current size.
+        """
+        files = self._files()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(files),
+            "bytes": sum(self._size(path) for path in files),
+        }
+
+    def _files(self) -> List[Path]:
+        return list(self.directory.glob(f"*{SUFFIX}"))
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        # Mark as recently used for eviction; the kernel's own file times are
+        # too coarse to order entries written in quick succession
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+
+def _symbol_frame(panel: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """
+    One symbol's fields on the bars where it traded.
+    """
+    frame = panel.xs(symbol, axis=1, level=1)
+    return frame[frame["close"].notna()]
+
+
+def _run_sleeves(
+    panel: pd.DataFrame,
+    symbols: List[str],
+    runner: StrategyRunner,
+    backtest: Backtest,
+) -> Dict[str, dict]:
+    """
+    Backtest each symbol on its own bars with one unit of starting cash.
+    """
+    subset = panel.loc[:, panel.columns.get_level_values(1).isin(symbols)]
+    events = _evaluate_strategies(runner, subset)
+    unit = Backtest(1.0, backtest.position_size, backtest.commission)
+    sleeves = {}
+    for symbol in symbols:
+        frame = _symbol_frame(panel, symbol)
+        if frame.empty:
+            continue
+        entries, exits = signal_masks(
+            events[events["symbol"] == symbol], frame.index, [symbol]
+        )
+        result = unit.run(to_panel({symbol: frame}), entries, exits)
+        sleeves[symbol] = {
+            "equity": result.portfolio_value,
+            "state": result.positions[symbol],
+            "trades": result.trades,
+        }
+    return sleeves
+
+
+def combine_sleeves(
+    sleeves: Dict[str, dict], index: pd.Index, backtest: Backtest
+) -> BacktestResult:
+    """
+    Scale unit-cash sleeves to equal shares of the starting cash and sum them
+    over the shared timeline, as Backtest.run does for a panel.
+    """
+    symbols = list(sleeves)
+    scale = backtest.initial_cash / len(symbols)
+    equity = np.column_stack(
+        [sleeves[s]["equity"].reindex(index).ffill().fillna(1.0) for s in symbols]
+    )
+    state = np.column_stack(
+        [sleeves[s]["state"].reindex(index).ffill().fillna(0.0) for s in symbols]
+    )
+    state[-1] = 0
+    portfolio_value = pd.Series(equity.sum(axis=1) * scale, index=index, name="equity")
+    returns = portfolio_value.pct_change().rename("returns")
+    returns.iloc[0] = portfolio_value.iloc[0] / backtest.initial_cash - 1
+    frames = [sleeves[s]["trades"] for s in symbols if len(sleeves[s]["trades"])]
+    if frames:
+        trades = pd.concat(frames, ignore_index=True)
+        trades[["shares", "pnl"]] = trades[["shares", "pnl"]] * scale
+        trades = trades.sort_values(["entry_time", "symbol"], kind="stable")
+    else:
+        trades = pd.DataFrame(columns=TRADE_COLUMNS)
+    return BacktestResult(
+        portfolio_value,
+        returns,
+        trades.reset_index(drop=True),
+        pd.DataFrame(state, index=index, columns=symbols),
+        backtest.initial_cash,
+        backtest.periods_per_year,
+    )
+
+
+def cached_portfolio_backtest(
+    panel: pd.DataFrame,
+    runner: Optional[StrategyRunner] = None,
+    backtest: Optional[Backtest] = None,
+    cache: Optional[BacktestCache] = None,
+) -> Optional[BacktestResult]:
+    """
+    Backtest the enabled strategy plugins over a panel like
+    run_portfolio_backtest, reusing cached results.
+
+    The whole run is keyed by the per-symbol keys and the starting cash, so
+    an unchanged run is a single cache read. Otherwise each symbol's sleeve is
+    looked up by its own data fingerprint, and only missing sleeves are
+    evaluated and backtested. A position still open when a symbol's history
+    ends is closed on its own last bar rather than the panel's.
+    """
+    if panel.empty:
+        return None
+    runner = runner or StrategyRunner.from_settings()
+    backtest = backtest or Backtest()
+    if cache is None:
+        cache = BacktestCache()
+    panel = panel.sort_index()
+    symbols = panel_symbols(panel)
+    version = code_version(Backtest, *(type(s) for s in runner.strategies))
+    params = {
+        "position_size": backtest.position_size,
+        "commission": backtest.commission,
+        "strategies": {s.name: strategy_inputs(s) for s in runner.strategies},
+    }
+    keys = {
+        symbol: run_key(
+            "sleeve",
+            symbol,
+            data_fingerprint(_symbol_frame(panel, symbol)),
+            version,
+            params,
+        )
+        for symbol in symbols
+    }
+    key = run_key("portfolio", keys, backtest.initial_cash, backtest.periods_per_year)
+    result = cache.get(key)
+    if result is not None:
+        logger.info(f"Backtest of {len(symbols)} symbols served from cache")
+        return result
+    sleeves = {}
+    missing = []
+    for symbol in symbols:
+        sleeve = cache.get(keys[symbol])
+        if sleeve is None:
+            missing.append(symbol)
+        else:
+            sleeves[symbol] = sleeve
+    logger.info(
+        f"Backtest cache: {len(sleeves)} of {len(symbols)} symbols reused, "
+        f"recomputing {len(missing)}"
+    )
+    if missing:
+        for symbol, sleeve in _run_sleeves(panel, missing, runner, backtest).items():
+            cache.put(keys[symbol], sleeve)
+            sleeves[symbol] = sleeve
+    sleeves = {s: sleeves[s] for s in symbols if s in sleeves}
+    if not sleeves:
+        return None
+    result = combine_sleeves(sleeves, panel.index, backtest)
+    cache.put(key, result)
+    log_metrics("Portfolio", result)
+    return result
@@ -1,36 +1,375 @@
+from pathlib import Path
+from typing import List, Optional
+
 import typer
 
 from stockapp.dashboard import main as start_dashboard  # Placeholder
-from stockapp.main import run_live
-
-# from stockapp.backtests.backtest_engine import run_backtest  # Placeholder
 
 app = typer.Typer(help="StockApp CLI")
 
+DEFAULT_TICKERS_FILE = Path("data/tickers.txt")
+
+
+def load_tickers(path: Path = DEFAULT_TICKERS_FILE) -> List[str]:
+    """Read one ticker per line, skipping blanks."""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
 
 @app.command()
-def scan():
+def scan(
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to scan (defaults to data/tickers.txt)"
+    ),
+    criteria: List[str] = typer.Option(
+        ["gap_up", "rel_volume"], "--criterion", help="Ranking criterion, repeatable"
+    ),
+    top: int = typer.Option(20, help="Symbols to list per criterion"),
+):
     """Run the pre-market scanner and list today's tickers."""
-    # Placeholder: Replace with actual scan logic
-    typer.echo("Running premarket scan...")
-    # premarket_scan(...)
+    from stockapp.db_models import SessionLocal
+    from stockapp.scanner import run_scan
+
+    symbols = symbols or load_tickers()
+    typer.echo(f"Running premarket scan over {len(symbols)} symbols...")
+    db = SessionLocal()
+    try:
+        results = run_scan(db, symbols, criteria, top)
+    finally:
+        db.close()
+    for criterion, ranked in results.items():
+        typer.echo(f"\nTop {len(ranked)} by {criterion}:")
+        for row in ranked.itertuples(index=False):
+            typer.echo(
+                f"{row.symbol:<8} price {row.price:>10.2f}  gap {row.gap_pct:>7.2f}%"
+                f"  rel vol {row.rel_volume:>6.2f}"
+            )
 
 
 @app.command()
 def backtest(
     start: str = typer.Option(..., help="YYYY-MM-DD"),
     end: str = typer.Option(..., help="YYYY-MM-DD"),
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to trade (defaults to data/tickers.txt)"
+    ),
+    initial_cash: float = typer.Option(10000.0, help="Starting cash"),
+    position_size: Optional[float] = typer.Option(
+        None, help="Fraction of equity per trade [default: 1.0]"
+    ),
+    commission: float = typer.Option(0.0, help="Fraction of traded value per side"),
+    cache: bool = typer.Option(True, help="Reuse cached results of unchanged runs"),
+    account_limits: bool = typer.Option(
+        False,
+        help="Trade one account under the position and loss limits in settings",
+    ),
+    resamples: int = typer.Option(
+        1000, help="Bootstrap resamples for robustness bands (0 to skip)"
+    ),
+    stream: bool = typer.Option(
+        False, help="Stream bars from the database in chunks instead of loading all"
+    ),
+    chunk_bars: int = typer.Option(5000, help="Timestamps per streamed chunk"),
+    trace_memory: bool = typer.Option(
+        False, help="Report the streamed run's peak memory (slower)"
+    ),
 ):
     """Run a historical backtest over the given date range."""
+    from stockapp.backtest import (
+        Backtest,
+        load_backtest_panel,
+        run_portfolio_backtest,
+    )
+    from stockapp.backtest_cache import cached_portfolio_backtest
+    from stockapp.db_models import SessionLocal
+    from stockapp.portfolio_backtest import (
+        PortfolioBacktest,
+        run_risk_portfolio_backtest,
+    )
+    from stockapp.robustness import run_robustness
+    from stockapp.streaming_backtest import run_streaming_backtest
+
+    if account_limits and position_size is not None:
+        raise typer.BadParameter(
+            "positions are sized by the account limits in settings",
+            param_hint="--position-size",
+        )
+    if account_limits and stream:
+        raise typer.BadParameter(
+            "the account-limited backtest cannot be streamed", param_hint="--stream"
+        )
+    if trace_memory and not stream:
+        raise typer.BadParameter(
+            "memory is only traced for streamed runs", param_hint="--trace-memory"
+        )
+    symbols = symbols or load_tickers()
     typer.echo(f"Running backtest from {start} to {end}...")
-    # run_backtest(start, end)
+    engine = Backtest(
+        initial_cash, 1.0 if position_size is None else position_size, commission
+    )
+    db = SessionLocal()
+    try:
+        if account_limits:
+            result = run_risk_portfolio_backtest(
+                db,
+                symbols,
+                start,
+                end,
+                backtest=PortfolioBacktest.from_settings(
+                    initial_cash=initial_cash, commission=commission
+                ),
+            )
+        elif stream:
+            result = run_streaming_backtest(
+                db,
+                symbols,
+                start,
+                end,
+                backtest=engine,
+                chunk_bars=chunk_bars,
+                trace_memory=trace_memory,
+            )
+        elif cache:
+            panel = load_backtest_panel(db, symbols, start, end)
+            result = cached_portfolio_backtest(panel, backtest=engine)
+        else:
+            result = run_portfolio_backtest(db, symbols, start, end, backtest=engine)
+    finally:
+        db.close()
+    if result is None:
+        typer.echo("No price data in range.")
+        raise typer.Exit(1)
+    for name, value in result.metrics.items():
+        typer.echo(
+            f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}"
+        )
+    if stream:
+        memory = ""
+        if trace_memory:
+            memory = f", peak memory {result.peak_memory / 2**20:.1f} MiB"
+        typer.echo(f"Streamed {result.chunks} chunks{memory}")
+    if resamples and len(result.returns) > 1:
+        report = run_robustness(result, resamples=resamples)
+        typer.echo(f"Bootstrap percentiles over {resamples} resamples:")
+        typer.echo(report.bands.to_string(float_format="{:.4f}".format))
+
+
+@app.command()
+def sweep(
+    start: str = typer.Option(..., help="YYYY-MM-DD"),
+    end: str = typer.Option(..., help="YYYY-MM-DD"),
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to trade (defaults to data/tickers.txt)"
+    ),
+    grid: List[str] = typer.Option(
+        ..., "--grid", help="Parameter values as name=v1,v2 (repeatable)"
+    ),
+    workers: Optional[int] = typer.Option(None, help="Worker processes"),
+    output: Path = typer.Option(
+        Path("data/sweep_results.csv"), help="CSV results table"
+    ),
+    metric: str = typer.Option("sharpe_ratio", help="Metric to rank by"),
+    screen_bars: Optional[int] = typer.Option(
+        None, help="Screen every combination on the first N bars first"
+    ),
+    keep: float = typer.Option(0.5, help="Fraction of screened combinations kept"),
+    top: int = typer.Option(10, help="Combinations to list"),
+):
+    """Sweep strategy parameters over historical prices in parallel."""
+    from stockapp.backtest import load_backtest_panel
+    from stockapp.db_models import SessionLocal
+    from stockapp.sweep import ma_periods_ordered, parse_grid, run_sweep
+
+    symbols = symbols or load_tickers()
+    db = SessionLocal()
+    try:
+        panel = load_backtest_panel(db, symbols, start, end)
+    finally:
+        db.close()
+    if panel.empty:
+        typer.echo("No price data in range.")
+        raise typer.Exit(1)
+    results = run_sweep(
+        panel,
+        parse_grid(grid),
+        workers=workers,
+        results_path=output,
+        metric=metric,
+        constraint=ma_periods_ordered,
+        screen_bars=screen_bars,
+        keep=keep,
+    )
+    typer.echo(results.head(top).to_string(index=False))
+    typer.echo(f"Results written to {output}")
+
+
+@app.command()
+def walkforward(
+    start: str = typer.Option(..., help="YYYY-MM-DD"),
+    end: str = typer.Option(..., help="YYYY-MM-DD"),
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to trade (defaults to data/tickers.txt)"
+    ),
+    grid: List[str] = typer.Option(
+        ..., "--grid", help="Parameter values as name=v1,v2 (repeatable)"
+    ),
+    train_bars: int = typer.Option(504, help="Bars per train window"),
+    test_bars: int = typer.Option(126, help="Bars per test window"),
+    anchored: bool = typer.Option(False, help="Grow train windows from the start"),
+    workers: Optional[int] = typer.Option(None, help="Worker processes"),
+    metric: str = typer.Option("sharpe_ratio", help="Metric to optimize"),
+    output: Optional[Path] = typer.Option(
+        None, help="CSV file for the out-of-sample equity curve"
+    ),
+):
+    """Walk-forward optimize strategy parameters and report out-of-sample results."""
+    from stockapp.backtest import load_backtest_panel
+    from stockapp.db_models import SessionLocal
+    from stockapp.sweep import ma_periods_ordered, parse_grid
+    from stockapp.walk_forward import run_walk_forward
+
+    symbols = symbols or load_tickers()
+    db = SessionLocal()
+    try:
+        panel = load_backtest_panel(db, symbols, start, end)
+    finally:
+        db.close()
+    if panel.empty:
+        typer.echo("No price data in range.")
+        raise typer.Exit(1)
+    result = run_walk_forward(
+        panel,
+        parse_grid(grid),
+        train_bars,
+        test_bars,
+        anchored=anchored,
+        metric=metric,
+        constraint=ma_periods_ordered,
+        workers=workers,
+    )
+    typer.echo(result.windows.to_string(index=False))
+    for name, value in result.metrics.items():
+        typer.echo(f"out-of-sample {name}: {value}")
+    if output:
+        result.equity.to_csv(output)
+        typer.echo(f"Equity curve written to {output}")
 
 
 @app.command()
-def live(paper: bool = typer.Option(True, help="Paper trade if true")):
-    """Start the live trading loop."""
-    typer.echo(f"Starting live trading. Paper: {paper}")
-    run_live(paper)
+def indicators(
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to update (defaults to data/tickers.txt)"
+    ),
+    workers: int = typer.Option(1, help="Number of worker processes"),
+    chunk_size: int = typer.Option(8, help="Symbols per work unit"),
+):
+    """Recalculate indicators, optionally in parallel across worker processes."""
+    from stockapp.indicators import update_indicators_parallel
+
+    symbols = symbols or load_tickers()
+    typer.echo(f"Updating indicators for {len(symbols)} symbols with {workers} workers")
+    results = update_indicators_parallel(
+        symbols, workers=workers, chunk_size=chunk_size
+    )
+    for key in ["inserted", "updated", "unchanged"]:
+        typer.echo(f"{key}: {sum(counts[key] for counts in results.values())}")
+
+
+@app.command("rebuild-indicators")
+def rebuild_indicators(
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to rebuild (defaults to every stored symbol)"
+    ),
+    workers: int = typer.Option(1, help="Number of worker processes"),
+    chunk_size: int = typer.Option(8, help="Symbols per work unit"),
+):
+    """Regenerate full-history indicators into a shadow table and swap it in."""
+    from stockapp.indicator_rebuild import rebuild_indicators as run_rebuild
+
+    results = run_rebuild(symbols or None, workers=workers, chunk_size=chunk_size)
+    typer.echo(f"Rebuilt {sum(results.values())} rows for {len(results)} symbols")
+
+
+@app.command()
+def pipeline():
+    """Run the event-driven signal pipeline, triggered by new-bar notifications."""
+    import asyncio
+
+    from stockapp.pipeline import run_pipeline
+
+    typer.echo("Starting signal pipeline (Ctrl+C to stop)...")
+    try:
+        asyncio.run(run_pipeline())
+    except KeyboardInterrupt:
+        typer.echo("Pipeline stopped")
+
+
+@app.command()
+def replay(
+    start: str = typer.Option(..., help="First bar to replay, YYYY-MM-DD"),
+    end: Optional[str] = typer.Option(None, help="Last bar to replay, YYYY-MM-DD"),
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to replay (defaults to data/tickers.txt)"
+    ),
+    workers: int = typer.Option(1, help="Worker processes"),
+    show: int = typer.Option(20, help="Differences to list"),
+):
+    """Replay stored bars through the live pipeline and diff against the backtest."""
+    from stockapp.db_models import SessionLocal
+    from stockapp.indicators import get_price_data
+    from stockapp.replay import run_replay
+
+    symbols = symbols or load_tickers()
+    db = SessionLocal()
+    try:
+        frames = {symbol: get_price_data(db, symbol, days=None) for symbol in symbols}
+    finally:
+        db.close()
+    frames = {s: f.loc[:end] if end else f for s, f in frames.items() if not f.empty}
+    if not frames:
+        typer.echo("No price data to replay.")
+        raise typer.Exit(1)
+    report = run_replay(frames, start, workers=workers)
+    typer.echo(report.summary().to_string())
+    typer.echo(f"{report.bars} bars replayed at {report.bars_per_second:.0f} bars/s")
+    if not report.matches:
+        typer.echo(report.diff.head(show).to_string(index=False))
+        raise typer.Exit(1)
+    typer.echo("Live signals match the backtest.")
+
+
+@app.command()
+def live(
+    symbols: Optional[List[str]] = typer.Argument(
+        None, help="Symbols to trade (defaults to data/tickers.txt)"
+    ),
+    paper: bool = typer.Option(True, help="Paper trade if true"),
+    interval: float = typer.Option(60, help="Seconds between strategy runs"),
+):
+    """Start the live trading loop, running the strategies in settings.yaml."""
+    import time
+
+    from stockapp.db_models import SessionLocal
+    from stockapp.strategies import StrategyRunner, run_live
+
+    symbols = symbols or load_tickers()
+    runner = StrategyRunner.from_settings()
+    typer.echo(f"Starting live trading on {len(symbols)} symbols. Paper: {paper}")
+    try:
+        while True:
+            db = SessionLocal()
+            try:
+                rows = run_live(db, symbols, runner)
+            finally:
+                db.close()
+            for row in rows:
+                typer.echo(
+                    f"{row['signal_type']} {row['symbol']} at {row['timestamp']} "
+                    f"({row['reason']})"
+                )
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        typer.echo("Live trading stopped")
 
 
 @app.command()
@@ -6,11 +6,21 @@ from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import desc
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from . import db_models, schemas
 
 
+def dialect_insert(db: Session, model):
+    """
+    Return an INSERT for model that supports ON CONFLICT on the session's database.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model.__table__)
+    return sqlite.insert(model.__table__)
+
+
 def create_market_data(
     db: Session, market_data: schemas.MarketDataBase
 ) -> db_models.RawPrice:
@@ -46,15 +56,20 @@ def get_market_data(
 
 
 def create_signal(db: Session, signal: schemas.SignalBase) -> db_models.Signal:
-    """Create a new trading signal."""
+    """
+    Create a new trading signal. Signals without a reason are stored under
+    MANUAL_SIGNAL_REASON, so the (symbol, timestamp, reason) key still applies.
+    """
     db_signal = db_models.Signal(
         symbol=signal.symbol,
         timestamp=signal.timestamp,
         signal_type=signal.signal_type,
+        reason=signal.reason or db_models.MANUAL_SIGNAL_REASON,
         price=signal.price,
         rsi=signal.rsi,
         sma20=signal.sma20,
         ema50=signal.ema50,
+        details=signal.details,
         executed=False,  # New signals are not executed by default
     )
     db.add(db_signal)
@@ -63,6 +78,69 @@ def create_signal(db: Session, signal: schemas.SignalBase) -> db_models.Signal:
     return db_signal
 
 
+def bulk_create_signals(db: Session, rows: List[dict]) -> int:
+    """
+    Insert many signal rows with a single statement. The caller commits.
+    Rows matching an existing (symbol, timestamp, reason) are skipped, so
+    re-running signal generation is idempotent.
+    Returns the number of rows inserted, not counting skipped ones.
+    """
+    if not rows:
+        return 0
+    stmt = dialect_insert(db, db_models.Signal).on_conflict_do_nothing(
+        index_elements=["symbol", "timestamp", "reason"]
+    )
+    return db.execute(stmt, rows).rowcount
+
+
+def upsert_indicator_values(db: Session, rows: List[dict]) -> None:
+    """
+    Insert or update rsi/sma20/ema50 indicator columns. The caller commits.
+    """
+    if rows:
+        stmt = dialect_insert(db, db_models.Indicator)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol", "timestamp"],
+            set_={col: stmt.excluded[col] for col in ("rsi", "sma20", "ema50")},
+        )
+        db.execute(stmt, rows)
+
+
+def get_warmup_start(
+    db: Session, symbol: str, timestamp: datetime, bars: int
+) -> Optional[datetime]:
+    """
+    Get the timestamp of the bar `bars` bars before timestamp, or None when
+    the symbol has less history than that.
+    """
+    row = (
+        db.query(db_models.RawPrice.timestamp)
+        .filter(
+            db_models.RawPrice.symbol == symbol,
+            db_models.RawPrice.timestamp < timestamp,
+        )
+        .order_by(desc(db_models.RawPrice.timestamp))
+        .offset(bars - 1)
+        .first()
+    )
+    return row[0] if row else None
+
+
+def get_signal_watermark(db: Session, symbol: str) -> Optional[datetime]:
+    """Get the last bar evaluated for a symbol, if any."""
+    watermark = db.get(db_models.SignalWatermark, symbol)
+    return watermark.last_timestamp if watermark else None
+
+
+def set_signal_watermark(db: Session, symbol: str, timestamp: datetime) -> None:
+    """Record the last bar evaluated for a symbol. The caller commits."""
+    stmt = dialect_insert(db, db_models.SignalWatermark)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol"], set_={"last_timestamp": stmt.excluded.last_timestamp}
+    )
+    db.execute(stmt, {"symbol": symbol, "last_timestamp": timestamp})
+
+
 def get_latest_signals(db: Session, limit: int = 20) -> List[db_models.Signal]:
     """Get the latest trading signals."""
     return (
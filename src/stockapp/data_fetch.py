@@ -18,6 +18,8 @@ from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 
 from stockapp.db_models import RawPrice, get_db
+from stockapp.indicator_cache import indicator_cache
+from stockapp.pipeline import notify_new_bar
 
 # Configure logging
 logging.basicConfig(
@@ -85,7 +87,10 @@ def save_to_db(db: Session, symbol: str, data: pd.DataFrame) -> int:
             db.add(price)
             rows_added += 1
     if rows_added > 0:
+        # Delivered on commit, triggering any pipeline listening for new bars
+        notify_new_bar(db, symbol, data.index.max())
         db.commit()
+        indicator_cache.on_new_bar(symbol, data.index.max())
         logger.info(f"Added {rows_added} new records for {symbol}")
     return rows_added
 
@@ -13,6 +13,7 @@ from sqlalchemy import (
     Float,
     Integer,
     String,
+    UniqueConstraint,
     create_engine,
 )
 from sqlalchemy.ext.declarative import declarative_base
@@ -24,6 +25,9 @@ load_dotenv()
 # Get database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Reason stored for signals created without one, so they stay under the dedup key
+MANUAL_SIGNAL_REASON = "MANUAL"
+
 # Create SQLAlchemy engine
 engine = create_engine(DATABASE_URL)
 
@@ -53,6 +57,9 @@ class Indicator(Base):
     """Technical indicators table."""
 
     __tablename__ = "indicators"
+    __table_args__ = (
+        UniqueConstraint("symbol", "timestamp", name="uq_indicators_symbol_timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
@@ -60,25 +67,42 @@ class Indicator(Base):
     rsi = Column(Float)
     sma20 = Column(Float)
     ema50 = Column(Float)
+    values = Column(JSON, nullable=True)
 
 
 class Signal(Base):
     """Trading signals table."""
 
     __tablename__ = "signals"
+    __table_args__ = (
+        UniqueConstraint(
+            "symbol", "timestamp", "reason", name="uq_signals_symbol_timestamp_reason"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
     timestamp = Column(DateTime, index=True)
     signal_type = Column(String)
+    reason = Column(String, nullable=False, default=MANUAL_SIGNAL_REASON)
     price = Column(Float)
     rsi = Column(Float)
     sma20 = Column(Float)
     ema50 = Column(Float)
+    details = Column(JSON, nullable=True)
     executed = Column(Boolean, default=False)
     execution_details = Column(JSON, nullable=True)
 
 
+class SignalWatermark(Base):
+    """Last bar evaluated by the signal generator, per symbol."""
+
+    __tablename__ = "signal_watermarks"
+
+    symbol = Column(String, primary_key=True)
+    last_timestamp = Column(DateTime, nullable=False)
+
+
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
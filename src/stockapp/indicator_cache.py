@@ -0,0 +1,381 @@
+"""
+Indicator Cache Module
+
+This module provides an in-process LRU cache for computed indicator frames, shared by
+the API, signal engine, backtests and dashboard, with an optional shared backend so
+several processes can reuse each other's results. Frames go to the backend as
+Parquet, and a per-symbol generation counter kept in the backend retires every
+process's entries for a symbol when it is invalidated.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.getenv("INDICATOR_CACHE_MAX_MB", "256")) * 1024 * 1024
+DEFAULT_TTL_SECONDS = 900
+
+# (symbol, timeframe, last_bar_timestamp, indicator set, params hash)
+CacheKey = Tuple[str, str, Optional[pd.Timestamp], Tuple[str, ...], str]
+# (whole-cache generation, symbol generation) an entry was written under
+Generation = Tuple[int, int]
+# Cached frame, its size in bytes and the generation it was written under
+Entry = Tuple[pd.DataFrame, int, Optional[Generation]]
+GENERATION_PREFIX = "indicators:generation:"
+ALL_SYMBOLS = "*"
+FREQ_METADATA = b"stockapp.freq"
+
+
+def params_hash(params: Optional[Dict[str, Any]]) -> str:
+    """
+    Stable short hash of indicator parameters.
+    """
+    payload = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]  # nosec B324 - cache key
+
+
+def make_key(
+    symbol: str,
+    timeframe: str,
+    last_bar_timestamp: Optional[pd.Timestamp],
+    indicators: Iterable[str],
+    params: Optional[Dict[str, Any]] = None,
+) -> CacheKey:
+    """
+    Build the cache key for an indicator frame.
+    """
+    ts = pd.Timestamp(last_bar_timestamp) if last_bar_timestamp is not None else None
+    return (symbol, timeframe, ts, tuple(sorted(indicators)), params_hash(params))
+
+
+def key_to_str(key: CacheKey, generation: Generation = (0, 0)) -> str:
+    """
+    Serialize a cache key and its generation for shared backends.
+    """
+    symbol, timeframe, ts, indicators, phash = key
+    ts_str = ts.isoformat() if ts is not None else "none"
+    gen = f"{generation[0]}.{generation[1]}"
+    return (
+        f"indicators:{symbol}:g{gen}:{timeframe}:{ts_str}:"
+        f"{','.join(indicators)}:{phash}"
+    )
+
+
+def frame_to_bytes(frame: pd.DataFrame) -> bytes:
+    """
+    Serialize a frame as Parquet, which unlike pickle cannot run code on load.
+    The index frequency, which Parquet drops, is kept in the file metadata.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(frame)
+    freq = getattr(frame.index, "freqstr", None)
+    if freq:
+        metadata = {**(table.schema.metadata or {}), FREQ_METADATA: freq.encode()}
+        table = table.replace_schema_metadata(metadata)
+    buffer = pa.BufferOutputStream()
+    pq.write_table(table, buffer)
+    return buffer.getvalue().to_pybytes()
+
+
+def frame_from_bytes(payload: bytes) -> pd.DataFrame:
+    """
+    Read a frame written by frame_to_bytes().
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(pa.BufferReader(payload))
+    frame = table.to_pandas()
+    freq = (table.schema.metadata or {}).get(FREQ_METADATA)
+    if freq:
+        frame.index = pd.DatetimeIndex(frame.index, freq=freq.decode())
+    return frame
+
+
+class CacheBackend(ABC):
+    """
+    Interface for a cache shared between processes.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Value stored under key, or None."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        """Store value under key for ttl seconds."""
+
+    @abstractmethod
+    def generations(self, names: List[str]) -> List[int]:
+        """Current value of each generation counter, 0 if never bumped."""
+
+    @abstractmethod
+    def bump(self, name: str) -> int:
+        """Increment a generation counter and return its new value."""
+
+
+class InMemoryBackend(CacheBackend):
+    """
+    Dict-backed shared backend, used in tests and single-process setups.
+    """
+
+    def __init__(self):
+        self.store: Dict[str, Tuple[bytes, float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self.store.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.store[key] = (value, time.monotonic() + ttl)
+
+    def generations(self, names: List[str]) -> List[int]:
+        return [self.counters.get(name, 0) for name in names]
+
+    def bump(self, name: str) -> int:
+        self.counters[name] = self.counters.get(name, 0) + 1
+        return self.counters[name]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis-backed shared backend.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl)
+
+    def generations(self, names: List[str]) -> List[int]:
+        return [int(value or 0) for value in self.client.mget(names)]
+
+    def bump(self, name: str) -> int:
+        return int(self.client.incr(name))
+
+
+class IndicatorCache:
+    """
+    Memory-bounded LRU cache of indicator frames.
+
+    Keys include the timestamp of the last bar used, so a frame is never served
+    for a symbol that has received newer bars. on_new_bar() also drops the
+    symbol's entries straight away, including frames a backfilled bar falls
+    inside, so they are neither served nor hold memory until evicted. With a
+    shared backend it also bumps the symbol's generation there: backend keys
+    include it, and local entries written under an older generation, in this
+    or any other process, are no longer served.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backend: Optional[CacheBackend] = None,
+        ttl: int = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.backend_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[pd.DataFrame]:
+        """
+        Return a copy of the cached frame, or None on a miss.
+        """
+        generation = self._generation(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+        if generation is not None:
+            payload = self._backend_get(key, generation)
+            if payload is not None:
+                frame = frame_from_bytes(payload)
+                self._store(key, frame, generation)
+                with self._lock:
+                    self.hits += 1
+                    self.backend_hits += 1
+                return frame.copy()
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, frame: pd.DataFrame) -> None:
+        """
+        Store a frame locally and in the shared backend.
+        """
+        frame = frame.copy()
+        generation = self._generation(key[0])
+        self._store(key, frame, generation)
+        if generation is not None:
+            try:
+                self.backend.set(
+                    key_to_str(key, generation), frame_to_bytes(frame), self.ttl
+                )
+            except Exception as e:
+                logger.warning(f"Shared indicator cache write failed: {e}")
+
+    def get_or_compute(
+        self,
+        symbol: str,
+        timeframe: str,
+        last_bar_timestamp: Optional[pd.Timestamp],
+        indicators: Iterable[str],
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """
+        Return the cached frame for the key, computing and storing it on a miss.
+        """
+        key = make_key(symbol, timeframe, last_bar_timestamp, indicators, params)
+        frame = self.get(key)
+        if frame is None:
+            frame = compute()
+            if not frame.empty:
+                self.put(key, frame)
+        return frame
+
+    def on_new_bar(self, symbol: str, timestamp: pd.Timestamp) -> int:
+        """
+        Drop entries for symbol once a bar at timestamp is stored. Frames built
+        from earlier bars are outdated, and a backfilled bar can fall inside
+        the window of frames ending after it, so every entry for symbol goes.
+        Returns the number of entries removed.
+        """
+        return self.invalidate(symbol)
+
+    def invalidate(self, symbol: Optional[str] = None) -> int:
+        """
+        Drop all entries for symbol, or the whole cache when symbol is None,
+        here and, through the backend's generation counters, in every process.
+        """
+        if self.backend is not None:
+            try:
+                self.backend.bump(GENERATION_PREFIX + (symbol or ALL_SYMBOLS))
+            except Exception as e:
+                logger.warning(f"Shared indicator cache invalidation failed: {e}")
+        return self._remove(lambda key: symbol is None or key[0] == symbol)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss/eviction counters and current size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "backend_hits": self.backend_hits,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+            }
+
+    def _generation(self, symbol: str) -> Optional[Generation]:
+        """
+        The backend's (whole cache, symbol) generation; None without a
+        backend or when it cannot be read.
+        """
+        if self.backend is None:
+            return None
+        try:
+            everything, own = self.backend.generations(
+                [GENERATION_PREFIX + ALL_SYMBOLS, GENERATION_PREFIX + symbol]
+            )
+        except Exception as e:
+            logger.warning(f"Shared indicator cache read failed: {e}")
+            return None
+        return everything, own
+
+    def _backend_get(self, key: CacheKey, generation: Generation) -> Optional[bytes]:
+        try:
+            return self.backend.get(key_to_str(key, generation))
+        except Exception as e:
+            logger.warning(f"Shared indicator cache read failed: {e}")
+            return None
+
+    def _store(
+        self,
+        key: CacheKey,
+        frame: pd.DataFrame,
+        generation: Optional[Generation] = None,
+    ) -> None:
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            logger.debug(f"Frame for {key[0]} larger than cache, not stored")
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (frame, size, generation)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def _remove(self, predicate: Callable[[CacheKey], bool]) -> int:
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                _, size, _ = self._entries.pop(key)
+                self.current_bytes -= size
+            return len(stale)
+
+
+def _default_backend() -> Optional[CacheBackend]:
+    """
+    Use Redis as the shared backend when REDIS_URL is configured.
+    """
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+    try:
+        return RedisBackend(url)
+    except ImportError:
+        logger.warning("REDIS_URL is set but redis is not installed")
+        return None
+
+
+# Process-wide cache shared by every consumer of indicator frames
+indicator_cache = IndicatorCache(backend=_default_backend())
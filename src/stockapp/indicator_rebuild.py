@@ -0,0 +1,275 @@
+"""
+Indicator Rebuild Module
+
+This module regenerates indicators for every symbol over the full price history.
+Indicators are computed in parallel and bulk-loaded into a shadow table, which is then
+swapped in place of the live indicators table in a single transaction, so readers
+never see a half-rebuilt table. Rows the rebuild did not regenerate (other symbols,
+and bars indicators were written for while it ran) are carried over in the swap.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from sqlalchemy import (
+    MetaData,
+    Table,
+    UniqueConstraint,
+    create_engine,
+    func,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateTable
+
+from stockapp.db_models import DATABASE_URL, Indicator, RawPrice
+from stockapp.indicator_cache import indicator_cache
+from stockapp.indicators import (
+    calculate_indicators,
+    chunk_symbols,
+    get_price_data,
+    indicator_rows,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+LIVE_TABLE = Indicator.__tablename__
+SHADOW_TABLE = f"{LIVE_TABLE}_rebuild"
+RETIRED_TABLE = f"{LIVE_TABLE}_retired"
+
+# Engine owned by each worker process of the rebuild pool
+_worker_engine: Optional[Engine] = None
+
+
+def shadow_table(name: str = SHADOW_TABLE) -> Table:
+    """
+    Copy of the indicators table under a new name.
+    Named constraints get the shadow prefix so they cannot clash with the live table.
+    """
+    table = Indicator.__table__.to_metadata(MetaData(), name=name)
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name:
+            constraint.name = constraint.name.replace(LIVE_TABLE, name, 1)
+    return table
+
+
+def create_shadow_table(engine: Engine) -> Table:
+    """
+    Create an empty shadow table without secondary indexes, for fast loading.
+    """
+    table = shadow_table()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        conn.execute(CreateTable(table))
+    return table
+
+
+def _init_rebuild_worker(database_url: str) -> Engine:
+    """
+    Give each pool worker its own engine, and return it.
+    """
+    global _worker_engine
+    _worker_engine = create_engine(database_url)
+    return _worker_engine
+
+
+def bulk_load(conn: Connection, table: Table, rows: List[dict]) -> None:
+    """
+    Load indicator rows into table, using COPY on PostgreSQL.
+    """
+    if not rows:
+        return
+    if conn.dialect.name != "postgresql":
+        conn.execute(table.insert(), rows)
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [row["symbol"], row["timestamp"].isoformat(), json.dumps(row["values"])]
+        )
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(
+        f'COPY {table.name} (symbol, timestamp, "values") FROM STDIN WITH CSV', buffer
+    )
+
+
+def _rebuild_chunk(symbols: List[str]) -> Dict[str, int]:
+    """
+    Compute full-history indicators for a chunk of symbols and load them
+    into the shadow table. Returns rows loaded per symbol.
+    """
+    table = shadow_table()
+    results = {}
+    db = Session(bind=_worker_engine)
+    try:
+        with _worker_engine.begin() as conn:
+            for symbol in symbols:
+                prices = get_price_data(db, symbol, days=None)
+                if prices.empty:
+                    results[symbol] = 0
+                    continue
+                rows = [
+                    {"symbol": symbol, "timestamp": ts.to_pydatetime(), "values": v}
+                    for ts, v in indicator_rows(calculate_indicators(prices)).items()
+                ]
+                bulk_load(conn, table, rows)
+                results[symbol] = len(rows)
+    finally:
+        db.close()
+    return results
+
+
+def _postgres_renames(table: Table) -> List[str]:
+    """
+    Statements that give the swapped-in table the live table's object names.
+    """
+    statements = [
+        f"ALTER SEQUENCE IF EXISTS {SHADOW_TABLE}_id_seq RENAME TO {LIVE_TABLE}_id_seq",
+        f"ALTER INDEX {SHADOW_TABLE}_pkey RENAME TO {LIVE_TABLE}_pkey",
+    ]
+    for index in table.indexes:
+        live_name = index.name.replace(SHADOW_TABLE, LIVE_TABLE, 1)
+        statements.append(f"ALTER INDEX {index.name} RENAME TO {live_name}")
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.name:
+            live_name = constraint.name.replace(SHADOW_TABLE, LIVE_TABLE, 1)
+            statements.append(
+                f"ALTER TABLE {LIVE_TABLE} RENAME CONSTRAINT "
+                f"{constraint.name} TO {live_name}"
+            )
+    return statements
+
+
+def carry_over_rows(
+    conn: Connection, table: Table, source: Table, rebuilt: Optional[List[str]]
+) -> int:
+    """
+    Copy rows of source the rebuild did not regenerate into table: every row
+    of symbols outside rebuilt (None means all symbols were rebuilt), and rows
+    after the last rebuilt bar of a symbol, written while the rebuild ran.
+    Returns the rows copied.
+    """
+    latest = (
+        select(func.max(table.c.timestamp))
+        .where(table.c.symbol == source.c.symbol)
+        .scalar_subquery()
+    )
+    keep = source.c.timestamp > latest
+    if rebuilt is not None:
+        keep = or_(source.c.symbol.notin_(rebuilt), keep)
+    columns = ["symbol", "timestamp", "values"]
+    rows = select(*(source.c[c] for c in columns)).where(keep)
+    return conn.execute(table.insert().from_select(columns, rows)).rowcount
+
+
+def swap_tables(
+    engine: Engine, table: Table, rebuilt: Optional[List[str]] = None
+) -> int:
+    """
+    Replace the live indicators table with the shadow table in one transaction.
+    DDL is transactional on PostgreSQL, so readers see either the old or the
+    new table and never a mix. Renaming the live table first locks out
+    writers, so rows they committed are all carried over (see carry_over_rows)
+    before the shadow table goes live. Returns the rows carried over.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {RETIRED_TABLE}"))
+        conn.execute(text(f"ALTER TABLE {LIVE_TABLE} RENAME TO {RETIRED_TABLE}"))
+        carried = carry_over_rows(conn, table, shadow_table(RETIRED_TABLE), rebuilt)
+        conn.execute(text(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {LIVE_TABLE}"))
+        conn.execute(text(f"DROP TABLE {RETIRED_TABLE}"))
+        if conn.dialect.name == "postgresql":
+            for statement in _postgres_renames(table):
+                conn.execute(text(statement))
+        else:
+            # SQLite cannot rename indexes, so recreate them under the live names
+            for index in table.indexes:
+                live_name = index.name.replace(SHADOW_TABLE, LIVE_TABLE, 1)
+                columns = ", ".join(c.name for c in index.columns)
+                conn.execute(text(f"DROP INDEX {index.name}"))
+                conn.execute(
+                    text(f"CREATE INDEX {live_name} ON {LIVE_TABLE} ({columns})")
+                )
+    return carried
+
+
+def rebuild_indicators(
+    symbols: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 8,
+    database_url: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Regenerate indicators for symbols (by default every stored symbol) over
+    the full history.
+
+    Rows are bulk-loaded into a shadow table by a process pool. Indexes are
+    built once loading is complete and the shadow table is then swapped in,
+    keeping the live rows of symbols not rebuilt. On failure the shadow table
+    is dropped and the live table is untouched. Returns rows loaded per symbol.
+    """
+    database_url = database_url or DATABASE_URL
+    workers = workers or os.cpu_count() or 1
+    engine = create_engine(database_url)
+    # A full rebuild keeps no other symbols' rows, only ones written meanwhile
+    rebuilt = None if symbols is None else list(symbols)
+    if symbols is None:
+        db = sessionmaker(bind=engine)()
+        symbols = [s for (s,) in db.query(RawPrice.symbol).distinct()]
+        db.close()
+    table = create_shadow_table(engine)
+    chunks = chunk_symbols(list(symbols), chunk_size)
+    logger.info(
+        f"Rebuilding indicators for {len(symbols)} symbols "
+        f"in {len(chunks)} chunks across {workers} workers"
+    )
+    results: Dict[str, int] = {}
+    try:
+        if workers == 1 or len(chunks) <= 1:
+            worker_engine = _init_rebuild_worker(database_url)
+            try:
+                for chunk in chunks:
+                    results.update(_rebuild_chunk(chunk))
+            finally:
+                worker_engine.dispose()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_rebuild_worker,
+                initargs=(database_url,),
+            ) as pool:
+                futures = [pool.submit(_rebuild_chunk, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    results.update(future.result())
+        with engine.begin() as conn:
+            for index in table.indexes:
+                index.create(conn)
+        carried = swap_tables(engine, table, rebuilt)
+        # Cached frames joined with the replaced rows are no longer valid
+        indicator_cache.invalidate()
+    except Exception as e:
+        logger.error(f"Indicator rebuild failed, live table left unchanged: {e}")
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        raise
+    finally:
+        engine.dispose()
+    logger.info(
+        f"Rebuild complete: loaded {sum(results.values())} indicator rows, "
+        f"kept {carried} rows not rebuilt"
+    )
+    return results
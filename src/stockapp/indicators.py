@@ -7,12 +7,20 @@ from historical price data and storing the results in the database.
 
 # Technical indicator computations
 import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import pandas as pd
 import pandas_ta as ta
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 
-from stockapp.db_models import Indicator, RawPrice, get_db
+from stockapp import crud
+from stockapp.db_models import DATABASE_URL, Indicator, RawPrice, get_db
+from stockapp.indicator_cache import indicator_cache
 
 # Configure logging
 logging.basicConfig(
@@ -20,37 +28,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
 
-def get_price_data(db: Session, symbol: str, days: int = 200) -> pd.DataFrame:
+# Indicator set and parameters produced by calculate_indicators, used in cache keys
+INDICATOR_SET = ("sma_20", "ema_50", "rsi_14", "macd", "bbands")
+INDICATOR_PARAMS = {"sma": 20, "ema": 50, "rsi": 14, "macd": (12, 26, 9), "bbands": 5}
+# Cache key timeframe of frames built from bars as stored in raw_prices
+STORED_TIMEFRAME = "stored"
+
+# Bars of history carried between chunks. The slowest recursive indicator is the
+# 50-period EMA (alpha = 2/51); (49/51) ** 700 < 1e-12, so a seed 700 bars back no
+# longer affects results beyond floating-point noise.
+WARMUP_BARS = 700
+# Bars of history the live path recalculates indicators over on every new bar
+LIVE_WINDOW = 200
+
+
+def get_price_data(
+    db: Session, symbol: str, days: Optional[int] = LIVE_WINDOW
+) -> pd.DataFrame:
     """
     Get historical price data for a symbol from the database.
+    Pass days=None to load the full history.
     """
-    query = (
-        db.query(RawPrice)
+    rows = (
+        db.query(
+            RawPrice.timestamp,
+            RawPrice.open,
+            RawPrice.high,
+            RawPrice.low,
+            RawPrice.close,
+            RawPrice.volume,
+        )
         .filter(RawPrice.symbol == symbol)
         .order_by(RawPrice.timestamp.desc())
         .limit(days)
+        .all()
     )
-    result = query.all()
-    if not result:
+    if not rows:
         logger.warning(f"No price data found for {symbol}")
         return pd.DataFrame()
-    data = pd.DataFrame(
-        [
-            {
-                "timestamp": r.timestamp,
-                "open": r.open,
-                "high": r.high,
-                "low": r.low,
-                "close": r.close,
-                "volume": r.volume,
-            }
-            for r in result
-        ]
+    # Plain column tuples rather than ORM objects; newest first, so reverse
+    return pd.DataFrame.from_records(
+        rows[::-1], columns=["timestamp"] + PRICE_COLUMNS, index="timestamp"
     )
-    data = data.sort_values("timestamp")
-    data.set_index("timestamp", inplace=True)
-    return data
 
 
 def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
@@ -64,68 +85,314 @@ def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
         return df
     if df["close"].isna().any():
         logger.warning("NaN values found in 'close' column. Filling with forward fill.")
-        df["close"] = df["close"].fillna(method="ffill")
+        df["close"] = df["close"].ffill()
     df["sma_20"] = ta.sma(df["close"], length=20)
     df["ema_50"] = ta.ema(df["close"], length=50)
     df["rsi_14"] = ta.rsi(df["close"], length=14)
-    macd = ta.macd(df["close"])
-    df = pd.concat([df, macd], axis=1)
-    bbands = ta.bbands(df["close"])
-    df = pd.concat([df, bbands], axis=1)
+    # Assign columns in place rather than pd.concat, which copies the whole frame
+    for extra in (ta.macd(df["close"]), ta.bbands(df["close"])):
+        if extra is not None:
+            for col in extra.columns:
+                df[col] = extra[col]
     return df
 
 
-def save_indicators_to_db(db: Session, symbol: str, df: pd.DataFrame) -> int:
+def iter_price_chunks(
+    db: Session, symbol: str, chunk_size: int = 50000
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield a symbol's price history in time order, chunk_size bars at a time.
+    Uses keyset pagination on timestamp so each query stays cheap.
+    """
+    last_timestamp = None
+    while True:
+        query = db.query(RawPrice).filter(RawPrice.symbol == symbol)
+        if last_timestamp is not None:
+            query = query.filter(RawPrice.timestamp > last_timestamp)
+        rows = query.order_by(RawPrice.timestamp.asc()).limit(chunk_size).all()
+        if not rows:
+            return
+        last_timestamp = rows[-1].timestamp
+        yield pd.DataFrame(
+            {
+                "open": [r.open for r in rows],
+                "high": [r.high for r in rows],
+                "low": [r.low for r in rows],
+                "close": [r.close for r in rows],
+                "volume": [r.volume for r in rows],
+            },
+            index=pd.DatetimeIndex([r.timestamp for r in rows], name="timestamp"),
+        )
+        if len(rows) < chunk_size:
+            return
+
+
+def iter_indicator_chunks(
+    price_chunks: Iterable[pd.DataFrame], warmup: int = WARMUP_BARS
+) -> Iterator[pd.DataFrame]:
+    """
+    Calculate indicators chunk by chunk over a time-ordered stream of price frames.
+
+    The last warmup bars of each chunk are carried into the next one, so rolling
+    windows see complete history and recursive indicators (EMA, RSI, MACD) have
+    converged to the full-history values within floating-point tolerance.
+    Memory use depends on chunk size and warmup, not on history length.
+    """
+    carry = None
+    for chunk in price_chunks:
+        if chunk.empty:
+            continue
+        frame = chunk if carry is None else pd.concat([carry, chunk])
+        skip = 0 if carry is None else len(carry)
+        carry = frame.iloc[-warmup:] if warmup else None
+        yield calculate_indicators(frame.copy()).iloc[skip:]
+
+
+def update_symbol_indicators_chunked(
+    db: Session, symbol: str, chunk_size: int = 50000, warmup: int = WARMUP_BARS
+) -> Dict[str, int]:
+    """
+    Calculate and save indicators for a symbol's full history with bounded memory.
+    Each chunk is written as soon as it is computed.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for frame in iter_indicator_chunks(
+        iter_price_chunks(db, symbol, chunk_size), warmup
+    ):
+        for key, value in save_indicators_to_db(db, symbol, frame).items():
+            counts[key] += value
+    logger.info(
+        f"Updated indicators for {symbol} in chunks: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['unchanged']} unchanged"
+    )
+    return counts
+
+
+def get_indicator_frame(
+    db: Session, symbol: str, days: int = LIVE_WINDOW
+) -> pd.DataFrame:
+    """
+    Get the last days of price data with indicators for a symbol, served from
+    the shared cache. Only the latest bar timestamp is queried when the frame
+    is already cached.
+    """
+    last_bar = (
+        db.query(func.max(RawPrice.timestamp))
+        .filter(RawPrice.symbol == symbol)
+        .scalar()
+    )
+    if last_bar is None:
+        logger.warning(f"No price data found for {symbol}")
+        return pd.DataFrame()
+    return indicator_cache.get_or_compute(
+        symbol,
+        STORED_TIMEFRAME,
+        last_bar,
+        INDICATOR_SET,
+        dict(INDICATOR_PARAMS, days=days),
+        lambda: calculate_indicators(get_price_data(db, symbol, days)),
+    )
+
+
+def indicator_rows(df: pd.DataFrame) -> Dict[pd.Timestamp, Dict[str, float]]:
+    """
+    Convert an indicator frame into {timestamp: {indicator: value}} rows.
+    Rows where every indicator is NaN are dropped.
+    """
+    indicator_columns = [col for col in df.columns if col not in PRICE_COLUMNS]
+    values = df[indicator_columns]
+    present = values.notna().to_numpy()
+    keep = present.any(axis=1)
+    array = values.to_numpy(dtype=float)[keep]
+    return {
+        pd.Timestamp(ts): {
+            col: v for col, v, ok in zip(indicator_columns, row.tolist(), mask) if ok
+        }
+        for ts, row, mask in zip(values.index[keep], array, present[keep])
+    }
+
+
+def _values_equal(stored: Optional[dict], new: Dict[str, float]) -> bool:
+    """
+    Compare stored and freshly calculated indicator values with a float tolerance.
+    """
+    if not stored or stored.keys() != new.keys():
+        return False
+    return all(math.isclose(stored[k], new[k], rel_tol=1e-9) for k in new)
+
+
+def save_indicators_to_db(
+    db: Session, symbol: str, df: pd.DataFrame, commit: bool = True
+) -> Dict[str, int]:
     """
     Save calculated indicators to the database.
+
+    Stored rows for the frame's date range are read in one query and compared
+    with the new values; only new or changed rows are written, using a single
+    bulk upsert. Returns inserted/updated/unchanged counts.
+    Pass commit=False to batch several symbols into a single transaction.
     """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
     if df.empty:
-        return 0
-    rows_added = 0
-    indicator_columns = [
-        col
-        for col in df.columns
-        if col not in ["open", "high", "low", "close", "volume"]
-    ]
-    for timestamp, row in df.iterrows():
-        if row[indicator_columns].isna().all():
-            continue
-        existing = (
-            db.query(Indicator)
-            .filter(Indicator.symbol == symbol, Indicator.timestamp == timestamp)
-            .first()
+        return counts
+    rows = indicator_rows(df)
+    if not rows:
+        return counts
+    stored = {
+        pd.Timestamp(ts): values
+        for ts, values in db.query(Indicator.timestamp, Indicator.values).filter(
+            Indicator.symbol == symbol,
+            Indicator.timestamp >= min(rows).to_pydatetime(),
+            Indicator.timestamp <= max(rows).to_pydatetime(),
         )
-        indicators_dict = {
-            col: float(row[col]) for col in indicator_columns if not pd.isna(row[col])
-        }
-        if existing:
-            existing.values = indicators_dict
-            db.add(existing)
+    }
+    pending = []
+    for timestamp, values in rows.items():
+        if timestamp not in stored:
+            counts["inserted"] += 1
+        elif _values_equal(stored[timestamp], values):
+            counts["unchanged"] += 1
+            continue
         else:
-            indicator = Indicator(
-                symbol=symbol, timestamp=timestamp, values=indicators_dict
-            )
-            db.add(indicator)
-            rows_added += 1
-    db.commit()
-    return rows_added
+            counts["updated"] += 1
+        pending.append(
+            {"symbol": symbol, "timestamp": timestamp.to_pydatetime(), "values": values}
+        )
+    if pending:
+        stmt = crud.dialect_insert(db, Indicator)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol", "timestamp"],
+            set_={"values": stmt.excluded["values"]},
+        )
+        db.execute(stmt, pending)
+    if commit:
+        db.commit()
+    return counts
 
 
-def update_indicators(db: Session, symbols: list):
+def update_symbol_indicators(
+    db: Session, symbol: str, commit: bool = True
+) -> Dict[str, int]:
+    """
+    Calculate and save indicators for a single symbol.
+    Returns inserted/updated/unchanged counts.
+    """
+    logger.info(f"Updating indicators for {symbol}")
+    # Served from the shared cache, so the API and dashboard reuse this frame
+    with_indicators = get_indicator_frame(db, symbol)
+    if with_indicators.empty:
+        logger.warning(
+            f"No price data available for {symbol}, skipping indicator calculation"
+        )
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    counts = save_indicators_to_db(db, symbol, with_indicators, commit=commit)
+    logger.info(
+        f"Updated indicators for {symbol}: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['unchanged']} unchanged"
+    )
+    return counts
+
+
+def update_indicators(db: Session, symbols: list) -> Dict[str, Dict[str, int]]:
     """
     Update indicators for multiple symbols.
+    Returns a mapping of symbol to inserted/updated/unchanged counts.
     """
-    for symbol in symbols:
-        logger.info(f"Updating indicators for {symbol}")
-        price_data = get_price_data(db, symbol)
-        if price_data.empty:
-            logger.warning(
-                f"No price data available for {symbol}, skipping indicator calculation"
-            )
-            continue
-        with_indicators = calculate_indicators(price_data)
-        rows_added = save_indicators_to_db(db, symbol, with_indicators)
-        logger.info(f"Updated indicators for {symbol}, added {rows_added} new records")
+    return {symbol: update_symbol_indicators(db, symbol) for symbol in symbols}
+
+
+# Session factory owned by each worker process of the parallel pool
+_worker_session_factory: Optional[sessionmaker] = None
+
+
+def _init_indicator_worker(database_url: str) -> Engine:
+    """
+    Give each pool worker its own engine and connection pool, and return the
+    engine. Connections inherited from the parent process must never be shared.
+    """
+    global _worker_session_factory
+    engine = create_engine(database_url)
+    _worker_session_factory = sessionmaker(
+        autocommit=False, autoflush=False, bind=engine
+    )
+    return engine
+
+
+def _update_indicator_chunk(symbols: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Update indicators for one chunk of symbols inside a worker process.
+    All rows for the chunk are written in a single transaction.
+    """
+    db = _worker_session_factory()
+    try:
+        results = {
+            symbol: update_symbol_indicators(db, symbol, commit=False)
+            for symbol in symbols
+        }
+        db.commit()
+        return results
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def chunk_symbols(symbols: List[str], chunk_size: int) -> List[List[str]]:
+    """
+    Split the symbol list into work units of at most chunk_size symbols.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    return [symbols[i : i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+
+
+def update_indicators_parallel(
+    symbols: List[str],
+    workers: Optional[int] = None,
+    chunk_size: int = 8,
+    database_url: Optional[str] = None,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Update indicators for multiple symbols using a process pool.
+
+    The symbol list is sharded into chunks of chunk_size symbols. Each worker
+    process opens its own database connection, computes indicators for every
+    symbol in a chunk and commits the whole chunk at once.
+    Returns a mapping of symbol to inserted/updated/unchanged counts.
+    """
+    database_url = database_url or DATABASE_URL
+    workers = workers or os.cpu_count() or 1
+    chunks = chunk_symbols(list(symbols), chunk_size)
+    if workers == 1 or len(chunks) <= 1:
+        engine = _init_indicator_worker(database_url)
+        results: Dict[str, Dict[str, int]] = {}
+        try:
+            for chunk in chunks:
+                results.update(_update_indicator_chunk(chunk))
+        finally:
+            engine.dispose()
+        return results
+    logger.info(
+        f"Updating indicators for {len(symbols)} symbols "
+        f"in {len(chunks)} chunks across {workers} workers"
+    )
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_indicator_worker,
+        initargs=(database_url,),
+    ) as pool:
+        futures = {pool.submit(_update_indicator_chunk, c): c for c in chunks}
+        for future in as_completed(futures):
+            try:
+                results.update(future.result())
+            except Exception as e:
+                logger.error(
+                    f"Indicator update failed for chunk {futures[future]}: {e}"
+                )
+                raise
+    return results
 
 
 # Example usage
@@ -0,0 +1,375 @@
+"""
+Intraday Backtest Module
+
+This module runs an event-driven backtest over minute bars for strategies that
+trade with stops and targets, such as the opening range breakout. Bars are
+served from (time, symbol) arrays rather than DataFrame rows; each bar first
+checks open positions for intrabar stop and target fills, then takes new
+entries at the close. Positions are flattened at the end of every session and
+RiskManager's daily loss limit halts trading for the rest of the day.
+"""
+
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from stockapp.backtest import TRADE_COLUMNS, BacktestResult
+from stockapp.panel import panel_symbols
+from stockapp.risk_manager import DailyLossLimitReached, RiskManager
+from stockapp.strategies.opening_range import (
+    OpeningRangeBreakout,
+    OpeningRangeTracker,
+    session_layout,
+)
+from stockapp.volume_profile import VolumeProfile
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS_FILE = "config/settings.yaml"
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+MINUTES_PER_YEAR = 252 * 390
+INTRADAY_TRADE_COLUMNS = TRADE_COLUMNS + ["exit_reason"]
+
+# Entry orders for one bar: (symbol positions, stop prices, target prices)
+Entries = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class Bar:
+    """One timestamp of every symbol; fields are arrays in symbol order."""
+
+    __slots__ = (
+        "t",
+        "timestamp",
+        "session",
+        "session_end",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+    )
+
+    def __init__(self, t, timestamp, session, session_end, o, h, lo, c, v):
+        self.t = t
+        self.timestamp = timestamp
+        self.session = session
+        self.session_end = session_end
+        self.open = o
+        self.high = h
+        self.low = lo
+        self.close = c
+        self.volume = v
+
+
+class BarIterator:
+    """
+    Minute bars held as contiguous (time, symbol) float arrays, iterated one
+    timestamp at a time. Missing bars are NaN.
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, symbols: List[str], **fields):
+        self.index = pd.DatetimeIndex(index)
+        self.symbols = list(symbols)
+        self.fields: Dict[str, np.ndarray] = {
+            name: np.ascontiguousarray(fields[name], dtype=float) for name in BAR_FIELDS
+        }
+        _, self.sessions, starts, _ = session_layout(self.index)
+        self.session_end = np.zeros(len(self.index), dtype=bool)
+        self.session_end[starts[1:] - 1] = True
+        if len(self.index):
+            self.session_end[-1] = True
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame) -> "BarIterator":
+        panel = panel.sort_index()
+        symbols = panel_symbols(panel)
+        fields = {
+            name: panel[name].reindex(columns=symbols).to_numpy(dtype=float)
+            for name in BAR_FIELDS
+        }
+        return cls(panel.index, symbols, **fields)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[Bar]:
+        o, h, lo, c, v = (self.fields[name] for name in BAR_FIELDS)
+        timestamps = list(self.index)
+        for t in range(len(timestamps)):
+            yield Bar(
+                t,
+                timestamps[t],
+                self.sessions[t],
+                self.session_end[t],
+                o[t],
+                h[t],
+                lo[t],
+                c[t],
+                v[t],
+            )
+
+
+class EventSignals:
+    """
+    Entries from precomputed BUY events (EVENT_COLUMNS) whose values carry
+    stop and target, e.g. from detect_breakouts over the whole history.
+    """
+
+    def __init__(self, events: pd.DataFrame, index: pd.Index, symbols: List[str]):
+        buys = events[events["signal_type"] == "BUY"]
+        rows = pd.Index(index).get_indexer(buys["timestamp"])
+        cols = pd.Index(symbols).get_indexer(buys["symbol"])
+        stops = np.array([v.get("stop", np.nan) for v in buys["values"]], dtype=float)
+        targets = np.array(
+            [v.get("target", np.nan) for v in buys["values"]], dtype=float
+        )
+        keep = (rows >= 0) & (cols >= 0)
+        self.orders: Dict[int, Entries] = {}
+        frame = pd.DataFrame(
+            {"t": rows[keep], "col": cols[keep], "stop": stops[keep]}
+        ).assign(target=targets[keep])
+        for t, group in frame.groupby("t"):
+            self.orders[int(t)] = (
+                group["col"].to_numpy(),
+                group["stop"].to_numpy(),
+                group["target"].to_numpy(),
+            )
+
+    def reset_session(self) -> None:
+        pass
+
+    def on_bar(self, bar: Bar) -> Optional[Entries]:
+        return self.orders.get(bar.t)
+
+
+class OpeningRangeSignals:
+    """
+    Streaming opening range breakout entries from OpeningRangeTracker, with
+    the range low as stop and the tracker's risk/reward target.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        minutes: int = 5,
+        volume_multiplier: float = 1.5,
+        risk_reward_ratio: float = 2,
+        profile: Optional[VolumeProfile] = None,
+    ):
+        self.tracker = OpeningRangeTracker(
+            symbols, minutes, volume_multiplier, risk_reward_ratio
+        )
+        self.profile = profile
+        self._profile_rows = None
+        if profile is not None:
+            self._profile_rows = np.array(
+                [profile.positions.get(s, -1) for s in symbols], dtype=int
+            )
+
+    @classmethod
+    def from_strategy(
+        cls, strategy: OpeningRangeBreakout, symbols: List[str]
+    ) -> "OpeningRangeSignals":
+        params = strategy.params
+        return cls(
+            symbols,
+            int(params["opening_range_minutes"]),
+            params["volume_multiplier_threshold"],
+            params["risk_reward_ratio"],
+            strategy.profile,
+        )
+
+    def reset_session(self) -> None:
+        self.tracker.reset_session()
+
+    def on_bar(self, bar: Bar) -> Optional[Entries]:
+        baseline = None
+        if self.profile is not None:
+            averages = np.append(self.profile.averages(bar.timestamp), np.nan)
+            baseline = averages[self._profile_rows]
+        hits = self.tracker.breakouts(
+            bar.timestamp, bar.high, bar.low, bar.close, bar.volume, baseline
+        )
+        if not len(hits):
+            return None
+        return hits, self.tracker.low[hits], self.tracker.target()[hits]
+
+
+def load_settings(path: str = DEFAULT_SETTINGS_FILE) -> dict:
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+class IntradayBacktest:
+    """
+    Event-driven long-only minute-bar backtest with stops and targets.
+
+    On every bar, open positions exit at the stop or target if the bar's
+    range reaches it. A bar that gaps through a level fills at the open, and
+    a bar reaching both the stop and the target is assumed to hit the stop
+    first. New entries fill at the signal bar's close, sized to risk
+    RiskManager's per-trade amount between entry and stop, capped by cash.
+    Everything is closed at the last bar of each session. Realized P&L is
+    reported to the RiskManager. Once the daily loss limit is reached, open
+    positions are closed at that bar's close and no new entries are taken
+    until the next session.
+    """
+
+    def __init__(
+        self,
+        initial_cash: Optional[float] = None,
+        risk_manager: Optional[RiskManager] = None,
+        commission_per_share: float = 0.0,
+        config: Optional[dict] = None,
+    ):
+        if risk_manager is None:
+            config = config or load_settings()
+            initial_cash = initial_cash or config["account"]["initial_balance"]
+            risk_manager = RiskManager(initial_cash, config)
+        self.initial_cash = float(initial_cash or risk_manager.balance)
+        self.risk_manager = risk_manager
+        self.commission_per_share = commission_per_share
+
+    def run(self, bars: BarIterator, signals) -> BacktestResult:
+        """
+        Replay bars through a signal source (reset_session() and
+        on_bar(bar) -> (positions, stops, targets) or None).
+        Returns a BacktestResult; its positions frame holds the number of
+        open positions per bar.
+        """
+        n = len(bars.symbols)
+        rm = self.risk_manager
+        fee = self.commission_per_share
+        cash = self.initial_cash
+        shares = np.zeros(n)
+        entry_price = np.zeros(n)
+        entry_value = np.zeros(n)
+        stop = np.full(n, np.nan)
+        target = np.full(n, np.nan)
+        entry_t = np.zeros(n, dtype=int)
+        last_close = np.zeros(n)
+        equity = np.empty(len(bars))
+        open_count = np.zeros(len(bars), dtype=int)
+        trades: List[tuple] = []
+        session = None
+        halted = False
+
+        def close_position(i, t, price, reason):
+            nonlocal cash, halted
+            proceeds = shares[i] * price
+            pnl = proceeds - shares[i] * entry_price[i] - 2 * fee * shares[i]
+            cash += proceeds - fee * shares[i]
+            trades.append(
+                (
+                    bars.symbols[i],
+                    entry_t[i],
+                    t,
+                    entry_price[i],
+                    price,
+                    shares[i],
+                    entry_value[i],
+                    pnl,
+                    pnl / (shares[i] * entry_price[i]),
+                    reason,
+                )
+            )
+            shares[i] = 0
+            try:
+                rm.record_pl(pnl)
+            except DailyLossLimitReached:
+                if not halted:
+                    logger.info(f"Daily loss limit reached at {bars.index[t]}, halting")
+                halted = True
+
+        for bar in bars:
+            t = bar.t
+            if bar.session != session:
+                session = bar.session
+                rm.reset_day()
+                signals.reset_session()
+                halted = False
+            close = bar.close
+            traded = ~np.isnan(close)
+            last_close = np.where(traded, close, last_close)
+            holding = shares > 0
+            if holding.any():
+                live = holding & traded
+                with np.errstate(invalid="ignore"):
+                    stop_hit = live & (bar.low <= stop)
+                    target_hit = live & ~stop_hit & (bar.high >= target)
+                for i in np.flatnonzero(stop_hit):
+                    close_position(i, t, min(bar.open[i], stop[i]), "stop")
+                for i in np.flatnonzero(target_hit):
+                    close_position(i, t, max(bar.open[i], target[i]), "target")
+            orders = None if halted else signals.on_bar(bar)
+            if orders is not None:
+                for i, stop_price, target_price in zip(*orders):
+                    price = close[i]
+                    risk = price - stop_price
+                    if shares[i] > 0 or not risk > 0:
+                        continue
+                    budget = rm.position_size(cash)
+                    size = np.floor(min(budget / risk, cash / (price + fee)))
+                    if size < 1:
+                        continue
+                    equity_now = cash + shares @ last_close
+                    cash -= size * (price + fee)
+                    shares[i] = size
+                    entry_price[i] = price
+                    entry_value[i] = size * price / equity_now
+                    stop[i] = stop_price
+                    target[i] = target_price
+                    entry_t[i] = t
+            if halted or bar.session_end:
+                reason = "daily_loss" if halted else "session_end"
+                for i in np.flatnonzero(shares > 0):
+                    close_position(i, t, last_close[i], reason)
+            equity[t] = cash + shares @ last_close
+            open_count[t] = np.count_nonzero(shares)
+
+        return self._result(bars, equity, open_count, trades)
+
+    def _result(self, bars, equity, open_count, trades) -> BacktestResult:
+        index = bars.index
+        portfolio_value = pd.Series(equity, index=index, name="equity")
+        returns = portfolio_value.pct_change().rename("returns")
+        if len(returns):
+            returns.iloc[0] = portfolio_value.iloc[0] / self.initial_cash - 1
+        trades = pd.DataFrame(
+            trades,
+            columns=[
+                "symbol",
+                "entry_time",
+                "exit_time",
+                "entry_price",
+                "exit_price",
+                "shares",
+                "position_size",
+                "pnl",
+                "return",
+                "exit_reason",
+            ],
+        )
+        trades["entry_time"] = index[trades["entry_time"].to_numpy(dtype=int)]
+        trades["exit_time"] = index[trades["exit_time"].to_numpy(dtype=int)]
+        positions = pd.DataFrame({"open_positions": open_count}, index=index)
+        result = BacktestResult(
+            portfolio_value,
+            returns,
+            trades[INTRADAY_TRADE_COLUMNS],
+            positions,
+            self.initial_cash,
+            MINUTES_PER_YEAR,
+        )
+        logger.info(
+            f"Intraday backtest over {len(index)} bars x {len(bars.symbols)} "
+            f"symbols: {len(trades)} trades, return {result.total_return:.2%}"
+        )
+        return result
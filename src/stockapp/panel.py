@@ -0,0 +1,36 @@
+"""
+Panel Module
+
+This module converts per-symbol frames into a single time x symbol panel, the layout
+used by vectorized signal detection, strategies and backtests. A panel is a DataFrame
+indexed by timestamp with (field, symbol) column pairs, so panel["close"] is a
+time x symbol frame of closing prices.
+"""
+
+from typing import Dict, List
+
+import pandas as pd
+
+
+def to_panel(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combine {symbol: frame} into a (field, symbol) panel aligned on timestamp.
+    """
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_arrays([[], []]))
+    panel = pd.concat(frames, axis=1).swaplevel(axis=1)
+    return panel.sort_index(axis=1, level=0, sort_remaining=False)
+
+
+def panel_symbols(panel: pd.DataFrame) -> List[str]:
+    """
+    Symbols of a panel, in column order.
+    """
+    return list(panel.columns.get_level_values(1).unique())
+
+
+def from_panel(panel: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """
+    Extract one symbol's frame from a panel.
+    """
+    return panel.xs(symbol, axis=1, level=1)
@@ -0,0 +1,344 @@
+"""
+Signal Pipeline Module
+
+This module runs an event-driven signal pipeline. A new-bar event triggers an
+indicator update for the affected symbols only, which triggers signal detection
+by the configured strategy plugins, which publishes the new signals to
+subscribers. Stages are connected by in-process
+asyncio queues; PostgreSQL LISTEN/NOTIFY can carry bar events between processes.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from stockapp.db_models import DATABASE_URL, SessionLocal
+from stockapp.indicators import update_symbol_indicators
+from stockapp.strategies import StrategyRunner, run_bars
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+NEW_BAR_CHANNEL = "new_bars"
+STAGES = ["indicators", "signals", "publish", "end_to_end"]
+
+
+@dataclass
+class BarEvent:
+    """A new bar stored for a symbol."""
+
+    symbol: str
+    timestamp: datetime
+    received_at: float = field(default_factory=time.perf_counter)
+
+
+class LatencyStats:
+    """
+    Rolling latency samples per pipeline stage.
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        self.samples: Dict[str, Deque[float]] = {
+            stage: deque(maxlen=max_samples) for stage in STAGES
+        }
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds * 1000)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return count, mean, p50, p95 and max latency in milliseconds per stage.
+        """
+        result = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=float)
+            result[stage] = {
+                "count": len(values),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "max_ms": float(values.max()),
+            }
+        return result
+
+
+class SignalPipeline:
+    """
+    Bar events -> indicator updates -> signal detection -> subscribers.
+
+    Bar events arriving within batch_window seconds of each other are handled
+    as one batch: a symbol appearing several times in a batch has its
+    indicators updated once, and signals are detected on every bar received.
+    Signals come from the runner's strategies, by default those enabled in
+    settings.yaml. Database work runs in worker threads so the event loop
+    stays free.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_window: float = 0.05,
+        runner: Optional[StrategyRunner] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_window = batch_window
+        self.runner = runner or StrategyRunner.from_settings()
+        self.bars: "asyncio.Queue[BarEvent]" = asyncio.Queue()
+        self._detect: asyncio.Queue = asyncio.Queue()
+        self._publish: asyncio.Queue = asyncio.Queue()
+        self._subscribers: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self.latency = LatencyStats()
+
+    def subscribe(self, maxsize: int = 0) -> asyncio.Queue:
+        """
+        Return a queue that receives every published signal row.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def publish_bar(self, symbol: str, timestamp: datetime) -> None:
+        """
+        Announce a new bar for symbol.
+        """
+        await self.bars.put(BarEvent(symbol, timestamp))
+
+    def start(self) -> None:
+        """
+        Start the stage tasks on the running event loop.
+        """
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._indicator_stage()),
+            asyncio.create_task(self._signal_stage()),
+            asyncio.create_task(self._publish_stage()),
+        ]
+        logger.info("Signal pipeline started")
+
+    async def drain(self) -> None:
+        """
+        Wait until every queued bar event has been fully processed.
+        """
+        for queue in (self.bars, self._detect, self._publish):
+            await queue.join()
+
+    async def stop(self) -> None:
+        """
+        Cancel the stage tasks.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Signal pipeline stopped")
+
+    async def _next_batch(self) -> List[BarEvent]:
+        """
+        Wait for one bar event, then collect any that follow within the batch window.
+        """
+        events = [await self.bars.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                events.append(await asyncio.wait_for(self.bars.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return events
+
+    async def _indicator_stage(self) -> None:
+        while True:
+            events = await self._next_batch()
+            try:
+                # Keep the earliest receipt time per symbol for end-to-end latency
+                received: Dict[str, float] = {}
+                bars: Dict[str, List[datetime]] = {}
+                for event in events:
+                    received.setdefault(event.symbol, event.received_at)
+                    bars.setdefault(event.symbol, []).append(event.timestamp)
+                start = time.perf_counter()
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._update_indicators, list(received)
+                )
+                self.latency.record("indicators", time.perf_counter() - start)
+                await self._detect.put((bars, received))
+            except Exception as e:
+                logger.error(f"Indicator stage failed for {len(events)} bars: {e}")
+            finally:
+                for _ in events:
+                    self.bars.task_done()
+
+    async def _signal_stage(self) -> None:
+        while True:
+            bars, received = await self._detect.get()
+            try:
+                start = time.perf_counter()
+                rows = await asyncio.get_running_loop().run_in_executor(
+                    None, self._detect_signals, bars
+                )
+                self.latency.record("signals", time.perf_counter() - start)
+                await self._publish.put((rows, received))
+            except Exception as e:
+                logger.error(f"Signal stage failed for {len(received)} symbols: {e}")
+            finally:
+                self._detect.task_done()
+
+    async def _publish_stage(self) -> None:
+        while True:
+            rows, received = await self._publish.get()
+            try:
+                start = time.perf_counter()
+                for row in rows:
+                    for queue in self._subscribers:
+                        try:
+                            queue.put_nowait(row)
+                        except asyncio.QueueFull:
+                            logger.warning(
+                                f"Subscriber queue full, dropped {row['symbol']} signal"
+                            )
+                done = time.perf_counter()
+                self.latency.record("publish", done - start)
+                for received_at in received.values():
+                    self.latency.record("end_to_end", done - received_at)
+            finally:
+                self._publish.task_done()
+
+    def _update_indicators(self, symbols: List[str]) -> None:
+        db = self.session_factory()
+        try:
+            for symbol in symbols:
+                update_symbol_indicators(db, symbol, commit=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _detect_signals(self, bars: Dict[str, List[datetime]]) -> List[dict]:
+        db = self.session_factory()
+        try:
+            return run_bars(db, bars, self.runner)
+        finally:
+            db.close()
+
+
+def notify_new_bar(
+    db: Session, symbol: str, timestamp: datetime, channel: str = NEW_BAR_CHANNEL
+) -> None:
+    """
+    Send a new-bar notification on PostgreSQL; a no-op on other databases.
+    The notification is delivered when the caller's transaction commits.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    payload = json.dumps(
+        {"symbol": symbol, "timestamp": pd.Timestamp(timestamp).isoformat()}
+    )
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload},
+    )
+
+
+class PostgresNotifyTransport:
+    """
+    Feed bar events from PostgreSQL LISTEN/NOTIFY into a pipeline, so bars stored
+    by another process (see data_fetch.save_to_db) trigger this one.
+    """
+
+    def __init__(
+        self, database_url: Optional[str] = None, channel: str = NEW_BAR_CHANNEL
+    ):
+        self.database_url = database_url or DATABASE_URL
+        self.channel = channel
+        self._conn = None
+
+    def listen(self, pipeline: SignalPipeline) -> None:
+        """
+        Start listening on the running event loop.
+        """
+        import psycopg2.extensions
+
+        raw = create_engine(self.database_url).raw_connection()
+        # driver_connection needs SQLAlchemy 1.4.24; older 1.4 has connection
+        self._conn = getattr(raw, "driver_connection", None) or raw.connection
+        self._conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with self._conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self._conn.fileno(), self._on_notify, pipeline)
+        logger.info(f"Listening for new bars on channel {self.channel}")
+
+    def _on_notify(self, pipeline: SignalPipeline) -> None:
+        self._conn.poll()
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+                event = BarEvent(
+                    payload["symbol"],
+                    pd.Timestamp(payload["timestamp"]).to_pydatetime(),
+                )
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Ignoring malformed bar notification: {e}")
+                continue
+            pipeline.bars.put_nowait(event)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            asyncio.get_running_loop().remove_reader(self._conn.fileno())
+            self._conn.close()
+            self._conn = None
+
+
+async def run_pipeline(
+    transport: Optional[PostgresNotifyTransport] = None,
+    runner: Optional[StrategyRunner] = None,
+) -> None:
+    """
+    Run the pipeline until cancelled, logging each published signal.
+    """
+    pipeline = SignalPipeline(runner=runner)
+    signals = pipeline.subscribe()
+    transport = transport or PostgresNotifyTransport()
+    pipeline.start()
+    transport.listen(pipeline)
+    try:
+        while True:
+            row = await signals.get()
+            logger.info(
+                f"Signal {row['signal_type']} {row['symbol']} at {row['timestamp']} "
+                f"({row['reason']})"
+            )
+    finally:
+        transport.close()
+        await pipeline.stop()
+        for stage, stats in pipeline.latency.summary().items():
+            logger.info(
+                f"{stage}: n={stats['count']} mean={stats['mean_ms']:.1f}ms "
+                f"p95={stats['p95_ms']:.1f}ms max={stats['max_ms']:.1f}ms"
+            )
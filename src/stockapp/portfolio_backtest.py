@@ -0,0 +1,359 @@
+"""
+Portfolio Backtest Module
+
+This module runs a backtest of all symbols on one shared timeline under the
+account limits from settings.yaml: a maximum number of open positions, risk
+per trade and a daily loss stop. Unlike Backtest, which gives each symbol its
+own sleeve of cash, symbols compete for one cash balance and a fixed number
+of position slots. Per-symbol state is held in arrays, so each bar is a
+handful of vector operations however many symbols there are.
+"""
+
+import logging
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from stockapp.backtest import (
+    PERIODS_PER_YEAR,
+    TRADE_COLUMNS,
+    Backtest,
+    BacktestResult,
+    Signals,
+    _as_grid,
+    _evaluate_strategies,
+    _ffill,
+    load_backtest_panel,
+    log_metrics,
+    signal_masks,
+)
+from stockapp.intraday_backtest import DEFAULT_SETTINGS_FILE, load_settings
+from stockapp.panel import panel_symbols
+from stockapp.risk_manager import DailyLossLimitReached, RiskManager
+from stockapp.strategies import StrategyRunner
+from stockapp.strategies.opening_range import session_layout
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_TRADE_COLUMNS = TRADE_COLUMNS + ["exit_reason"]
+
+
+def _as_levels(
+    levels: Optional[Signals], index: pd.Index, symbols: List[str]
+) -> Optional[np.ndarray]:
+    """
+    Align stop, target or score levels to a (time, symbol) float array.
+    """
+    if levels is None:
+        return None
+    if isinstance(levels, pd.Series):
+        levels = levels.to_frame(symbols[0])
+    if isinstance(levels, pd.DataFrame):
+        return levels.reindex(index=index, columns=symbols).to_numpy(dtype=float)
+    return np.asarray(levels, dtype=float).reshape(len(index), len(symbols))
+
+
+class PortfolioBacktest:
+    """
+    Long-only backtest of entry and exit signals sharing one cash balance.
+
+    On every bar, open positions first exit at their stop or target if the
+    bar's range reaches it (stop first, gaps filled at the open), then on an
+    exit signal at the close. Entry signals are filled at the close while
+    position slots and cash last, highest score first. Each takes an equal
+    slot of equity (equity / max_open_positions), or less when it has a stop
+    level and RiskManager's per-trade risk between entry and stop is
+    smaller. Realized P&L goes to the RiskManager, and trading stops for the
+    rest of the day, with all positions closed, once realized losses or the
+    drop in equity since the day's open reach the daily loss limit.
+    commission is a fraction of the traded value charged on both sides.
+    """
+
+    def __init__(
+        self,
+        initial_cash: Optional[float] = None,
+        max_open_positions: Optional[int] = None,
+        risk_manager: Optional[RiskManager] = None,
+        commission: float = 0.0,
+        flatten_daily: bool = False,
+        periods_per_year: int = PERIODS_PER_YEAR,
+        config: Optional[dict] = None,
+    ):
+        if risk_manager is None or max_open_positions is None:
+            config = config or load_settings()
+            account = config["account"]
+            initial_cash = initial_cash or account["initial_balance"]
+            max_open_positions = max_open_positions or account["max_open_positions"]
+            risk_manager = risk_manager or RiskManager(initial_cash, config)
+        if max_open_positions < 1:
+            raise ValueError("max_open_positions must be at least 1")
+        if not 0 <= commission < 1:
+            raise ValueError("commission must be in [0, 1)")
+        self.initial_cash = float(initial_cash or risk_manager.balance)
+        self.max_open_positions = int(max_open_positions)
+        self.risk_manager = risk_manager
+        self.commission = float(commission)
+        self.flatten_daily = flatten_daily
+        self.periods_per_year = periods_per_year
+
+    @classmethod
+    def from_settings(
+        cls, path: str = DEFAULT_SETTINGS_FILE, **kwargs
+    ) -> "PortfolioBacktest":
+        return cls(config=load_settings(path), **kwargs)
+
+    def run(
+        self,
+        data: pd.DataFrame,
+        entries: Signals,
+        exits: Optional[Signals] = None,
+        stops: Optional[Signals] = None,
+        targets: Optional[Signals] = None,
+        scores: Optional[Signals] = None,
+    ) -> BacktestResult:
+        """
+        Simulate the portfolio. entries and exits are boolean signals aligned
+        to data like Backtest.run; stops, targets and scores are levels on the
+        entry bar (NaN for none). Returns a BacktestResult whose positions
+        frame holds the number of open positions per bar.
+        """
+        panel, symbols = Backtest.prepare(data)
+        index = panel.index
+        n = len(symbols)
+
+        def field(name):
+            if name not in panel.columns.get_level_values(0):
+                return raw_close
+            return panel[name].reindex(columns=symbols).to_numpy(dtype=float)
+
+        raw_close = field("close")
+        open_, high, low = field("open"), field("high"), field("low")
+        close = np.nan_to_num(_ffill(raw_close))
+        traded = ~np.isnan(raw_close)
+        entries = _as_grid(entries, index, symbols) & traded
+        exits = _as_grid(exits, index, symbols)
+        if exits is None:
+            exits = np.zeros_like(traded)
+        stops = _as_levels(stops, index, symbols)
+        targets = _as_levels(targets, index, symbols)
+        scores = _as_levels(scores, index, symbols)
+        _, _, starts, _ = session_layout(index)
+        session_start = np.zeros(len(index), dtype=bool)
+        session_start[starts] = True
+        session_end = np.r_[session_start[1:], True]
+
+        rm = self.risk_manager
+        c = self.commission
+        slots = self.max_open_positions
+        cash = self.initial_cash
+        shares = np.zeros(n)
+        entry_price = np.zeros(n)
+        entry_value = np.zeros(n)
+        entry_t = np.zeros(n, dtype=int)
+        stop = np.full(n, np.nan)
+        target = np.full(n, np.nan)
+        equity = np.empty(len(index))
+        open_count = np.zeros(len(index), dtype=int)
+        trades: List[tuple] = []
+        halted = False
+        day_start_equity = cash
+
+        def close_positions(t, which, prices, reason):
+            """Sell every position in which at prices; True once halted."""
+            nonlocal cash
+            if not len(which):
+                return False
+            proceeds = shares[which] * prices * (1 - c)
+            cost = shares[which] * entry_price[which] * (1 + c)
+            pnl = proceeds - cost
+            cash += proceeds.sum()
+            trades.append(
+                (
+                    which,
+                    entry_t[which],
+                    np.full(len(which), t),
+                    entry_price[which],
+                    prices,
+                    shares[which],
+                    entry_value[which],
+                    pnl,
+                    pnl / cost,
+                    np.full(len(which), reason, dtype=object),
+                )
+            )
+            shares[which] = 0
+            limit_hit = False
+            for pl in pnl:
+                try:
+                    rm.record_pl(pl)
+                except DailyLossLimitReached:
+                    limit_hit = True
+            return limit_hit
+
+        for t in range(len(index)):
+            if session_start[t]:
+                rm.reset_day()
+                halted = False
+                day_start_equity = equity[t - 1] if t else self.initial_cash
+            price = close[t]
+            limit_hit = False
+            holding = shares > 0
+            if holding.any():
+                live = holding & traded[t]
+                with np.errstate(invalid="ignore"):
+                    stop_hit = live & (low[t] <= stop)
+                    target_hit = live & ~stop_hit & (high[t] >= target)
+                which = np.flatnonzero(stop_hit)
+                limit_hit |= close_positions(
+                    t, which, np.fmin(open_[t, which], stop[which]), "stop"
+                )
+                which = np.flatnonzero(target_hit)
+                limit_hit |= close_positions(
+                    t, which, np.fmax(open_[t, which], target[which]), "target"
+                )
+                which = np.flatnonzero((shares > 0) & exits[t] & traded[t])
+                limit_hit |= close_positions(t, which, price[which], "signal")
+            value = cash + shares @ price
+            if limit_hit or day_start_equity - value >= rm.daily_loss_limit:
+                if not halted:
+                    logger.info(f"Daily loss limit reached at {index[t]}, halting")
+                halted = True
+            if halted or t == len(index) - 1 or (self.flatten_daily and session_end[t]):
+                reason = "daily_loss" if halted else "session_end"
+                if t == len(index) - 1 and not halted:
+                    reason = "end"
+                which = np.flatnonzero(shares > 0)
+                close_positions(t, which, price[which], reason)
+            else:
+                which = np.flatnonzero(entries[t] & (shares == 0) & ~exits[t])
+                free = slots - np.count_nonzero(shares)
+                if free > 0 and len(which):
+                    if scores is not None:
+                        rank = np.nan_to_num(scores[t, which], nan=-np.inf)
+                        which = which[np.argsort(-rank, kind="stable")]
+                    fill = price[which] * (1 + c)
+                    size = value / slots / fill
+                    if stops is not None:
+                        risk = price[which] - stops[t, which]
+                        with np.errstate(invalid="ignore", divide="ignore"):
+                            at_risk = rm.position_size(cash) / risk
+                        size = np.where(
+                            np.isnan(risk), size, np.where(risk > 0, at_risk, 0)
+                        )
+                        size = np.minimum(size, value / slots / fill)
+                    for i, wanted, cost in zip(which, np.floor(size), fill):
+                        size_i = min(wanted, cash // cost)
+                        if size_i < 1:
+                            continue
+                        cash -= size_i * cost
+                        shares[i] = size_i
+                        entry_price[i] = price[i]
+                        entry_value[i] = size_i * price[i] / value
+                        entry_t[i] = t
+                        stop[i] = stops[t, i] if stops is not None else np.nan
+                        target[i] = targets[t, i] if targets is not None else np.nan
+                        free -= 1
+                        if not free:
+                            break
+            equity[t] = cash + shares @ price
+            open_count[t] = np.count_nonzero(shares)
+        return self._result(index, symbols, equity, open_count, trades)
+
+    def _result(self, index, symbols, equity, open_count, trades) -> BacktestResult:
+        portfolio_value = pd.Series(equity, index=index, name="equity")
+        returns = portfolio_value.pct_change().rename("returns")
+        returns.iloc[0] = portfolio_value.iloc[0] / self.initial_cash - 1
+        if trades:
+            columns = [np.concatenate(column) for column in zip(*trades)]
+            trades = pd.DataFrame(dict(zip(PORTFOLIO_TRADE_COLUMNS, columns)))
+            trades["symbol"] = np.asarray(symbols, dtype=object)[trades["symbol"]]
+            trades["entry_time"] = index[trades["entry_time"].to_numpy()]
+            trades["exit_time"] = index[trades["exit_time"].to_numpy()]
+            trades = trades.sort_values(["entry_time", "symbol"], kind="stable")
+        else:
+            trades = pd.DataFrame(columns=PORTFOLIO_TRADE_COLUMNS)
+        positions = pd.DataFrame({"open_positions": open_count}, index=index)
+        return BacktestResult(
+            portfolio_value,
+            returns,
+            trades.reset_index(drop=True),
+            positions,
+            self.initial_cash,
+            self.periods_per_year,
+        )
+
+
+def event_levels(
+    events: pd.DataFrame, index: pd.Index, symbols: List[str], name: str
+) -> pd.DataFrame:
+    """
+    A level stored in BUY events' values, such as the opening range
+    breakout's stop or target, as a (time, symbol) frame; NaN where no BUY
+    event carries it.
+    """
+    levels = pd.DataFrame(np.nan, index=index, columns=symbols)
+    buys = events[events["signal_type"] == "BUY"]
+    values = [v.get(name) if isinstance(v, dict) else None for v in buys["values"]]
+    found = pd.DataFrame(
+        {
+            "timestamp": buys["timestamp"].to_numpy(),
+            "symbol": buys["symbol"].to_numpy(),
+            name: pd.to_numeric(pd.Series(values, dtype=object), errors="coerce"),
+        }
+    ).dropna()
+    if found.empty:
+        return levels
+    first = found.groupby(["timestamp", "symbol"])[name].first().unstack()
+    return first.reindex(index=index, columns=symbols)
+
+
+def dollar_volume(panel: pd.DataFrame, symbols: List[str]) -> Optional[pd.DataFrame]:
+    """
+    Close times volume of every bar, the default entry score, or None
+    without volume.
+    """
+    if "volume" not in panel.columns.get_level_values(0):
+        return None
+    close = panel["close"].reindex(columns=symbols)
+    return close * panel["volume"].reindex(columns=symbols)
+
+
+def run_risk_portfolio_backtest(
+    db,
+    symbols: List[str],
+    start_date,
+    end_date,
+    runner: Optional[StrategyRunner] = None,
+    backtest: Optional[PortfolioBacktest] = None,
+) -> Optional[BacktestResult]:
+    """
+    Trade the enabled strategy plugins' BUY and SELL signals across several
+    symbols from one account, under the account limits in settings.yaml.
+    The stop and target a BUY event carries in its values (as opening range
+    breakouts do) become the position's exit levels and size it by risk per
+    trade. Entries competing for the last slots are taken by the signal
+    bar's dollar volume, most liquid first.
+    Returns a BacktestResult, or None without price data.
+    """
+    runner = runner or StrategyRunner.from_settings()
+    panel = load_backtest_panel(db, symbols, start_date, end_date)
+    if panel.empty:
+        return None
+    events = _evaluate_strategies(runner, panel)
+    traded = panel_symbols(panel)
+    entries, exits = signal_masks(events, panel.index, traded)
+    result = (backtest or PortfolioBacktest.from_settings()).run(
+        panel,
+        entries,
+        exits,
+        stops=event_levels(events, panel.index, traded, "stop"),
+        targets=event_levels(events, panel.index, traded, "target"),
+        scores=dollar_volume(panel, traded),
+    )
+    log_metrics("Portfolio", result)
+    return result
@@ -0,0 +1,348 @@
+"""
+Replay Module
+
+This module checks that the live pipeline and the backtest agree. Recorded
+bars are fed one timestamp at a time through the live path (save_to_db
+ingest, then the SignalPipeline's indicator update and signal detection)
+against an in-memory SQLite database, as fast as the pipeline processes them.
+The signals it publishes are diffed against the events the same strategies
+derive from the backtest's indicators over the same bars. Symbols are
+independent in the live path, so they are replayed in shards, each with its
+own database, across worker processes.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import reduce
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from stockapp.data_fetch import save_to_db
+from stockapp.db_models import Base, RawPrice
+from stockapp.indicators import (
+    LIVE_WINDOW,
+    PRICE_COLUMNS,
+    calculate_indicators,
+    chunk_symbols,
+)
+from stockapp.panel import from_panel, panel_symbols, to_panel
+from stockapp.pipeline import SignalPipeline
+from stockapp.signal_engine import EVENT_COLUMNS
+from stockapp.strategies import StrategyRunner
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SIGNAL_KEY = ["timestamp", "symbol", "signal_type", "reason"]
+# Modules logging every bar of the live path, silenced while replaying
+LIVE_LOGGERS = [
+    "stockapp.data_fetch",
+    "stockapp.indicators",
+    "stockapp.signal_engine",
+    "stockapp.pipeline",
+    "stockapp.strategies.runner",
+]
+
+
+@dataclass
+class ReplayReport:
+    """Signals from the live replay and the backtest, and where they differ."""
+
+    live: pd.DataFrame
+    backtest: pd.DataFrame
+    diff: pd.DataFrame
+    bars: int
+    seconds: float
+
+    @property
+    def matches(self) -> bool:
+        return self.diff.empty
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.bars / self.seconds if self.seconds > 0 else float("inf")
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Signal counts per reason: live, backtest, live_only and backtest_only.
+        """
+        counts = {
+            "live": self.live["reason"].value_counts(),
+            "backtest": self.backtest["reason"].value_counts(),
+        }
+        for side in ("live_only", "backtest_only"):
+            counts[side] = self.diff.loc[self.diff["side"] == side, "reason"]
+            counts[side] = counts[side].value_counts()
+        return pd.DataFrame(counts).fillna(0).astype(int).sort_index()
+
+
+def memory_session_factory() -> sessionmaker:
+    """
+    Session factory for a fresh in-memory SQLite database that every thread
+    shares, as the pipeline runs its database work in worker threads.
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def bar_frames(
+    data: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+) -> Dict[str, pd.DataFrame]:
+    """
+    Per-symbol OHLCV frames from a (field, symbol) panel or a dict of frames.
+    Missing open, high and low default to the close and volume to zero;
+    bars without a close are dropped.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = {symbol: from_panel(data, symbol) for symbol in panel_symbols(data)}
+    frames = {}
+    for symbol, frame in data.items():
+        frame = frame.dropna(subset=["close"])
+        bars = pd.DataFrame(index=pd.DatetimeIndex(frame.index, name="timestamp"))
+        for col in PRICE_COLUMNS:
+            default = 0 if col == "volume" else frame["close"]
+            bars[col] = frame[col] if col in frame.columns else default
+        bars["volume"] = bars["volume"].fillna(0).astype(int)
+        frames[symbol] = bars.sort_index()
+    return frames
+
+
+def backtest_events(
+    frames: Dict[str, pd.DataFrame],
+    start: Optional[pd.Timestamp] = None,
+    runner: Optional[StrategyRunner] = None,
+) -> pd.DataFrame:
+    """
+    The backtest's signal events: indicators calculated over each symbol's
+    whole history, then every event of the runner's strategies (by default
+    those enabled in settings.yaml) from start on.
+    """
+    runner = runner or StrategyRunner.from_settings()
+    panel = to_panel(
+        {symbol: calculate_indicators(frame.copy()) for symbol, frame in frames.items()}
+    )
+    events = runner.evaluate(panel)[EVENT_COLUMNS]
+    if start is not None:
+        events = events[events["timestamp"] >= start]
+    return events.sort_values(SIGNAL_KEY, kind="stable").reset_index(drop=True)
+
+
+def diff_signals(live: pd.DataFrame, backtest: pd.DataFrame) -> pd.DataFrame:
+    """
+    Signals emitted by only one side, keyed on timestamp, symbol, signal type
+    and reason, with side live_only or backtest_only and the indicator values
+    that side saw.
+    """
+    merged = live[SIGNAL_KEY + ["values"]].merge(
+        backtest[SIGNAL_KEY + ["values"]],
+        on=SIGNAL_KEY,
+        how="outer",
+        suffixes=("_live", "_backtest"),
+        indicator=True,
+    )
+    merged = merged[merged["_merge"] != "both"]
+    side = merged["_merge"].map(
+        {"left_only": "live_only", "right_only": "backtest_only"}
+    )
+    return (
+        pd.DataFrame(
+            {
+                **{col: merged[col] for col in SIGNAL_KEY},
+                "side": side.astype(str),
+                "values": merged["values_live"].where(
+                    side == "live_only", merged["values_backtest"]
+                ),
+            }
+        )
+        .sort_values(SIGNAL_KEY, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def _timeline(frames: Dict[str, pd.DataFrame]) -> pd.DatetimeIndex:
+    """
+    Sorted union of every symbol's bar timestamps.
+    """
+    return reduce(
+        pd.Index.union, [f.index for f in frames.values()], pd.DatetimeIndex([])
+    )
+
+
+@contextmanager
+def quiet_live_logs(level: int = logging.WARNING) -> Iterator[None]:
+    """
+    Raise the live path's loggers to level for the duration of a replay.
+    """
+    loggers = [logging.getLogger(name) for name in LIVE_LOGGERS]
+    previous = [log.level for log in loggers]
+    for log in loggers:
+        log.setLevel(level)
+    try:
+        yield
+    finally:
+        for log, old in zip(loggers, previous):
+            log.setLevel(old)
+
+
+def _preload(session_factory: sessionmaker, frames: Dict[str, pd.DataFrame]) -> None:
+    """
+    Bulk insert warmup bars that precede the replay.
+    """
+    rows = [
+        dict(record, symbol=symbol, timestamp=ts.to_pydatetime())
+        for symbol, frame in frames.items()
+        for ts, record in zip(frame.index, frame.to_dict("records"))
+    ]
+    if rows:
+        db = session_factory()
+        try:
+            db.execute(insert(RawPrice), rows)
+            db.commit()
+        finally:
+            db.close()
+
+
+async def _replay_bars(
+    pipeline: SignalPipeline,
+    session_factory: sessionmaker,
+    frames: Dict[str, pd.DataFrame],
+) -> List[dict]:
+    """
+    Ingest and publish every bar of frames timestamp by timestamp, waiting
+    for the pipeline to finish each timestamp before the next. Returns the
+    published signal rows.
+    """
+    signals = pipeline.subscribe()
+    timestamps = _timeline(frames)
+    position = {symbol: 0 for symbol in frames}
+    published = []
+    db = session_factory()
+    pipeline.start()
+    try:
+        for ts in timestamps:
+            for symbol, frame in frames.items():
+                i = position[symbol]
+                if i < len(frame) and frame.index[i] == ts:
+                    save_to_db(db, symbol, frame.iloc[i : i + 1])
+                    await pipeline.publish_bar(symbol, ts.to_pydatetime())
+                    position[symbol] = i + 1
+            await pipeline.drain()
+            while not signals.empty():
+                published.append(signals.get_nowait())
+    finally:
+        await pipeline.stop()
+        db.close()
+    return published
+
+
+def _replay_shard(
+    frames: Dict[str, pd.DataFrame],
+    start: pd.Timestamp,
+    batch_window: float,
+    runner: StrategyRunner,
+) -> Tuple[List[dict], int]:
+    """
+    Replay one shard of symbols from start against its own in-memory
+    database. Returns the published signal rows and the bars replayed.
+    """
+    session_factory = memory_session_factory()
+    _preload(session_factory, {s: f[f.index < start] for s, f in frames.items()})
+    replayed = {s: f[f.index >= start] for s, f in frames.items()}
+    pipeline = SignalPipeline(session_factory, batch_window=batch_window, runner=runner)
+    with quiet_live_logs():
+        rows = asyncio.run(_replay_bars(pipeline, session_factory, replayed))
+    return rows, sum(len(f) for f in replayed.values())
+
+
+def _signal_frame(rows: List[dict]) -> pd.DataFrame:
+    """
+    Published signal rows as an event frame like detect_signal_events'.
+    """
+    if not rows:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    live = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime([r["timestamp"] for r in rows]),
+            "symbol": [r["symbol"] for r in rows],
+            "signal_type": [r["signal_type"] for r in rows],
+            "reason": [r["reason"] for r in rows],
+            "values": [r["details"]["values"] for r in rows],
+        }
+    )
+    return live.sort_values(SIGNAL_KEY, kind="stable").reset_index(drop=True)
+
+
+def run_replay(
+    data: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+    start: Optional[Union[str, pd.Timestamp]] = None,
+    workers: int = 1,
+    shard_size: Optional[int] = None,
+    batch_window: float = 0.001,
+    runner: Optional[StrategyRunner] = None,
+) -> ReplayReport:
+    """
+    Replay recorded bars through the live pipeline and diff its signals
+    against the backtest's.
+
+    Bars before start are preloaded without replaying; start defaults to the
+    bar after the first LIVE_WINDOW bars, so every replayed update sees a
+    full live indicator window. Symbols are split into shards of shard_size
+    (by default spread evenly over workers), each replayed in its own
+    process and database. Both sides run the runner's strategies, by default
+    those enabled in settings.yaml.
+    """
+    runner = runner or StrategyRunner.from_settings()
+    frames = bar_frames(data)
+    if not frames:
+        raise ValueError("No bars to replay")
+    index = _timeline(frames)
+    start = index[min(LIVE_WINDOW, len(index) - 1)] if start is None else start
+    start = pd.Timestamp(start)
+    workers = workers or os.cpu_count() or 1
+    symbols = list(frames)
+    shards = chunk_symbols(symbols, shard_size or math.ceil(len(symbols) / workers))
+    shard_frames = [{s: frames[s] for s in shard} for shard in shards]
+    logger.info(
+        f"Replaying {len(symbols)} symbols from {start} "
+        f"in {len(shards)} shards across {min(workers, len(shards))} workers"
+    )
+    started = time.perf_counter()
+    args = (shard_frames, repeat(start), repeat(batch_window), repeat(runner))
+    if workers == 1 or len(shards) == 1:
+        results = list(map(_replay_shard, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_replay_shard, *args))
+    seconds = time.perf_counter() - started
+    live = _signal_frame([row for rows, _ in results for row in rows])
+    backtest = backtest_events(frames, start, runner)
+    report = ReplayReport(
+        live,
+        backtest,
+        diff_signals(live, backtest),
+        sum(bars for _, bars in results),
+        seconds,
+    )
+    logger.info(
+        f"Replayed {report.bars} bars in {seconds:.1f}s "
+        f"({report.bars_per_second:.0f} bars/s): {len(live)} live signals, "
+        f"{len(backtest)} backtest signals, {len(report.diff)} differences"
+    )
+    return report
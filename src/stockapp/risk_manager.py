@@ -1,3 +1,7 @@
+class DailyLossLimitReached(Exception):
+    pass
+
+
 class RiskManager:
     def __init__(self, account_balance, cfg):
         self.balance = account_balance
@@ -12,7 +16,11 @@ class RiskManager:
     def record_pl(self, pl):
         self.loss_today += max(-pl, 0)
         if self.loss_today >= self.daily_loss_limit:
-            raise Exception("Daily loss limit reached")
+            raise DailyLossLimitReached("Daily loss limit reached")
+
+    def reset_day(self):
+        # start a new trading day's loss tally
+        self.loss_today = 0
 
     def position_size(self, stop_risk_amount):
         # risk per trade cap
@@ -0,0 +1,174 @@
+"""
+Robustness Module
+
+This module measures how much of a backtest's performance could be luck by
+resampling it many times. Period returns are bootstrapped (optionally in
+blocks, to keep short-term autocorrelation) and trade results are shuffled or
+bootstrapped, all as batched NumPy computations over a resamples x steps
+matrix. The spread of drawdown, CAGR and Sharpe over the resamples is
+reported as percentile bands.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from stockapp.backtest import BacktestResult
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+METHODS = ("bootstrap", "trade_shuffle", "trade_bootstrap")
+ROBUSTNESS_METRICS = ["total_return", "cagr", "sharpe_ratio", "max_drawdown"]
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+# Matrix elements per batch, to bound memory on long minute-bar histories
+BATCH_ELEMENTS = 4_000_000
+
+
+@dataclass
+class RobustnessReport:
+    """Percentile bands of resampled metrics next to the observed ones."""
+
+    method: str
+    resamples: int
+    observed: Dict[str, float]
+    bands: pd.DataFrame
+    samples: pd.DataFrame
+
+    def probability(self, metric: str, threshold: float = 0.0) -> float:
+        """
+        Share of resamples whose metric is above threshold.
+        """
+        return float((self.samples[metric] > threshold).mean())
+
+
+def resample_indices(
+    steps: int,
+    resamples: int,
+    rng: np.random.Generator,
+    block: int = 1,
+    replace: bool = True,
+) -> np.ndarray:
+    """
+    A resamples x steps matrix of positions into a series of length steps:
+    bootstrap draws (in blocks of consecutive positions when block > 1), or
+    permutations when replace is False.
+    """
+    if not replace:
+        return rng.permuted(np.tile(np.arange(steps), (resamples, 1)), axis=1)
+    if block <= 1:
+        return rng.integers(0, steps, (resamples, steps))
+    block = min(block, steps)
+    starts = rng.integers(0, steps - block + 1, (resamples, -(-steps // block)))
+    positions = (starts[:, :, None] + np.arange(block)).reshape(resamples, -1)
+    return positions[:, :steps]
+
+
+def path_metrics(
+    returns: np.ndarray, years: float, periods_per_year: float
+) -> Dict[str, np.ndarray]:
+    """
+    Metrics of every row of a resamples x steps matrix of returns, with
+    the same definitions as backtest.compute_metrics.
+    """
+    growth = np.cumprod(1 + returns, axis=1)
+    final = growth[:, -1]
+    peak = np.maximum.accumulate(growth, axis=1)
+    std = (
+        returns.std(axis=1, ddof=1) if returns.shape[1] > 1 else np.zeros(len(returns))
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(
+            std > 0, returns.mean(axis=1) / std * np.sqrt(periods_per_year), 0.0
+        )
+        cagr = final ** (1 / years) - 1 if years > 0 else np.zeros(len(final))
+    return {
+        "total_return": final - 1,
+        "cagr": cagr,
+        "sharpe_ratio": sharpe,
+        "max_drawdown": (1 - growth / peak).max(axis=1),
+    }
+
+
+def trade_returns(result: BacktestResult) -> np.ndarray:
+    """
+    Each trade's P&L as a fraction of portfolio equity when it was entered,
+    in exit order.
+    """
+    trades = result.trades.sort_values("exit_time", kind="stable")
+    if trades.empty:
+        return np.empty(0)
+    value = result.portfolio_value
+    position = value.index.get_indexer(trades["entry_time"])
+    before = np.where(
+        position > 0, value.to_numpy()[np.maximum(position - 1, 0)], result.initial_cash
+    )
+    return trades["pnl"].to_numpy(dtype=float) / before
+
+
+def run_robustness(
+    result: BacktestResult,
+    method: str = "bootstrap",
+    resamples: int = 1000,
+    block: int = 1,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    seed: Optional[int] = None,
+) -> RobustnessReport:
+    """
+    Resample a backtest and report percentile bands of its metrics.
+
+    bootstrap draws period returns with replacement (in blocks of `block`
+    periods), trade_shuffle reorders the trades, which changes the path and
+    drawdown but not the final return, and trade_bootstrap draws trades with
+    replacement. Trade methods annualize by the observed trades per year.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    if resamples < 1:
+        raise ValueError("resamples must be at least 1")
+    rng = np.random.default_rng(seed)
+    index = result.portfolio_value.index
+    if isinstance(index, pd.DatetimeIndex) and len(index) > 1:
+        years = (index[-1] - index[0]).days / 365.25
+    else:
+        years = len(index) / result.periods_per_year
+    if method == "bootstrap":
+        series = result.returns.to_numpy(dtype=float)
+        periods_per_year = result.periods_per_year
+    else:
+        series = trade_returns(result)
+        periods_per_year = len(series) / years if years > 0 else len(series)
+    if len(series) < 2:
+        raise ValueError(f"Need at least two returns to resample, got {len(series)}")
+
+    batch = max(1, BATCH_ELEMENTS // len(series))
+    chunks = []
+    for start in range(0, resamples, batch):
+        size = min(batch, resamples - start)
+        positions = resample_indices(
+            len(series), size, rng, block, replace=method != "trade_shuffle"
+        )
+        chunks.append(path_metrics(series[positions], years, periods_per_year))
+    samples = pd.DataFrame(
+        {name: np.concatenate([c[name] for c in chunks]) for name in ROBUSTNESS_METRICS}
+    )
+    bands = samples.quantile(np.asarray(percentiles) / 100).T
+    bands.columns = [f"p{p:g}" for p in percentiles]
+    observed = {name: result.metrics[name] for name in ROBUSTNESS_METRICS}
+    bands.insert(0, "observed", pd.Series(observed))
+    return RobustnessReport(method, resamples, observed, bands, samples)
+
+
+def log_robustness(report: RobustnessReport) -> None:
+    low, high = report.bands.columns[1], report.bands.columns[-1]
+    for metric, row in report.bands.iterrows():
+        logger.info(
+            f"{report.method} {metric}: observed {row['observed']:.4f}, "
+            f"{low}-{high} [{row[low]:.4f}, {row[high]:.4f}]"
+        )
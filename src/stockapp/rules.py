@@ -0,0 +1,255 @@
+"""
+Rules Module
+
+This module compiles declarative signal rules (config/rules.yaml) into vectorized
+NumPy boolean expressions. A compiled rule set is evaluated over a whole
+(field, symbol) panel in one pass, so the same rules drive live detection and
+backtests. Sub-expressions shared between rules are evaluated once per panel.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from stockapp.panel import panel_symbols, to_panel
+from stockapp.signal_engine import crossover_masks, events_from_masks
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_FILE = "config/rules.yaml"
+SIGNAL_TYPES = {"BUY", "SELL"}
+
+CROSSES = {"crosses_above": 0, "crosses_below": 1}
+COMPARISONS = {"above": np.greater, "below": np.less}
+COMBINATORS = {"all": np.logical_and, "any": np.logical_or}
+
+# A condition is a nested tuple, e.g. ("crosses_above", "sma_20", "ema_50") or
+# ("all", (cond, cond)); tuples are hashable, so they double as memo keys.
+Operand = Union[str, float]
+Condition = Tuple[Any, ...]
+
+
+def _operand(value: Any, rule: str) -> Operand:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"Rule {rule}: operand must be a field or number: {value!r}")
+    return value if isinstance(value, str) else float(value)
+
+
+def parse_condition(spec: Any, rule: str) -> Condition:
+    """
+    Parse one condition mapping from the rules file.
+    """
+    if not isinstance(spec, dict) or len(spec) != 1:
+        raise ValueError(f"Rule {rule}: condition must have exactly one key: {spec!r}")
+    op, args = next(iter(spec.items()))
+    if op in COMBINATORS:
+        if not isinstance(args, list) or not args:
+            raise ValueError(f"Rule {rule}: {op} needs a list of conditions")
+        return (op, tuple(parse_condition(arg, rule) for arg in args))
+    if op == "not":
+        return ("not", parse_condition(args, rule))
+    if op in CROSSES or op in COMPARISONS:
+        if not isinstance(args, list) or len(args) != 2:
+            raise ValueError(f"Rule {rule}: {op} needs two operands")
+        return (op, _operand(args[0], rule), _operand(args[1], rule))
+    if op == "volume_multiple":
+        args = args or {}
+        if "multiple" not in args:
+            raise ValueError(f"Rule {rule}: volume_multiple needs a multiple")
+        window = int(args.get("window", 20))
+        if window < 1:
+            raise ValueError(f"Rule {rule}: volume_multiple window must be >= 1")
+        return (op, str(args.get("field", "volume")), window, float(args["multiple"]))
+    raise ValueError(f"Rule {rule}: unknown condition {op!r}")
+
+
+def condition_fields(condition: Condition) -> List[str]:
+    """
+    Panel fields read by a condition, in first-use order.
+    """
+    op = condition[0]
+    if op in COMBINATORS:
+        fields = [f for child in condition[1] for f in condition_fields(child)]
+    elif op == "not":
+        fields = condition_fields(condition[1])
+    elif op == "volume_multiple":
+        fields = [condition[1]]
+    else:
+        fields = [arg for arg in condition[1:] if isinstance(arg, str)]
+    return list(dict.fromkeys(fields))
+
+
+@dataclass
+class CompiledRule:
+    """A named rule whose condition is ready for vectorized evaluation."""
+
+    name: str
+    signal_type: str
+    condition: Condition
+    values: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def fields(self) -> Set[str]:
+        return set(condition_fields(self.condition)) | set(self.values.values())
+
+
+def compile_rule(spec: Dict[str, Any]) -> CompiledRule:
+    """
+    Compile one rule mapping (name, signal, when, optional values).
+    """
+    name = spec.get("name")
+    if not name:
+        raise ValueError(f"Rule is missing a name: {spec!r}")
+    signal_type = str(spec.get("signal", "")).upper()
+    if signal_type not in SIGNAL_TYPES:
+        raise ValueError(f"Rule {name}: signal must be BUY or SELL")
+    if "when" not in spec:
+        raise ValueError(f"Rule {name}: missing 'when' condition")
+    condition = parse_condition(spec["when"], name)
+    values = spec.get("values") or {f: f for f in condition_fields(condition)}
+    return CompiledRule(name, signal_type, condition, dict(values))
+
+
+class _PanelEvaluator:
+    """
+    Evaluates conditions over one panel, memoizing fields and sub-expressions.
+    """
+
+    def __init__(self, panel: pd.DataFrame, symbols: List[str]):
+        self.panel = panel
+        self.symbols = symbols
+        self.available = set(panel.columns.get_level_values(0))
+        self.shape = (len(panel.index), len(symbols))
+        self.columns: Dict[str, np.ndarray] = {}
+        self.memo: Dict[Condition, np.ndarray] = {}
+        self.nodes_evaluated = 0
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            if name not in self.available:
+                raise KeyError(name)
+            self.columns[name] = (
+                self.panel[name].reindex(columns=self.symbols).to_numpy(dtype=float)
+            )
+        return self.columns[name]
+
+    def operand(self, value: Operand) -> np.ndarray:
+        if isinstance(value, str):
+            return self.column(value)
+        return np.full(self.shape, value)
+
+    def mask(self, condition: Condition) -> np.ndarray:
+        result = self.memo.get(condition)
+        if result is None:
+            result = self._evaluate(condition)
+            self.memo[condition] = result
+            self.nodes_evaluated += 1
+        return result
+
+    def _evaluate(self, condition: Condition) -> np.ndarray:
+        op = condition[0]
+        if op in COMBINATORS:
+            return COMBINATORS[op].reduce([self.mask(c) for c in condition[1]])
+        if op == "not":
+            return ~self.mask(condition[1])
+        if op in CROSSES:
+            # Both directions come from one comparison pass, shared via the memo
+            key = ("crosses", condition[1], condition[2])
+            if key not in self.memo:
+                above, below = crossover_masks(
+                    self.operand(condition[1]), self.operand(condition[2])
+                )
+                self.memo[key] = np.stack([above, below])
+            return self.memo[key][CROSSES[op]]
+        if op in COMPARISONS:
+            left, right = self.operand(condition[1]), self.operand(condition[2])
+            # NaN comparisons are already False
+            return COMPARISONS[op](left, right)
+        if op == "volume_multiple":
+            _, name, window, multiple = condition
+            values = self.column(name)
+            baseline = pd.DataFrame(values).rolling(window).mean().shift(1).to_numpy()
+            return values > multiple * baseline
+        raise ValueError(f"Unknown condition {op!r}")
+
+
+class RuleSet:
+    """
+    Compiled rules evaluated together over a panel.
+    """
+
+    def __init__(self, rules: List[CompiledRule]):
+        names = [rule.name for rule in rules]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate rule names: {sorted(duplicates)}")
+        self.rules = rules
+        # Distinct sub-expressions computed by the last evaluation
+        self.nodes_evaluated = 0
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RuleSet":
+        return cls([compile_rule(spec) for spec in config.get("rules") or []])
+
+    def _evaluate(self, panel: pd.DataFrame) -> Tuple[_PanelEvaluator, list]:
+        evaluator = _PanelEvaluator(panel, panel_symbols(panel))
+        rule_masks = []
+        for rule in self.rules:
+            try:
+                mask = evaluator.mask(rule.condition)
+                for col in rule.values.values():
+                    evaluator.column(col)
+            except KeyError as e:
+                logger.debug(f"Skipping rule {rule.name}: field {e} not in panel")
+                continue
+            rule_masks.append((rule.signal_type, rule.name, rule.values, mask))
+        self.nodes_evaluated = evaluator.nodes_evaluated
+        return evaluator, rule_masks
+
+    def masks(self, panel: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Return {rule name: (time, symbol) boolean mask} for every evaluable rule.
+        """
+        _, rule_masks = self._evaluate(panel)
+        return {reason: mask for _, reason, _, mask in rule_masks}
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        """
+        Evaluate every rule over a (field, symbol) panel.
+        Returns one row per event, in the same layout as
+        signal_engine.detect_panel_events.
+        """
+        evaluator, rule_masks = self._evaluate(panel)
+        return events_from_masks(
+            panel.index, evaluator.symbols, evaluator.columns, rule_masks
+        )
+
+    def evaluate_frame(
+        self, df: pd.DataFrame, symbol: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Evaluate every rule over a single symbol's indicator frame.
+        """
+        return self.evaluate(to_panel({symbol: df}))
+
+
+def load_rules(path: str = DEFAULT_RULES_FILE) -> RuleSet:
+    """
+    Load and compile the rules file.
+    """
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    rules = RuleSet.from_config(config)
+    logger.info(f"Compiled {len(rules)} signal rules from {path}")
+    return rules
@@ -1,10 +1,639 @@
-def premarket_scan(data):
+"""
+Scanner Module
+
+This module ranks the symbol universe before the open by gap % and relative volume.
+Metrics are computed for every symbol at once from the latest stored daily bars and
+live pre-market quotes, and the top N per ranking criterion are kept in bounded
+heaps that are updated as quotes stream in. After the open, IntradayScanner keeps
+running per-symbol aggregates from minute bars and ranks them the same way.
+"""
+
+import heapq
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from stockapp.db_models import RawPrice
+from stockapp.panel import panel_symbols
+from stockapp.volume_profile import SESSION_MINUTES, SESSION_OPEN, VolumeProfile
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_N = 20
+BASELINE_DAYS = 20
+
+# Ranking criteria: name -> (metric column, +1 for largest first, -1 for smallest)
+CRITERIA = {
+    "gap_up": ("gap_pct", 1),
+    "gap_down": ("gap_pct", -1),
+    "rel_volume": ("rel_volume", 1),
+    "volume": ("volume", 1),
+}
+METRIC_COLUMNS = ["price", "volume", "gap_pct", "rel_volume"]
+
+# Intraday criteria over IntradayScanner metrics, in the same form as CRITERIA
+INTRADAY_CRITERIA = {
+    "rel_volume": ("rel_volume", 1),
+    "change_up": ("change_pct", 1),
+    "change_down": ("change_pct", -1),
+    "range_breakout": ("range_distance_pct", 1),
+}
+INTRADAY_COLUMNS = [
+    "price",
+    "volume",
+    "vwap",
+    "high",
+    "low",
+    "change_pct",
+    "rel_volume",
+    "range_distance_pct",
+]
+
+
+def premarket_scan(data, top_n=DEFAULT_TOP_N):
     """
-    Scan premarket data and return top N tickers by gap% and volume.
+    Scan premarket data and return top N tickers by gap%.
     Args:
         data: list of dicts with keys 'symbol', 'gap_pct', 'volume'
+        top_n: number of symbols to return
     Returns:
-        list: top 20 symbols
+        list: top N symbols
     """
-    sorted_ = sorted(data, key=lambda x: x["gap_pct"], reverse=True)
-    return [r["symbol"] for r in sorted_[:20]]
+    top = heapq.nlargest(top_n, data, key=lambda x: x["gap_pct"])
+    return [r["symbol"] for r in top]
+
+
+def load_scan_baseline(
+    db: Session, symbols: Sequence[str], days: int = BASELINE_DAYS
+) -> pd.DataFrame:
+    """
+    Previous close and average daily volume over the last `days` bars for every
+    symbol, from one windowed query. Returns a frame indexed by symbol.
+    """
+    rank = (
+        func.row_number()
+        .over(partition_by=RawPrice.symbol, order_by=RawPrice.timestamp.desc())
+        .label("rank")
+    )
+    recent = (
+        db.query(RawPrice.symbol, RawPrice.close, RawPrice.volume, rank)
+        .filter(RawPrice.symbol.in_(list(symbols)))
+        .subquery()
+    )
+    rows = (
+        db.query(recent.c.symbol, recent.c.close, recent.c.volume, recent.c.rank)
+        .filter(recent.c.rank <= days)
+        .all()
+    )
+    bars = pd.DataFrame(rows, columns=["symbol", "close", "volume", "rank"])
+    grouped = bars.groupby("symbol")
+    baseline = pd.DataFrame(
+        {
+            "prev_close": bars[bars["rank"] == 1].set_index("symbol")["close"],
+            "avg_volume": grouped["volume"].mean(),
+        }
+    )
+    return baseline.reindex(list(symbols)).astype(float)
+
+
+def compute_scan_metrics(baseline: pd.DataFrame, quotes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gap % from the previous close and relative volume for every symbol.
+    quotes is indexed by symbol with price and volume columns.
+    """
+    quotes = quotes.reindex(baseline.index)
+    price = quotes["price"].to_numpy(dtype=float)
+    volume = quotes["volume"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap_pct = (price / baseline["prev_close"].to_numpy() - 1) * 100
+        rel_volume = volume / baseline["avg_volume"].to_numpy()
+    return pd.DataFrame(
+        {
+            "price": price,
+            "volume": volume,
+            "gap_pct": gap_pct,
+            "rel_volume": rel_volume,
+        },
+        index=baseline.index,
+    )
+
+
+class TopN:
+    """
+    Bounded min-heap of the n highest-scoring symbols.
+
+    Entries are replaced lazily: an improved score pushes a new entry and stale
+    ones are skipped when they reach the top of the heap. A member whose score
+    drops may no longer belong, so the heap is rebuilt from all known scores;
+    that is O(symbols) but only happens for members losing ground.
+    """
+
+    def __init__(self, n: int = DEFAULT_TOP_N):
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        self.n = n
+        self.scores: Dict[str, float] = {}
+        self.members: set = set()
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _clean(self) -> None:
+        heap = self._heap
+        while heap and (
+            heap[0][1] not in self.members or self.scores[heap[0][1]] != heap[0][0]
+        ):
+            heapq.heappop(heap)
+
+    def _min(self) -> Tuple[float, str]:
+        self._clean()
+        return self._heap[0]
+
+    def _push(self, score: float, symbol: str) -> None:
+        heapq.heappush(self._heap, (score, symbol))
+        # Drop accumulated stale entries once they outnumber the members
+        if len(self._heap) > 4 * self.n:
+            self._heap = [(self.scores[s], s) for s in self.members]
+            heapq.heapify(self._heap)
+
+    def rebuild(self) -> None:
+        """
+        Recompute the members from every known score.
+        """
+        top = heapq.nlargest(self.n, self.scores.items(), key=lambda item: item[1])
+        self.members = {symbol for symbol, _ in top}
+        self._heap = [(score, symbol) for symbol, score in top]
+        heapq.heapify(self._heap)
+
+    def load(self, scores: Dict[str, float]) -> None:
+        """
+        Replace every score at once, skipping NaN.
+        """
+        self.scores = {s: v for s, v in scores.items() if not np.isnan(v)}
+        self.rebuild()
+
+    def update_many(self, symbols: Sequence[str], scores: np.ndarray) -> bool:
+        """
+        Record new scores for many symbols (NaN removes one) and re-rank once.
+        Cheaper than update() per symbol when most of the universe changes.
+        Returns True if the members changed.
+        """
+        scores = np.asarray(scores, dtype=float)
+        valid = ~np.isnan(scores)
+        for i in np.flatnonzero(~valid):
+            self.scores.pop(symbols[i], None)
+        kept = np.flatnonzero(valid)
+        self.scores.update(zip([symbols[i] for i in kept], scores[kept].tolist()))
+        before = self.members
+        self.rebuild()
+        return self.members != before
+
+    def update(self, symbol: str, score: float) -> bool:
+        """
+        Record a new score for symbol. Returns True if the members changed.
+        """
+        if score is None or np.isnan(score):
+            self.scores.pop(symbol, None)
+            if symbol not in self.members:
+                return False
+            self.rebuild()
+            return True
+        previous = self.scores.get(symbol)
+        self.scores[symbol] = score
+        if symbol in self.members:
+            if score < previous:
+                before = set(self.members)
+                self.rebuild()
+                return self.members != before
+            if score > previous:
+                self._push(score, symbol)
+            return False
+        if len(self.members) < self.n:
+            self.members.add(symbol)
+            self._push(score, symbol)
+            return True
+        lowest, lowest_symbol = self._min()
+        if score <= lowest:
+            return False
+        heapq.heappop(self._heap)
+        self.members.discard(lowest_symbol)
+        self.members.add(symbol)
+        self._push(score, symbol)
+        return True
+
+    def top(self) -> List[Tuple[str, float]]:
+        """
+        Members and scores, highest first.
+        """
+        return sorted(
+            ((s, self.scores[s]) for s in self.members),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+
+class PremarketScanner:
+    """
+    Streaming gap and relative volume scanner over a symbol universe.
+
+    scan() ranks a full set of quotes with array operations; on_quote()
+    updates one symbol in O(log n) per criterion as quotes stream in.
+    """
+
+    def __init__(
+        self,
+        baseline: pd.DataFrame,
+        criteria: Iterable[str] = ("gap_up", "rel_volume"),
+        top_n: int = DEFAULT_TOP_N,
+    ):
+        criteria = list(criteria)
+        unknown = [c for c in criteria if c not in CRITERIA]
+        if unknown:
+            raise ValueError(
+                f"Unknown criteria: {unknown} (available: {list(CRITERIA)})"
+            )
+        self.baseline = baseline
+        self.criteria = criteria
+        self.top_n = top_n
+        self.positions = {symbol: i for i, symbol in enumerate(baseline.index)}
+        self.prev_close = baseline["prev_close"].to_numpy(dtype=float)
+        self.avg_volume = baseline["avg_volume"].to_numpy(dtype=float)
+        # (symbols, METRIC_COLUMNS) array of the latest metrics
+        self.values = np.full((len(baseline), len(METRIC_COLUMNS)), np.nan)
+        self.rankings = {criterion: TopN(top_n) for criterion in criteria}
+        self._score_columns = {
+            criterion: (
+                METRIC_COLUMNS.index(CRITERIA[criterion][0]),
+                CRITERIA[criterion][1],
+            )
+            for criterion in criteria
+        }
+
+    def scan(self, quotes: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Rank a full set of quotes (indexed by symbol, with price and volume).
+        Replaces any streamed state. Returns the top N per criterion.
+        """
+        metrics = compute_scan_metrics(self.baseline, quotes)
+        self.values = metrics.to_numpy(dtype=float, copy=True)
+        for criterion, (column, direction) in self._score_columns.items():
+            scores = direction * self.values[:, column]
+            self.rankings[criterion].load(dict(zip(self.baseline.index, scores)))
+        return {criterion: self.top(criterion) for criterion in self.criteria}
+
+    def on_quote(self, symbol: str, price: float, volume: float) -> List[str]:
+        """
+        Apply one streamed quote. Returns the criteria whose top N changed.
+        """
+        position = self.positions.get(symbol)
+        if position is None:
+            return []
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gap_pct = (price / self.prev_close[position] - 1) * 100
+            rel_volume = volume / self.avg_volume[position]
+        values = (float(price), float(volume), float(gap_pct), float(rel_volume))
+        self.values[position] = values
+        changed = []
+        for criterion, (column, direction) in self._score_columns.items():
+            if self.rankings[criterion].update(symbol, direction * values[column]):
+                changed.append(criterion)
+        return changed
+
+    def top(self, criterion: str) -> pd.DataFrame:
+        """
+        Current top N for a criterion, best first, with every metric.
+        """
+        symbols = [symbol for symbol, _ in self.rankings[criterion].top()]
+        rows = [self.positions[symbol] for symbol in symbols]
+        ranked = pd.DataFrame(self.values[rows], columns=METRIC_COLUMNS)
+        ranked.insert(0, "symbol", symbols)
+        return ranked
+
+
+class IntradayScanner:
+    """
+    Incremental intraday scanner over minute bars.
+
+    Each bar updates O(1) running aggregates for its symbol (cumulative
+    volume, VWAP, session high/low, opening range). on_bar() re-scores only
+    that symbol in every ranking; update() applies a bar for the whole
+    universe and re-ranks each criterion once. Relative volume compares
+    cumulative volume with the volume expected by this minute: the
+    time-of-day profile when given, otherwise the daily average spread evenly
+    over the session. Subscribers are called with (criterion, top frame)
+    whenever a ranking's members change. State resets when a bar from a new
+    session arrives; bars outside the regular session are ignored.
+    """
+
+    def __init__(
+        self,
+        baseline: pd.DataFrame,
+        criteria: Iterable[str] = ("rel_volume", "change_up", "range_breakout"),
+        top_n: int = DEFAULT_TOP_N,
+        opening_range_minutes: int = 5,
+        profile: Optional[VolumeProfile] = None,
+        session_open: str = SESSION_OPEN,
+        session_minutes: int = SESSION_MINUTES,
+    ):
+        criteria = list(criteria)
+        unknown = [c for c in criteria if c not in INTRADAY_CRITERIA]
+        if unknown:
+            raise ValueError(
+                f"Unknown criteria: {unknown} (available: {list(INTRADAY_CRITERIA)})"
+            )
+        self.baseline = baseline
+        self.symbols = list(baseline.index)
+        self.criteria = criteria
+        self._score_columns = {c: INTRADAY_CRITERIA[c] for c in criteria}
+        self.top_n = top_n
+        self.opening_range_minutes = opening_range_minutes
+        self.session_minutes = session_minutes
+        open_time = pd.Timestamp(session_open)
+        self._open_minute = open_time.hour * 60 + open_time.minute
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.prev_close = baseline["prev_close"].to_numpy(dtype=float)
+        self.expected_volume = self._expected_volume(profile)
+        self._subscribers: List[Callable[[str, pd.DataFrame], None]] = []
+        self.bars_processed = 0
+        self.session: Optional[pd.Timestamp] = None
+        self.reset_session()
+
+    def _expected_volume(self, profile: Optional[VolumeProfile]) -> np.ndarray:
+        """
+        (symbols, minutes) cumulative volume expected by the end of each minute.
+        """
+        if profile is None:
+            avg_volume = self.baseline["avg_volume"].to_numpy(dtype=float)
+            elapsed = np.arange(1, self.session_minutes + 1) / self.session_minutes
+            return np.outer(avg_volume, elapsed)
+        rows = [profile.positions.get(s, -1) for s in self.symbols]
+        means = np.vstack([profile.mean, np.full(profile.minutes, np.nan)])[rows]
+        expected = np.cumsum(np.nan_to_num(means), axis=1)
+        expected[np.isnan(means).all(axis=1)] = np.nan
+        return expected[:, : self.session_minutes]
+
+    def reset_session(self, session: Optional[pd.Timestamp] = None) -> None:
+        """
+        Clear every aggregate and ranking for a new session.
+        """
+        n = len(self.symbols)
+        self.session = session
+        self.volume = np.zeros(n)
+        self.price_volume = np.zeros(n)
+        self.high = np.full(n, np.nan)
+        self.low = np.full(n, np.nan)
+        self.price = np.full(n, np.nan)
+        self.range_high = np.full(n, np.nan)
+        self.range_low = np.full(n, np.nan)
+        self.minute = np.full(n, -1)
+        self.rankings = {criterion: TopN(self.top_n) for criterion in self.criteria}
+
+    def subscribe(self, callback: Callable[[str, pd.DataFrame], None]) -> None:
+        """
+        Call callback(criterion, top frame) when a ranking's members change.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, pd.DataFrame], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _session_minute(self, timestamp: pd.Timestamp) -> int:
+        minute = timestamp.hour * 60 + timestamp.minute - self._open_minute
+        return minute if 0 <= minute < self.session_minutes else -1
+
+    def _start_bar(self, timestamp) -> int:
+        """
+        Roll the session if needed; return the session minute of the bar.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        session = timestamp.normalize()
+        if session != self.session:
+            self.reset_session(session)
+        return self._session_minute(timestamp)
+
+    def _scores(self, i: int) -> Dict[str, float]:
+        price = self.price[i]
+        minute = self.minute[i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            metrics = {
+                "change_pct": (price / self.prev_close[i] - 1) * 100,
+                "rel_volume": self.volume[i] / self.expected_volume[i, minute],
+                "range_distance_pct": (
+                    (price / self.range_high[i] - 1) * 100
+                    if minute >= self.opening_range_minutes
+                    else np.nan
+                ),
+            }
+        return {
+            criterion: direction * float(metrics[column])
+            for criterion, (column, direction) in self._score_columns.items()
+        }
+
+    def _rank(self, i: int) -> List[str]:
+        symbol = self.symbols[i]
+        return [
+            criterion
+            for criterion, score in self._scores(i).items()
+            if self.rankings[criterion].update(symbol, score)
+        ]
+
+    def _notify(self, changed: Iterable[str]) -> None:
+        for criterion in changed:
+            if not self._subscribers:
+                return
+            ranked = self.top(criterion)
+            for callback in self._subscribers:
+                try:
+                    callback(criterion, ranked)
+                except Exception as e:
+                    logger.error(f"Scanner subscriber failed for {criterion}: {e}")
+
+    def on_bar(self, symbol: str, timestamp, bar: dict) -> List[str]:
+        """
+        Apply one minute bar (high, low, close, volume) for one symbol.
+        Returns the criteria whose top N changed.
+        """
+        i = self.positions.get(symbol)
+        if i is None:
+            return []
+        minute = self._start_bar(timestamp)
+        if minute < 0:
+            return []
+        high, low, close = float(bar["high"]), float(bar["low"]), float(bar["close"])
+        volume = float(bar["volume"] or 0)
+        if volume != volume:
+            volume = 0.0
+        self.volume[i] += volume
+        self.price_volume[i] += (high + low + close) / 3 * volume
+        self.high[i] = max(high, self.high[i]) if self.high[i] == self.high[i] else high
+        self.low[i] = min(low, self.low[i]) if self.low[i] == self.low[i] else low
+        if minute < self.opening_range_minutes:
+            self.range_high[i] = self.high[i]
+            self.range_low[i] = self.low[i]
+        self.price[i] = close
+        self.minute[i] = minute
+        self.bars_processed += 1
+        changed = self._rank(i)
+        self._notify(changed)
+        return changed
+
+    def update(self, timestamp, high, low, close, volume) -> List[str]:
+        """
+        Apply one bar for every symbol at once (arrays ordered like
+        self.symbols; NaN close means no bar). Subscribers are notified once
+        per changed criterion. Returns the criteria whose top N changed.
+        """
+        minute = self._start_bar(timestamp)
+        if minute < 0:
+            return []
+        high, low, close, volume = (
+            np.asarray(values, dtype=float) for values in (high, low, close, volume)
+        )
+        traded = ~np.isnan(close)
+        volume = np.where(traded, np.nan_to_num(volume), 0.0)
+        self.volume += volume
+        self.price_volume += np.where(traded, (high + low + close) / 3 * volume, 0.0)
+        self.high = np.where(traded, np.fmax(self.high, high), self.high)
+        self.low = np.where(traded, np.fmin(self.low, low), self.low)
+        if minute < self.opening_range_minutes:
+            self.range_high = self.high.copy()
+            self.range_low = self.low.copy()
+        self.price = np.where(traded, close, self.price)
+        self.minute = np.where(traded, minute, self.minute)
+        rows = np.flatnonzero(traded)
+        self.bars_processed += len(rows)
+        # One re-rank per criterion for the whole cross-section
+        metrics = self._metrics(rows)
+        symbols = [self.symbols[i] for i in rows]
+        changed = [
+            criterion
+            for criterion, (column, direction) in self._score_columns.items()
+            if self.rankings[criterion].update_many(
+                symbols, direction * metrics[column].to_numpy()
+            )
+        ]
+        self._notify(changed)
+        return changed
+
+    def feed_panel(self, panel: pd.DataFrame) -> int:
+        """
+        Replay a minute-bar panel bar by bar through update().
+        Returns the number of symbol bars processed.
+        """
+        symbols = panel_symbols(panel)
+        order = [self.positions[s] for s in symbols if s in self.positions]
+        known = [s for s in symbols if s in self.positions]
+        fields = {}
+        for name in ("high", "low", "close", "volume"):
+            values = np.full((len(panel.index), len(self.symbols)), np.nan)
+            values[:, order] = panel[name].reindex(columns=known).to_numpy(dtype=float)
+            fields[name] = values
+        start = self.bars_processed
+        for t, timestamp in enumerate(panel.index):
+            self.update(
+                timestamp,
+                fields["high"][t],
+                fields["low"][t],
+                fields["close"][t],
+                fields["volume"][t],
+            )
+        return self.bars_processed - start
+
+    def _metrics(self, rows: np.ndarray) -> pd.DataFrame:
+        minute = self.minute[rows]
+        price = self.price[rows]
+        volume = self.volume[rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = self.expected_volume[rows, np.maximum(minute, 0)]
+            return pd.DataFrame(
+                {
+                    "price": price,
+                    "volume": volume,
+                    "vwap": self.price_volume[rows] / volume,
+                    "high": self.high[rows],
+                    "low": self.low[rows],
+                    "change_pct": (price / self.prev_close[rows] - 1) * 100,
+                    "rel_volume": np.where(minute >= 0, volume / expected, np.nan),
+                    "range_distance_pct": np.where(
+                        minute >= self.opening_range_minutes,
+                        (price / self.range_high[rows] - 1) * 100,
+                        np.nan,
+                    ),
+                },
+                columns=INTRADAY_COLUMNS,
+            )
+
+    def metrics(self) -> pd.DataFrame:
+        """
+        Current metrics of every symbol, indexed by symbol.
+        """
+        frame = self._metrics(np.arange(len(self.symbols)))
+        frame.index = self.symbols
+        return frame
+
+    def top(self, criterion: str) -> pd.DataFrame:
+        """
+        Current top N for a criterion, best first, with every metric.
+        """
+        symbols = [symbol for symbol, _ in self.rankings[criterion].top()]
+        ranked = self._metrics(
+            np.array([self.positions[s] for s in symbols], dtype=int)
+        )
+        ranked.insert(0, "symbol", symbols)
+        return ranked
+
+
+def fetch_premarket_quotes(symbols: Sequence[str]) -> pd.DataFrame:
+    """
+    Latest trade price and volume so far today for every symbol, from Alpaca
+    snapshots. Returns a frame indexed by symbol with price and volume.
+    """
+    import alpaca_trade_api as tradeapi
+
+    api = tradeapi.REST(
+        os.getenv("ALPACA_API_KEY"),
+        os.getenv("ALPACA_API_SECRET"),
+        os.getenv("ALPACA_PAPER_URL", "https://paper-api.alpaca.markets"),
+        api_version="v2",
+    )
+    rows = {}
+    for start in range(0, len(symbols), 1000):
+        snapshots = api.get_snapshots(list(symbols[start : start + 1000]))
+        for symbol, snapshot in snapshots.items():
+            if snapshot is None or snapshot.latest_trade is None:
+                continue
+            daily = snapshot.daily_bar
+            rows[symbol] = {
+                "price": snapshot.latest_trade.price,
+                "volume": daily.volume if daily is not None else np.nan,
+            }
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["price", "volume"])
+
+
+def run_scan(
+    db: Session,
+    symbols: Sequence[str],
+    criteria: Iterable[str] = ("gap_up", "rel_volume"),
+    top_n: int = DEFAULT_TOP_N,
+    quotes: Optional[pd.DataFrame] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Scan the universe with stored baselines and live (or given) quotes.
+    """
+    baseline = load_scan_baseline(db, symbols)
+    if quotes is None:
+        quotes = fetch_premarket_quotes(symbols)
+    scanner = PremarketScanner(baseline, criteria, top_n)
+    results = scanner.scan(quotes)
+    logger.info(f"Scanned {len(symbols)} symbols, {len(quotes)} with quotes")
+    return results
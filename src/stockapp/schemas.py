@@ -50,6 +50,11 @@ class SignalBase(BaseModel):
     symbol: str
     timestamp: datetime
     signal_type: str
+    reason: Optional[str] = None
+    price: Optional[float] = None
+    rsi: Optional[float] = None
+    sma20: Optional[float] = None
+    ema50: Optional[float] = None
     details: Optional[Dict[str, Any]] = None
     executed: bool = False
     execution_details: Optional[Dict[str, Any]] = None
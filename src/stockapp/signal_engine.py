@@ -8,11 +8,16 @@ applying rule-based logic (crossovers, RSI thresholds, etc.), and saving the sig
 # Strategy logic & signal generation
 import logging
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+from sqlalchemy import and_, func, or_, tuple_
 from sqlalchemy.orm import Session
 
+from stockapp import crud
 from stockapp.db_models import Indicator, Signal, get_db
+from stockapp.panel import panel_symbols
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +25,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+
+EVENT_COLUMNS = ["timestamp", "symbol", "signal_type", "reason", "values"]
+
 
 def get_indicator_data(db: Session, symbol: str, days: int = 10) -> pd.DataFrame:
     """
@@ -47,81 +57,178 @@ def get_indicator_data(db: Session, symbol: str, days: int = 10) -> pd.DataFrame
     return df
 
 
-def detect_ma_crossover(df: pd.DataFrame) -> list:
+def crossover_masks(
+    fast: np.ndarray, slow: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Detect moving average crossovers.
+    Find bars where fast crosses above or below slow.
+    Works on a single series (time,) or a panel (time, symbol).
+    A cross above needs fast <= slow on the previous bar and fast > slow now;
+    comparisons involving NaN are never a cross.
     """
-    signals = []
-    if len(df) < 2:
-        return signals
-    if "sma_20" in df.columns and "ema_50" in df.columns:
-        prev_row = df.iloc[-2]
-        curr_row = df.iloc[-1]
-        if (
-            prev_row["sma_20"] <= prev_row["ema_50"]
-            and curr_row["sma_20"] > curr_row["ema_50"]
-        ):
-            signals.append(
-                {
-                    "signal_type": "BUY",
-                    "reason": "SMA_20_CROSS_ABOVE_EMA_50",
-                    "values": {
-                        "sma_20": curr_row["sma_20"],
-                        "ema_50": curr_row["ema_50"],
-                    },
-                }
-            )
-        elif (
-            prev_row["sma_20"] >= prev_row["ema_50"]
-            and curr_row["sma_20"] < curr_row["ema_50"]
-        ):
-            signals.append(
+    fast = np.asarray(fast, dtype=float)
+    slow = np.asarray(slow, dtype=float)
+    above = np.zeros(fast.shape, dtype=bool)
+    below = np.zeros(fast.shape, dtype=bool)
+    if len(fast) < 2:
+        return above, below
+    above[1:] = (fast[:-1] <= slow[:-1]) & (fast[1:] > slow[1:])
+    below[1:] = (fast[:-1] >= slow[:-1]) & (fast[1:] < slow[1:])
+    return above, below
+
+
+def threshold_masks(
+    values: np.ndarray, lower: float, upper: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find bars where values are below lower or above upper.
+    """
+    values = np.asarray(values, dtype=float)
+    return values < lower, values > upper
+
+
+# (signal_type, reason, {value name: column}) for each rule, in output order
+MA_RULES = [
+    ("BUY", "SMA_20_CROSS_ABOVE_EMA_50", {"sma_20": "sma_20", "ema_50": "ema_50"}),
+    ("SELL", "SMA_20_CROSS_BELOW_EMA_50", {"sma_20": "sma_20", "ema_50": "ema_50"}),
+]
+RSI_RULES = [
+    ("BUY", "RSI_OVERSOLD", {"rsi": "rsi_14"}),
+    ("SELL", "RSI_OVERBOUGHT", {"rsi": "rsi_14"}),
+]
+
+
+def _rule_masks(columns: Dict[str, np.ndarray], ma: bool = True, rsi: bool = True):
+    """
+    Evaluate every rule whose input columns are present.
+    Returns (signal_type, reason, value columns, mask) tuples in rule order.
+    """
+    results = []
+    if ma and "sma_20" in columns and "ema_50" in columns:
+        masks = crossover_masks(columns["sma_20"], columns["ema_50"])
+        results += [rule + (mask,) for rule, mask in zip(MA_RULES, masks)]
+    if rsi and "rsi_14" in columns:
+        masks = threshold_masks(columns["rsi_14"], RSI_OVERSOLD, RSI_OVERBOUGHT)
+        results += [rule + (mask,) for rule, mask in zip(RSI_RULES, masks)]
+    return results
+
+
+def events_from_masks(
+    index: pd.Index,
+    symbols: List[str],
+    columns: Dict[str, np.ndarray],
+    rule_masks: list,
+) -> pd.DataFrame:
+    """
+    Turn (signal_type, reason, value columns, mask) rule masks over a
+    (time, symbol) grid into one row per event, ordered by timestamp, symbol
+    and rule.
+    """
+    frames = []
+    for order, (signal_type, reason, value_columns, mask) in enumerate(rule_masks):
+        t_idx, s_idx = np.nonzero(mask)
+        if not len(t_idx):
+            continue
+        values = {
+            name: columns[col][t_idx, s_idx] for name, col in value_columns.items()
+        }
+        frames.append(
+            pd.DataFrame(
                 {
-                    "signal_type": "SELL",
-                    "reason": "SMA_20_CROSS_BELOW_EMA_50",
-                    "values": {
-                        "sma_20": curr_row["sma_20"],
-                        "ema_50": curr_row["ema_50"],
-                    },
+                    "timestamp": index[t_idx],
+                    "symbol": np.asarray(symbols, dtype=object)[s_idx],
+                    "signal_type": signal_type,
+                    "reason": reason,
+                    "values": [
+                        {name: float(v[i]) for name, v in values.items()}
+                        for i in range(len(t_idx))
+                    ],
+                    "_order": order,
                 }
             )
-    return signals
+        )
+    if not frames:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    events = pd.concat(frames, ignore_index=True)
+    events = events.sort_values(["timestamp", "symbol", "_order"], kind="stable")
+    return events.drop(columns="_order").reset_index(drop=True)
+
+
+def _events_frame(
+    index: pd.Index,
+    symbols: List[str],
+    columns: Dict[str, np.ndarray],
+    ma: bool = True,
+    rsi: bool = True,
+) -> pd.DataFrame:
+    """
+    Events of the built-in MA and RSI rules.
+    """
+    return events_from_masks(index, symbols, columns, _rule_masks(columns, ma, rsi))
+
+
+def detect_signal_events(
+    df: pd.DataFrame, symbol: Optional[str] = None, ma: bool = True, rsi: bool = True
+) -> pd.DataFrame:
+    """
+    Detect every crossover and RSI threshold event over a whole indicator frame.
+    Returns one row per event with timestamp, symbol, signal_type, reason and values.
+    """
+    columns = {
+        col: df[col].to_numpy(dtype=float).reshape(-1, 1)
+        for col in ("sma_20", "ema_50", "rsi_14")
+        if col in df.columns
+    }
+    return _events_frame(df.index, [symbol], columns, ma, rsi)
+
+
+def detect_panel_events(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Detect events for every symbol of a (field, symbol) indicator panel in one pass.
+    """
+    symbols = panel_symbols(panel)
+    fields = panel.columns.get_level_values(0)
+    columns = {
+        col: panel[col].reindex(columns=symbols).to_numpy(dtype=float)
+        for col in ("sma_20", "ema_50", "rsi_14")
+        if col in fields
+    }
+    return _events_frame(panel.index, symbols, columns)
+
+
+def _latest_signals(df: pd.DataFrame, ma: bool = True, rsi: bool = True) -> list:
+    """
+    Signals on the last row of df, as signal dicts.
+    """
+    if len(df) < 1:
+        return []
+    events = detect_signal_events(df.iloc[-2:], ma=ma, rsi=rsi)
+    events = events[events["timestamp"] == df.index[-1]]
+    return [
+        {"signal_type": e.signal_type, "reason": e.reason, "values": e.values}
+        for e in events.itertuples(index=False)
+    ]
+
+
+def detect_ma_crossover(df: pd.DataFrame) -> list:
+    """
+    Detect moving average crossovers.
+    """
+    return _latest_signals(df, rsi=False)
 
 
 def detect_rsi_signals(df: pd.DataFrame) -> list:
     """
     Detect RSI overbought/oversold conditions.
     """
-    signals = []
-    if len(df) < 1 or "rsi_14" not in df.columns:
-        return signals
-    curr_row = df.iloc[-1]
-    if curr_row["rsi_14"] < 30:
-        signals.append(
-            {
-                "signal_type": "BUY",
-                "reason": "RSI_OVERSOLD",
-                "values": {"rsi": curr_row["rsi_14"]},
-            }
-        )
-    elif curr_row["rsi_14"] > 70:
-        signals.append(
-            {
-                "signal_type": "SELL",
-                "reason": "RSI_OVERBOUGHT",
-                "values": {"rsi": curr_row["rsi_14"]},
-            }
-        )
-    return signals
+    return _latest_signals(df, ma=False)
 
 
-def save_signals(db: Session, symbol: str, timestamp: datetime, signals: list) -> int:
+def signal_rows(symbol: str, timestamp: datetime, signals: list) -> List[dict]:
     """
-    Save detected signals to the database.
+    Validate detected signals and convert them to Signal table rows.
     """
-    if not signals:
-        return 0
-    count = 0
+    rows = []
     for signal_data in signals:
         if not signal_data.get("signal_type") or not signal_data.get("reason"):
             logger.error("Invalid signal data: missing signal_type or reason.")
@@ -129,23 +236,199 @@ def save_signals(db: Session, symbol: str, timestamp: datetime, signals: list) -
         if not signal_data.get("values"):
             logger.warning("Signal data missing values. Skipping.")
             continue
-        signal = Signal(
-            symbol=symbol,
-            timestamp=timestamp,
-            signal_type=signal_data["signal_type"],
-            details={"reason": signal_data["reason"], "values": signal_data["values"]},
-            executed=False,
+        rows.append(
+            {
+                "symbol": symbol,
+                "timestamp": pd.Timestamp(timestamp).to_pydatetime(),
+                "signal_type": signal_data["signal_type"],
+                "reason": signal_data["reason"],
+                "details": {
+                    "reason": signal_data["reason"],
+                    "values": signal_data["values"],
+                },
+                "executed": False,
+            }
         )
-        db.add(signal)
-        count += 1
+    return rows
+
+
+def save_signals(db: Session, symbol: str, timestamp: datetime, signals: list) -> int:
+    """
+    Save detected signals to the database.
+    Returns the number of new signals; ones already stored are not counted.
+    """
+    if not signals:
+        return 0
+    inserted = crud.bulk_create_signals(db, signal_rows(symbol, timestamp, signals))
     db.commit()
-    return count
+    return inserted
+
+
+def get_indicator_data_batch(
+    db: Session, symbols: list, days: int = 10
+) -> Dict[str, pd.DataFrame]:
+    """
+    Get the last `days` indicator rows for every symbol in one query.
+    """
+    rank = (
+        func.row_number()
+        .over(partition_by=Indicator.symbol, order_by=Indicator.timestamp.desc())
+        .label("rank")
+    )
+    recent = (
+        db.query(Indicator.symbol, Indicator.timestamp, Indicator.values, rank)
+        .filter(Indicator.symbol.in_(symbols))
+        .subquery()
+    )
+    result = (
+        db.query(recent.c.symbol, recent.c.timestamp, recent.c["values"])
+        .filter(recent.c.rank <= days)
+        .all()
+    )
+    rows: Dict[str, list] = {}
+    for symbol, timestamp, values in result:
+        rows.setdefault(symbol, []).append(dict(values or {}, timestamp=timestamp))
+    return {
+        symbol: pd.DataFrame(symbol_rows)
+        .sort_values("timestamp")
+        .set_index("timestamp")
+        for symbol, symbol_rows in rows.items()
+    }
+
+
+def detect_signals_batched(db: Session, symbols: list, days: int = 10) -> List[dict]:
+    """
+    Run signal detection for all symbols with a fixed number of queries.
+
+    One window-function query loads recent indicators for every symbol, one
+    query finds the (symbol, timestamp) pairs that already have signals, and
+    all new signals are written with a single bulk insert.
+    Returns the signal rows written.
+    """
+    indicator_data = get_indicator_data_batch(db, symbols, days)
+    missing = [s for s in symbols if s not in indicator_data]
+    if missing:
+        logger.warning(f"No indicator data available for {len(missing)} symbols")
+    latest = {symbol: df.index[-1] for symbol, df in indicator_data.items()}
+    if not latest:
+        return []
+    signalled = set(
+        (symbol, pd.Timestamp(ts))
+        for symbol, ts in db.query(Signal.symbol, Signal.timestamp).filter(
+            tuple_(Signal.symbol, Signal.timestamp).in_(
+                [(s, pd.Timestamp(ts).to_pydatetime()) for s, ts in latest.items()]
+            )
+        )
+    )
+    rows = []
+    for symbol, df in indicator_data.items():
+        if (symbol, pd.Timestamp(latest[symbol])) in signalled:
+            continue
+        rows.extend(signal_rows(symbol, latest[symbol], _latest_signals(df)))
+    inserted = crud.bulk_create_signals(db, rows)
+    if inserted:
+        db.commit()
+    logger.info(
+        f"Detected {inserted} new signals across {len(indicator_data)} symbols "
+        f"({len(signalled)} already signalled)"
+    )
+    return rows
+
+
+def detect_bar_signals(db: Session, bars: Dict[str, List[datetime]]) -> List[dict]:
+    """
+    Run signal detection on the given bars of each symbol, with a fixed number
+    of queries. Every bar is evaluated against the indicator row before it, so
+    several bars of one symbol arriving together each get their signals.
+    Bars that already have signals are skipped. Returns the signal rows written.
+    """
+    bars = {
+        symbol: sorted({pd.Timestamp(ts) for ts in timestamps})
+        for symbol, timestamps in bars.items()
+        if timestamps
+    }
+    if not bars:
+        return []
+    # The row before each symbol's earliest bar, for crossovers on that bar
+    previous = dict(
+        db.query(Indicator.symbol, func.max(Indicator.timestamp))
+        .filter(
+            or_(
+                *(
+                    and_(
+                        Indicator.symbol == symbol,
+                        Indicator.timestamp < ts[0].to_pydatetime(),
+                    )
+                    for symbol, ts in bars.items()
+                )
+            )
+        )
+        .group_by(Indicator.symbol)
+    )
+    result = db.query(Indicator.symbol, Indicator.timestamp, Indicator.values).filter(
+        or_(
+            *(
+                and_(
+                    Indicator.symbol == symbol,
+                    Indicator.timestamp >= previous.get(symbol, ts[0].to_pydatetime()),
+                    Indicator.timestamp <= ts[-1].to_pydatetime(),
+                )
+                for symbol, ts in bars.items()
+            )
+        )
+    )
+    rows: Dict[str, list] = {}
+    for symbol, timestamp, values in result:
+        rows.setdefault(symbol, []).append(dict(values or {}, timestamp=timestamp))
+    events = []
+    for symbol, symbol_rows in rows.items():
+        df = pd.DataFrame(symbol_rows).sort_values("timestamp").set_index("timestamp")
+        found = detect_signal_events(df, symbol)
+        events.append(found[found["timestamp"].isin(bars[symbol])])
+    events = [e for e in events if not e.empty]
+    if not events:
+        return []
+    events = pd.concat(events, ignore_index=True)
+    signalled = set(
+        (symbol, pd.Timestamp(ts))
+        for symbol, ts in db.query(Signal.symbol, Signal.timestamp).filter(
+            tuple_(Signal.symbol, Signal.timestamp).in_(
+                [
+                    (e.symbol, e.timestamp.to_pydatetime())
+                    for e in events.itertuples(index=False)
+                ]
+            )
+        )
+    )
+    written = []
+    for (symbol, timestamp), group in events.groupby(
+        ["symbol", "timestamp"], sort=False
+    ):
+        if (symbol, timestamp) in signalled:
+            continue
+        signals = [
+            {"signal_type": e.signal_type, "reason": e.reason, "values": e.values}
+            for e in group.itertuples(index=False)
+        ]
+        written.extend(signal_rows(symbol, timestamp, signals))
+    inserted = crud.bulk_create_signals(db, written)
+    if inserted:
+        db.commit()
+    logger.info(
+        f"Detected {inserted} new signals on "
+        f"{sum(len(ts) for ts in bars.values())} bars of {len(bars)} symbols"
+    )
+    return written
 
 
-def detect_signals(db: Session, symbols: list):
+def detect_signals(db: Session, symbols: list, batched: bool = True) -> List[dict]:
     """
     Run signal detection for multiple symbols.
+    Returns the signal rows written.
     """
+    if batched:
+        return detect_signals_batched(db, symbols)
+    written = []
     for symbol in symbols:
         logger.info(f"Detecting signals for {symbol}")
         indicator_data = get_indicator_data(db, symbol)
@@ -165,16 +448,17 @@ def detect_signals(db: Session, symbols: list):
                 f"Signals already exist for {symbol} at {latest_timestamp}, skipping"
             )
             continue
-        all_signals = []
-        all_signals.extend(detect_ma_crossover(indicator_data))
-        all_signals.extend(detect_rsi_signals(indicator_data))
-        if all_signals:
-            count = save_signals(db, symbol, latest_timestamp, all_signals)
+        rows = signal_rows(symbol, latest_timestamp, _latest_signals(indicator_data))
+        if rows:
+            inserted = crud.bulk_create_signals(db, rows)
+            db.commit()
+            written.extend(rows)
             logger.info(
-                f"Detected {count} new signals for {symbol} at {latest_timestamp}"
+                f"Detected {inserted} new signals for {symbol} at {latest_timestamp}"
             )
         else:
             logger.info(f"No signals detected for {symbol} at {latest_timestamp}")
+    return written
 
 
 # Example usage
@@ -12,7 +12,8 @@ from typing import Optional, Tuple
 import pandas as pd
 from sqlalchemy.orm import Session
 
-from . import crud, schemas
+from . import crud
+from .indicators import WARMUP_BARS
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +27,7 @@ RSI_OVERBOUGHT = 70
 RSI_OVERSOLD = 30
 SMA_PERIOD = 20
 EMA_PERIOD = 50
+SIGNAL_REASON = "SMA_20_EMA_50_CROSSOVER"
 
 
 def calculate_indicators(prices: pd.DataFrame) -> pd.DataFrame:
@@ -68,15 +70,30 @@ def check_signal_conditions(
     return False, None
 
 
-def generate_signals(db: Session, symbol: str) -> None:
-    """Generate trading signals for a symbol based on latest market data."""
+def generate_signals(db: Session, symbol: str, backfill: bool = False) -> int:
+    """
+    Generate trading signals for a symbol based on latest market data.
+
+    Only bars after the symbol's watermark (the last bar evaluated by a previous
+    run) are checked, and only WARMUP_BARS bars before it are loaded as
+    indicator history, so each run costs O(new bars) and repeating a run
+    writes nothing. The first run evaluates the last 100 days. With
+    backfill=True the full stored history is re-evaluated; signals that already
+    exist are skipped by the unique (symbol, timestamp, reason) key.
+    Returns the number of new signals stored.
+    """
     try:
-        # Get latest market data
-        start_date = datetime.now() - pd.Timedelta(days=100)
+        watermark = None if backfill else crud.get_signal_watermark(db, symbol)
+        if backfill:
+            start_date = None
+        elif watermark is None:
+            start_date = datetime.now() - pd.Timedelta(days=100)
+        else:
+            start_date = crud.get_warmup_start(db, symbol, watermark, WARMUP_BARS)
         market_data = crud.get_market_data(db=db, symbol=symbol, start_date=start_date)
         if not market_data:
             logger.warning(f"No market data found for {symbol}")
-            return
+            return 0
         # Convert to DataFrame
         df = pd.DataFrame(
             [{"close": data.close, "timestamp": data.timestamp} for data in market_data]
@@ -87,36 +104,47 @@ def generate_signals(db: Session, symbol: str) -> None:
         if indicators.empty:
             msg = f"Not enough data to calculate indicators for {symbol}"
             logger.warning(msg)
-            return
-        # Check for signals
-        for i in range(1, len(indicators)):
+            return 0
+        # Evaluate only bars after the watermark; the bar before is kept as prev_row
+        first = 1
+        if watermark is not None:
+            first = max(first, int(indicators.index.searchsorted(watermark, "right")))
+        signal_rows = []
+        indicator_rows = []
+        for i in range(first, len(indicators)):
             curr_row = indicators.iloc[i]
             prev_row = indicators.iloc[i - 1]
             has_signal, signal_type = check_signal_conditions(curr_row, prev_row)
             if has_signal:
-                # Create signal
-                signal = schemas.SignalBase(
-                    symbol=symbol,
-                    timestamp=curr_row.name,
-                    signal_type=signal_type,
-                    price=curr_row["close"],
-                    rsi=curr_row["rsi"],
-                    sma20=curr_row["sma20"],
-                    ema50=curr_row["ema50"],
+                values = {
+                    "rsi": float(curr_row["rsi"]),
+                    "sma20": float(curr_row["sma20"]),
+                    "ema50": float(curr_row["ema50"]),
+                }
+                signal_rows.append(
+                    dict(
+                        values,
+                        symbol=symbol,
+                        timestamp=curr_row.name,
+                        signal_type=signal_type,
+                        reason=SIGNAL_REASON,
+                        price=float(curr_row["close"]),
+                        details={"reason": SIGNAL_REASON, "values": values},
+                        executed=False,
+                    )
                 )
-                # Save signal to database
-                crud.create_signal(db, signal)
-                # Save indicator values
-                indicator = schemas.IndicatorBase(
-                    symbol=symbol,
-                    timestamp=curr_row.name,
-                    rsi=curr_row["rsi"],
-                    sma20=curr_row["sma20"],
-                    ema50=curr_row["ema50"],
+                indicator_rows.append(
+                    dict(values, symbol=symbol, timestamp=curr_row.name)
                 )
-                crud.create_indicator(db, indicator)
                 msg = f"Generated {signal_type} signal for {symbol}"
                 logger.info(f"{msg} at {curr_row.name}")
+        inserted = crud.bulk_create_signals(db, signal_rows)
+        crud.upsert_indicator_values(db, indicator_rows)
+        if first < len(indicators) or watermark is None:
+            crud.set_signal_watermark(db, symbol, indicators.index[-1])
+        db.commit()
+        return inserted
     except Exception as e:
+        db.rollback()
         logger.error(f"Error generating signals for {symbol}: {e}")
         raise
@@ -0,0 +1,41 @@
+"""
+Strategy plugins.
+
+Importing this package registers the built-in strategies.
+"""
+
+from stockapp.strategies.base import (
+    STRATEGY_REGISTRY,
+    Strategy,
+    get_strategy_class,
+    register_strategy,
+)
+from stockapp.strategies.opening_range import OpeningRangeBreakout
+from stockapp.strategies.runner import (
+    StrategyRunner,
+    load_strategies,
+    run_bars,
+    run_live,
+    store_signals,
+)
+from stockapp.strategies.signal_rules import (
+    DeclarativeRules,
+    MovingAverageCrossover,
+    RsiThreshold,
+)
+
+__all__ = [
+    "STRATEGY_REGISTRY",
+    "DeclarativeRules",
+    "MovingAverageCrossover",
+    "OpeningRangeBreakout",
+    "RsiThreshold",
+    "Strategy",
+    "StrategyRunner",
+    "get_strategy_class",
+    "load_strategies",
+    "register_strategy",
+    "run_bars",
+    "run_live",
+    "store_signals",
+]
@@ -0,0 +1,114 @@
+"""
+Strategy Base Module
+
+This module defines the strategy plugin interface shared by live trading and
+backtests, and the registry that maps strategy names in settings.yaml to classes.
+A strategy implements evaluate(panel), a vectorized pass over a (field, symbol)
+panel; on_bar() streams single bars through the same code.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Type
+
+import pandas as pd
+
+from stockapp.panel import to_panel
+from stockapp.signal_engine import EVENT_COLUMNS
+
+STRATEGY_REGISTRY: Dict[str, Type["Strategy"]] = {}
+
+
+def register_strategy(name: str):
+    """
+    Class decorator that makes a strategy available under name.
+    """
+
+    def decorator(cls: Type["Strategy"]) -> Type["Strategy"]:
+        if name in STRATEGY_REGISTRY and STRATEGY_REGISTRY[name] is not cls:
+            raise ValueError(f"Strategy {name} is already registered")
+        cls.name = name
+        STRATEGY_REGISTRY[name] = cls
+        return cls
+
+    return decorator
+
+
+def get_strategy_class(name: str) -> Type["Strategy"]:
+    if name not in STRATEGY_REGISTRY:
+        raise ValueError(
+            f"Unknown strategy: {name} (available: {sorted(STRATEGY_REGISTRY)})"
+        )
+    return STRATEGY_REGISTRY[name]
+
+
+class Strategy:
+    """
+    Base class for strategy plugins.
+
+    Subclasses set `defaults` (parameter names and default values),
+    `required_fields` (panel fields evaluate() reads) and `lookback` (bars of
+    history on_bar() keeps per symbol), and implement evaluate().
+    """
+
+    name = "strategy"
+    defaults: Dict[str, Any] = {}
+    required_fields: Tuple[str, ...] = ()
+    lookback = 2
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {sorted(unknown)}")
+        self.params = {**self.defaults, **params}
+        self._buffers: Dict[str, Deque[Tuple[pd.Timestamp, dict]]] = {}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.params})"
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        """
+        Evaluate the strategy over a whole panel.
+        Returns one row per event with EVENT_COLUMNS.
+        """
+        raise NotImplementedError
+
+    def supports(self, panel: pd.DataFrame) -> bool:
+        """
+        Whether the panel has every field this strategy reads.
+        """
+        fields = set(panel.columns.get_level_values(0))
+        return all(field in fields for field in self.required_fields)
+
+    def on_bar(self, symbol: str, timestamp: pd.Timestamp, bar: Dict) -> List[dict]:
+        """
+        Feed one bar (price and indicator fields) for a symbol.
+        Returns signal dicts (signal_type, reason, values) for this bar.
+
+        The default keeps the last `lookback` bars per symbol and runs
+        evaluate() over them, so live signals match backtest signals.
+        """
+        buffer = self._buffers.setdefault(symbol, deque(maxlen=self.lookback))
+        buffer.append((pd.Timestamp(timestamp), dict(bar)))
+        frame = pd.DataFrame([row for _, row in buffer], index=[ts for ts, _ in buffer])
+        panel = to_panel({symbol: frame})
+        if not self.supports(panel):
+            return []
+        events = self.evaluate(panel)
+        events = events[events["timestamp"] == buffer[-1][0]]
+        return [
+            {"signal_type": e.signal_type, "reason": e.reason, "values": e.values}
+            for e in events.itertuples(index=False)
+        ]
+
+    def reset(self, symbol: Optional[str] = None) -> None:
+        """
+        Drop streamed history for symbol, or for every symbol.
+        """
+        if symbol is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(symbol, None)
+
+
+def empty_events() -> pd.DataFrame:
+    return pd.DataFrame(columns=EVENT_COLUMNS)
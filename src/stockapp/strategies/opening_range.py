@@ -1,16 +1,345 @@
+"""
+Opening range breakout strategy.
+
+The opening range of every symbol is the high and low of the bars in the
+first opening_range_minutes minutes after the session open, so missing
+minute rows and pre-market bars do not shift it. Breakouts are found with array
+operations over a whole minute-bar panel, for one live session or many
+historical days, or bar by bar with OpeningRangeTracker.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from stockapp.panel import panel_symbols
+from stockapp.signal_engine import EVENT_COLUMNS
+from stockapp.strategies.base import Strategy, empty_events, register_strategy
+from stockapp.strategies.volume_confirmation import volume_ok
+from stockapp.volume_profile import SESSION_MINUTES, SESSION_OPEN, VolumeProfile
+
+BREAKOUT_REASON = "OPENING_RANGE_BREAKOUT"
+
+
 def compute_opening_range(highs, lows, minutes):
     """
     Compute the opening range breakout entry and stop.
     Args:
-        highs: list of high prices for each minute in the opening range
-        lows: list of low prices for each minute in the opening range
+        highs: high prices for each minute, a list for one symbol or a
+            (minutes, symbols) array for many
+        lows: low prices for each minute, same shape as highs
         minutes: number of minutes in the opening range
     Returns:
-        entry (float): breakout entry price
-        stop (float): stop loss price
+        entry (float or array): breakout entry price per symbol
+        stop (float or array): stop loss price per symbol
     """
-    opening_high = max(highs[:minutes])
-    opening_low = min(lows[:minutes])
-    entry = opening_high
-    stop = opening_low
+    highs = np.asarray(highs, dtype=float)[:minutes]
+    lows = np.asarray(lows, dtype=float)[:minutes]
+    # fmax/fmin skip missing bars; a symbol with no bars gets NaN
+    entry = np.fmax.reduce(highs, axis=0)
+    stop = np.fmin.reduce(lows, axis=0)
     return entry, stop
+
+
+def open_minute(session_open: str = SESSION_OPEN) -> int:
+    """
+    Minute of the day of the session open.
+    """
+    open_time = pd.Timestamp(session_open)
+    return open_time.hour * 60 + open_time.minute
+
+
+def session_layout(index: pd.DatetimeIndex, session_open: str = SESSION_OPEN):
+    """
+    Split a sorted minute index into sessions (calendar days).
+    Returns (session labels, session code per bar, first bar of each session,
+    minutes after the session open of each bar, negative before the open).
+    """
+    codes, sessions = pd.factorize(index.normalize())
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    minutes = np.asarray(index.hour * 60 + index.minute) - open_minute(session_open)
+    return pd.DatetimeIndex(sessions), codes, starts, minutes
+
+
+def opening_range_levels(
+    panel: pd.DataFrame,
+    minutes: int,
+    risk_reward_ratio: float,
+    session_open: str = SESSION_OPEN,
+) -> dict:
+    """
+    Opening range levels of every symbol and session at once.
+    Returns {name: session x symbol frame} for high, low, avg_volume, entry,
+    stop and target.
+    """
+    symbols = panel_symbols(panel)
+    sessions, codes, starts, elapsed = session_layout(panel.index, session_open)
+    in_range = ((elapsed >= 0) & (elapsed < minutes))[:, None]
+
+    def field(name):
+        values = panel[name].reindex(columns=symbols).to_numpy(dtype=float)
+        return np.where(in_range, values, np.nan)
+
+    high = np.fmax.reduceat(field("high"), starts, axis=0)
+    low = np.fmin.reduceat(field("low"), starts, axis=0)
+    volume = field("volume")
+    counts = np.add.reduceat(~np.isnan(volume), starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_volume = np.add.reduceat(np.nan_to_num(volume), starts, axis=0) / counts
+    levels = {
+        "high": high,
+        "low": low,
+        "avg_volume": avg_volume,
+        "entry": high,
+        "stop": low,
+        "target": high + risk_reward_ratio * (high - low),
+    }
+    return {
+        name: pd.DataFrame(values, index=sessions, columns=symbols)
+        for name, values in levels.items()
+    }
+
+
+def detect_breakouts(
+    panel: pd.DataFrame,
+    minutes: int,
+    volume_multiplier: float,
+    risk_reward_ratio: float,
+    volume_baseline: Optional[np.ndarray] = None,
+    session_open: str = SESSION_OPEN,
+) -> pd.DataFrame:
+    """
+    Find the first opening range breakout of every symbol in every session.
+
+    A breakout is a bar at least minutes after the session open whose close
+    is above the range high on volume of at least volume_multiplier times the
+    baseline volume.
+    The baseline is the opening range average, or a (time, symbol) array such
+    as VolumeProfile.baseline(panel) when given.
+    Works on one streaming session or on many historical days at once.
+    Returns one row per breakout with EVENT_COLUMNS.
+    """
+    if panel.empty:
+        return empty_events()
+    symbols = panel_symbols(panel)
+    _, codes, starts, elapsed = session_layout(panel.index, session_open)
+    levels = opening_range_levels(panel, minutes, risk_reward_ratio, session_open)
+    entry = levels["entry"].to_numpy()[codes]
+    avg_volume = levels["avg_volume"].to_numpy()[codes]
+    if volume_baseline is not None:
+        avg_volume = volume_baseline
+    close = panel["close"].reindex(columns=symbols).to_numpy(dtype=float)
+    volume = panel["volume"].reindex(columns=symbols).to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        breakout = (
+            (elapsed >= minutes)[:, None]
+            & (close > entry)
+            & volume_ok(volume, avg_volume, volume_multiplier)
+        )
+    # Keep the first breakout per session: the running count within the session is 1
+    running = np.cumsum(breakout, axis=0)
+    padded = np.vstack([np.zeros((1, len(symbols)), dtype=int), running])
+    before_session = padded[starts][codes]
+    first = breakout & (running - before_session == 1)
+    t_idx, s_idx = np.nonzero(first)
+    if not len(t_idx):
+        return empty_events()
+    d_idx = codes[t_idx]
+    stop = levels["stop"].to_numpy()
+    target = levels["target"].to_numpy()
+    return pd.DataFrame(
+        {
+            "timestamp": panel.index[t_idx],
+            "symbol": np.asarray(symbols, dtype=object)[s_idx],
+            "signal_type": "BUY",
+            "reason": BREAKOUT_REASON,
+            "values": [
+                {
+                    "entry": float(entry[t, s]),
+                    "stop": float(stop[d, s]),
+                    "target": float(target[d, s]),
+                    "volume": float(volume[t, s]),
+                }
+                for t, s, d in zip(t_idx, s_idx, d_idx)
+            ],
+        },
+        columns=EVENT_COLUMNS,
+    )
+
+
+class OpeningRangeTracker:
+    """
+    Streaming opening range breakout detection for a set of symbols.
+
+    update() takes one bar per symbol as arrays and keeps O(symbols) state, so
+    a live session costs the same per bar regardless of how far into the day
+    it is. State resets when a bar from a new calendar day arrives.
+    """
+
+    def __init__(
+        self,
+        symbols,
+        minutes: int,
+        volume_multiplier: float,
+        risk_reward_ratio: float,
+        session_open: str = SESSION_OPEN,
+    ):
+        self.symbols = list(symbols)
+        self.minutes = minutes
+        self.open_minute = open_minute(session_open)
+        self.volume_multiplier = volume_multiplier
+        self.risk_reward_ratio = risk_reward_ratio
+        self.session = None
+        self.reset_session()
+
+    def reset_session(self, session=None) -> None:
+        n = len(self.symbols)
+        self.session = session
+        self.high = np.full(n, np.nan)
+        self.low = np.full(n, np.nan)
+        self.volume_sum = np.zeros(n)
+        self.volume_count = np.zeros(n)
+        self.triggered = np.zeros(n, dtype=bool)
+
+    def breakouts(
+        self, timestamp, high, low, close, volume, volume_baseline=None
+    ) -> np.ndarray:
+        """
+        Feed one bar per symbol (arrays ordered like self.symbols) and return
+        the positions of symbols breaking out on this bar. Levels are in
+        self.high (entry), self.low (stop) and target().
+        volume_baseline optionally replaces the opening range average volume,
+        e.g. VolumeProfile.averages(timestamp).
+        """
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.normalize() != self.session:
+            self.reset_session(timestamp.normalize())
+        high, low, close, volume = (
+            np.asarray(values, dtype=float) for values in (high, low, close, volume)
+        )
+        elapsed = timestamp.hour * 60 + timestamp.minute - self.open_minute
+        if elapsed < 0:
+            return np.empty(0, dtype=int)
+        if elapsed < self.minutes:
+            self.high = np.fmax(self.high, high)
+            self.low = np.fmin(self.low, low)
+            self.volume_sum += np.nan_to_num(volume)
+            self.volume_count += ~np.isnan(volume)
+            return np.empty(0, dtype=int)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_volume = self.volume_sum / self.volume_count
+            if volume_baseline is not None:
+                avg_volume = np.asarray(volume_baseline, dtype=float)
+            breakout = (
+                ~self.triggered
+                & (close > self.high)
+                & volume_ok(volume, avg_volume, self.volume_multiplier)
+            )
+        self.triggered |= breakout
+        return np.flatnonzero(breakout)
+
+    def target(self) -> np.ndarray:
+        return self.high + self.risk_reward_ratio * (self.high - self.low)
+
+    def update(
+        self, timestamp, high, low, close, volume, volume_baseline=None
+    ) -> pd.DataFrame:
+        """
+        Feed one bar per symbol like breakouts().
+        Returns breakouts on this bar with EVENT_COLUMNS.
+        """
+        hits = self.breakouts(timestamp, high, low, close, volume, volume_baseline)
+        if not len(hits):
+            return empty_events()
+        volume = np.asarray(volume, dtype=float)
+        target = self.target()
+        return pd.DataFrame(
+            {
+                "timestamp": pd.Timestamp(timestamp),
+                "symbol": [self.symbols[i] for i in hits],
+                "signal_type": "BUY",
+                "reason": BREAKOUT_REASON,
+                "values": [
+                    {
+                        "entry": float(self.high[i]),
+                        "stop": float(self.low[i]),
+                        "target": float(target[i]),
+                        "volume": float(volume[i]),
+                    }
+                    for i in hits
+                ],
+            },
+            columns=EVENT_COLUMNS,
+        )
+
+
+@register_strategy("opening_range")
+class OpeningRangeBreakout(Strategy):
+    """
+    Opening range breakout: buy the first close above the high of the first
+    opening_range_minutes minutes after the session open, on volume of at least
+    volume_multiplier_threshold times the opening range average, or the
+    time-of-day average from a saved volume profile when volume_profile names
+    one. The stop is the opening range low and the target is
+    risk_reward_ratio times the risk.
+    """
+
+    defaults = {
+        "opening_range_minutes": 5,
+        "volume_multiplier_threshold": 1.5,
+        "risk_reward_ratio": 2,
+        "volume_profile": None,
+    }
+    required_fields = ("high", "low", "close", "volume")
+    # One regular session of 1-minute bars, so live panels reach back to the open
+    lookback = SESSION_MINUTES
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        self._trackers = {}
+        self.profile = None
+        if self.params["volume_profile"]:
+            self.profile = VolumeProfile.load(self.params["volume_profile"])
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        return detect_breakouts(
+            panel,
+            int(self.params["opening_range_minutes"]),
+            self.params["volume_multiplier_threshold"],
+            self.params["risk_reward_ratio"],
+            self.profile.baseline(panel) if self.profile else None,
+        )
+
+    def on_bar(self, symbol: str, timestamp: pd.Timestamp, bar: dict) -> list:
+        """
+        Stream one bar through a per-symbol tracker instead of re-evaluating.
+        """
+        tracker = self._trackers.get(symbol)
+        if tracker is None:
+            tracker = OpeningRangeTracker(
+                [symbol],
+                int(self.params["opening_range_minutes"]),
+                self.params["volume_multiplier_threshold"],
+                self.params["risk_reward_ratio"],
+            )
+            self._trackers[symbol] = tracker
+        baseline = [self.profile.average(symbol, timestamp)] if self.profile else None
+        events = tracker.update(
+            timestamp,
+            [bar["high"]],
+            [bar["low"]],
+            [bar["close"]],
+            [bar["volume"]],
+            baseline,
+        )
+        return [
+            {"signal_type": e.signal_type, "reason": e.reason, "values": e.values}
+            for e in events.itertuples(index=False)
+        ]
+
+    def reset(self, symbol=None) -> None:
+        if symbol is None:
+            self._trackers.clear()
+        else:
+            self._trackers.pop(symbol, None)
@@ -0,0 +1,274 @@
+"""
+Strategy Runner Module
+
+This module loads the strategies enabled in settings.yaml and runs them over a
+panel, either the full history for backtests or the latest bars in live mode,
+collecting per-strategy timing so slow strategies can be found.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import yaml
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from stockapp import crud
+from stockapp.db_models import RawPrice, Signal
+from stockapp.indicators import PRICE_COLUMNS
+from stockapp.panel import panel_symbols, to_panel
+from stockapp.signal_engine import (
+    EVENT_COLUMNS,
+    get_indicator_data_batch,
+    signal_rows,
+)
+from stockapp.strategies.base import Strategy, get_strategy_class
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS_FILE = "config/settings.yaml"
+
+
+def load_strategies(
+    config: Optional[Dict] = None, path: str = DEFAULT_SETTINGS_FILE
+) -> List[Strategy]:
+    """
+    Instantiate the strategies enabled in the `strategies` section of the settings.
+
+    Each entry maps a registered strategy name to its parameters plus an
+    optional `enabled` flag. Parameters missing from an entry fall back to the
+    shared `strategy` section, then to the strategy's defaults.
+    """
+    if config is None:
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+    shared = config.get("strategy") or {}
+    strategies = []
+    for name, options in (config.get("strategies") or {}).items():
+        options = dict(options or {})
+        if not options.pop("enabled", True):
+            continue
+        cls = get_strategy_class(name)
+        params = {key: value for key, value in shared.items() if key in cls.defaults}
+        params.update(options)
+        strategies.append(cls(**params))
+    logger.info(f"Loaded strategies: {[s.name for s in strategies]}")
+    return strategies
+
+
+class StrategyRunner:
+    """
+    Runs a set of strategies over panels or streamed bars.
+    """
+
+    def __init__(self, strategies: List[Strategy]):
+        names = [strategy.name for strategy in strategies]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate strategies: {names}")
+        self.strategies = strategies
+        self.timings: Dict[str, Dict[str, float]] = {
+            name: {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            for name in names
+        }
+
+    @classmethod
+    def from_settings(cls, path: str = DEFAULT_SETTINGS_FILE) -> "StrategyRunner":
+        return cls(load_strategies(path=path))
+
+    def _record(self, name: str, seconds: float) -> None:
+        timing = self.timings[name]
+        timing["calls"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run every strategy over the panel.
+        Returns the events of all strategies with a `strategy` column.
+        """
+        frames = []
+        for strategy in self.strategies:
+            if not strategy.supports(panel):
+                logger.warning(
+                    f"Skipping {strategy.name}: panel lacks {strategy.required_fields}"
+                )
+                continue
+            start = time.perf_counter()
+            events = strategy.evaluate(panel)
+            self._record(strategy.name, time.perf_counter() - start)
+            if not events.empty:
+                frames.append(events.assign(strategy=strategy.name))
+        if not frames:
+            return pd.DataFrame(columns=EVENT_COLUMNS + ["strategy"])
+        events = pd.concat(frames, ignore_index=True)
+        events = events.sort_values(["timestamp", "symbol"], kind="stable")
+        return events.reset_index(drop=True)
+
+    def at(self, panel: pd.DataFrame, bars: Dict[str, Iterable]) -> pd.DataFrame:
+        """
+        Run every strategy and keep only events on the given bars of each symbol.
+        """
+        events = self.evaluate(panel)
+        if events.empty:
+            return events
+        wanted = {
+            (symbol, pd.Timestamp(ts))
+            for symbol, timestamps in bars.items()
+            for ts in timestamps
+        }
+        keep = [key in wanted for key in zip(events["symbol"], events["timestamp"])]
+        return events[keep].reset_index(drop=True)
+
+    def latest(self, panel: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run every strategy and keep only events on each symbol's last bar.
+        """
+        return self.at(
+            panel,
+            {
+                symbol: [
+                    panel.xs(symbol, axis=1, level=1).dropna(how="all").index.max()
+                ]
+                for symbol in panel_symbols(panel)
+            },
+        )
+
+    def on_bar(self, symbol: str, timestamp: pd.Timestamp, bar: Dict) -> List[dict]:
+        """
+        Stream one bar to every strategy.
+        Returns signal dicts, each tagged with the strategy that produced it.
+        """
+        signals = []
+        for strategy in self.strategies:
+            start = time.perf_counter()
+            found = strategy.on_bar(symbol, timestamp, bar)
+            self._record(strategy.name, time.perf_counter() - start)
+            signals.extend(dict(signal, strategy=strategy.name) for signal in found)
+        return signals
+
+    def reset(self) -> None:
+        for strategy in self.strategies:
+            strategy.reset()
+
+    def timing_report(self) -> List[Dict]:
+        """
+        Per-strategy timing, slowest total first.
+        """
+        report = [
+            {
+                "strategy": name,
+                "calls": int(t["calls"]),
+                "total_ms": t["total_seconds"] * 1000,
+                "mean_ms": t["total_seconds"] * 1000 / t["calls"] if t["calls"] else 0,
+                "max_ms": t["max_seconds"] * 1000,
+            }
+            for name, t in self.timings.items()
+        ]
+        return sorted(report, key=lambda row: row["total_ms"], reverse=True)
+
+
+def load_recent_panel(db: Session, symbols: List[str], bars: int = 400) -> pd.DataFrame:
+    """
+    Load the last `bars` prices and indicator values of every symbol as one panel.
+    """
+    rank = (
+        func.row_number()
+        .over(partition_by=RawPrice.symbol, order_by=RawPrice.timestamp.desc())
+        .label("rank")
+    )
+    recent = db.query(RawPrice, rank).filter(RawPrice.symbol.in_(symbols)).subquery()
+    rows = (
+        db.query(
+            recent.c.symbol, recent.c.timestamp, *[recent.c[c] for c in PRICE_COLUMNS]
+        )
+        .filter(recent.c.rank <= bars)
+        .all()
+    )
+    prices = pd.DataFrame(rows, columns=["symbol", "timestamp", *PRICE_COLUMNS])
+    indicators = get_indicator_data_batch(db, symbols, bars)
+    frames = {}
+    for symbol, price_df in prices.groupby("symbol"):
+        frame = price_df.drop(columns="symbol").set_index("timestamp").sort_index()
+        if symbol in indicators:
+            frame = frame.join(
+                indicators[symbol].drop(columns="symbol", errors="ignore")
+            )
+        frames[symbol] = frame
+    return to_panel(frames)
+
+
+def store_signals(db: Session, events: pd.DataFrame) -> List[dict]:
+    """
+    Store strategy events as signals, skipping any (symbol, timestamp, reason)
+    already stored. Returns the signal rows written.
+    """
+    rows = []
+    for (symbol, timestamp), group in events.groupby(
+        ["symbol", "timestamp"], sort=False
+    ):
+        signals = group[["signal_type", "reason", "values"]].to_dict("records")
+        rows.extend(signal_rows(symbol, timestamp, signals))
+    if not rows:
+        return []
+    stored = set(
+        db.query(Signal.symbol, Signal.timestamp, Signal.reason).filter(
+            tuple_(Signal.symbol, Signal.timestamp, Signal.reason).in_(
+                [(r["symbol"], r["timestamp"], r["reason"]) for r in rows]
+            )
+        )
+    )
+    rows = [r for r in rows if (r["symbol"], r["timestamp"], r["reason"]) not in stored]
+    if crud.bulk_create_signals(db, rows):
+        db.commit()
+    return rows
+
+
+def run_live(db: Session, symbols: List[str], runner: StrategyRunner) -> List[dict]:
+    """
+    Run every strategy on the latest bars and store signals for the last bar.
+    Returns the signal rows written.
+    """
+    if not runner.strategies:
+        logger.warning("No strategies enabled, nothing to run")
+        return []
+    panel = load_recent_panel(db, symbols, max(s.lookback for s in runner.strategies))
+    if panel.empty:
+        return []
+    rows = store_signals(db, runner.latest(panel))
+    logger.info(
+        f"Strategies produced {len(rows)} new signals for {len(symbols)} symbols"
+    )
+    return rows
+
+
+def run_bars(
+    db: Session, bars: Dict[str, List[datetime]], runner: StrategyRunner
+) -> List[dict]:
+    """
+    Run every strategy on newly stored bars of each symbol and store their
+    signals. Each bar is evaluated with the lookback bars before it, so several
+    bars of one symbol arriving together each get their signals.
+    Returns the signal rows written.
+    """
+    bars = {symbol: timestamps for symbol, timestamps in bars.items() if timestamps}
+    if not bars or not runner.strategies:
+        return []
+    # The received bars are the newest stored, so the last lookback + n bars hold them
+    lookback = max(s.lookback for s in runner.strategies)
+    window = lookback + max(len(set(timestamps)) for timestamps in bars.values())
+    panel = load_recent_panel(db, list(bars), window)
+    if panel.empty:
+        return []
+    rows = store_signals(db, runner.at(panel, bars))
+    logger.info(
+        f"Strategies produced {len(rows)} new signals on "
+        f"{sum(len(ts) for ts in bars.values())} bars of {len(bars)} symbols"
+    )
+    return rows
@@ -0,0 +1,75 @@
+"""
+Signal rule strategies: the signal engine's moving average crossover and RSI
+threshold rules, and the declarative rules from config/rules.yaml, as plugins.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from stockapp.panel import panel_symbols
+from stockapp.rules import DEFAULT_RULES_FILE, load_rules
+from stockapp.signal_engine import (
+    MA_RULES,
+    RSI_OVERBOUGHT,
+    RSI_OVERSOLD,
+    RSI_RULES,
+    crossover_masks,
+    events_from_masks,
+    threshold_masks,
+)
+from stockapp.strategies.base import Strategy, register_strategy
+
+
+def _panel_columns(panel: pd.DataFrame, fields: List[str]) -> Dict[str, np.ndarray]:
+    symbols = panel_symbols(panel)
+    return {
+        field: panel[field].reindex(columns=symbols).to_numpy(dtype=float)
+        for field in fields
+    }
+
+
+@register_strategy("ma_crossover")
+class MovingAverageCrossover(Strategy):
+    """SMA 20 crossing the EMA 50."""
+
+    required_fields = ("sma_20", "ema_50")
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        columns = _panel_columns(panel, ["sma_20", "ema_50"])
+        masks = crossover_masks(columns["sma_20"], columns["ema_50"])
+        rule_masks = [rule + (mask,) for rule, mask in zip(MA_RULES, masks)]
+        return events_from_masks(panel.index, panel_symbols(panel), columns, rule_masks)
+
+
+@register_strategy("rsi_threshold")
+class RsiThreshold(Strategy):
+    """RSI 14 below the oversold or above the overbought level."""
+
+    defaults = {"oversold": RSI_OVERSOLD, "overbought": RSI_OVERBOUGHT}
+    required_fields = ("rsi_14",)
+    lookback = 1
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        columns = _panel_columns(panel, ["rsi_14"])
+        masks = threshold_masks(
+            columns["rsi_14"], self.params["oversold"], self.params["overbought"]
+        )
+        rule_masks = [rule + (mask,) for rule, mask in zip(RSI_RULES, masks)]
+        return events_from_masks(panel.index, panel_symbols(panel), columns, rule_masks)
+
+
+@register_strategy("rules")
+class DeclarativeRules(Strategy):
+    """Every rule in a rules file, evaluated as one compiled rule set."""
+
+    defaults = {"path": DEFAULT_RULES_FILE, "lookback": 50}
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        self.rules = load_rules(self.params["path"])
+        self.lookback = int(self.params["lookback"])
+
+    def evaluate(self, panel: pd.DataFrame) -> pd.DataFrame:
+        return self.rules.evaluate(panel)
@@ -2,8 +2,9 @@ def volume_ok(volume, avg_volume, multiplier):
     """
     Check if the current volume meets the threshold.
     Args:
-        volume: current volume
-        avg_volume: average volume
+        volume: current volume (scalar or array)
+        avg_volume: average volume, e.g. the time-of-day average from
+            stockapp.volume_profile.VolumeProfile
         multiplier: threshold multiplier
     Returns:
         bool: True if volume is sufficient
@@ -0,0 +1,492 @@
+"""
+Streaming Backtest Module
+
+This module backtests histories too large to load at once. Bars are read as
+time-ordered (field, symbol) panel chunks, from the database with keyset
+pagination or from any other iterator of panels, and every piece of state
+the in-memory backtest would see is carried across chunk boundaries: each
+symbol's sleeve (position, entry, compounded equity), the last close for
+forward-filling, the bars strategies look back over and, when indicators are
+calculated from raw bars, each symbol's indicator warmup. Results are the
+same as Backtest.run over the whole history, while memory depends on the
+chunk size, not the history length. Peak traced memory is reported with the
+result.
+"""
+
+import logging
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from stockapp.backtest import (
+    TRADE_COLUMNS,
+    Backtest,
+    BacktestResult,
+    _ffill,
+    log_metrics,
+    signal_masks,
+)
+from stockapp.db_models import Indicator, RawPrice
+from stockapp.indicators import PRICE_COLUMNS, WARMUP_BARS, calculate_indicators
+from stockapp.panel import from_panel, panel_symbols, to_panel
+from stockapp.strategies import StrategyRunner
+from stockapp.strategies.opening_range import session_layout
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Timestamps per chunk; chunks are extended to the end of their last session
+DEFAULT_CHUNK_BARS = 5000
+
+
+@dataclass
+class StreamingBacktestResult(BacktestResult):
+    """A BacktestResult with the chunks streamed and any peak traced memory."""
+
+    chunks: int = 0
+    peak_memory: int = 0
+    seconds: float = 0.0
+
+
+def iter_panel_chunks(
+    panel: pd.DataFrame, chunk_bars: int = DEFAULT_CHUNK_BARS
+) -> Iterator[pd.DataFrame]:
+    """
+    Slice a panel into time-ordered chunks of at least chunk_bars bars,
+    cut only where a session (calendar day) starts.
+    """
+    if chunk_bars < 1:
+        raise ValueError("chunk_bars must be at least 1")
+    _, _, starts, _ = session_layout(panel.index)
+    position = 0
+    while position < len(panel):
+        cut = np.searchsorted(starts, position + chunk_bars)
+        stop = starts[cut] if cut < len(starts) else len(panel)
+        yield panel.iloc[position:stop]
+        position = stop
+
+
+def _session_boundary(query, chunk_bars: int) -> Optional[pd.Timestamp]:
+    """
+    First timestamp of the session after the one holding bar chunk_bars of
+    query's distinct timestamps, or None when the query ends before it.
+    """
+    rows = [ts for (ts,) in query.offset(chunk_bars - 1).limit(2)]
+    if len(rows) < 2:
+        return None
+    last, following = (pd.Timestamp(ts) for ts in rows)
+    if following.normalize() > last.normalize():
+        return following
+    return following.normalize() + pd.Timedelta(days=1)
+
+
+def _chunk_panel(
+    db: Session, symbols: List[str], lower, upper, inclusive_upper: bool
+) -> pd.DataFrame:
+    """
+    Prices joined with stored indicators for symbols in [lower, upper), or
+    [lower, upper] when inclusive_upper, like load_backtest_panel.
+    """
+
+    def window(column):
+        below = column <= upper if inclusive_upper else column < upper
+        return (column >= lower, below)
+
+    prices = pd.DataFrame.from_records(
+        db.query(
+            RawPrice.symbol,
+            RawPrice.timestamp,
+            RawPrice.open,
+            RawPrice.high,
+            RawPrice.low,
+            RawPrice.close,
+            RawPrice.volume,
+        )
+        .filter(RawPrice.symbol.in_(symbols), *window(RawPrice.timestamp))
+        .all(),
+        columns=["symbol", "timestamp"] + PRICE_COLUMNS,
+    )
+    indicators = pd.DataFrame(
+        [
+            dict(values or {}, symbol=symbol, timestamp=timestamp)
+            for symbol, timestamp, values in db.query(
+                Indicator.symbol, Indicator.timestamp, Indicator.values
+            ).filter(Indicator.symbol.in_(symbols), *window(Indicator.timestamp))
+        ]
+    )
+    by_symbol = (
+        dict(tuple(indicators.groupby("symbol", sort=False)))
+        if not indicators.empty
+        else {}
+    )
+    frames = {}
+    for symbol, price_df in prices.groupby("symbol", sort=False):
+        price_df = price_df.drop(columns="symbol").sort_values("timestamp")
+        price_df = price_df.set_index("timestamp")
+        ind_df = by_symbol.get(symbol)
+        if ind_df is not None:
+            ind_df = ind_df.drop(columns="symbol").sort_values("timestamp")
+            price_df = price_df.join(ind_df.set_index("timestamp"))
+        frames[symbol] = price_df
+    return to_panel({s: frames[s] for s in symbols if s in frames})
+
+
+def stream_universe(db: Session, symbols: List[str], start_date, end_date) -> List[str]:
+    """
+    The symbols, in the given order, that have price data in the range.
+    """
+    present = {
+        symbol
+        for (symbol,) in db.query(RawPrice.symbol)
+        .filter(
+            RawPrice.symbol.in_(symbols),
+            RawPrice.timestamp >= start_date,
+            RawPrice.timestamp <= end_date,
+        )
+        .distinct()
+    }
+    return [symbol for symbol in symbols if symbol in present]
+
+
+def iter_db_chunks(
+    db: Session,
+    symbols: List[str],
+    start_date,
+    end_date,
+    chunk_bars: int = DEFAULT_CHUNK_BARS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield prices with stored indicators for symbols between start_date and
+    end_date as time-ordered panel chunks of at least chunk_bars timestamps,
+    cut at session starts. Uses keyset pagination on timestamp.
+    """
+    if chunk_bars < 1:
+        raise ValueError("chunk_bars must be at least 1")
+    lower = pd.Timestamp(start_date).to_pydatetime()
+    while True:
+        timestamps = (
+            db.query(RawPrice.timestamp)
+            .filter(
+                RawPrice.symbol.in_(symbols),
+                RawPrice.timestamp >= lower,
+                RawPrice.timestamp <= end_date,
+            )
+            .distinct()
+            .order_by(RawPrice.timestamp)
+        )
+        boundary = _session_boundary(timestamps, chunk_bars)
+        if boundary is None:
+            panel = _chunk_panel(db, symbols, lower, end_date, inclusive_upper=True)
+            if not panel.empty:
+                yield panel
+            return
+        boundary = boundary.to_pydatetime()
+        yield _chunk_panel(db, symbols, lower, boundary, inclusive_upper=False)
+        lower = boundary
+
+
+def iter_indicator_panels(
+    chunks: Iterable[pd.DataFrame], warmup: int = WARMUP_BARS
+) -> Iterator[pd.DataFrame]:
+    """
+    Calculate indicators over a stream of raw price panels, carrying each
+    symbol's last warmup bars into the next chunk like iter_indicator_chunks,
+    so values match a full-history calculation to floating-point noise.
+    """
+    carry: Dict[str, pd.DataFrame] = {}
+    for panel in chunks:
+        frames = {}
+        for symbol in panel_symbols(panel):
+            bars = from_panel(panel, symbol)
+            bars = bars[[c for c in PRICE_COLUMNS if c in bars.columns]]
+            bars = bars.dropna(subset=["close"])
+            previous = carry.get(symbol)
+            frame = bars if previous is None else pd.concat([previous, bars])
+            skip = 0 if previous is None else len(previous)
+            if warmup and len(frame):
+                carry[symbol] = frame.iloc[-warmup:]
+            frames[symbol] = calculate_indicators(frame.copy()).iloc[skip:]
+        yield to_panel(frames).reindex(panel.index)
+
+
+def _with_last(chunks: Iterable[pd.DataFrame]) -> Iterator[Tuple[pd.DataFrame, bool]]:
+    """
+    Yield non-empty chunks with a flag marking the final one.
+    """
+    pending = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if pending is not None:
+            yield pending, False
+        pending = chunk
+    if pending is not None:
+        yield pending, True
+
+
+class StreamingBacktest:
+    """
+    Backtest.run over a stream of panel chunks, with signals from a
+    StrategyRunner evaluated chunk by chunk.
+
+    Each symbol's sleeve state, its last close, and the last bars of the
+    panel that strategies look back over are carried from one chunk to the
+    next, and positions open on the final bar are closed there, so equity,
+    trades and positions match the in-memory backtest of the whole history.
+    Only the equity curve and closed trades grow with the history; the
+    time x symbol position grid is kept only when keep_positions is True,
+    otherwise positions holds the number of open positions per bar.
+    trace_memory records the run's peak memory with tracemalloc, which slows
+    the run down.
+    """
+
+    def __init__(
+        self,
+        backtest: Optional[Backtest] = None,
+        runner: Optional[StrategyRunner] = None,
+        keep_positions: bool = False,
+        trace_memory: bool = False,
+    ):
+        self.backtest = backtest or Backtest()
+        self.runner = runner or StrategyRunner.from_settings()
+        self.keep_positions = keep_positions
+        self.trace_memory = trace_memory
+
+    def run(
+        self, chunks: Iterable[pd.DataFrame], symbols: Optional[List[str]] = None
+    ) -> StreamingBacktestResult:
+        """
+        Simulate the portfolio over time-ordered panel chunks. symbols fixes
+        the traded universe; it defaults to the first chunk's symbols.
+        """
+        started = time.perf_counter()
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.trace_memory and hasattr(tracemalloc, "reset_peak"):
+            # Python 3.9+; before that a trace already running keeps its peak
+            tracemalloc.reset_peak()
+        try:
+            result = self._run(chunks, symbols)
+            if self.trace_memory:
+                result.peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            if tracing:
+                tracemalloc.stop()
+        result.seconds = time.perf_counter() - started
+        memory = ""
+        if self.trace_memory:
+            memory = f", peak memory {result.peak_memory / 2**20:.1f} MiB"
+        logger.info(
+            f"Streamed {len(result.portfolio_value)} bars in {result.chunks} chunks "
+            f"in {result.seconds:.1f}s{memory}"
+        )
+        return result
+
+    def _run(self, chunks, symbols) -> StreamingBacktestResult:
+        bt = self.backtest
+        f, c = bt.position_size, bt.commission
+        # Entry sizing as in Backtest.run: f of equity buys shares and commission
+        notional = f / (1 + c)
+        lookback = max([s.lookback for s in self.runner.strategies], default=1)
+        tail = None
+        n = None
+        indexes, values, grids, trades = [], [], [], []
+        offset = 0
+        for chunk, last in _with_last(chunks):
+            panel, chunk_symbols = Backtest.prepare(chunk)
+            if n is None:
+                symbols = list(symbols or chunk_symbols)
+                n = len(symbols)
+                sleeve = bt.initial_cash / n
+                # Sleeve state carried between chunks
+                position = np.zeros(n)
+                last_close = np.full(n, np.nan)
+                after = np.ones(n)
+                entry_price = np.ones(n)
+                equity_entry = np.zeros(n)
+                entry_bar = np.zeros(n, dtype=int)
+            elif panel.index[0] <= indexes[-1][-1]:
+                raise ValueError("Chunks must be in strictly increasing time order")
+            index = panel.index
+            m = len(index)
+
+            # Strategy signals, with the bars the strategies look back over
+            frame = panel if tail is None else pd.concat([tail, panel])
+            events = self.runner.evaluate(frame)
+            events = events[events["timestamp"] >= index[0]]
+            tail = frame.iloc[-lookback:]
+            entries, exits = signal_masks(events, index, symbols)
+            entries, exits = entries.to_numpy(), exits.to_numpy()
+
+            raw_close = panel["close"].reindex(columns=symbols).to_numpy(dtype=float)
+            close = _ffill(np.vstack([last_close, raw_close]))[1:]
+            traded = ~np.isnan(raw_close)
+            entries = entries & traded
+            exits = exits & traded
+
+            # Position state as in Backtest.run, seeded with the carried state
+            state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+            state = _ffill(np.vstack([position, state]))[1:].copy()
+            if last:
+                state[-1] = 0
+            previous = np.vstack([position, state[:-1]])
+            start_s, start_t = np.nonzero(((state == 1) & (previous == 0)).T)
+            end_s, end_t = np.nonzero(((state == 0) & (previous == 1)).T)
+
+            # Trades touching the chunk in (symbol, time) order: positions
+            # carried in from the previous chunk (bar -1) first
+            held = np.flatnonzero(position == 1)
+            trade_s = np.concatenate([held, start_s])
+            trade_t = np.concatenate([np.full(len(held), -1), start_t])
+            order = np.lexsort((trade_t, trade_s))
+            trade_s, trade_t = trade_s[order], trade_t[order]
+            carried = trade_t < 0
+            trade_price = np.where(
+                carried, entry_price[trade_s], close[np.maximum(trade_t, 0), trade_s]
+            )
+            # Each symbol's trades alternate with its exits, so the k-th
+            # trade of a symbol closes at its k-th exit if there is one
+            rank = np.arange(len(trade_s)) - np.searchsorted(trade_s, trade_s)
+            closed = rank < np.bincount(end_s, minlength=n)[trade_s]
+            exit_at = np.searchsorted(end_s, trade_s[closed]) + rank[closed]
+            exit_t = end_t[exit_at]
+            exit_price = close[exit_t, end_s[exit_at]]
+            growth = 1 - f + notional * (exit_price / trade_price[closed]) * (1 - c)
+
+            # Compound closed trades onto each symbol's carried growth
+            flat_equity = sleeve * after
+            closed_s = trade_s[closed]
+            seeds = np.unique(closed_s)
+            compounded = pd.Series(np.concatenate([after[seeds], growth]))
+            groups = np.concatenate([seeds, closed_s])
+            cumulative = compounded.groupby(groups).cumprod()
+            before_closed = cumulative.groupby(groups).shift(fill_value=1.0)
+            after_closed = cumulative.to_numpy()[len(seeds) :]
+            before_closed = before_closed.to_numpy()[len(seeds) :]
+            final = np.diff(closed_s, append=-1) != 0
+            after[closed_s[final]] = after_closed[final]
+
+            before = after[trade_s].copy()
+            before[closed] = before_closed
+            trade_entry = np.where(carried, equity_entry[trade_s], sleeve * before)
+            trade_after = np.full(len(trade_s), np.nan)
+            trade_after[closed] = sleeve * after_closed
+
+            # Equity from the trade in force, as in Backtest.run; symbols
+            # without one carry their compounded flat equity in extra slots
+            ids = np.full((m + 1, n), np.nan)
+            ids[0] = len(trade_s) + np.arange(n)
+            ids[0, trade_s[carried]] = np.flatnonzero(carried)
+            new = ~carried
+            ids[trade_t[new] + 1, trade_s[new]] = np.flatnonzero(new)
+            k = _ffill(ids)[1:].astype(int)
+            slot_entry = np.concatenate([trade_entry, np.zeros(n)])
+            slot_price = np.concatenate([trade_price, np.ones(n)])
+            slot_after = np.concatenate([trade_after, flat_equity])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                holding = slot_entry[k] * (1 - f + notional * close / slot_price[k])
+            equity = np.where(state == 1, holding, slot_after[k])
+
+            entry_bars = np.where(carried, entry_bar[trade_s], offset + trade_t)
+            trades.append(
+                (
+                    closed_s,
+                    entry_bars[closed],
+                    offset + exit_t,
+                    trade_price[closed],
+                    exit_price,
+                    notional * trade_entry[closed] / trade_price[closed],
+                    trade_after[closed] - trade_entry[closed],
+                    growth - 1,
+                )
+            )
+            still_open = ~closed
+            entry_price[trade_s[still_open]] = trade_price[still_open]
+            equity_entry[trade_s[still_open]] = trade_entry[still_open]
+            entry_bar[trade_s[still_open]] = entry_bars[still_open]
+            position = state[-1].copy()
+            last_close = close[-1].copy()
+
+            indexes.append(index)
+            values.append(equity.sum(axis=1))
+            grids.append(state if self.keep_positions else (state == 1).sum(axis=1))
+            offset += m
+        if n is None:
+            raise ValueError("No price data to backtest")
+        return self._result(symbols, indexes, values, grids, trades, f)
+
+    def _result(self, symbols, indexes, values, grids, trades, f):
+        bt = self.backtest
+        index = indexes[0].append(indexes[1:]) if len(indexes) > 1 else indexes[0]
+        portfolio_value = pd.Series(np.concatenate(values), index=index, name="equity")
+        returns = portfolio_value.pct_change().rename("returns")
+        returns.iloc[0] = portfolio_value.iloc[0] / bt.initial_cash - 1
+        s, entry_t, exit_t, entry_px, exit_px, shares, pnl, ret = (
+            np.concatenate(column) for column in zip(*trades)
+        )
+        trades = pd.DataFrame(
+            {
+                "symbol": np.asarray(symbols, dtype=object)[s],
+                "entry_time": index[entry_t.astype(int)],
+                "exit_time": index[exit_t.astype(int)],
+                "entry_price": entry_px,
+                "exit_price": exit_px,
+                "shares": shares,
+                "position_size": f,
+                "pnl": pnl,
+                "return": ret,
+            },
+            columns=TRADE_COLUMNS,
+        )
+        trades = trades.sort_values(["entry_time", "symbol"], kind="stable")
+        if self.keep_positions:
+            positions = pd.DataFrame(np.vstack(grids), index=index, columns=symbols)
+        else:
+            positions = pd.DataFrame(
+                {"open_positions": np.concatenate(grids)}, index=index
+            )
+        return StreamingBacktestResult(
+            portfolio_value,
+            returns,
+            trades.reset_index(drop=True),
+            positions,
+            bt.initial_cash,
+            bt.periods_per_year,
+            chunks=len(indexes),
+        )
+
+
+def run_streaming_backtest(
+    db: Session,
+    symbols: List[str],
+    start_date,
+    end_date,
+    runner: Optional[StrategyRunner] = None,
+    backtest: Optional[Backtest] = None,
+    chunk_bars: int = DEFAULT_CHUNK_BARS,
+    trace_memory: bool = False,
+) -> Optional[StreamingBacktestResult]:
+    """
+    run_portfolio_backtest without loading the whole range: bars and stored
+    indicators are streamed from the database in chunks of chunk_bars
+    timestamps, tracing peak memory when trace_memory is set. Returns a
+    StreamingBacktestResult, or None without price data.
+    """
+    universe = stream_universe(db, symbols, start_date, end_date)
+    if not universe:
+        return None
+    engine = StreamingBacktest(backtest, runner, trace_memory=trace_memory)
+    result = engine.run(
+        iter_db_chunks(db, universe, start_date, end_date, chunk_bars), universe
+    )
+    log_metrics("Portfolio", result)
+    return result
@@ -0,0 +1,460 @@
+"""
+Parameter Sweep Module
+
+This module evaluates a strategy over a grid of parameter combinations in a
+process pool. Prices are loaded once into shared memory and every worker maps
+the same block, so no price data is copied per worker or per combination.
+Results stream into a CSV results table as combinations finish, and an
+optional screening pass over the start of the history prunes poor regions of
+the grid before the full evaluation.
+"""
+
+import csv
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from stockapp.backtest import Backtest, BacktestResult
+from stockapp.panel import panel_symbols
+from stockapp.signal_engine import crossover_masks
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SWEEP_FIELDS = ("close",)
+DEFAULT_METRIC = "sharpe_ratio"
+PARAM_DEFAULTS = {
+    "sma_period": 20,
+    "ema_period": 50,
+    "rsi_period": 14,
+    "rsi_oversold": 30,
+    "rsi_overbought": 70,
+}
+
+# evaluate(prices, index, symbols, params, start, stop) -> metrics. prices and
+# index cover the whole history; only bars [start, stop) are traded, so
+# indicators can be computed once over the history and shared by every window.
+Evaluator = Callable[
+    [
+        Dict[str, np.ndarray],
+        pd.DatetimeIndex,
+        List[str],
+        Dict[str, Any],
+        int,
+        Optional[int],
+    ],
+    Dict[str, float],
+]
+
+
+@dataclass(frozen=True)
+class SharedPanelSpec:
+    """Everything a worker needs to map a shared price block."""
+
+    name: str
+    fields: Tuple[str, ...]
+    shape: Tuple[int, int, int]
+    index: np.ndarray
+    symbols: Tuple[str, ...]
+
+
+class SharedPanel:
+    """
+    Price fields of a panel in one shared memory block of shape
+    (fields, time, symbols). The creating process owns the block and must
+    unlink it; workers attach read-only views with attach().
+    """
+
+    def __init__(self, spec: SharedPanelSpec, memory: shared_memory.SharedMemory):
+        self.spec = spec
+        self.memory = memory
+        self.array = np.ndarray(spec.shape, dtype=np.float64, buffer=memory.buf)
+
+    @classmethod
+    def create(
+        cls, panel: pd.DataFrame, fields: Iterable[str] = SWEEP_FIELDS
+    ) -> "SharedPanel":
+        fields = tuple(fields)
+        symbols = tuple(panel_symbols(panel))
+        shape = (len(fields), len(panel.index), len(symbols))
+        memory = shared_memory.SharedMemory(
+            create=True, size=max(int(np.prod(shape)) * 8, 1)
+        )
+        spec = SharedPanelSpec(
+            memory.name, fields, shape, panel.index.to_numpy(), symbols
+        )
+        shared = cls(spec, memory)
+        for i, name in enumerate(fields):
+            shared.array[i] = (
+                panel[name].reindex(columns=list(symbols)).to_numpy(dtype=float)
+            )
+        return shared
+
+    @classmethod
+    def attach(cls, spec: SharedPanelSpec) -> "SharedPanel":
+        shared = cls(spec, shared_memory.SharedMemory(name=spec.name))
+        shared.array.flags.writeable = False
+        return shared
+
+    def fields(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, Any]:
+        """
+        {field: (time, symbol) view} over bars [start, stop), without copying.
+        """
+        return {
+            name: self.array[i, start:stop] for i, name in enumerate(self.spec.fields)
+        }
+
+    def close(self) -> None:
+        self.array = None
+        self.memory.close()
+
+    def unlink(self) -> None:
+        self.close()
+        self.memory.unlink()
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.unlink()
+
+
+def expand_grid(
+    grid: Dict[str, Iterable[Any]],
+    constraint: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Every combination of the grid's values, skipping those failing constraint.
+    """
+    names = list(grid)
+    combos = [
+        dict(zip(names, values))
+        for values in itertools.product(*(list(grid[n]) for n in names))
+    ]
+    if constraint is not None:
+        combos = [combo for combo in combos if constraint(combo)]
+    return combos
+
+
+def sweep_indicator(close: np.ndarray, kind: str, period: int) -> np.ndarray:
+    """
+    SMA, EMA or RSI of a (time, symbol) close array, computed like
+    signal_generator.calculate_indicators.
+    """
+    frame = pd.DataFrame(close)
+    if kind == "sma":
+        return frame.rolling(window=period).mean().to_numpy()
+    if kind == "ema":
+        return frame.ewm(span=period, adjust=False).mean().to_numpy()
+    if kind == "rsi":
+        delta = frame.diff()
+        gain = delta.where(delta > 0, 0).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        return (100 - (100 / (1 + gain / loss))).to_numpy()
+    raise ValueError(f"Unknown indicator {kind!r}")
+
+
+# Indicators computed by this process over views of one mapped SharedPanel
+# block, reused by combinations sharing a period. Caching is only on while a
+# sweep or walk-forward holds the block (see scope_indicator_cache), so buffer
+# addresses cannot be reused by other arrays while they are cache keys.
+_indicator_cache: Dict[tuple, np.ndarray] = {}
+_cache_block: Optional[np.ndarray] = None
+MAX_CACHED_INDICATORS = 64
+
+
+def ma_periods_ordered(params: Dict[str, Any]) -> bool:
+    """
+    Grid constraint: the SMA must be faster than the EMA it crosses.
+    """
+    merged = {**PARAM_DEFAULTS, **params}
+    return merged["sma_period"] < merged["ema_period"]
+
+
+def _cached_indicator(close: np.ndarray, kind: str, period: int) -> np.ndarray:
+    if _cache_block is None or not np.may_share_memory(close, _cache_block):
+        return sweep_indicator(close, kind, period)
+    # Within the mapped block, the buffer address and shape identify the window
+    key = (kind, period, close.shape, close.__array_interface__["data"][0])
+    values = _indicator_cache.get(key)
+    if values is None:
+        if len(_indicator_cache) >= MAX_CACHED_INDICATORS:
+            _indicator_cache.clear()
+        values = _indicator_cache[key] = sweep_indicator(close, kind, period)
+    return values
+
+
+def backtest_ma_rsi(
+    prices: Dict[str, np.ndarray],
+    index: pd.DatetimeIndex,
+    symbols: List[str],
+    params: Dict[str, Any],
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> BacktestResult:
+    """
+    Backtest the signal generator's rule for one parameter combination over
+    bars [start, stop): buy when the SMA crosses above the EMA with RSI below
+    overbought, sell when it crosses below with RSI above oversold.
+    Indicators are computed over the whole history, so earlier bars warm
+    them up without being traded.
+    """
+    params = {**PARAM_DEFAULTS, **params}
+    close = prices["close"]
+    window = slice(start, stop)
+    sma = _cached_indicator(close, "sma", int(params["sma_period"]))[window]
+    ema = _cached_indicator(close, "ema", int(params["ema_period"]))[window]
+    rsi = _cached_indicator(close, "rsi", int(params["rsi_period"]))[window]
+    above, below = crossover_masks(sma, ema)
+    with np.errstate(invalid="ignore"):
+        entries = above & (rsi < params["rsi_overbought"])
+        exits = below & (rsi > params["rsi_oversold"])
+    columns = pd.MultiIndex.from_product([["close"], symbols])
+    panel = pd.DataFrame(close[window], index=index[window], columns=columns)
+    backtest = Backtest(
+        position_size=params.get("position_size", 1.0),
+        commission=params.get("commission", 0.0),
+    )
+    return backtest.run(panel, entries, exits)
+
+
+def evaluate_ma_rsi(
+    prices: Dict[str, np.ndarray],
+    index: pd.DatetimeIndex,
+    symbols: List[str],
+    params: Dict[str, Any],
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Metrics of backtest_ma_rsi for one parameter combination.
+    """
+    return backtest_ma_rsi(prices, index, symbols, params, start, stop).metrics
+
+
+def scope_indicator_cache(block: np.ndarray) -> None:
+    """
+    Cache indicators of price views into block, a mapped SharedPanel array,
+    until clear_indicator_cache(). Other arrays are never cached.
+    """
+    global _cache_block
+    _indicator_cache.clear()
+    _cache_block = block
+
+
+def clear_indicator_cache() -> None:
+    """
+    Drop cached indicators and stop caching.
+    """
+    global _cache_block
+    _indicator_cache.clear()
+    _cache_block = None
+
+
+# Shared prices and evaluator owned by each worker process of the sweep pool
+_worker_panel: Optional[SharedPanel] = None
+_worker_index: Optional[pd.DatetimeIndex] = None
+_worker_evaluate: Optional[Evaluator] = None
+
+
+def _init_sweep_worker(spec: SharedPanelSpec, evaluate: Evaluator) -> None:
+    """
+    Map the shared price block in a pool worker.
+    """
+    global _worker_panel, _worker_index, _worker_evaluate
+    _worker_panel = SharedPanel.attach(spec)
+    _worker_index = pd.DatetimeIndex(spec.index)
+    _worker_evaluate = evaluate
+    scope_indicator_cache(_worker_panel.array)
+
+
+def _evaluate_combination(
+    params: Dict[str, Any], bars: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Evaluate one combination over the first `bars` bars (all when None).
+    """
+    metrics = _worker_evaluate(
+        _worker_panel.fields(),
+        _worker_index,
+        list(_worker_panel.spec.symbols),
+        params,
+        0,
+        bars,
+    )
+    return {**params, **metrics}
+
+
+class ResultsTable:
+    """
+    Sweep results appended to a CSV file as they arrive, and kept in memory.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.rows: List[Dict[str, Any]] = []
+        self._file = None
+        self._writer = None
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self.rows.append(row)
+        if self.path is None:
+            return
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "w", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row))
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows)
+
+
+def _run_stage(
+    combos: List[Dict[str, Any]],
+    spec: SharedPanelSpec,
+    evaluate: Evaluator,
+    workers: int,
+    bars: Optional[int],
+    stage: str,
+    table: ResultsTable,
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate combinations in the pool (or inline with one worker), appending
+    each result to the table as soon as it completes.
+    """
+    rows = []
+
+    def record(row):
+        row = {"stage": stage, **row}
+        table.append(row)
+        rows.append(row)
+
+    if workers == 1 or len(combos) <= 1:
+        _init_sweep_worker(spec, evaluate)
+        try:
+            for params in combos:
+                record(_evaluate_combination(params, bars))
+        finally:
+            clear_indicator_cache()
+            _worker_panel.close()
+        return rows
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_sweep_worker,
+        initargs=(spec, evaluate),
+    ) as pool:
+        futures = {pool.submit(_evaluate_combination, c, bars): c for c in combos}
+        for future in as_completed(futures):
+            try:
+                record(future.result())
+            except Exception as e:
+                logger.error(f"Sweep failed for {futures[future]}: {e}")
+                raise
+    return rows
+
+
+def prune(
+    rows: List[Dict[str, Any]],
+    metric: str = DEFAULT_METRIC,
+    keep: float = 0.5,
+    min_score: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Screening results worth a full evaluation: the best `keep` fraction by
+    metric, dropping any below min_score or with a missing score.
+    """
+    scored = [r for r in rows if r.get(metric) is not None and np.isfinite(r[metric])]
+    if min_score is not None:
+        scored = [r for r in scored if r[metric] >= min_score]
+    scored.sort(key=lambda r: r[metric], reverse=True)
+    return scored[: max(1, int(np.ceil(len(rows) * keep)))] if scored else []
+
+
+def run_sweep(
+    panel: pd.DataFrame,
+    grid: Dict[str, Iterable[Any]],
+    evaluate: Evaluator = evaluate_ma_rsi,
+    workers: Optional[int] = None,
+    results_path: Optional[Union[str, Path]] = None,
+    metric: str = DEFAULT_METRIC,
+    constraint: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    screen_bars: Optional[int] = None,
+    keep: float = 0.5,
+    min_score: Optional[float] = None,
+    fields: Iterable[str] = SWEEP_FIELDS,
+) -> pd.DataFrame:
+    """
+    Evaluate every grid combination over a price panel and rank them by metric.
+
+    With screen_bars, every combination is first scored over only the first
+    screen_bars bars and just the survivors of prune(keep, min_score) get the
+    full evaluation. evaluate must be a module-level function so workers can
+    import it. Returns the full-stage results, best first; every screening and
+    full result is also streamed to results_path when given.
+    """
+    combos = expand_grid(grid, constraint)
+    if not combos:
+        raise ValueError("Parameter grid has no valid combinations")
+    workers = workers or os.cpu_count() or 1
+    table = ResultsTable(results_path)
+    logger.info(
+        f"Sweeping {len(combos)} combinations over {len(panel_symbols(panel))} "
+        f"symbols and {len(panel.index)} bars with {workers} workers"
+    )
+    try:
+        with SharedPanel.create(panel, fields) as shared:
+            if screen_bars and screen_bars < len(panel.index):
+                screened = _run_stage(
+                    combos, shared.spec, evaluate, workers, screen_bars, "screen", table
+                )
+                survivors = prune(screened, metric, keep, min_score)
+                names = list(combos[0])
+                combos = [{n: row[n] for n in names} for row in survivors]
+                logger.info(
+                    f"Screening kept {len(combos)} of {len(screened)} combinations"
+                )
+            rows = _run_stage(
+                combos, shared.spec, evaluate, workers, None, "full", table
+            )
+    finally:
+        table.close()
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    return results.sort_values(metric, ascending=False, kind="stable").reset_index(
+        drop=True
+    )
+
+
+def parse_grid(specs: Iterable[str]) -> Dict[str, List[Any]]:
+    """
+    Parse "name=v1,v2,..." strings (e.g. from the CLI) into a grid.
+    """
+    grid = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep or not values:
+            raise ValueError(f"Grid entries look like name=v1,v2: {spec!r}")
+        grid[name.strip()] = [
+            float(v) if "." in v else int(v) for v in values.split(",") if v.strip()
+        ]
+    return grid
@@ -0,0 +1,183 @@
+"""
+Multi-Timeframe Module
+
+This module provides views of stored bars at coarser timeframes (5-minute, 15-minute,
+hourly, daily, weekly). Derived bars are resampled lazily on first request, cached,
+and updated incrementally when new base bars arrive.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from stockapp.db_models import RawPrice
+from stockapp.indicator_cache import IndicatorCache, indicator_cache
+from stockapp.indicators import INDICATOR_PARAMS, INDICATOR_SET, calculate_indicators
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Timeframe names follow the data.timeframe setting in settings.yaml
+TIMEFRAMES = {
+    "1Min": pd.Timedelta(minutes=1),
+    "5Min": pd.Timedelta(minutes=5),
+    "15Min": pd.Timedelta(minutes=15),
+    "1H": pd.Timedelta(hours=1),
+    "1D": pd.Timedelta(days=1),
+    "1W": pd.Timedelta(weeks=1),
+}
+
+AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+}
+
+
+def bucket_labels(index: pd.DatetimeIndex, timeframe: str) -> pd.DatetimeIndex:
+    """
+    Label each timestamp with the start of its bucket.
+    Weekly buckets start on Monday; all others are floored to the bucket size.
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    if timeframe == "1W":
+        return (index - pd.to_timedelta(index.dayofweek, unit="D")).normalize()
+    return index.floor(TIMEFRAMES[timeframe])
+
+
+def resample_bars(bars: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Aggregate OHLCV bars into the given timeframe.
+    """
+    if bars.empty:
+        return bars.copy()
+    aggregations = {col: how for col, how in AGGREGATIONS.items() if col in bars}
+    resampled = bars.groupby(bucket_labels(bars.index, timeframe)).agg(aggregations)
+    resampled.index.name = bars.index.name
+    return resampled
+
+
+class MultiTimeframeBars:
+    """
+    Lazily resampled views of one symbol's bars.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        base_bars: pd.DataFrame,
+        base_timeframe: str = "1Min",
+        cache: Optional[IndicatorCache] = None,
+    ):
+        if base_timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe: {base_timeframe}")
+        self.symbol = symbol
+        self.base_timeframe = base_timeframe
+        self.base = base_bars.sort_index()
+        self.cache = cache if cache is not None else indicator_cache
+        self._derived: Dict[str, pd.DataFrame] = {}
+        # Number of base rows aggregated per timeframe, to observe incremental work
+        self.rows_resampled: Dict[str, int] = {}
+
+    @classmethod
+    def from_db(
+        cls,
+        db: Session,
+        symbol: str,
+        base_timeframe: str = "1Min",
+        start: Optional[pd.Timestamp] = None,
+    ) -> "MultiTimeframeBars":
+        """
+        Load stored bars for a symbol.
+        """
+        query = db.query(RawPrice).filter(RawPrice.symbol == symbol)
+        if start is not None:
+            query = query.filter(RawPrice.timestamp >= start)
+        rows = query.order_by(RawPrice.timestamp.asc()).all()
+        bars = pd.DataFrame(
+            [
+                {
+                    "timestamp": r.timestamp,
+                    "open": r.open,
+                    "high": r.high,
+                    "low": r.low,
+                    "close": r.close,
+                    "volume": r.volume,
+                }
+                for r in rows
+            ],
+            columns=["timestamp", *AGGREGATIONS],
+        ).set_index("timestamp")
+        return cls(symbol, bars, base_timeframe)
+
+    def bars(self, timeframe: str) -> pd.DataFrame:
+        """
+        Return bars at the given timeframe, resampling on first request.
+        """
+        if timeframe == self.base_timeframe:
+            return self.base
+        if TIMEFRAMES.get(timeframe, pd.Timedelta(0)) < TIMEFRAMES[self.base_timeframe]:
+            raise ValueError(
+                f"Cannot derive {timeframe} bars from {self.base_timeframe} bars"
+            )
+        if timeframe not in self._derived:
+            self._derived[timeframe] = resample_bars(self.base, timeframe)
+            self.rows_resampled[timeframe] = len(self.base)
+        return self._derived[timeframe]
+
+    def append(self, new_bars: pd.DataFrame) -> None:
+        """
+        Add new base bars and update every cached timeframe.
+
+        Only buckets from the one containing the earliest new bar onward are
+        rebuilt; earlier derived bars are kept as they are.
+        """
+        if new_bars.empty:
+            return
+        new_bars = new_bars.sort_index()
+        first_new = new_bars.index[0]
+        self.base = pd.concat([self.base, new_bars])
+        if (
+            len(self.base) > len(new_bars)
+            and first_new <= self.base.index[-len(new_bars) - 1]
+        ):
+            # Revised bars can keep the same last timestamp, so cached keys would match
+            self.cache.invalidate(self.symbol)
+            self.base = self.base[~self.base.index.duplicated(keep="last")].sort_index()
+        for timeframe, derived in self._derived.items():
+            start = bucket_labels(pd.DatetimeIndex([first_new]), timeframe)[0]
+            tail = self.base[self.base.index >= start]
+            self._derived[timeframe] = pd.concat(
+                [derived[derived.index < start], resample_bars(tail, timeframe)]
+            )
+            self.rows_resampled[timeframe] += len(tail)
+
+    def indicators(self, timeframe: str) -> pd.DataFrame:
+        """
+        Return bars with indicators for the given timeframe, via the indicator cache.
+        """
+        bars = self.bars(timeframe)
+        if bars.empty:
+            return bars.copy()
+        # Warmup depends on where the history starts, not just where it ends
+        params = {
+            **INDICATOR_PARAMS,
+            "first_bar": self.base.index[0],
+            "bars": len(self.base),
+        }
+        return self.cache.get_or_compute(
+            self.symbol,
+            timeframe,
+            self.base.index[-1],
+            INDICATOR_SET,
+            params,
+            lambda: calculate_indicators(bars.copy()),
+        )
@@ -0,0 +1,345 @@
+"""
+Volume Profile Module
+
+This module keeps, for every symbol, the average volume traded in each minute of the
+regular session over the last N sessions. That time-of-day average is the baseline
+for intraday volume confirmation (volume_ok) and relative volume in the scanner.
+Profiles are updated as sessions arrive and lookups are array indexing. Lookups for
+a bar only average sessions before that bar's session, so backtests over history
+the profile already holds see no future volume.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from stockapp.panel import panel_symbols
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SESSION_OPEN = "09:30"
+SESSION_MINUTES = 390
+DEFAULT_SESSIONS = 20
+DEFAULT_PROFILE_FILE = Path("data/volume_profile.npz")
+
+
+class VolumeProfile:
+    """
+    Rolling minute-of-day average volume per symbol.
+
+    The last `sessions` sessions are kept in a ring buffer of shape
+    (sessions, symbols, minutes) together with running sums and counts, so
+    adding a session touches one slot and the averages stay current without
+    rescanning history. Each slot records its session date so lookups can
+    leave out the bar's own and later sessions; the average without the
+    newest session is kept alongside, so lookups during that session are
+    indexing too. Missing bars (NaN) are left out of the averages.
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        sessions: int = DEFAULT_SESSIONS,
+        minutes: int = SESSION_MINUTES,
+        session_open: str = SESSION_OPEN,
+    ):
+        if sessions < 1:
+            raise ValueError("sessions must be at least 1")
+        self.symbols: List[str] = list(symbols)
+        self.positions: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self.sessions = sessions
+        self.minutes = minutes
+        self.session_open = session_open
+        open_time = pd.Timestamp(session_open)
+        self._open_minute = open_time.hour * 60 + open_time.minute
+        n = len(self.symbols)
+        # Sessions are stored as float32 to halve memory and file size
+        self.history = np.full((sessions, n, minutes), np.nan, dtype=np.float32)
+        self.sums = np.zeros((n, minutes))
+        self.counts = np.zeros((n, minutes), dtype=np.int32)
+        self.mean = np.full((n, minutes), np.nan)
+        self.prior_mean = np.full((n, minutes), np.nan)
+        self.dates = np.full(sessions, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.head = 0
+        self.sessions_loaded = 0
+        self.last_session: Optional[pd.Timestamp] = None
+
+    def minute_of_day(self, timestamp: pd.Timestamp) -> int:
+        """
+        Session minute of a timestamp, or -1 outside the regular session.
+        """
+        minute = timestamp.hour * 60 + timestamp.minute - self._open_minute
+        return minute if 0 <= minute < self.minutes else -1
+
+    def minutes_of_day(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Session minute of every timestamp, -1 outside the regular session.
+        """
+        minutes = np.asarray(index.hour * 60 + index.minute) - self._open_minute
+        return np.where((minutes >= 0) & (minutes < self.minutes), minutes, -1)
+
+    def add_session(
+        self, volumes: np.ndarray, session: Optional[pd.Timestamp] = None
+    ) -> None:
+        """
+        Add one completed session of (symbols, minutes) volumes, replacing the
+        oldest session once the buffer is full.
+        """
+        self._store(self.head, volumes)
+        self.dates[self.head] = np.datetime64(session or "NaT", "ns")
+        self.head = (self.head + 1) % self.sessions
+        self.sessions_loaded = min(self.sessions_loaded + 1, self.sessions)
+        self.last_session = session
+
+    def refold_session(self, volumes: np.ndarray) -> None:
+        """
+        Merge newer (symbols, minutes) volumes into the latest session, e.g.
+        as a partial session fills in during the day. NaN keeps the stored
+        value.
+        """
+        if not self.sessions_loaded:
+            raise ValueError("No session to refold")
+        latest = (self.head - 1) % self.sessions
+        volumes = np.asarray(volumes, dtype=float)
+        self._store(latest, np.where(np.isnan(volumes), self.history[latest], volumes))
+
+    def _store(self, slot: int, volumes: np.ndarray) -> None:
+        """
+        Replace the session in a ring buffer slot and refresh the averages.
+        """
+        # Round to the stored precision so the value added now is exactly the
+        # value subtracted when this session leaves the buffer
+        volumes = np.asarray(volumes, dtype=np.float32).astype(float)
+        if volumes.shape != self.mean.shape:
+            raise ValueError(
+                f"Expected volumes of shape {self.mean.shape}, got {volumes.shape}"
+            )
+        old = self.history[slot].astype(float)
+        valid = ~np.isnan(old)
+        self.sums -= np.where(valid, old, 0)
+        self.counts -= valid
+        valid = ~np.isnan(volumes)
+        self.sums += np.where(valid, volumes, 0)
+        self.counts += valid
+        self.history[slot] = volumes
+        self._refresh_means(slot)
+
+    def _refresh_means(self, newest: int) -> None:
+        """
+        Recompute the averages over every stored session (mean) and over
+        every stored session but the one in the newest slot (prior_mean).
+        """
+        latest = self.history[newest].astype(float)
+        valid = ~np.isnan(latest)
+        prior_sums = self.sums - np.where(valid, latest, 0)
+        prior_counts = self.counts - valid
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+            self.prior_mean = np.where(
+                prior_counts > 0, prior_sums / prior_counts, np.nan
+            )
+
+    def _slots(self) -> np.ndarray:
+        """
+        Filled ring buffer slots, oldest session first.
+        """
+        return (self.head - self.sessions_loaded + np.arange(self.sessions_loaded)) % (
+            self.sessions
+        )
+
+    def _mean_before(
+        self, session: pd.Timestamp, minute: int, rows=slice(None)
+    ) -> np.ndarray:
+        """
+        Average volume of the symbols at rows (by default all) at a session
+        minute over the stored sessions before session. Undated sessions count
+        as earlier. Only sessions older than the newest stored one rescan
+        history.
+        """
+        if self.last_session is None or session > self.last_session:
+            return self.mean[rows, minute]
+        if session == self.last_session:
+            return self.prior_mean[rows, minute]
+        slots = self._slots()
+        dates = self.dates[slots]
+        earlier = np.isnat(dates) | (dates < np.datetime64(session, "ns"))
+        values = self.history[slots[earlier], rows, minute].astype(float)
+        counts = (~np.isnan(values)).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, np.nansum(values, axis=0) / counts, np.nan)
+
+    def session_volumes(self, bars: pd.DataFrame) -> np.ndarray:
+        """
+        Arrange one session's volume frame (time x symbol) as (symbols, minutes).
+        """
+        minutes = self.minutes_of_day(bars.index)
+        inside = minutes >= 0
+        volumes = np.full((len(self.symbols), self.minutes), np.nan)
+        frame = bars.reindex(columns=self.symbols).to_numpy(dtype=float)
+        volumes[:, minutes[inside]] = frame[inside].T
+        return volumes
+
+    def update(self, panel: pd.DataFrame) -> int:
+        """
+        Add every session of a minute-bar panel that is newer than the last one
+        added, and refold the panel's bars of the last one, so a session
+        ingested part way through the day keeps filling in. Returns the number
+        of sessions added.
+        """
+        added = 0
+        volume = panel["volume"]
+        for session, bars in volume.groupby(volume.index.normalize()):
+            if self.last_session is not None and session < self.last_session:
+                continue
+            if session == self.last_session:
+                self.refold_session(self.session_volumes(bars))
+                continue
+            self.add_session(self.session_volumes(bars), session)
+            added += 1
+        return added
+
+    def average(self, symbol: str, timestamp: pd.Timestamp) -> float:
+        """
+        Average volume for symbol at this minute of day over the sessions
+        before timestamp's; NaN if unknown.
+        """
+        minute = self.minute_of_day(timestamp)
+        position = self.positions.get(symbol)
+        if minute < 0 or position is None:
+            return np.nan
+        return float(self._mean_before(timestamp.normalize(), minute, position))
+
+    def averages(self, timestamp: pd.Timestamp) -> np.ndarray:
+        """
+        Average volume of every symbol at this minute of day over the sessions
+        before timestamp's, in symbol order.
+        """
+        minute = self.minute_of_day(timestamp)
+        if minute < 0:
+            return np.full(len(self.symbols), np.nan)
+        return self._mean_before(timestamp.normalize(), minute)
+
+    def baseline(self, panel: pd.DataFrame) -> np.ndarray:
+        """
+        Average volume aligned to a panel: a (time, symbol) array in the panel's
+        symbol order, for vectorized volume checks.
+
+        Every bar gets the average of the last `sessions` sessions before its
+        own, taken from the stored sessions and the panel's earlier sessions
+        (merged with stored sessions of the same date), so a backtest over
+        history never sees its own or later volume.
+        """
+        symbols = panel_symbols(panel)
+        codes, sessions = pd.factorize(panel.index.normalize(), sort=True)
+        minutes = self.minutes_of_day(panel.index)
+        inside = minutes >= 0
+        volume = panel["volume"].reindex(columns=symbols).to_numpy(dtype=float)
+        own = np.full((len(sessions), len(symbols), self.minutes), np.nan)
+        own[codes[inside], :, minutes[inside]] = volume[inside]
+        # Stored sessions in panel symbol order, with a NaN row for unknown symbols
+        rows = np.array([self.positions.get(s, -1) for s in symbols], dtype=int)
+        slots = self._slots()
+        stored = np.concatenate(
+            [self.history[slots], np.full((len(slots), 1, self.minutes), np.nan)],
+            axis=1,
+        )[:, rows].astype(float)
+        # Undated sessions sort first, as the oldest
+        stored_dates = self.dates[slots]
+        stored_dates = np.where(
+            np.isnat(stored_dates), np.datetime64(0, "ns"), stored_dates
+        )
+        session_dates = sessions.to_numpy().astype("datetime64[ns]")
+        keep = ~np.isin(stored_dates, session_dates)
+        # Panel bars fill in stored sessions of the same date
+        for slot in np.flatnonzero(~keep):
+            day = np.searchsorted(session_dates, stored_dates[slot])
+            own[day] = np.where(np.isnan(own[day]), stored[slot], own[day])
+        dates = np.concatenate([stored_dates[keep], session_dates])
+        order = np.argsort(dates, kind="stable")
+        combined = np.concatenate([stored[keep], own])[order]
+        valid = ~np.isnan(combined)
+        zeros = np.zeros((1,) + combined.shape[1:])
+        sums = np.concatenate([zeros, np.cumsum(np.where(valid, combined, 0), axis=0)])
+        counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+        end = np.searchsorted(dates[order], session_dates, side="left")
+        start = np.maximum(end - self.sessions, 0)
+        window = counts[end] - counts[start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(window > 0, (sums[end] - sums[start]) / window, np.nan)
+        # Pad with a NaN minute so bars outside the session map to NaN
+        means = np.concatenate([means, np.full(means.shape[:2] + (1,), np.nan)], axis=2)
+        return means[codes[:, None], np.arange(len(symbols))[None, :], minutes[:, None]]
+
+    def relative_volume(
+        self, symbol: str, timestamp: pd.Timestamp, volume: float
+    ) -> float:
+        """
+        Volume as a multiple of the time-of-day average.
+        """
+        average = self.average(symbol, timestamp)
+        if not average or np.isnan(average):
+            return np.nan
+        return volume / average
+
+    def save(self, path: Union[str, Path] = DEFAULT_PROFILE_FILE) -> None:
+        """
+        Persist the ring buffer as a compressed .npz file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            symbols=np.array(self.symbols),
+            history=self.history,
+            head=self.head,
+            sessions_loaded=self.sessions_loaded,
+            session_open=self.session_open,
+            last_session=str(self.last_session or ""),
+            session_dates=self.dates,
+        )
+        logger.info(f"Saved volume profile for {len(self.symbols)} symbols to {path}")
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = DEFAULT_PROFILE_FILE) -> "VolumeProfile":
+        """
+        Load a profile written by save(); sums and averages are rebuilt from
+        the stored sessions.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            history = data["history"]
+            profile = cls(
+                data["symbols"].tolist(),
+                sessions=history.shape[0],
+                minutes=history.shape[2],
+                session_open=str(data["session_open"]),
+            )
+            profile.history = history
+            profile.head = int(data["head"])
+            profile.sessions_loaded = int(data["sessions_loaded"])
+            last_session = str(data["last_session"])
+            if "session_dates" in data.files:
+                profile.dates = data["session_dates"]
+        profile.last_session = pd.Timestamp(last_session) if last_session else None
+        valid = ~np.isnan(history)
+        profile.sums = np.where(valid, history, 0).sum(axis=0, dtype=float)
+        profile.counts = valid.sum(axis=0).astype(np.int32)
+        profile._refresh_means((profile.head - 1) % profile.sessions)
+        return profile
+
+    @classmethod
+    def from_panel(
+        cls, panel: pd.DataFrame, sessions: int = DEFAULT_SESSIONS, **kwargs
+    ) -> "VolumeProfile":
+        """
+        Build a profile from the sessions of a historical minute-bar panel.
+        """
+        profile = cls(panel_symbols(panel), sessions=sessions, **kwargs)
+        profile.update(panel)
+        return profile
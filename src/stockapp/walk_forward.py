@@ -0,0 +1,240 @@
+"""
+Walk-Forward Module
+
+This module runs walk-forward optimization: history is split into rolling (or
+anchored) train/test windows, the best parameters are chosen on each train
+window and traded on the test window that follows. Windows run in parallel
+over prices in shared memory, indicators are computed once over the history
+and shared by every window a worker handles, and the test windows are stitched
+into one out-of-sample equity curve.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stockapp.backtest import TRADE_COLUMNS, BacktestResult, compute_metrics
+from stockapp.sweep import (
+    DEFAULT_METRIC,
+    SWEEP_FIELDS,
+    SharedPanel,
+    SharedPanelSpec,
+    backtest_ma_rsi,
+    clear_indicator_cache,
+    expand_grid,
+    scope_indicator_cache,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# backtest(prices, index, symbols, params, start, stop) -> BacktestResult over
+# bars [start, stop) of the full-history prices, like sweep.backtest_ma_rsi
+WindowBacktest = Callable[..., BacktestResult]
+
+
+@dataclass(frozen=True)
+class WalkForwardWindow:
+    """Bar positions of one train/test split; ends are exclusive."""
+
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def walk_forward_windows(
+    bars: int,
+    train_bars: int,
+    test_bars: int,
+    step: Optional[int] = None,
+    anchored: bool = False,
+) -> List[WalkForwardWindow]:
+    """
+    Split `bars` bars into train/test windows. Each test window follows its
+    train window and the next split starts `step` bars later (default
+    test_bars, so test windows tile the history without overlap). Anchored
+    train windows all start at bar 0 and grow.
+    """
+    if train_bars < 1 or test_bars < 1:
+        raise ValueError("train_bars and test_bars must be at least 1")
+    step = step or test_bars
+    windows = []
+    start = 0
+    while start + train_bars + test_bars <= bars:
+        train_end = start + train_bars
+        windows.append(
+            WalkForwardWindow(
+                0 if anchored else start,
+                train_end,
+                train_end,
+                train_end + test_bars,
+            )
+        )
+        start += step
+    return windows
+
+
+@dataclass
+class WalkForwardResult:
+    """Per-window choices and the stitched out-of-sample performance."""
+
+    windows: pd.DataFrame
+    equity: pd.Series
+    returns: pd.Series
+    trades: pd.DataFrame
+    metrics: Dict[str, float]
+
+
+# Shared prices and backtest owned by each worker process of the pool
+_worker_panel: Optional[SharedPanel] = None
+_worker_index: Optional[pd.DatetimeIndex] = None
+_worker_backtest: Optional[WindowBacktest] = None
+
+
+def _init_walk_forward_worker(spec: SharedPanelSpec, backtest: WindowBacktest) -> None:
+    """
+    Map the shared price block in a pool worker.
+    """
+    global _worker_panel, _worker_index, _worker_backtest
+    _worker_panel = SharedPanel.attach(spec)
+    _worker_index = pd.DatetimeIndex(spec.index)
+    _worker_backtest = backtest
+    scope_indicator_cache(_worker_panel.array)
+
+
+def _run_window(
+    window: WalkForwardWindow, combos: List[Dict[str, Any]], metric: str
+) -> Tuple[Dict[str, Any], pd.Series, pd.DataFrame]:
+    """
+    Optimize on the train window, then trade the winner on the test window.
+    """
+    args = (_worker_panel.fields(), _worker_index, list(_worker_panel.spec.symbols))
+    best, best_score = combos[0], -np.inf
+    for params in combos:
+        result = _worker_backtest(*args, params, window.train_start, window.train_end)
+        score = result.metrics[metric]
+        if np.isfinite(score) and score > best_score:
+            best, best_score = params, score
+    test = _worker_backtest(*args, best, window.test_start, window.test_end)
+    index = _worker_index
+    row = {
+        "train_start": index[window.train_start],
+        "train_end": index[window.train_end - 1],
+        "test_start": index[window.test_start],
+        "test_end": index[window.test_end - 1],
+        **best,
+        f"train_{metric}": best_score if np.isfinite(best_score) else np.nan,
+        **{f"test_{k}": v for k, v in test.metrics.items()},
+    }
+    trades = test.trades.assign(window=window.test_start)
+    # Trade P&L as a fraction of the window's starting capital, rescaled later
+    trades["pnl"] = trades["pnl"] / test.initial_cash
+    trades["shares"] = trades["shares"] / test.initial_cash
+    return row, test.returns, trades
+
+
+def stitch_returns(
+    windows: List[Tuple[Dict[str, Any], pd.Series, pd.DataFrame]],
+    initial_cash: float,
+) -> Tuple[pd.Series, pd.Series, pd.DataFrame]:
+    """
+    Chain test-window returns into one equity curve in time order, and scale
+    each window's trades to the equity it started with.
+    """
+    windows = sorted(windows, key=lambda w: w[0]["test_start"])
+    returns = pd.concat([w[1] for w in windows]).rename("returns")
+    returns = returns[~returns.index.duplicated(keep="first")]
+    equity = (initial_cash * (1 + returns).cumprod()).rename("equity")
+    trades = []
+    for row, window_returns, window_trades in windows:
+        start = equity.index.get_loc(window_returns.index[0])
+        capital = equity.iloc[start - 1] if start else initial_cash
+        scaled = window_trades.copy()
+        scaled[["pnl", "shares"]] = scaled[["pnl", "shares"]] * capital
+        trades.append(scaled)
+    trades = (
+        pd.concat(trades, ignore_index=True)
+        if trades
+        else pd.DataFrame(columns=TRADE_COLUMNS + ["window"])
+    )
+    return equity, returns, trades
+
+
+def run_walk_forward(
+    panel: pd.DataFrame,
+    grid: Dict[str, Iterable[Any]],
+    train_bars: int,
+    test_bars: int,
+    step: Optional[int] = None,
+    anchored: bool = False,
+    backtest: WindowBacktest = backtest_ma_rsi,
+    metric: str = DEFAULT_METRIC,
+    constraint: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    workers: Optional[int] = None,
+    initial_cash: float = 10000.0,
+    fields: Iterable[str] = SWEEP_FIELDS,
+) -> WalkForwardResult:
+    """
+    Walk-forward optimization of a parameter grid over a price panel.
+    backtest must be a module-level function so workers can import it.
+    Overlapping test windows (step < test_bars) are stitched using the
+    earliest window for each bar.
+    """
+    combos = expand_grid(grid, constraint)
+    if not combos:
+        raise ValueError("Parameter grid has no valid combinations")
+    windows = walk_forward_windows(
+        len(panel.index), train_bars, test_bars, step, anchored
+    )
+    if not windows:
+        raise ValueError(
+            f"{len(panel.index)} bars is too short for {train_bars} train "
+            f"and {test_bars} test bars"
+        )
+    workers = workers or os.cpu_count() or 1
+    logger.info(
+        f"Walk-forward over {len(windows)} windows x {len(combos)} combinations "
+        f"with {workers} workers"
+    )
+    results = []
+    with SharedPanel.create(panel, fields) as shared:
+        if workers == 1 or len(windows) <= 1:
+            _init_walk_forward_worker(shared.spec, backtest)
+            try:
+                results = [_run_window(w, combos, metric) for w in windows]
+            finally:
+                clear_indicator_cache()
+                _worker_panel.close()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_walk_forward_worker,
+                initargs=(shared.spec, backtest),
+            ) as pool:
+                futures = {
+                    pool.submit(_run_window, w, combos, metric): w for w in windows
+                }
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"Walk-forward failed for {futures[future]}: {e}")
+                        raise
+    equity, returns, trades = stitch_returns(results, initial_cash)
+    table = pd.DataFrame(sorted((r[0] for r in results), key=lambda r: r["test_start"]))
+    metrics = compute_metrics(equity, returns, trades, initial_cash)
+    logger.info(
+        f"Out-of-sample: return {metrics['total_return']:.2%}, "
+        f"Sharpe {metrics['sharpe_ratio']:.2f}, "
+        f"max drawdown {metrics['max_drawdown']:.2%}"
+    )
+    return WalkForwardResult(table, equity, returns, trades, metrics)
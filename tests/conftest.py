@@ -5,6 +5,13 @@ from datetime import datetime, timedelta
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from stockapp.db_models import Base, RawPrice, Indicator, Signal
+from stockapp.indicator_cache import indicator_cache
+
+@pytest.fixture(autouse=True)
+def empty_indicator_cache():
+    """Start every test with an empty shared indicator cache"""
+    indicator_cache.invalidate()
+    yield
 
 @pytest.fixture
 def db_engine():
@@ -2,7 +2,7 @@ import pytest
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from trading_bot.backtest import Backtest, BacktestResult
+from stockapp.backtest import Backtest, BacktestResult
 
 def create_sample_data():
     """Create sample price data for testing"""
@@ -127,4 +127,102 @@ def test_backtest_comparison():
     assert isinstance(result1.compare(result2), dict)
     assert 'return_diff' in result1.compare(result2)
     assert 'sharpe_diff' in result1.compare(result2)
-    assert 'drawdown_diff' in result1.compare(result2) 
\ No newline at end of file
+    assert 'drawdown_diff' in result1.compare(result2)
+
+
+def random_panel(days, symbols, seed=0):
+    """Random-walk daily closes for several symbols"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2014-01-01", periods=days)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, (days, symbols)), axis=0)
+    names = [f"S{i:03d}" for i in range(symbols)]
+    return pd.concat({"close": pd.DataFrame(close, index=index, columns=names)}, axis=1)
+
+
+def reference_equity(close, entries, exits, cash, size, commission):
+    """Bar-by-bar loop over one symbol's sleeve"""
+    equity = []
+    shares = 0.0
+    for t, price in enumerate(close):
+        last = t == len(close) - 1
+        if shares and (exits[t] or last):
+            cash += shares * price * (1 - commission)
+            shares = 0.0
+        elif not shares and entries[t] and not exits[t] and not last:
+            invest = size * cash / (1 + commission)
+            shares = invest / price
+            cash -= invest * (1 + commission)
+        equity.append(cash + shares * price)
+    return np.array(equity)
+
+
+def test_vectorized_matches_loop():
+    """Test the array simulation matches a bar-by-bar loop"""
+    panel = random_panel(300, 4)
+    rng = np.random.default_rng(1)
+    entries = rng.random((300, 4)) < 0.05
+    exits = rng.random((300, 4)) < 0.05
+    result = Backtest(initial_cash=40000.0, position_size=0.8, commission=0.001).run(
+        panel, entries, exits
+    )
+    close = panel["close"].to_numpy()
+    expected = sum(
+        reference_equity(close[:, s], entries[:, s], exits[:, s], 10000.0, 0.8, 0.001)
+        for s in range(4)
+    )
+    np.testing.assert_allclose(result.portfolio_value.to_numpy(), expected)
+    assert result.trades["pnl"].sum() == pytest.approx(
+        result.portfolio_value.iloc[-1] - 40000.0
+    )
+    assert (result.trades["exit_time"] >= result.trades["entry_time"]).all()
+
+
+def test_full_position_with_commission_keeps_cash_non_negative():
+    """Test investing the whole sleeve leaves room for the entry commission"""
+    panel = random_panel(50, 1)
+    result = Backtest(initial_cash=10000.0, position_size=1.0, commission=0.01).run(
+        panel
+    )
+    (trade,) = result.trades.to_dict("records")
+    cost = trade["shares"] * trade["entry_price"] * 1.01
+    assert cost == pytest.approx(10000.0)
+    # Every bar's equity is the shares held: no negative cash offsets it
+    held = trade["shares"] * panel["close"].iloc[:, 0].to_numpy()
+    np.testing.assert_allclose(result.portfolio_value.to_numpy()[:-1], held[:-1])
+
+
+def test_signal_masks_from_events():
+    """Test BUY and SELL events become entry and exit grids"""
+    from stockapp.backtest import signal_masks
+
+    panel = random_panel(5, 2)
+    index = panel.index
+    events = pd.DataFrame(
+        {
+            "timestamp": [index[0], index[3], index[1]],
+            "symbol": ["S000", "S000", "S001"],
+            "signal_type": ["BUY", "SELL", "BUY"],
+        }
+    )
+    entries, exits = signal_masks(events, index, ["S000", "S001"])
+    assert entries.to_numpy().sum() == 2 and exits.at[index[3], "S000"]
+    result = Backtest().run(panel, entries, exits)
+    assert result.trades[["symbol", "exit_time"]].values.tolist() == [
+        ["S000", index[3]],
+        ["S001", index[4]],
+    ]
+
+
+def test_ten_years_of_500_symbols_runs_in_seconds():
+    """Test the engine handles a large daily universe quickly"""
+    import time
+
+    panel = random_panel(2520, 500)
+    rng = np.random.default_rng(2)
+    entries = rng.random((2520, 500)) < 0.02
+    exits = rng.random((2520, 500)) < 0.02
+    start = time.perf_counter()
+    result = Backtest(initial_cash=1_000_000.0).run(panel, entries, exits)
+    assert time.perf_counter() - start < 5
+    assert len(result.trades) > 10000
+    assert 0 <= result.max_drawdown <= 1
@@ -0,0 +1,168 @@
+"""Tests for the content-addressed backtest result cache."""
+
+import inspect
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp import backtest_cache
+from stockapp.backtest import Backtest, signal_masks
+from stockapp.backtest_cache import (
+    BacktestCache,
+    cached_portfolio_backtest,
+    code_version,
+    data_fingerprint,
+)
+from stockapp.panel import to_panel
+from stockapp.strategies import (
+    DeclarativeRules,
+    MovingAverageCrossover,
+    RsiThreshold,
+    StrategyRunner,
+)
+
+RULES = """
+rules:
+  - name: RSI_LOW
+    signal: BUY
+    when:
+      below: [rsi_14, {level}]
+"""
+
+
+def indicator_panel(symbols=("AAPL", "MSFT", "NVDA"), periods=300, seed=0):
+    """Random-walk prices with the indicators the strategies read"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=periods)
+    frames = {}
+    for symbol in symbols:
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.015, periods))
+        frames[symbol] = pd.DataFrame(
+            {
+                "close": close,
+                "sma_20": pd.Series(close).rolling(20).mean().to_numpy(),
+                "ema_50": pd.Series(close).ewm(span=50).mean().to_numpy(),
+                "rsi_14": rng.uniform(10, 90, periods),
+            },
+            index=dates,
+        )
+    return to_panel(frames)
+
+
+def runner():
+    return StrategyRunner([MovingAverageCrossover(), RsiThreshold(oversold=25)])
+
+
+def test_matches_an_uncached_portfolio_backtest(tmp_path):
+    """Test combined sleeves equal backtesting the whole panel at once"""
+    panel = indicator_panel()
+    backtest = Backtest(10000.0, position_size=0.5, commission=0.001)
+    events = runner().evaluate(panel)
+    entries, exits = signal_masks(events, panel.index, list(panel["close"].columns))
+    expected = backtest.run(panel, entries, exits)
+    cache = BacktestCache(tmp_path)
+    result = cached_portfolio_backtest(panel, runner(), backtest, cache)
+    assert len(result.trades) > 0
+    pd.testing.assert_series_equal(result.portfolio_value, expected.portfolio_value)
+    pd.testing.assert_frame_equal(result.trades, expected.trades)
+    pd.testing.assert_frame_equal(result.positions, expected.positions)
+    assert result.metrics == pytest.approx(expected.metrics)
+
+
+def test_unchanged_run_is_one_cache_read(tmp_path, monkeypatch):
+    """Test an identical rerun neither evaluates nor backtests anything"""
+    panel = indicator_panel()
+    cache = BacktestCache(tmp_path)
+    first = cached_portfolio_backtest(panel, runner(), cache=cache)
+    monkeypatch.setattr(
+        backtest_cache, "_run_sleeves", lambda *a: pytest.fail("recomputed")
+    )
+    second = cached_portfolio_backtest(panel, runner(), cache=BacktestCache(tmp_path))
+    pd.testing.assert_series_equal(first.portfolio_value, second.portfolio_value)
+
+
+def test_only_changed_symbols_are_recomputed(tmp_path, monkeypatch):
+    """Test a partial rerun backtests just the symbols whose data changed"""
+    panel = indicator_panel()
+    cache = BacktestCache(tmp_path)
+    cached_portfolio_backtest(panel, runner(), cache=cache)
+    recomputed = []
+    original = backtest_cache._run_sleeves
+
+    def tracking(panel, symbols, *args):
+        recomputed.extend(symbols)
+        return original(panel, symbols, *args)
+
+    monkeypatch.setattr(backtest_cache, "_run_sleeves", tracking)
+    changed = panel.copy()
+    changed.loc[changed.index[-1], ("close", "MSFT")] *= 1.05
+    cached_portfolio_backtest(changed, runner(), cache=cache)
+    assert recomputed == ["MSFT"]
+    recomputed.clear()
+    cached_portfolio_backtest(changed, StrategyRunner([RsiThreshold()]), cache=cache)
+    assert recomputed == ["AAPL", "MSFT", "NVDA"]
+
+
+def test_keys_depend_on_data_and_code():
+    """Test fingerprints change with values and versions with source"""
+    frame = indicator_panel(("AAPL",))["close"]
+    assert data_fingerprint(frame) == data_fingerprint(frame.copy())
+    edited = frame.copy()
+    edited.iloc[0, 0] += 0.01
+    assert data_fingerprint(edited) != data_fingerprint(frame)
+    assert code_version(MovingAverageCrossover) == code_version(RsiThreshold)
+    assert code_version(Backtest) != code_version(MovingAverageCrossover)
+
+
+def test_code_version_follows_indirect_imports(monkeypatch):
+    """Test editing a module reached only through another changes the version"""
+    before = code_version(MovingAverageCrossover)
+    source = inspect.getsource
+    monkeypatch.setattr(
+        inspect,
+        "getsource",
+        lambda m: source(m) + ("# edited" if m.__name__ == "stockapp.panel" else ""),
+    )
+    assert code_version(MovingAverageCrossover) != before
+
+
+def test_rules_file_contents_are_part_of_the_key(tmp_path, monkeypatch):
+    """Test editing the rules file a strategy reads reruns the backtest"""
+    panel = indicator_panel()
+    path = tmp_path / "rules.yaml"
+    path.write_text(RULES.format(level=30))
+    cache = BacktestCache(tmp_path / "cache")
+    first = cached_portfolio_backtest(
+        panel, StrategyRunner([DeclarativeRules(path=str(path))]), cache=cache
+    )
+    path.write_text(RULES.format(level=60))
+    recomputed = []
+    original = backtest_cache._run_sleeves
+
+    def tracking(panel, symbols, *args):
+        recomputed.extend(symbols)
+        return original(panel, symbols, *args)
+
+    monkeypatch.setattr(backtest_cache, "_run_sleeves", tracking)
+    second = cached_portfolio_backtest(
+        panel, StrategyRunner([DeclarativeRules(path=str(path))]), cache=cache
+    )
+    assert recomputed == ["AAPL", "MSFT", "NVDA"]
+    assert not second.trades["entry_time"].equals(first.trades["entry_time"])
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Test the cache stays under its size limit, dropping the oldest use"""
+    cache = BacktestCache(tmp_path, max_bytes=2500)
+    payload = np.zeros(100)
+    cache.put("a", payload)
+    cache.put("b", payload)
+    assert cache.get("a") is not None
+    cache.put("c", payload)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.stats()["bytes"] <= 2500
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("b") is None
+    assert cache.get_or_compute("b", lambda: 42) == 42
+    assert cache.clear() == 3
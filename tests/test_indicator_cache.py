@@ -0,0 +1,221 @@
+"""Tests for the shared indicator result cache."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.db_models import Indicator, RawPrice
+from stockapp.indicator_cache import (
+    CacheBackend,
+    IndicatorCache,
+    InMemoryBackend,
+    make_key,
+)
+
+
+def create_frame(rows=50):
+    """Create a sample indicator frame"""
+    dates = pd.date_range(start="2023-01-01", periods=rows, freq="D")
+    return pd.DataFrame(
+        {
+            "close": np.random.normal(100, 5, rows),
+            "sma_20": np.random.normal(100, 5, rows),
+        },
+        index=dates,
+    )
+
+
+def add_prices(db_session, frame, symbol="AAPL"):
+    """Store the frame's closes as price bars"""
+    for ts, close in frame["close"].items():
+        db_session.add(RawPrice(symbol=symbol, timestamp=ts, close=close, volume=100))
+    db_session.commit()
+
+
+def test_hit_and_miss_counters():
+    """Test that repeated lookups are served from the cache"""
+    cache = IndicatorCache()
+    frame = create_frame()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return frame
+
+    last_bar = frame.index[-1]
+    for _ in range(3):
+        result = cache.get_or_compute(
+            "AAPL", "1D", last_bar, ["sma_20"], {"sma": 20}, compute
+        )
+        pd.testing.assert_frame_equal(result, frame)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_params_change_key():
+    """Test that different parameters never share an entry"""
+    ts = pd.Timestamp("2023-01-31")
+    assert make_key("AAPL", "1D", ts, ["sma"], {"sma": 20}) != make_key(
+        "AAPL", "1D", ts, ["sma"], {"sma": 50}
+    )
+    assert make_key("AAPL", "1D", ts, ["a", "b"]) == make_key(
+        "AAPL", "1D", ts, ["b", "a"]
+    )
+
+
+def test_lru_eviction_by_memory():
+    """Test that the least recently used frame is evicted when over budget"""
+    frame = create_frame()
+    size = int(frame.memory_usage(index=True, deep=True).sum())
+    cache = IndicatorCache(max_bytes=size * 2)
+    keys = [make_key(s, "1D", frame.index[-1], ["sma_20"]) for s in ["A", "B", "C"]]
+    cache.put(keys[0], frame)
+    cache.put(keys[1], frame)
+    cache.get(keys[0])  # A becomes most recently used
+    cache.put(keys[2], frame)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_new_bar_invalidates_symbol():
+    """Test that new bars drop stale entries for that symbol only"""
+    cache = IndicatorCache()
+    frame = create_frame()
+    old = make_key("AAPL", "1D", frame.index[-1], ["sma_20"])
+    other = make_key("MSFT", "1D", frame.index[-1], ["sma_20"])
+    cache.put(old, frame)
+    cache.put(other, frame)
+    assert cache.on_new_bar("AAPL", frame.index[-1] + pd.Timedelta(days=1)) == 1
+    assert cache.get(old) is None
+    assert cache.get(other) is not None
+
+
+def test_cached_frame_is_not_mutated():
+    """Test that callers cannot modify the cached copy"""
+    cache = IndicatorCache()
+    frame = create_frame()
+    key = make_key("AAPL", "1D", frame.index[-1], ["sma_20"])
+    cache.put(key, frame)
+    copy = cache.get(key)
+    copy["close"] = 0.0
+    assert (cache.get(key)["close"] != 0.0).all()
+
+
+def test_shared_backend_between_caches():
+    """Test that a second process-local cache reuses results from the backend"""
+    backend = InMemoryBackend()
+    first = IndicatorCache(backend=backend)
+    second = IndicatorCache(backend=backend)
+    frame = create_frame()
+    key = make_key("AAPL", "1D", frame.index[-1], ["sma_20"])
+    first.put(key, frame)
+    pd.testing.assert_frame_equal(second.get(key), frame)
+    assert second.stats()["backend_hits"] == 1
+    assert len(second) == 1
+
+
+def test_invalidation_reaches_every_process():
+    """Test a backfilled bar retires the shared frame and other caches' copies"""
+    backend = InMemoryBackend()
+    first = IndicatorCache(backend=backend)
+    second = IndicatorCache(backend=backend)
+    frame = create_frame()
+    key = make_key("AAPL", "1D", frame.index[-1], ["sma_20"])
+    first.put(key, frame)
+    assert second.get(key) is not None
+    other = make_key("MSFT", "1D", frame.index[-1], ["sma_20"])
+    first.put(other, frame)
+    # The backfill keeps the last bar, so the key is unchanged
+    first.on_new_bar("AAPL", frame.index[10])
+    assert first.get(key) is None
+    assert second.get(key) is None
+    assert IndicatorCache(backend=backend).get(key) is None
+    assert second.get(other) is not None
+    second.invalidate()
+    assert first.get(other) is None
+
+
+def test_backend_interface_is_abstract():
+    """Test a backend missing methods cannot be created"""
+
+    class Partial(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_get_indicator_frame_uses_cache(db_session):
+    """Test that indicator frames are computed once until a new bar arrives"""
+    from stockapp.indicator_cache import indicator_cache
+    from stockapp.indicators import get_indicator_frame
+
+    add_prices(db_session, create_frame(60))
+
+    before = indicator_cache.stats()
+    first = get_indicator_frame(db_session, "AAPL")
+    second = get_indicator_frame(db_session, "AAPL")
+    pd.testing.assert_frame_equal(first, second)
+    assert indicator_cache.stats()["misses"] == before["misses"] + 1
+    assert indicator_cache.stats()["hits"] == before["hits"] + 1
+
+
+def test_backfilled_bar_invalidates_later_frames():
+    """Test a bar stored before a cached frame's last bar still drops it"""
+    cache = IndicatorCache()
+    frame = create_frame()
+    key = make_key("AAPL", "1D", frame.index[-1], ["sma_20"])
+    cache.put(key, frame)
+    assert cache.on_new_bar("AAPL", frame.index[5]) == 1
+    assert cache.get(key) is None
+
+
+def test_indicator_update_reuses_cached_frame(db_session):
+    """Test the live indicator update computes each frame once per bar"""
+    from stockapp.data_fetch import save_to_db
+    from stockapp.indicator_cache import indicator_cache
+    from stockapp.indicators import update_symbol_indicators
+
+    frame = create_frame(60)
+    add_prices(db_session, frame)
+    update_symbol_indicators(db_session, "AAPL")
+    before = indicator_cache.stats()
+    assert update_symbol_indicators(db_session, "AAPL")["inserted"] == 0
+    assert indicator_cache.stats()["hits"] == before["hits"] + 1
+
+    new_bar = pd.DataFrame(
+        {"open": 1.0, "high": 1.0, "low": 1.0, "close": 101.0, "volume": 100},
+        index=[frame.index[-1] + pd.Timedelta(days=1)],
+    )
+    save_to_db(db_session, "AAPL", new_bar)
+    assert update_symbol_indicators(db_session, "AAPL")["inserted"] == 1
+    assert indicator_cache.stats()["misses"] == before["misses"] + 1
+
+
+def test_backtest_panel_served_from_cache(db_session):
+    """Test backtests reuse loaded frames until stored indicators advance"""
+    from stockapp.backtest import load_backtest_panel
+    from stockapp.indicator_cache import indicator_cache
+
+    frame = create_frame(30)
+    add_prices(db_session, frame)
+    for ts in frame.index[:-1]:
+        db_session.add(Indicator(symbol="AAPL", timestamp=ts, values={"rsi_14": 50}))
+    db_session.commit()
+    first = load_backtest_panel(db_session, ["AAPL"], "2023-01-01", "2023-12-31")
+    hits = indicator_cache.stats()["hits"]
+    second = load_backtest_panel(db_session, ["AAPL"], "2023-01-01", "2023-12-31")
+    pd.testing.assert_frame_equal(first, second)
+    assert indicator_cache.stats()["hits"] == hits + 1
+    assert np.isnan(second[("rsi_14", "AAPL")].iloc[-1])
+
+    db_session.add(
+        Indicator(symbol="AAPL", timestamp=frame.index[-1], values={"rsi_14": 20})
+    )
+    db_session.commit()
+    third = load_backtest_panel(db_session, ["AAPL"], "2023-01-01", "2023-12-31")
+    assert third[("rsi_14", "AAPL")].iloc[-1] == 20
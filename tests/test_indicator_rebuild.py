@@ -0,0 +1,112 @@
+"""Tests for the full-history indicator rebuild."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from stockapp import indicator_rebuild
+from stockapp.db_models import Base, Indicator, RawPrice
+from stockapp.indicator_rebuild import SHADOW_TABLE, rebuild_indicators
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL"]
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """Create a file-backed database with prices and stale indicators"""
+    url = f"sqlite:///{tmp_path / 'rebuild.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    dates = pd.date_range(start="2022-01-01", periods=300, freq="D")
+    for symbol in SYMBOLS:
+        for date, close in zip(dates, np.random.normal(100, 5, len(dates))):
+            session.add(
+                RawPrice(symbol=symbol, timestamp=date, close=close, volume=1000)
+            )
+        session.add(Indicator(symbol=symbol, timestamp=dates[0], values={"old": 1.0}))
+    session.commit()
+    session.close()
+    return url
+
+
+def load_indicators(database_url):
+    """Return all indicator rows"""
+    session = sessionmaker(bind=create_engine(database_url))()
+    rows = session.query(Indicator).all()
+    session.close()
+    return rows
+
+
+def test_rebuild_replaces_table(database_url):
+    """Test the rebuild covers the full history and replaces old rows"""
+    results = rebuild_indicators(workers=2, chunk_size=1, database_url=database_url)
+    assert set(results) == set(SYMBOLS)
+    rows = load_indicators(database_url)
+    assert len(rows) == sum(results.values())
+    assert all("old" not in row.values for row in rows)
+    # Full history, not just the last 200 bars used by daily updates
+    assert all(count > 200 for count in results.values())
+
+    inspector = inspect(create_engine(database_url))
+    assert SHADOW_TABLE not in inspector.get_table_names()
+    index_names = {ix["name"] for ix in inspector.get_indexes("indicators")}
+    assert "ix_indicators_symbol" in index_names
+
+    # The swapped-in table can be rebuilt again
+    assert rebuild_indicators(workers=1, database_url=database_url) == results
+
+
+def test_failed_rebuild_keeps_live_table(database_url, monkeypatch):
+    """Test readers keep the old data when the rebuild fails"""
+
+    def fail(symbols):
+        raise RuntimeError("worker crashed")
+
+    monkeypatch.setattr(indicator_rebuild, "_rebuild_chunk", fail)
+    with pytest.raises(RuntimeError):
+        rebuild_indicators(workers=1, database_url=database_url)
+    rows = load_indicators(database_url)
+    assert len(rows) == len(SYMBOLS)
+    assert all(row.values == {"old": 1.0} for row in rows)
+    inspector = inspect(create_engine(database_url))
+    assert SHADOW_TABLE not in inspector.get_table_names()
+
+
+def count_by_symbol(database_url):
+    """Return indicator rows per symbol"""
+    counts = {}
+    for row in load_indicators(database_url):
+        counts[row.symbol] = counts.get(row.symbol, 0) + 1
+    return counts
+
+
+def test_partial_rebuild_keeps_other_symbols(database_url):
+    """Test rebuilding a subset leaves the other symbols' indicators alone"""
+    full = rebuild_indicators(workers=1, database_url=database_url)
+    results = rebuild_indicators(["AAPL"], workers=1, database_url=database_url)
+    assert set(results) == {"AAPL"}
+    assert count_by_symbol(database_url) == full
+
+
+def test_rows_written_during_rebuild_survive(database_url, monkeypatch):
+    """Test live rows committed while the rebuild runs are carried over"""
+    rebuild_chunk = indicator_rebuild._rebuild_chunk
+    late = pd.Timestamp("2030-01-01")
+
+    def rebuild_then_write(symbols):
+        results = rebuild_chunk(symbols)
+        session = sessionmaker(bind=create_engine(database_url))()
+        session.add(Indicator(symbol="AAPL", timestamp=late, values={"rsi_14": 1.0}))
+        session.commit()
+        session.close()
+        return results
+
+    monkeypatch.setattr(indicator_rebuild, "_rebuild_chunk", rebuild_then_write)
+    results = rebuild_indicators(workers=1, database_url=database_url)
+    rows = load_indicators(database_url)
+    assert len(rows) == sum(results.values()) + 1
+    assert any(row.timestamp == late for row in rows)
+    assert all("old" not in row.values for row in rows)
@@ -0,0 +1,61 @@
+"""Tests for the diff-aware indicator writer."""
+
+import numpy as np
+import pandas as pd
+
+from stockapp.db_models import Indicator
+from stockapp.indicators import save_indicators_to_db
+
+
+def create_indicator_frame(rows=30):
+    """Create a sample frame of prices and indicators"""
+    dates = pd.date_range(start="2023-01-01", periods=rows, freq="D")
+    close = np.random.normal(100, 5, rows)
+    return pd.DataFrame(
+        {
+            "close": close,
+            "sma_20": close * 0.99,
+            "rsi_14": np.random.uniform(0, 100, rows),
+        },
+        index=dates,
+    )
+
+
+def test_first_save_inserts_everything(db_session):
+    """Test that an empty table receives every row"""
+    df = create_indicator_frame()
+    counts = save_indicators_to_db(db_session, "AAPL", df)
+    assert counts == {"inserted": 30, "updated": 0, "unchanged": 0}
+    assert db_session.query(Indicator).count() == 30
+
+
+def test_resave_is_unchanged(db_session):
+    """Test that saving identical values writes nothing"""
+    df = create_indicator_frame()
+    save_indicators_to_db(db_session, "AAPL", df)
+    counts = save_indicators_to_db(db_session, "AAPL", df)
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 30}
+
+
+def test_only_new_and_changed_rows_written(db_session):
+    """Test a daily run that appends one bar and revises another"""
+    df = create_indicator_frame(31)
+    save_indicators_to_db(db_session, "AAPL", df.iloc[:30])
+    df.loc[df.index[5], "sma_20"] += 1.0
+    counts = save_indicators_to_db(db_session, "AAPL", df)
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 29}
+    stored = (
+        db_session.query(Indicator)
+        .filter(Indicator.symbol == "AAPL", Indicator.timestamp == df.index[5])
+        .one()
+    )
+    assert stored.values["sma_20"] == df["sma_20"].iloc[5]
+    assert db_session.query(Indicator).count() == 31
+
+
+def test_nan_rows_skipped_and_symbols_isolated(db_session):
+    """Test all-NaN rows are dropped and symbols do not affect each other"""
+    df = create_indicator_frame(5)
+    df.loc[df.index[0], ["sma_20", "rsi_14"]] = np.nan
+    assert save_indicators_to_db(db_session, "AAPL", df)["inserted"] == 4
+    assert save_indicators_to_db(db_session, "MSFT", df)["inserted"] == 4
@@ -0,0 +1,64 @@
+"""Tests for bounded-memory chunked indicator computation."""
+
+import numpy as np
+import pandas as pd
+
+from stockapp.db_models import Indicator, RawPrice
+from stockapp.indicators import (
+    calculate_indicators,
+    indicator_rows,
+    iter_indicator_chunks,
+    iter_price_chunks,
+    update_symbol_indicators_chunked,
+)
+
+
+def create_minute_prices(rows=5000):
+    """Create a long random-walk minute price history"""
+    dates = pd.date_range(start="2023-01-02 09:30", periods=rows, freq="min")
+    close = 100 * np.exp(np.cumsum(np.random.normal(0, 0.001, rows)))
+    return pd.DataFrame(
+        {
+            "open": close,
+            "high": close * 1.001,
+            "low": close * 0.999,
+            "close": close,
+            "volume": np.random.randint(100, 1000, rows),
+        },
+        index=pd.DatetimeIndex(dates, name="timestamp"),
+    )
+
+
+def test_chunked_matches_in_memory():
+    """Test chunked output equals the full in-memory computation"""
+    prices = create_minute_prices()
+    expected = calculate_indicators(prices.copy())
+    chunks = (prices.iloc[i : i + 1000] for i in range(0, len(prices), 1000))
+    result = pd.concat(iter_indicator_chunks(chunks))
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-9, check_freq=False)
+
+
+def test_price_chunks_paginate(db_session):
+    """Test keyset pagination returns every bar exactly once in order"""
+    prices = create_minute_prices(250)
+    for ts, row in prices.iterrows():
+        db_session.add(RawPrice(symbol="AAPL", timestamp=ts, **row.to_dict()))
+    db_session.commit()
+    chunks = list(iter_price_chunks(db_session, "AAPL", chunk_size=100))
+    assert [len(c) for c in chunks] == [100, 100, 50]
+    pd.testing.assert_index_equal(
+        pd.concat(chunks).index, prices.index, check_names=False, exact=False
+    )
+
+
+def test_chunked_update_writes_all_rows(db_session):
+    """Test the chunked writer stores as many rows as the in-memory path"""
+    prices = create_minute_prices(1200)
+    for ts, row in prices.iterrows():
+        db_session.add(RawPrice(symbol="AAPL", timestamp=ts, **row.to_dict()))
+    db_session.commit()
+    counts = update_symbol_indicators_chunked(
+        db_session, "AAPL", chunk_size=300, warmup=100
+    )
+    assert counts["inserted"] == db_session.query(Indicator).count()
+    assert counts["inserted"] == len(indicator_rows(calculate_indicators(prices)))
@@ -0,0 +1,99 @@
+"""Tests for parallel indicator computation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from stockapp.db_models import Base, Indicator, RawPrice
+from stockapp.indicators import chunk_symbols, update_indicators_parallel
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA"]
+
+
+def create_database(path, seed=0):
+    """Create a file-backed SQLite database shared by worker processes"""
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start="2023-01-01", periods=80, freq="D")
+    for symbol in SYMBOLS:
+        closes = rng.normal(100, 5, len(dates))
+        for date, close in zip(dates, closes):
+            session.add(
+                RawPrice(
+                    symbol=symbol,
+                    timestamp=date.to_pydatetime(),
+                    open=close,
+                    high=close + 1,
+                    low=close - 1,
+                    close=close,
+                    volume=1000000,
+                )
+            )
+    session.commit()
+    session.close()
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return create_database(tmp_path / "prices.db")
+
+
+def count_indicators(database_url):
+    """Count indicator rows per symbol"""
+    session = sessionmaker(bind=create_engine(database_url))()
+    counts = {s: session.query(Indicator).filter_by(symbol=s).count() for s in SYMBOLS}
+    session.close()
+    return counts
+
+
+def stored_values(database_url):
+    """Indicator values keyed by (symbol, timestamp)"""
+    session = sessionmaker(bind=create_engine(database_url))()
+    rows = {(r.symbol, r.timestamp): r.values for r in session.query(Indicator)}
+    session.close()
+    return rows
+
+
+def test_chunk_symbols():
+    """Test sharding the symbol list into work units"""
+    assert chunk_symbols(SYMBOLS, 2) == [["AAPL", "MSFT"], ["GOOGL", "AMZN"], ["NVDA"]]
+    with pytest.raises(ValueError):
+        chunk_symbols(SYMBOLS, 0)
+
+
+def test_parallel_matches_sequential(tmp_path):
+    """Test that the process pool writes the same rows as one worker"""
+    parallel_url = create_database(tmp_path / "parallel.db")
+    sequential_url = create_database(tmp_path / "sequential.db")
+    parallel = update_indicators_parallel(
+        SYMBOLS, workers=2, chunk_size=2, database_url=parallel_url
+    )
+    sequential = update_indicators_parallel(
+        SYMBOLS, workers=1, chunk_size=2, database_url=sequential_url
+    )
+    assert parallel == sequential
+    assert all(counts["inserted"] > 0 for counts in parallel.values())
+    inserted = {symbol: counts["inserted"] for symbol, counts in parallel.items()}
+    assert count_indicators(parallel_url) == inserted
+    assert stored_values(parallel_url) == stored_values(sequential_url)
+
+
+def test_rerun_changes_nothing(database_url):
+    """Test a second run finds every row already stored"""
+    first = update_indicators_parallel(
+        SYMBOLS, workers=2, chunk_size=2, database_url=database_url
+    )
+    inserted = {symbol: counts["inserted"] for symbol, counts in first.items()}
+    again = update_indicators_parallel(
+        SYMBOLS, workers=1, chunk_size=2, database_url=database_url
+    )
+    assert all(counts["inserted"] == 0 for counts in again.values())
+    assert all(counts["updated"] == 0 for counts in again.values())
+    assert count_indicators(database_url) == inserted
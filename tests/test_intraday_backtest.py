@@ -0,0 +1,207 @@
+"""Tests for the event-driven minute-bar backtester."""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.intraday_backtest import (
+    BarIterator,
+    EventSignals,
+    IntradayBacktest,
+    OpeningRangeSignals,
+)
+from stockapp.panel import to_panel
+from stockapp.risk_manager import DailyLossLimitReached, RiskManager
+from stockapp.strategies.opening_range import detect_breakouts
+
+CONFIG = {"account": {"risk_per_trade_pct": 1, "max_daily_loss_pct": 3}}
+
+
+def minute_index(days=1, minutes=10):
+    """Minutes from 09:30 on consecutive weekdays"""
+    return pd.DatetimeIndex(
+        [
+            day + pd.Timedelta(hours=9, minutes=30 + m)
+            for day in pd.bdate_range("2024-01-02", periods=days)
+            for m in range(minutes)
+        ]
+    )
+
+
+def flat_bars(index, symbols=1, price=100.0):
+    """Bars that never move, to be edited by each test"""
+    shape = (len(index), symbols)
+    return {
+        name: np.full(shape, price) for name in ("open", "high", "low", "close")
+    } | {"volume": np.full(shape, 1000.0)}
+
+
+class Orders:
+    """Signal source with fixed (bar, symbol, stop, target) entries"""
+
+    def __init__(self, *orders):
+        self.orders = orders
+        self.resets = 0
+
+    def reset_session(self):
+        self.resets += 1
+
+    def on_bar(self, bar):
+        hits = [o for o in self.orders if o[0] == bar.t]
+        if not hits:
+            return None
+        return tuple(np.array([o[k] for o in hits]) for k in (1, 2, 3))
+
+
+def run(index, fields, *orders, cash=10000.0):
+    bars = BarIterator(
+        index, [f"S{i}" for i in range(fields["close"].shape[1])], **fields
+    )
+    backtest = IntradayBacktest(cash, RiskManager(cash, CONFIG))
+    return backtest.run(bars, Orders(*orders))
+
+
+def test_stop_checked_before_target():
+    """Test a bar touching both levels exits at the stop"""
+    index = minute_index()
+    fields = flat_bars(index)
+    fields["high"][3], fields["low"][3] = 110.0, 90.0
+    result = run(index, fields, (1, 0, 98.0, 104.0))
+    trade = result.trades.iloc[0]
+    # Risk 1% of 10000 over 2 per share
+    assert trade["shares"] == 50
+    assert (trade["exit_reason"], trade["exit_price"]) == ("stop", 98.0)
+    assert trade["exit_time"] == index[3]
+    assert result.portfolio_value.iloc[-1] == pytest.approx(10000 - 100)
+
+
+def test_gaps_fill_at_the_open():
+    """Test a bar opening beyond a level fills at the open"""
+    index = minute_index()
+    fields = flat_bars(index)
+    fields["open"][2] = fields["low"][2] = 95.0
+    fields["open"][6] = fields["high"][6] = 110.0
+    result = run(index, fields, (1, 0, 98.0, 104.0), (4, 0, 98.0, 104.0))
+    assert result.trades["exit_reason"].tolist() == ["stop", "target"]
+    assert result.trades["exit_price"].tolist() == [95.0, 110.0]
+
+
+def test_positions_flattened_at_session_end():
+    """Test open positions close on the last bar of each session"""
+    index = minute_index(days=2)
+    fields = flat_bars(index)
+    fields["close"][9] = 101.0
+    orders = Orders((2, 0, 98.0, 110.0), (12, 0, 98.0, 110.0))
+    bars = BarIterator(index, ["S0"], **fields)
+    result = IntradayBacktest(10000.0, RiskManager(10000.0, CONFIG)).run(bars, orders)
+    assert result.trades["exit_reason"].tolist() == ["session_end"] * 2
+    assert result.trades["exit_time"].tolist() == [index[9], index[19]]
+    assert result.trades["exit_price"].tolist() == [101.0, 100.0]
+    assert orders.resets == 2
+    assert result.positions["open_positions"].iloc[[9, 19]].tolist() == [0, 0]
+
+
+def test_daily_loss_limit_halts_until_next_session():
+    """Test reaching the loss limit flattens and blocks entries for the day"""
+    index = minute_index(days=2)
+    fields = flat_bars(index, symbols=3)
+    fields["low"][2, 0] = fields["low"][4, 1] = 90.0
+    result = run(
+        index,
+        fields,
+        (1, 0, 98.0, 110.0),
+        (1, 1, 98.0, 110.0),
+        (3, 2, 98.0, 110.0),
+        (5, 2, 98.0, 110.0),
+        (11, 0, 98.0, 110.0),
+    )
+    reasons = result.trades[["symbol", "exit_reason"]].values.tolist()
+    # Two 100 stops reach the 300 limit only with the third position's loss
+    assert reasons[:2] == [["S0", "stop"], ["S1", "stop"]]
+    assert len(result.trades[result.trades["exit_time"] < index[10]]) == 3
+    assert result.trades.iloc[3]["entry_time"] == index[11]
+
+
+def test_daily_loss_limit_triggers_flatten():
+    """Test the exit crossing the limit closes the remaining positions"""
+    config = {"account": {"risk_per_trade_pct": 1, "max_daily_loss_pct": 1}}
+    index = minute_index()
+    fields = flat_bars(index, symbols=2)
+    fields["low"][3, 0] = 90.0
+    fields["close"][3, 1] = 99.0
+    bars = BarIterator(index, ["S0", "S1"], **fields)
+    orders = Orders((1, 0, 98.0, 110.0), (1, 1, 98.0, 110.0), (5, 0, 98.0, 110.0))
+    result = IntradayBacktest(10000.0, RiskManager(10000.0, config)).run(bars, orders)
+    assert result.trades["exit_reason"].tolist() == ["stop", "daily_loss"]
+    assert result.trades["exit_time"].tolist() == [index[3], index[3]]
+    assert result.trades.iloc[1]["exit_price"] == 99.0
+
+
+def test_record_pl_raises_and_resets():
+    """Test the risk manager raises once the day's losses reach the limit"""
+    rm = RiskManager(10000, CONFIG)
+    rm.record_pl(-200)
+    rm.record_pl(500)
+    with pytest.raises(DailyLossLimitReached):
+        rm.record_pl(-100)
+    rm.reset_day()
+    rm.record_pl(-100)
+    assert rm.loss_today == 100
+
+
+def breakout_panel(days=5, symbols=4, seed=0):
+    """Random-walk minute bars with volume spikes"""
+    rng = np.random.default_rng(seed)
+    index = minute_index(days, 60)
+    frames = {}
+    for s in range(symbols):
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.002, len(index)))
+        spread = np.abs(rng.normal(0, 0.1, len(index)))
+        frames[f"S{s}"] = pd.DataFrame(
+            {
+                "open": np.r_[close[0], close[:-1]],
+                "high": close + spread,
+                "low": close - spread,
+                "close": close,
+                "volume": rng.integers(500, 3000, len(index)).astype(float),
+            },
+            index=index,
+        )
+    return to_panel(frames)
+
+
+def test_streaming_signals_match_detected_breakouts():
+    """Test the streaming tracker trades the same entries as detect_breakouts"""
+    panel = breakout_panel()
+    bars = BarIterator.from_panel(panel)
+    events = detect_breakouts(panel, 5, 1.5, 2)
+    assert len(events) > 5
+
+    def backtest():
+        return IntradayBacktest(10000.0, RiskManager(10000.0, CONFIG))
+
+    streamed = backtest().run(bars, OpeningRangeSignals(bars.symbols, 5, 1.5, 2))
+    replayed = backtest().run(bars, EventSignals(events, bars.index, bars.symbols))
+    pd.testing.assert_frame_equal(streamed.trades, replayed.trades)
+    pd.testing.assert_series_equal(streamed.portfolio_value, replayed.portfolio_value)
+    assert len(streamed.trades) > 0
+    entries = streamed.trades[["entry_time", "symbol"]].apply(tuple, axis=1)
+    assert set(entries) <= set(events[["timestamp", "symbol"]].apply(tuple, axis=1))
+
+
+def test_quarter_of_minutes_is_fast():
+    """Test a quarter of minute bars for several symbols runs in seconds"""
+    index = minute_index(63, 390)
+    rng = np.random.default_rng(1)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.001, (len(index), 20)), axis=0)
+    fields = {"open": close, "high": close * 1.001, "low": close * 0.999}
+    fields |= {"close": close, "volume": rng.uniform(500, 3000, close.shape)}
+    bars = BarIterator(index, [f"S{i}" for i in range(20)], **fields)
+    started = time.perf_counter()
+    result = IntradayBacktest(10000.0, RiskManager(10000.0, CONFIG)).run(
+        bars, OpeningRangeSignals(bars.symbols)
+    )
+    assert time.perf_counter() - started < 10
+    assert len(result.portfolio_value) == len(index)
@@ -0,0 +1,155 @@
+"""Tests for the vectorized opening range breakout engine."""
+
+import numpy as np
+import pandas as pd
+
+from stockapp.panel import to_panel
+from stockapp.strategies.opening_range import (
+    OpeningRangeTracker,
+    compute_opening_range,
+    detect_breakouts,
+    opening_range_levels,
+)
+
+SYMBOLS = [f"SYM{i}" for i in range(25)]
+
+
+def minute_panel(days=3, minutes=60, seed=0):
+    """Random minute bars for several sessions and symbols, with gaps"""
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(
+        [
+            ts
+            for day in pd.bdate_range("2024-01-02", periods=days)
+            for ts in pd.date_range(
+                day + pd.Timedelta("09:30:00"), periods=minutes, freq="min"
+            )
+        ]
+    )
+    frames = {}
+    for symbol in SYMBOLS:
+        close = 100 + np.cumsum(rng.normal(0, 0.3, len(index)))
+        frame = pd.DataFrame(
+            {
+                "high": close + rng.uniform(0, 0.2, len(index)),
+                "low": close - rng.uniform(0, 0.2, len(index)),
+                "close": close,
+                "volume": rng.integers(500, 3000, len(index)).astype(float),
+            },
+            index=index,
+        )
+        # Missing bars, as for thinly traded symbols
+        frame[rng.random(len(index)) < 0.05] = np.nan
+        frames[symbol] = frame
+    return to_panel(frames)
+
+
+def keys(events):
+    return sorted(
+        (ts, symbol, tuple(sorted(values.items())))
+        for ts, symbol, values in zip(
+            events["timestamp"], events["symbol"], events["values"]
+        )
+    )
+
+
+def test_compute_opening_range_lists_and_arrays():
+    """Test the helper works on one symbol's lists and on a symbol matrix"""
+    entry, stop = compute_opening_range([1, 3, 2, 9], [0.5, 1, 0.2, 0.1], 3)
+    assert (entry, stop) == (3, 0.2)
+    highs = np.array([[1.0, 5.0], [2.0, np.nan], [9.0, 9.0]])
+    entry, stop = compute_opening_range(highs, highs - 1, 2)
+    np.testing.assert_array_equal(entry, [2.0, 5.0])
+    np.testing.assert_array_equal(stop, [0.0, 4.0])
+
+
+def test_levels_match_per_symbol_helper():
+    """Test vectorized levels equal the helper applied per symbol and session"""
+    panel = minute_panel()
+    levels = opening_range_levels(panel, minutes=5, risk_reward_ratio=2)
+    for session in levels["high"].index:
+        day = panel[panel.index.normalize() == session]
+        for symbol in ["SYM0", "SYM7"]:
+            entry, stop = compute_opening_range(
+                day["high"][symbol].to_numpy(), day["low"][symbol].to_numpy(), 5
+            )
+            assert levels["entry"].loc[session, symbol] == entry
+            assert levels["stop"].loc[session, symbol] == stop
+            assert levels["target"].loc[session, symbol] == entry + 2 * (entry - stop)
+
+
+def test_one_breakout_per_symbol_and_session():
+    """Test breakouts are after the range, above it, on volume, and first only"""
+    panel = minute_panel()
+    events = detect_breakouts(panel, 5, 1.2, 2)
+    assert not events.empty
+    sessions = events["timestamp"].dt.normalize()
+    assert not pd.concat([sessions, events["symbol"]], axis=1).duplicated().any()
+    levels = opening_range_levels(panel, 5, 2)
+    for ts, symbol, values in zip(
+        events["timestamp"], events["symbol"], events["values"]
+    ):
+        session = ts.normalize()
+        assert ts >= session + pd.Timedelta("09:35:00")
+        assert panel.loc[ts, ("close", symbol)] > values["entry"]
+        assert values["volume"] >= 1.2 * levels["avg_volume"].loc[session, symbol]
+
+
+def test_streaming_tracker_matches_vectorized():
+    """Test the bar-by-bar tracker finds the same breakouts as the array engine"""
+    panel = minute_panel()
+    tracker = OpeningRangeTracker(SYMBOLS, 5, 1.2, 2)
+    streamed = []
+    for ts in panel.index:
+        row = panel.loc[ts]
+        bar = [
+            row[field].reindex(SYMBOLS).to_numpy()
+            for field in ["high", "low", "close", "volume"]
+        ]
+        streamed.append(tracker.update(ts, *bar))
+    streamed = pd.concat(streamed, ignore_index=True)
+    assert keys(streamed) == keys(detect_breakouts(panel, 5, 1.2, 2))
+
+
+def test_single_streaming_session_and_history_agree():
+    """Test evaluating one session alone matches that day of a multi-day run"""
+    panel = minute_panel()
+    history = detect_breakouts(panel, 5, 1.2, 2)
+    last_day = panel.index.normalize()[-1]
+    session = detect_breakouts(panel[panel.index.normalize() == last_day], 5, 1.2, 2)
+    assert keys(session) == keys(
+        history[history["timestamp"].dt.normalize() == last_day]
+    )
+
+
+def test_range_follows_time_of_day():
+    """Test pre-market bars and missing minutes do not shift the opening range"""
+    index = pd.DatetimeIndex(
+        ["2024-01-02 09:00", "2024-01-02 09:29"]
+        + [f"2024-01-02 09:{m}" for m in (30, 32, 33, 34, 35, 36)]
+    )
+    bars = pd.DataFrame(
+        {
+            "high": [110.0, 110.0, 101.0, 101.0, 102.0, 101.0, 102.5, 104.0],
+            "low": [90.0, 90.0, 99.0, 99.0, 99.0, 99.0, 100.0, 101.0],
+            "close": [100.0, 100.0, 100.0, 100.0, 101.0, 100.0, 102.2, 103.5],
+            "volume": [1000.0] * 6 + [2000.0, 2000.0],
+        },
+        index=index,
+    )
+    panel = to_panel({"AAPL": bars})
+    levels = opening_range_levels(panel, 5, 2)
+    # 09:30-09:34 with 09:31 missing; the 09:00 and 09:29 bars are pre-market
+    assert levels["high"].iloc[0, 0] == 102.0
+    assert levels["low"].iloc[0, 0] == 99.0
+    events = detect_breakouts(panel, 5, 1.5, 2)
+    # 09:34 is still in the range although it is the fourth regular bar
+    assert list(events["timestamp"]) == [pd.Timestamp("2024-01-02 09:35")]
+    tracker = OpeningRangeTracker(["AAPL"], 5, 1.5, 2)
+    streamed = pd.concat(
+        [
+            tracker.update(ts, *[[bar[f]] for f in bars.columns])
+            for ts, bar in bars.iterrows()
+        ]
+    )
+    assert keys(streamed) == keys(events)
@@ -0,0 +1,191 @@
+"""Tests for the event-driven signal pipeline."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from stockapp.db_models import Base, Indicator, RawPrice, Signal
+from stockapp.pipeline import SignalPipeline, notify_new_bar
+from stockapp.signal_engine import EVENT_COLUMNS
+from stockapp.strategies import (
+    Strategy,
+    StrategyRunner,
+    load_strategies,
+    register_strategy,
+)
+
+
+@register_strategy("test_close_below")
+class CloseBelow(Strategy):
+    """Sell every bar closing below a level"""
+
+    defaults = {"level": 150.0}
+    required_fields = ("close",)
+    lookback = 1
+
+    def evaluate(self, panel):
+        close = panel["close"].stack()
+        hits = close[close < self.params["level"]]
+        return pd.DataFrame(
+            {
+                "timestamp": hits.index.get_level_values(0),
+                "symbol": hits.index.get_level_values(1),
+                "signal_type": "SELL",
+                "reason": "CLOSE_BELOW",
+                "values": [{"close": float(c)} for c in hits],
+            },
+            columns=EVENT_COLUMNS,
+        )
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory sharing one in-memory database across threads"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    Base.metadata.drop_all(engine)
+
+
+def add_prices(db, symbol, closes):
+    """Store daily bars for a symbol"""
+    dates = pd.date_range(start="2024-01-01", periods=len(closes), freq="D")
+    for ts, close in zip(dates, closes):
+        db.add(
+            RawPrice(
+                symbol=symbol,
+                timestamp=ts,
+                open=close,
+                high=close,
+                low=close,
+                close=close,
+                volume=1000,
+            )
+        )
+    db.commit()
+    return dates
+
+
+async def run_events(pipeline, events):
+    """Publish bar events and wait for the pipeline to process them"""
+    signals = pipeline.subscribe()
+    pipeline.start()
+    for symbol, ts in events:
+        await pipeline.publish_bar(symbol, ts)
+    await pipeline.drain()
+    await pipeline.stop()
+    published = []
+    while not signals.empty():
+        published.append(signals.get_nowait())
+    return published
+
+
+def test_bar_event_updates_only_affected_symbol(session_factory):
+    """Test a bar event updates indicators and signals for its symbol only"""
+    db = session_factory()
+    # Steadily falling closes leave AAPL oversold on the last bar
+    dates = add_prices(db, "AAPL", np.linspace(200, 100, 80))
+    add_prices(db, "MSFT", np.linspace(100, 200, 80))
+    pipeline = SignalPipeline(session_factory, batch_window=0.01)
+
+    published = asyncio.run(
+        run_events(pipeline, [("AAPL", dates[-1]), ("AAPL", dates[-1])])
+    )
+
+    assert db.query(Indicator).filter(Indicator.symbol == "MSFT").count() == 0
+    assert db.query(Indicator).filter(Indicator.symbol == "AAPL").count() > 0
+    stored = db.query(Signal).all()
+    assert [(s.symbol, s.reason) for s in stored] == [("AAPL", "RSI_OVERSOLD")]
+    assert [(r["symbol"], r["reason"]) for r in published] == [("AAPL", "RSI_OVERSOLD")]
+    db.close()
+
+
+def test_every_bar_in_a_batch_is_evaluated(session_factory):
+    """Test several bars of one symbol in one batch each get their signals"""
+    db = session_factory()
+    dates = add_prices(db, "AAPL", np.linspace(200, 100, 80))
+    pipeline = SignalPipeline(session_factory, batch_window=0.5)
+
+    published = asyncio.run(
+        run_events(pipeline, [("AAPL", dates[-3]), ("AAPL", dates[-1])])
+    )
+
+    expected = [(dates[-3], "RSI_OVERSOLD"), (dates[-1], "RSI_OVERSOLD")]
+    assert [(r["timestamp"], r["reason"]) for r in published] == expected
+    assert db.query(Signal).count() == 2
+    db.close()
+
+
+def test_registered_plugin_signals_are_published(session_factory):
+    """Test the pipeline publishes signals of a strategy enabled by name"""
+    db = session_factory()
+    dates = add_prices(db, "AAPL", np.linspace(200, 100, 80))
+    runner = StrategyRunner(load_strategies({"strategies": {"test_close_below": {}}}))
+    pipeline = SignalPipeline(session_factory, batch_window=0.01, runner=runner)
+
+    published = asyncio.run(run_events(pipeline, [("AAPL", dates[-1])]))
+
+    assert [(r["timestamp"], r["reason"]) for r in published] == [
+        (dates[-1], "CLOSE_BELOW")
+    ]
+    assert [(s.symbol, s.reason) for s in db.query(Signal)] == [("AAPL", "CLOSE_BELOW")]
+    db.close()
+
+
+def test_latency_recorded_per_stage(session_factory):
+    """Test every stage records its latency"""
+    db = session_factory()
+    dates = add_prices(db, "AAPL", np.linspace(200, 100, 80))
+    db.close()
+    pipeline = SignalPipeline(session_factory, batch_window=0.01)
+    asyncio.run(run_events(pipeline, [("AAPL", dates[-1])]))
+
+    summary = pipeline.latency.summary()
+    assert set(summary) == {"indicators", "signals", "publish", "end_to_end"}
+    assert summary["end_to_end"]["count"] == 1
+    assert summary["end_to_end"]["max_ms"] >= summary["indicators"]["max_ms"]
+
+
+def test_failed_batch_does_not_stop_pipeline(session_factory, monkeypatch):
+    """Test a failing indicator update is logged and later bars still flow"""
+    db = session_factory()
+    dates = add_prices(db, "AAPL", np.linspace(200, 100, 80))
+    db.close()
+    pipeline = SignalPipeline(session_factory, batch_window=0.01)
+    calls = []
+    original = pipeline._update_indicators
+
+    def flaky(symbols):
+        calls.append(symbols)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        original(symbols)
+
+    monkeypatch.setattr(pipeline, "_update_indicators", flaky)
+
+    async def scenario():
+        signals = pipeline.subscribe()
+        pipeline.start()
+        await pipeline.publish_bar("AAPL", dates[-1])
+        await pipeline.drain()
+        await pipeline.publish_bar("AAPL", dates[-1])
+        await pipeline.drain()
+        await pipeline.stop()
+        return signals.qsize()
+
+    assert asyncio.run(scenario()) == 1
+    assert len(calls) == 2
+
+
+def test_notify_is_noop_without_postgres(db_session):
+    """Test new-bar notifications are skipped on SQLite"""
+    notify_new_bar(db_session, "AAPL", pd.Timestamp("2024-01-01"))
@@ -0,0 +1,155 @@
+"""Tests for the shared-cash portfolio backtest with account risk limits."""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from stockapp.portfolio_backtest import PortfolioBacktest
+from stockapp.risk_manager import RiskManager
+
+CONFIG = {
+    "account": {
+        "initial_balance": 10000,
+        "risk_per_trade_pct": 1,
+        "max_daily_loss_pct": 3,
+        "max_open_positions": 2,
+    }
+}
+
+
+def close_panel(close, start="2024-01-02", freq="B"):
+    """Daily close panel from a (time, symbol) array"""
+    close = np.asarray(close, dtype=float)
+    index = pd.date_range(start, periods=len(close), freq=freq)
+    columns = pd.MultiIndex.from_product(
+        [["close"], [f"S{i}" for i in range(close.shape[1])]]
+    )
+    return pd.DataFrame(close, index=index, columns=columns)
+
+
+def grid(shape, *cells):
+    mask = np.zeros(shape, dtype=bool)
+    for t, s in cells:
+        mask[t, s] = True
+    return mask
+
+
+def backtest(**kwargs):
+    return PortfolioBacktest(config=CONFIG, **kwargs)
+
+
+def test_open_positions_capped_by_score():
+    """Test competing entries fill the free slots, best score first"""
+    panel = close_panel(np.full((5, 3), 100.0))
+    entries = grid((5, 3), (1, 0), (1, 1), (1, 2))
+    scores = np.tile([1.0, 3.0, 2.0], (5, 1))
+    result = backtest().run(panel, entries, scores=scores)
+    assert sorted(result.trades["symbol"]) == ["S1", "S2"]
+    # Each position takes an equal slot of equity
+    assert result.trades["shares"].tolist() == [50, 50]
+    assert result.positions["open_positions"].tolist() == [0, 2, 2, 2, 0]
+    assert result.trades["exit_reason"].tolist() == ["end", "end"]
+
+
+def test_exit_frees_a_slot_and_cash():
+    """Test an exit signal makes room for a later entry"""
+    close = np.full((6, 3), 100.0)
+    close[2:, 0] = 110.0
+    panel = close_panel(close)
+    entries = grid((6, 3), (1, 0), (1, 1), (2, 2), (4, 2))
+    exits = grid((6, 3), (3, 0))
+    result = backtest().run(panel, entries, exits)
+    trades = result.trades.set_index("symbol")
+    assert trades.loc["S0", "exit_reason"] == "signal"
+    assert trades.loc["S0", "pnl"] == pytest.approx(500.0)
+    # S2's first entry found no free slot; the second one, after S0 left, did
+    assert trades.loc["S2", "entry_time"] == panel.index[4]
+    assert trades.loc["S2", "shares"] == 52
+    assert result.portfolio_value.iloc[-1] == pytest.approx(10500.0)
+
+
+def test_daily_loss_stop_flattens_and_blocks_the_day():
+    """Test a drop past the daily limit closes everything until the next day"""
+    close = np.full((6, 2), 100.0)
+    close[3:, 0] = 90.0
+    panel = close_panel(close)
+    entries = grid((6, 2), (1, 0), (3, 1), (4, 1))
+    result = backtest().run(panel, entries)
+    first, second = result.trades.to_dict("records")
+    assert (first["symbol"], first["exit_reason"]) == ("S0", "daily_loss")
+    assert first["exit_time"] == panel.index[3]
+    # The entry on the halted day was skipped, the next day's was taken
+    assert second["entry_time"] == panel.index[4]
+
+
+def test_stops_targets_and_session_flattening():
+    """Test intrabar exits and end-of-day flattening on minute bars"""
+    index = pd.DatetimeIndex(
+        [
+            day + pd.Timedelta(hours=9, minutes=30 + m)
+            for day in pd.bdate_range("2024-01-02", periods=2)
+            for m in range(5)
+        ]
+    )
+    flat = np.full((10, 3), 100.0)
+    fields = {"open": flat.copy(), "high": flat.copy(), "low": flat.copy()}
+    fields["close"] = flat.copy()
+    fields["low"][2, 0] = 97.0
+    fields["open"][3, 1] = fields["high"][3, 1] = 106.0
+    panel = pd.concat(
+        {
+            name: pd.DataFrame(values, index=index, columns=["S0", "S1", "S2"])
+            for name, values in fields.items()
+        },
+        axis=1,
+    )
+    entries = grid((10, 3), (1, 0), (1, 1), (6, 2))
+    stops = np.full((10, 3), 98.0)
+    targets = np.full((10, 3), 104.0)
+    result = PortfolioBacktest(
+        config=CONFIG, max_open_positions=3, flatten_daily=True
+    ).run(panel, entries, stops=stops, targets=targets)
+    trades = result.trades.set_index("symbol")
+    assert trades["exit_reason"].to_dict() == {
+        "S0": "stop",
+        "S1": "target",
+        "S2": "end",
+    }
+    assert trades["exit_price"].tolist() == [98.0, 106.0, 100.0]
+    # 1% risk over a 2 stop, capped at a third of equity
+    assert trades.loc["S0", "shares"] == 33
+
+
+def test_settings_supply_the_account_limits(tmp_path):
+    """Test the limits default to the account section of settings.yaml"""
+    path = tmp_path / "settings.yaml"
+    path.write_text(yaml.safe_dump(CONFIG))
+    engine = PortfolioBacktest.from_settings(str(path))
+    assert engine.initial_cash == 10000
+    assert engine.max_open_positions == 2
+    assert engine.risk_manager.daily_loss_limit == pytest.approx(300)
+    explicit = PortfolioBacktest(5000, 3, RiskManager(5000, CONFIG))
+    assert (explicit.initial_cash, explicit.max_open_positions) == (5000, 3)
+    with pytest.raises(ValueError):
+        PortfolioBacktest(5000, 0, RiskManager(5000, CONFIG))
+
+
+def test_five_hundred_symbols_is_fast():
+    """Test ten years of daily bars for 500 symbols runs in seconds"""
+    rng = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, (2520, 500)), axis=0)
+    panel = close_panel(close)
+    entries = rng.random(close.shape) < 0.02
+    exits = rng.random(close.shape) < 0.05
+    started = time.perf_counter()
+    result = PortfolioBacktest(100000.0, 20, RiskManager(100000.0, CONFIG)).run(
+        panel, entries, exits, scores=rng.random(close.shape)
+    )
+    assert time.perf_counter() - started < 10
+    assert result.positions["open_positions"].max() == 20
+    assert result.trades["pnl"].sum() == pytest.approx(
+        result.portfolio_value.iloc[-1] - 100000.0
+    )
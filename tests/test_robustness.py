@@ -0,0 +1,100 @@
+"""Tests for bootstrap and trade-shuffle robustness analysis."""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.backtest import Backtest
+from stockapp.robustness import (
+    path_metrics,
+    resample_indices,
+    run_robustness,
+    trade_returns,
+)
+
+
+def backtest_result(days=750, symbols=4, seed=0):
+    """Backtest of random entries and exits on random-walk closes"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.015, (days, symbols)), axis=0)
+    index = pd.bdate_range("2020-01-01", periods=days)
+    columns = pd.MultiIndex.from_product([["close"], [f"S{i}" for i in range(symbols)]])
+    panel = pd.DataFrame(close, index=index, columns=columns)
+    entries = rng.random(close.shape) < 0.05
+    exits = rng.random(close.shape) < 0.05
+    return Backtest(10000.0).run(panel, entries, exits)
+
+
+def test_identity_path_reproduces_backtest_metrics():
+    """Test resample metrics use the backtest's own definitions"""
+    result = backtest_result()
+    index = result.portfolio_value.index
+    years = (index[-1] - index[0]).days / 365.25
+    metrics = path_metrics(result.returns.to_numpy()[None, :], years, 252)
+    for name, values in metrics.items():
+        assert values[0] == pytest.approx(result.metrics[name])
+
+
+def test_resample_index_shapes():
+    """Test bootstrap, block bootstrap and permutation draws"""
+    rng = np.random.default_rng(0)
+    draws = resample_indices(10, 50, rng)
+    assert draws.shape == (50, 10) and draws.min() >= 0 and draws.max() < 10
+    blocks = resample_indices(10, 50, rng, block=4)
+    assert blocks.shape == (50, 10)
+    assert (np.diff(blocks[:, :4], axis=1) == 1).all()
+    shuffled = resample_indices(10, 50, rng, replace=False)
+    assert (np.sort(shuffled, axis=1) == np.arange(10)).all()
+
+
+def test_trade_shuffle_keeps_final_return():
+    """Test reordering trades changes drawdown but not compounded return"""
+    result = backtest_result()
+    report = run_robustness(result, "trade_shuffle", resamples=500, seed=1)
+    growth = np.prod(1 + trade_returns(result)) - 1
+    np.testing.assert_allclose(report.samples["total_return"], growth)
+    assert report.samples["max_drawdown"].std() > 0
+    assert list(report.bands.columns) == ["observed", "p5", "p25", "p50", "p75", "p95"]
+    assert (
+        report.bands.loc["max_drawdown", "p5"]
+        <= report.bands.loc["max_drawdown", "p95"]
+    )
+
+
+def test_bootstrap_bands_surround_the_observed_run():
+    """Test the observed Sharpe falls inside the bootstrap band"""
+    result = backtest_result()
+    report = run_robustness(result, resamples=2000, seed=2)
+    bands = report.bands.loc["sharpe_ratio"]
+    assert bands["p5"] < result.sharpe_ratio < bands["p95"]
+    assert 0 <= report.probability("total_return") <= 1
+    again = run_robustness(result, resamples=2000, seed=2)
+    pd.testing.assert_frame_equal(report.bands, again.bands)
+
+
+def test_batches_bound_memory(monkeypatch):
+    """Test resamples are processed in batches without changing the count"""
+    from stockapp import robustness
+
+    monkeypatch.setattr(robustness, "BATCH_ELEMENTS", 10_000)
+    report = run_robustness(backtest_result(), "trade_bootstrap", resamples=777)
+    assert len(report.samples) == 777
+
+
+def test_invalid_requests():
+    """Test unknown methods and too little history are rejected"""
+    result = backtest_result()
+    with pytest.raises(ValueError):
+        run_robustness(result, "jackknife")
+    with pytest.raises(ValueError):
+        run_robustness(result, resamples=0)
+
+
+def test_thousands_of_resamples_are_fast():
+    """Test 5000 bootstrap paths of ten years run in a few seconds"""
+    result = backtest_result(days=2520, symbols=2)
+    started = time.perf_counter()
+    run_robustness(result, resamples=5000, seed=0)
+    assert time.perf_counter() - started < 10
@@ -0,0 +1,311 @@
+"""Tests for the pre-market scanner."""
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.db_models import RawPrice
+from stockapp.panel import to_panel
+from stockapp.scanner import (
+    CRITERIA,
+    INTRADAY_CRITERIA,
+    IntradayScanner,
+    PremarketScanner,
+    TopN,
+    load_scan_baseline,
+    premarket_scan,
+    run_scan,
+)
+from stockapp.volume_profile import VolumeProfile
+
+BAR_FIELDS = ("high", "low", "close", "volume")
+
+
+def universe(count, seed=0):
+    """Random baseline and quotes for count symbols"""
+    rng = np.random.default_rng(seed)
+    symbols = [f"S{i:04d}" for i in range(count)]
+    prev_close = rng.uniform(5, 500, count)
+    baseline = pd.DataFrame(
+        {"prev_close": prev_close, "avg_volume": rng.uniform(1e5, 1e7, count)},
+        index=symbols,
+    )
+    quotes = pd.DataFrame(
+        {
+            "price": prev_close * (1 + rng.normal(0, 0.03, count)),
+            "volume": rng.uniform(0, 1e6, count),
+        },
+        index=symbols,
+    )
+    return baseline, quotes
+
+
+def brute_force_top(scanner, criterion, n):
+    """Top n symbols for a criterion by sorting every metric"""
+    column, direction = CRITERIA[criterion]
+    metrics = pd.DataFrame(
+        scanner.values,
+        index=scanner.baseline.index,
+        columns=["price", "volume", "gap_pct", "rel_volume"],
+    )
+    scores = (direction * metrics[column]).dropna()
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [symbol for symbol, _ in ranked[:n]]
+
+
+def test_premarket_scan_top_n():
+    """Test the list-of-dicts scan still returns the top gaps"""
+    data = [
+        {"symbol": "A", "gap_pct": 1.0, "volume": 10},
+        {"symbol": "B", "gap_pct": 5.0, "volume": 10},
+        {"symbol": "C", "gap_pct": 3.0, "volume": 10},
+    ]
+    assert premarket_scan(data, top_n=2) == ["B", "C"]
+
+
+@pytest.mark.parametrize("criterion", list(CRITERIA))
+def test_scan_matches_brute_force(criterion):
+    """Test a full scan ranks every criterion like a plain sort"""
+    baseline, quotes = universe(500)
+    scanner = PremarketScanner(baseline, criteria=list(CRITERIA), top_n=10)
+    results = scanner.scan(quotes)
+    assert results[criterion]["symbol"].tolist() == brute_force_top(
+        scanner, criterion, 10
+    )
+
+
+def test_scan_skips_symbols_without_quotes():
+    """Test symbols missing a quote or baseline are left out of rankings"""
+    baseline, quotes = universe(50)
+    baseline.iloc[0, 0] = np.nan
+    quotes = quotes.drop(quotes.index[1])
+    scanner = PremarketScanner(baseline, top_n=50)
+    ranked = scanner.scan(quotes)["gap_up"]["symbol"].tolist()
+    assert baseline.index[0] not in ranked
+    assert baseline.index[1] not in ranked
+    assert len(ranked) == 48
+
+
+def test_streaming_matches_brute_force():
+    """Test random streamed quotes keep every ranking exact"""
+    baseline, quotes = universe(200, seed=1)
+    scanner = PremarketScanner(baseline, criteria=list(CRITERIA), top_n=5)
+    scanner.scan(quotes)
+    rng = np.random.default_rng(2)
+    symbols = baseline.index.tolist()
+    for step in range(3000):
+        symbol = symbols[rng.integers(len(symbols))]
+        price = baseline.loc[symbol, "prev_close"] * (1 + rng.normal(0, 0.05))
+        volume = np.nan if step % 97 == 0 else rng.uniform(0, 2e6)
+        scanner.on_quote(symbol, price, volume)
+    for criterion in CRITERIA:
+        assert scanner.top(criterion)["symbol"].tolist() == brute_force_top(
+            scanner, criterion, 5
+        )
+
+
+def test_on_quote_reports_changed_criteria():
+    """Test on_quote reports only rankings whose members changed"""
+    baseline, quotes = universe(20)
+    scanner = PremarketScanner(baseline, criteria=["gap_up", "gap_down"], top_n=3)
+    scanner.scan(quotes)
+    symbol = next(
+        s for s in baseline.index if s not in scanner.rankings["gap_up"].members
+    )
+    changed = scanner.on_quote(symbol, baseline.loc[symbol, "prev_close"] * 2, 1e5)
+    assert "gap_up" in changed
+    assert scanner.top("gap_up")["symbol"].iloc[0] == symbol
+    assert scanner.on_quote("UNKNOWN", 10.0, 100) == []
+
+
+def test_top_n_handles_drops_and_nan():
+    """Test members losing ground or going NaN are replaced"""
+    top = TopN(2)
+    top.load({"A": 3.0, "B": 2.0, "C": 1.0})
+    assert top.update("A", 0.5) is True
+    assert [s for s, _ in top.top()] == ["B", "C"]
+    assert top.update("B", np.nan) is True
+    assert [s for s, _ in top.top()] == ["C", "A"]
+    assert top.update("D", 0.1) is False
+    with pytest.raises(ValueError):
+        TopN(0)
+
+
+def test_top_n_heap_stays_bounded():
+    """Test rising member scores do not grow the heap without limit"""
+    top = TopN(3)
+    top.load({"A": 1.0, "B": 2.0, "C": 3.0, "D": 0.5})
+    for step in range(1, 1000):
+        assert top.update("ABC"[step % 3], 3.0 + step) is False
+        assert len(top._heap) <= 4 * top.n
+    assert top.members == {"A", "B", "C"}
+    assert top.update("D", 2000.0) is True
+    assert [s for s, _ in top.top()][0] == "D"
+
+
+def test_load_scan_baseline(db_session):
+    """Test the baseline uses the latest close and recent average volume"""
+    start = datetime(2024, 1, 1)
+    for day in range(30):
+        for symbol, base in (("AAPL", 100.0), ("MSFT", 200.0)):
+            db_session.add(
+                RawPrice(
+                    symbol=symbol,
+                    timestamp=start + timedelta(days=day),
+                    open=base + day,
+                    high=base + day,
+                    low=base + day,
+                    close=base + day,
+                    volume=1000 * (day + 1),
+                )
+            )
+    db_session.commit()
+
+    baseline = load_scan_baseline(db_session, ["AAPL", "MSFT", "NONE"], days=20)
+    assert baseline.loc["AAPL", "prev_close"] == 129.0
+    assert baseline.loc["MSFT", "prev_close"] == 229.0
+    # Volumes of the last 20 days: 11000..30000
+    assert baseline.loc["AAPL", "avg_volume"] == pytest.approx(20500.0)
+    assert np.isnan(baseline.loc["NONE", "prev_close"])
+
+    quotes = pd.DataFrame(
+        {"price": [258.0, 129.0], "volume": [1000.0, 41000.0]},
+        index=["MSFT", "AAPL"],
+    )
+    results = run_scan(db_session, ["AAPL", "MSFT"], top_n=1, quotes=quotes)
+    assert results["gap_up"]["symbol"].tolist() == ["MSFT"]
+    assert results["rel_volume"]["symbol"].tolist() == ["AAPL"]
+
+
+def test_scan_2500_symbols_is_fast():
+    """Test a full-universe scan stays well under a second"""
+    baseline, quotes = universe(2500)
+    scanner = PremarketScanner(baseline, criteria=list(CRITERIA))
+    start = time.perf_counter()
+    scanner.scan(quotes)
+    assert time.perf_counter() - start < 1.0
+
+
+def session_panel(baseline, minutes=30, day="2024-01-02", seed=3):
+    """Random-walk minute bars for every baseline symbol"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(f"{day} 09:30", periods=minutes, freq="min")
+    frames = {}
+    for symbol, prev_close in baseline["prev_close"].items():
+        close = prev_close * np.cumprod(1 + rng.normal(0, 0.01, minutes))
+        frames[symbol] = pd.DataFrame(
+            {
+                "high": close * 1.002,
+                "low": close * 0.998,
+                "close": close,
+                "volume": rng.uniform(100, 10_000, minutes),
+            },
+            index=index,
+        )
+    return to_panel(frames)
+
+
+def expected_intraday(baseline, panel, opening_range_minutes=5):
+    """Brute-force intraday metrics from the whole panel"""
+    close = panel["close"][baseline.index]
+    volume = panel["volume"][baseline.index]
+    high = panel["high"][baseline.index]
+    low = panel["low"][baseline.index]
+    typical = (high + low + close) / 3
+    minutes = len(panel.index)
+    range_high = high.iloc[:opening_range_minutes].max()
+    return pd.DataFrame(
+        {
+            "volume": volume.sum(),
+            "vwap": (typical * volume).sum() / volume.sum(),
+            "high": high.max(),
+            "low": low.min(),
+            "change_pct": (close.iloc[-1] / baseline["prev_close"] - 1) * 100,
+            "rel_volume": volume.sum() / (baseline["avg_volume"] * minutes / 390),
+            "range_distance_pct": (close.iloc[-1] / range_high - 1) * 100,
+        }
+    )
+
+
+def test_intraday_metrics_match_brute_force():
+    """Test running aggregates match metrics recomputed from every bar"""
+    baseline, _ = universe(50)
+    panel = session_panel(baseline)
+    scanner = IntradayScanner(baseline, criteria=list(INTRADAY_CRITERIA))
+    assert scanner.feed_panel(panel) == 50 * 30
+    metrics = scanner.metrics()
+    expected = expected_intraday(baseline, panel)
+    for column in expected.columns:
+        np.testing.assert_allclose(metrics[column], expected[column], rtol=1e-9)
+
+
+@pytest.mark.parametrize("criterion", list(INTRADAY_CRITERIA))
+def test_intraday_rankings_match_brute_force(criterion):
+    """Test per-bar and batched updates rank like a full sort"""
+    baseline, _ = universe(80, seed=4)
+    panel = session_panel(baseline, minutes=20)
+    batched = IntradayScanner(baseline, criteria=list(INTRADAY_CRITERIA), top_n=8)
+    batched.feed_panel(panel)
+    streamed = IntradayScanner(baseline, criteria=list(INTRADAY_CRITERIA), top_n=8)
+    values = {f: panel[f][baseline.index].to_numpy() for f in BAR_FIELDS}
+    for t, timestamp in enumerate(panel.index):
+        for s, symbol in enumerate(baseline.index):
+            bar = {f: values[f][t, s] for f in BAR_FIELDS}
+            streamed.on_bar(symbol, timestamp, bar)
+
+    column, direction = INTRADAY_CRITERIA[criterion]
+    scores = (direction * batched.metrics()[column]).dropna()
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    expected = [symbol for symbol, _ in ranked[:8]]
+    assert batched.top(criterion)["symbol"].tolist() == expected
+    assert streamed.top(criterion)["symbol"].tolist() == expected
+
+
+def test_intraday_subscribers_and_session_reset():
+    """Test subscribers hear about ranking changes and a new day resets state"""
+    baseline, _ = universe(10)
+    scanner = IntradayScanner(baseline, criteria=["change_up"], top_n=3)
+    pushed = []
+    scanner.subscribe(lambda criterion, ranked: pushed.append((criterion, ranked)))
+    scanner.feed_panel(session_panel(baseline, minutes=3))
+    assert pushed and pushed[0][0] == "change_up"
+    assert list(pushed[-1][1].columns) == ["symbol"] + [
+        "price",
+        "volume",
+        "vwap",
+        "high",
+        "low",
+        "change_pct",
+        "rel_volume",
+        "range_distance_pct",
+    ]
+
+    symbol = baseline.index[0]
+    scanner.on_bar(
+        symbol,
+        pd.Timestamp("2024-01-03 09:30"),
+        {"high": 1.0, "low": 1.0, "close": 1.0, "volume": 50},
+    )
+    assert scanner.metrics()["volume"].sum() == 50
+    assert len(scanner.rankings["change_up"]) == 1
+    # Outside the regular session and unknown symbols are ignored
+    assert scanner.on_bar(symbol, pd.Timestamp("2024-01-03 08:00"), {}) == []
+    assert scanner.on_bar("NONE", pd.Timestamp("2024-01-03 09:31"), {}) == []
+
+
+def test_intraday_profile_relative_volume():
+    """Test a volume profile sets the expected cumulative volume"""
+    baseline, _ = universe(3)
+    history = session_panel(baseline, minutes=390, day="2024-01-01")
+    profile = VolumeProfile.from_panel(history, sessions=1)
+    scanner = IntradayScanner(baseline, profile=profile)
+    today = session_panel(baseline, minutes=10)
+    scanner.feed_panel(today)
+    symbol = baseline.index[0]
+    expected = history["volume"][symbol].iloc[:10].sum()
+    assert scanner.metrics().loc[symbol, "rel_volume"] == pytest.approx(
+        today["volume"][symbol].sum() / expected
+    )
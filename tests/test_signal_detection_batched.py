@@ -0,0 +1,95 @@
+"""Tests for batched multi-symbol signal detection."""
+
+import pandas as pd
+import pytest
+from sqlalchemy import event
+
+from stockapp.db_models import Indicator, Signal
+from stockapp.signal_engine import detect_signals, save_signals
+
+SYMBOLS = [f"SYM{i}" for i in range(20)]
+
+
+def add_indicators(db_session):
+    """Store indicators where even symbols cross above on the last bar
+    and SYM1 is oversold"""
+    dates = pd.date_range(start="2023-01-01", periods=15, freq="D")
+    for n, symbol in enumerate(SYMBOLS):
+        for i, ts in enumerate(dates):
+            crossed = n % 2 == 0 and i == len(dates) - 1
+            db_session.add(
+                Indicator(
+                    symbol=symbol,
+                    timestamp=ts,
+                    values={
+                        "sma_20": 101.0 if crossed else 99.0,
+                        "ema_50": 100.0,
+                        "rsi_14": 25.0 if symbol == "SYM1" else 50.0,
+                    },
+                )
+            )
+    db_session.commit()
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    """Count SQL statements sent to the database"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(db_engine, "before_cursor_execute", count)
+
+
+def signal_keys(db_session):
+    """Stored signals as comparable tuples"""
+    return sorted(
+        (s.symbol, s.timestamp, s.signal_type, s.details["reason"])
+        for s in db_session.query(Signal).all()
+    )
+
+
+def test_batched_matches_per_symbol(db_session):
+    """Test batched detection writes the same signals as the per-symbol loop"""
+    add_indicators(db_session)
+    detect_signals(db_session, SYMBOLS, batched=False)
+    expected = signal_keys(db_session)
+    db_session.query(Signal).delete()
+    db_session.commit()
+
+    written = detect_signals(db_session, SYMBOLS)
+    assert signal_keys(db_session) == expected
+    # Ten crossovers on even symbols plus the oversold RSI on SYM1
+    assert len(written) == len(expected) == 11
+
+
+def test_batched_query_count_is_constant(db_session, query_counter):
+    """Test the number of round trips does not grow with the universe"""
+    add_indicators(db_session)
+    query_counter.clear()
+    detect_signals(db_session, SYMBOLS)
+    assert len(query_counter) <= 3
+
+
+def test_batched_skips_existing(db_session):
+    """Test re-running does not duplicate signals"""
+    add_indicators(db_session)
+    assert detect_signals(db_session, SYMBOLS)
+    assert detect_signals(db_session, SYMBOLS) == []
+    assert detect_signals(db_session, ["MISSING"]) == []
+
+
+def test_save_signals_counts_only_new_rows(db_session):
+    """Test signals skipped as already stored are not reported as saved"""
+    timestamp = pd.Timestamp("2023-01-02")
+    signals = [
+        {"signal_type": "BUY", "reason": "MA_CROSSOVER", "values": {"rsi": 50.0}},
+        {"signal_type": "BUY", "reason": "RSI_OVERSOLD", "values": {"rsi": 25.0}},
+    ]
+    assert save_signals(db_session, "AAPL", timestamp, signals[:1]) == 1
+    assert save_signals(db_session, "AAPL", timestamp, signals) == 1
+    assert save_signals(db_session, "AAPL", timestamp, signals) == 0
+    assert db_session.query(Signal).count() == 2
@@ -0,0 +1,113 @@
+"""Tests for vectorized full-history signal detection."""
+
+import numpy as np
+import pandas as pd
+
+from stockapp.panel import to_panel
+from stockapp.signal_engine import (
+    crossover_masks,
+    detect_ma_crossover,
+    detect_panel_events,
+    detect_rsi_signals,
+    detect_signal_events,
+)
+
+
+def create_indicator_frame(rows=300):
+    """Create indicators with frequent crossovers, threshold hits and NaNs"""
+    dates = pd.date_range(start="2023-01-01", periods=rows, freq="D")
+    close = 100 + np.cumsum(np.random.normal(0, 1, rows))
+    df = pd.DataFrame(
+        {
+            "sma_20": pd.Series(close).rolling(5).mean().to_numpy(),
+            "ema_50": pd.Series(close).ewm(span=10).mean().to_numpy(),
+            "rsi_14": np.random.uniform(0, 100, rows),
+        },
+        index=dates,
+    )
+    # Exact ties exercise the <= / >= edges of the crossover rule
+    df.iloc[50, df.columns.get_loc("sma_20")] = df["ema_50"].iloc[50]
+    return df
+
+
+def reference_ma(prev_row, curr_row):
+    """Original row-by-row crossover rule"""
+    if (
+        prev_row["sma_20"] <= prev_row["ema_50"]
+        and curr_row["sma_20"] > curr_row["ema_50"]
+    ):
+        return [("BUY", "SMA_20_CROSS_ABOVE_EMA_50")]
+    elif (
+        prev_row["sma_20"] >= prev_row["ema_50"]
+        and curr_row["sma_20"] < curr_row["ema_50"]
+    ):
+        return [("SELL", "SMA_20_CROSS_BELOW_EMA_50")]
+    return []
+
+
+def reference_rsi(curr_row):
+    """Original row-by-row RSI rule"""
+    if curr_row["rsi_14"] < 30:
+        return [("BUY", "RSI_OVERSOLD")]
+    elif curr_row["rsi_14"] > 70:
+        return [("SELL", "RSI_OVERBOUGHT")]
+    return []
+
+
+def reference_events(df):
+    """Slide the original rules over every bar, as the old backtest did"""
+    events = []
+    for i in range(len(df)):
+        found = reference_ma(df.iloc[i - 1], df.iloc[i]) if i > 0 else []
+        found += reference_rsi(df.iloc[i])
+        events += [(df.index[i], t, r) for t, r in found]
+    return events
+
+
+def test_vectorized_matches_row_by_row():
+    """Test the vectorized detector finds exactly the original events"""
+    df = create_indicator_frame()
+    events = detect_signal_events(df)
+    found = list(zip(events["timestamp"], events["signal_type"], events["reason"]))
+    assert found == reference_events(df)
+    assert len(found) > 0
+
+
+def test_live_functions_use_last_row():
+    """Test the live helpers report events on the latest bar only"""
+    df = create_indicator_frame(60)
+    events = detect_signal_events(df)
+    for i in range(1, len(df)):
+        window = df.iloc[: i + 1]
+        live = detect_ma_crossover(window) + detect_rsi_signals(window)
+        expected = events[events["timestamp"] == df.index[i]]
+        assert [(s["signal_type"], s["reason"]) for s in live] == list(
+            zip(expected["signal_type"], expected["reason"])
+        )
+
+
+def test_event_values():
+    """Test events carry the indicator values that triggered them"""
+    df = create_indicator_frame()
+    events = detect_signal_events(df)
+    rsi_event = events[events["reason"] == "RSI_OVERSOLD"].iloc[0]
+    assert rsi_event["values"] == {"rsi": df.loc[rsi_event["timestamp"], "rsi_14"]}
+
+
+def test_crossover_masks_panel_and_nan():
+    """Test crossover masks on a 2D panel and with missing values"""
+    fast = np.array([[1.0, np.nan], [2.0, 2.0], [1.0, 3.0]])
+    slow = np.array([[1.5, 1.0], [1.5, 2.5], [1.5, 2.5]])
+    above, below = crossover_masks(fast, slow)
+    assert above.tolist() == [[False, False], [True, False], [False, True]]
+    assert below.tolist() == [[False, False], [False, False], [True, False]]
+
+
+def test_panel_matches_per_symbol():
+    """Test panel detection equals running each symbol separately"""
+    frames = {s: create_indicator_frame() for s in ["AAPL", "MSFT", "GOOGL"]}
+    panel_events = detect_panel_events(to_panel(frames))
+    for symbol, df in frames.items():
+        expected = detect_signal_events(df, symbol=symbol)
+        got = panel_events[panel_events["symbol"] == symbol].reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected)
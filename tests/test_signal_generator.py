@@ -0,0 +1,96 @@
+"""Tests for incremental signal generation."""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from stockapp import crud, schemas
+from stockapp.db_models import MANUAL_SIGNAL_REASON, RawPrice, Signal
+from stockapp.indicators import WARMUP_BARS
+from stockapp.signal_generator import generate_signals
+
+
+def add_prices(db_session, start, periods):
+    """Store oscillating closes that cross the moving averages regularly"""
+    dates = pd.date_range(start=start, periods=periods, freq="D")
+    offset = (dates - pd.Timestamp("2000-01-01")).days.to_numpy()
+    closes = 100 + 10 * np.sin(offset / 10.0) + 3 * np.sin(offset * 1.7)
+    for ts, close in zip(dates, closes):
+        db_session.add(RawPrice(symbol="AAPL", timestamp=ts, close=close, volume=1000))
+    db_session.commit()
+    return dates
+
+
+def test_rerun_is_idempotent(db_session):
+    """Test a second run finds nothing new and writes no duplicates"""
+    end = pd.Timestamp(datetime.now()).normalize()
+    dates = add_prices(db_session, end - pd.Timedelta(days=89), 90)
+    assert generate_signals(db_session, "AAPL") > 0
+    stored = db_session.query(Signal).count()
+    assert crud.get_signal_watermark(db_session, "AAPL") == dates[-1]
+
+    assert generate_signals(db_session, "AAPL") == 0
+    assert db_session.query(Signal).count() == stored
+
+
+def test_only_new_bars_evaluated(db_session):
+    """Test signals after new bars arrive come only from the new bars"""
+    end = pd.Timestamp(datetime.now()).normalize()
+    first = add_prices(db_session, end - pd.Timedelta(days=119), 90)
+    generate_signals(db_session, "AAPL")
+    new = add_prices(db_session, first[-1] + pd.Timedelta(days=1), 30)
+    generate_signals(db_session, "AAPL")
+    latest = db_session.query(Signal).filter(Signal.timestamp > first[-1]).all()
+    assert latest
+    assert all(s.timestamp <= new[-1] for s in latest)
+    assert crud.get_signal_watermark(db_session, "AAPL") == new[-1]
+
+
+def test_backfill_reevaluates_without_duplicates(db_session):
+    """Test backfill re-checks full history and skips existing signals"""
+    end = pd.Timestamp(datetime.now()).normalize()
+    add_prices(db_session, end - pd.Timedelta(days=299), 300)
+    recent = generate_signals(db_session, "AAPL")
+    recent_rows = db_session.query(Signal).count()
+    assert recent_rows == recent
+
+    # Backfill reaches beyond the default 100-day window
+    assert generate_signals(db_session, "AAPL", backfill=True) > recent
+    backfilled = db_session.query(Signal).count()
+    assert backfilled > recent_rows
+    generate_signals(db_session, "AAPL", backfill=True)
+    assert db_session.query(Signal).count() == backfilled
+
+
+def test_rerun_loads_only_warmup_before_watermark(db_session, monkeypatch):
+    """Test a run after the watermark loads WARMUP_BARS of history, not all"""
+    end = pd.Timestamp(datetime.now()).normalize()
+    first = add_prices(db_session, end - pd.Timedelta(days=999), 1000)
+    crud.set_signal_watermark(db_session, "AAPL", first[-6].to_pydatetime())
+    db_session.commit()
+    get_market_data = crud.get_market_data
+    loaded = []
+
+    def spy(*args, **kwargs):
+        rows = get_market_data(*args, **kwargs)
+        loaded.append(len(rows))
+        return rows
+
+    monkeypatch.setattr(crud, "get_market_data", spy)
+    generate_signals(db_session, "AAPL")
+    # Warmup, the watermark bar itself and the five new bars
+    assert loaded == [WARMUP_BARS + 1 + 5]
+    assert crud.get_signal_watermark(db_session, "AAPL") == first[-1]
+
+
+def test_signals_without_reason_share_the_dedup_key(db_session):
+    """Test reasonless signals are stored under MANUAL and deduplicated"""
+    signal = schemas.SignalBase(
+        symbol="AAPL", timestamp=datetime(2024, 1, 2), signal_type="BUY"
+    )
+    assert crud.create_signal(db_session, signal).reason == MANUAL_SIGNAL_REASON
+    with pytest.raises(IntegrityError):
+        crud.create_signal(db_session, signal)
@@ -0,0 +1,293 @@
+"""Tests for strategy plugins, the registry and the strategy runner."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.backtest import run_portfolio_backtest, run_strategy_backtest
+from stockapp.db_models import Indicator, RawPrice, Signal
+from stockapp.panel import from_panel, to_panel
+from stockapp.portfolio_backtest import PortfolioBacktest, run_risk_portfolio_backtest
+from stockapp.risk_manager import RiskManager
+from stockapp.signal_engine import detect_panel_events
+from stockapp.strategies import (
+    MovingAverageCrossover,
+    OpeningRangeBreakout,
+    RsiThreshold,
+    StrategyRunner,
+    load_strategies,
+    run_live,
+)
+
+ACCOUNT_LIMITS = {"risk_per_trade_pct": 1, "max_daily_loss_pct": 3}
+
+
+def indicator_panel(symbols=("AAPL", "MSFT"), periods=120, seed=0):
+    """Random-walk price and indicator panel"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start="2024-01-01", periods=periods, freq="D")
+    frames = {}
+    for symbol in symbols:
+        close = 100 + np.cumsum(rng.normal(0, 1, periods))
+        frames[symbol] = pd.DataFrame(
+            {
+                "close": close,
+                "sma_20": pd.Series(close).rolling(20).mean().to_numpy(),
+                "ema_50": pd.Series(close).ewm(span=50).mean().to_numpy(),
+                "rsi_14": rng.uniform(10, 90, periods),
+            },
+            index=dates,
+        )
+    return to_panel(frames)
+
+
+def session_bars(day, breakout_at=None, minutes=30):
+    """One session of 1-minute bars ranging 99-101, optionally breaking out"""
+    index = pd.date_range(f"{day} 09:30", periods=minutes, freq="min")
+    bars = pd.DataFrame(
+        {"high": 101.0, "low": 99.0, "close": 100.0, "volume": 1000.0}, index=index
+    )
+    if breakout_at is not None:
+        bars.iloc[breakout_at] = [103.0, 100.0, 102.5, 2000.0]
+    return bars
+
+
+def stream(strategy, panel):
+    """Feed a panel through on_bar and collect (timestamp, symbol, reason)"""
+    found = []
+    for symbol in panel.columns.get_level_values(1).unique():
+        frame = from_panel(panel, symbol)
+        for ts, row in frame.iterrows():
+            for signal in strategy.on_bar(symbol, ts, row.to_dict()):
+                found.append((ts, symbol, signal["reason"]))
+    return sorted(found)
+
+
+def event_keys(events):
+    return sorted(zip(events["timestamp"], events["symbol"], events["reason"]))
+
+
+def test_load_strategies_from_settings():
+    """Test the shipped settings enable the signal engine's rules"""
+    names = [s.name for s in load_strategies()]
+    assert names == ["ma_crossover", "rsi_threshold"]
+
+
+def test_load_strategies_config_and_shared_params():
+    """Test disabled entries are skipped and shared params fill in defaults"""
+    config = {
+        "strategy": {"opening_range_minutes": 15, "risk_reward_ratio": 3},
+        "strategies": {
+            "ma_crossover": {"enabled": False},
+            "opening_range": {"risk_reward_ratio": 2.5},
+        },
+    }
+    (strategy,) = load_strategies(config)
+    assert isinstance(strategy, OpeningRangeBreakout)
+    assert strategy.params["opening_range_minutes"] == 15
+    assert strategy.params["risk_reward_ratio"] == 2.5
+
+
+def test_unknown_strategy_or_param_rejected():
+    """Test configuration errors are reported"""
+    with pytest.raises(ValueError):
+        load_strategies({"strategies": {"does_not_exist": {}}})
+    with pytest.raises(ValueError):
+        load_strategies({"strategies": {"ma_crossover": {"length": 5}}})
+
+
+def test_signal_rule_strategies_match_signal_engine():
+    """Test the MA and RSI plugins reproduce detect_panel_events"""
+    panel = indicator_panel()
+    runner = StrategyRunner([MovingAverageCrossover(), RsiThreshold()])
+    events = runner.evaluate(panel)
+    expected = detect_panel_events(panel)
+    assert event_keys(events) == event_keys(expected)
+
+
+@pytest.mark.parametrize("strategy_cls", [MovingAverageCrossover, RsiThreshold])
+def test_streaming_matches_vectorized(strategy_cls):
+    """Test on_bar produces the same signals as evaluate over the history"""
+    panel = indicator_panel()
+    assert stream(strategy_cls(), panel) == event_keys(strategy_cls().evaluate(panel))
+
+
+def test_opening_range_breakout():
+    """Test one breakout per session with entry, stop and target"""
+    bars = pd.concat(
+        [
+            session_bars("2024-01-02", breakout_at=10),
+            session_bars("2024-01-03"),
+            session_bars("2024-01-04", breakout_at=3),
+        ]
+    )
+    bars.iloc[12] = [104.0, 100.0, 103.5, 2500.0]
+    panel = to_panel({"AAPL": bars})
+    strategy = OpeningRangeBreakout(opening_range_minutes=5, risk_reward_ratio=2)
+    events = strategy.evaluate(panel)
+    # The breakout at minute 3 on the last day is inside the opening range
+    assert list(events["timestamp"]) == [bars.index[10]]
+    assert events.iloc[0]["values"] == {
+        "entry": 101.0,
+        "stop": 99.0,
+        "target": 105.0,
+        "volume": 2000.0,
+    }
+    assert stream(OpeningRangeBreakout(), panel) == event_keys(events)
+
+
+def test_opening_range_requires_volume():
+    """Test breakouts on thin volume are ignored"""
+    bars = session_bars("2024-01-02", breakout_at=10)
+    bars.iloc[10, 3] = 1200.0
+    assert OpeningRangeBreakout().evaluate(to_panel({"AAPL": bars})).empty
+
+
+def test_runner_records_timing_and_latest():
+    """Test per-strategy timing and last-bar filtering"""
+    panel = indicator_panel()
+    runner = StrategyRunner([MovingAverageCrossover(), RsiThreshold()])
+    latest = runner.latest(panel)
+    assert set(latest["timestamp"]) <= {panel.index[-1]}
+    report = runner.timing_report()
+    assert {row["strategy"] for row in report} == {"ma_crossover", "rsi_threshold"}
+    assert all(row["calls"] == 1 for row in report)
+    # Strategies whose fields are missing are skipped, not failed
+    StrategyRunner([OpeningRangeBreakout()]).evaluate(panel)
+
+
+def store_panel(db_session, panel):
+    """Store a panel's prices and indicators"""
+    for symbol in panel.columns.get_level_values(1).unique():
+        frame = from_panel(panel, symbol)
+        for ts, row in frame.iterrows():
+            db_session.add(
+                RawPrice(
+                    symbol=symbol,
+                    timestamp=ts,
+                    open=row["close"],
+                    high=row["close"],
+                    low=row["close"],
+                    close=row["close"],
+                    volume=1000,
+                )
+            )
+            values = row.drop("close").dropna().to_dict()
+            db_session.add(Indicator(symbol=symbol, timestamp=ts, values=values))
+    db_session.commit()
+
+
+def test_live_and_backtest_share_strategy_code(db_session):
+    """Test live signals equal the backtest events on the last bar"""
+    panel = indicator_panel()
+    # Force an oversold reading on the last bar of AAPL
+    panel.loc[panel.index[-1], ("rsi_14", "AAPL")] = 20.0
+    store_panel(db_session, panel)
+    runner = StrategyRunner([MovingAverageCrossover(), RsiThreshold()])
+
+    rows = run_live(db_session, ["AAPL", "MSFT"], runner)
+    backtest = run_strategy_backtest(
+        db_session, ["AAPL", "MSFT"], panel.index[0], panel.index[-1], runner
+    )
+    last = backtest[backtest["timestamp"] == panel.index[-1]]
+    assert sorted((r["symbol"], r["reason"]) for r in rows) == sorted(
+        zip(last["symbol"], last["reason"])
+    )
+    assert ("AAPL", "RSI_OVERSOLD") in [(r["symbol"], r["reason"]) for r in rows]
+    assert db_session.query(Signal).count() == len(rows)
+
+
+def test_live_run_without_strategies_is_a_noop(db_session):
+    """Test running live with every strategy disabled writes nothing"""
+    store_panel(db_session, indicator_panel())
+    assert run_live(db_session, ["AAPL", "MSFT"], StrategyRunner([])) == []
+    assert db_session.query(Signal).count() == 0
+
+
+def test_live_opening_range_sees_the_whole_session(db_session):
+    """Test run_live loads enough bars to find a breakout late in the session"""
+    bars = session_bars("2024-01-02", breakout_at=200, minutes=201)
+    for ts, row in bars.iterrows():
+        db_session.add(RawPrice(symbol="AAPL", timestamp=ts, open=100.0, **row))
+    db_session.commit()
+    runner = StrategyRunner([OpeningRangeBreakout()])
+    rows = run_live(db_session, ["AAPL"], runner)
+    assert [(r["symbol"], r["reason"]) for r in rows] == [
+        ("AAPL", "OPENING_RANGE_BREAKOUT")
+    ]
+
+
+def test_portfolio_backtest_trades_strategy_signals(db_session):
+    """Test the portfolio backtest enters on the strategies' BUY events"""
+    panel = indicator_panel()
+    store_panel(db_session, panel)
+    runner = StrategyRunner([MovingAverageCrossover()])
+    events = run_strategy_backtest(
+        db_session, ["AAPL", "MSFT"], panel.index[0], panel.index[-1], runner
+    )
+    result = run_portfolio_backtest(
+        db_session, ["AAPL", "MSFT"], panel.index[0], panel.index[-1], runner
+    )
+    buys = events[events["signal_type"] == "BUY"]
+    assert len(result.trades) > 0
+    assert set(zip(result.trades["symbol"], result.trades["entry_time"])) <= set(
+        zip(buys["symbol"], buys["timestamp"])
+    )
+    assert (
+        run_portfolio_backtest(
+            db_session, ["NONE"], panel.index[0], panel.index[-1], runner
+        )
+        is None
+    )
+
+
+def test_risk_portfolio_backtest_uses_breakout_levels(db_session):
+    """Test ORB stops and targets reach the account backtest and the most
+    liquid breakout takes the last slot"""
+    for symbol, volume in [("AAPL", 2000.0), ("ZZZ", 3000.0)]:
+        bars = session_bars("2024-01-02", breakout_at=10)
+        bars.iloc[10, 3] = volume
+        bars.iloc[11:, 1] = 100.0
+        bars.iloc[12] = [106.0, 104.0, 105.5, 1000.0]
+        for ts, row in bars.iterrows():
+            db_session.add(RawPrice(symbol=symbol, timestamp=ts, open=100.0, **row))
+    db_session.commit()
+    engine = PortfolioBacktest(
+        10000.0, 1, RiskManager(10000.0, {"account": ACCOUNT_LIMITS})
+    )
+    result = run_risk_portfolio_backtest(
+        db_session,
+        ["AAPL", "ZZZ"],
+        "2024-01-02",
+        "2024-01-03",
+        StrategyRunner([OpeningRangeBreakout()]),
+        engine,
+    )
+    (trade,) = result.trades.to_dict("records")
+    assert trade["symbol"] == "ZZZ"
+    assert trade["exit_reason"] == "target"
+    assert trade["exit_price"] == 105.0
+    # 1% of the account at risk between the 102.5 fill and the 99 stop
+    assert trade["shares"] == 28
+
+
+def test_risk_portfolio_backtest_shares_one_account(db_session):
+    """Test the account-limited backtest trades BUY events within its slots"""
+    panel = indicator_panel()
+    store_panel(db_session, panel)
+    runner = StrategyRunner([MovingAverageCrossover()])
+    events = run_strategy_backtest(
+        db_session, ["AAPL", "MSFT"], panel.index[0], panel.index[-1], runner
+    )
+    engine = PortfolioBacktest(
+        10000.0, 1, RiskManager(10000.0, {"account": ACCOUNT_LIMITS})
+    )
+    result = run_risk_portfolio_backtest(
+        db_session, ["AAPL", "MSFT"], panel.index[0], panel.index[-1], runner, engine
+    )
+    buys = events[events["signal_type"] == "BUY"]
+    assert len(result.trades) > 0
+    assert set(zip(result.trades["symbol"], result.trades["entry_time"])) <= set(
+        zip(buys["symbol"], buys["timestamp"])
+    )
+    assert result.positions["open_positions"].max() == 1
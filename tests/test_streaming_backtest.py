@@ -0,0 +1,197 @@
+"""Tests for out-of-core streaming backtests."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.backtest import Backtest, run_portfolio_backtest, signal_masks
+from stockapp.db_models import Indicator, RawPrice
+from stockapp.indicators import calculate_indicators
+from stockapp.panel import from_panel, panel_symbols, to_panel
+from stockapp.streaming_backtest import (
+    StreamingBacktest,
+    iter_indicator_panels,
+    iter_panel_chunks,
+    run_streaming_backtest,
+)
+from stockapp.strategies import (
+    MovingAverageCrossover,
+    OpeningRangeBreakout,
+    RsiThreshold,
+    StrategyRunner,
+)
+
+
+def indicator_panel(symbols=4, periods=400, seed=0):
+    """Random-walk closes with the indicators the strategies read"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=periods)
+    frames = {}
+    for i in range(symbols):
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.015, periods))
+        frame = pd.DataFrame(
+            {
+                "close": close,
+                "sma_20": pd.Series(close).rolling(20).mean().to_numpy(),
+                "ema_50": pd.Series(close).ewm(span=50).mean().to_numpy(),
+                "rsi_14": rng.uniform(10, 90, periods),
+            },
+            index=dates,
+        )
+        # One symbol lists late, so chunks also carry missing bars
+        frames[f"S{i}"] = frame.iloc[periods // 3 :] if i == 1 else frame
+    return to_panel(frames)
+
+
+def runner():
+    return StrategyRunner([MovingAverageCrossover(), RsiThreshold(oversold=25)])
+
+
+def in_memory(panel, backtest, strategies):
+    events = strategies.evaluate(panel)
+    entries, exits = signal_masks(events, panel.index, panel_symbols(panel))
+    return backtest.run(panel, entries, exits)
+
+
+def assert_same_result(result, expected):
+    # Appended chunk indexes carry no inferred freq; values must be identical
+    pd.testing.assert_series_equal(
+        result.portfolio_value, expected.portfolio_value, check_freq=False
+    )
+    pd.testing.assert_series_equal(result.returns, expected.returns, check_freq=False)
+    pd.testing.assert_frame_equal(result.trades, expected.trades)
+    assert result.metrics == expected.metrics
+
+
+@pytest.mark.parametrize("chunk_bars", [3, 64, 10000])
+def test_chunks_match_the_in_memory_backtest(chunk_bars):
+    """Test streaming any chunk size gives exactly the in-memory result"""
+    panel = indicator_panel()
+    backtest = Backtest(10000.0, position_size=0.5, commission=0.001)
+    expected = in_memory(panel, backtest, runner())
+    result = StreamingBacktest(backtest, runner(), keep_positions=True).run(
+        iter_panel_chunks(panel, chunk_bars)
+    )
+    assert len(result.trades) > 0
+    assert result.chunks == -(-len(panel) // chunk_bars)
+    assert result.peak_memory == 0
+    assert_same_result(result, expected)
+    pd.testing.assert_frame_equal(result.positions, expected.positions)
+
+
+def test_minute_chunks_end_on_session_boundaries():
+    """Test intraday chunks never split a session, so breakouts match"""
+    rng = np.random.default_rng(1)
+    index = pd.DatetimeIndex(
+        [
+            day + pd.Timedelta(hours=9, minutes=30 + m)
+            for day in pd.bdate_range("2024-01-02", periods=10)
+            for m in range(60)
+        ]
+    )
+    frames = {}
+    for symbol in ("AAPL", "MSFT"):
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.002, len(index)))
+        frames[symbol] = pd.DataFrame(
+            {
+                "open": close,
+                "high": close * 1.001,
+                "low": close * 0.999,
+                "close": close,
+                "volume": rng.integers(100, 1000, len(index)),
+            },
+            index=index,
+        )
+    panel = to_panel(frames)
+    chunks = list(iter_panel_chunks(panel, 90))
+    assert [len(c) for c in chunks] == [120, 120, 120, 120, 120]
+    assert all(c.index[0].time() == pd.Timestamp("09:30").time() for c in chunks)
+    strategies = StrategyRunner([OpeningRangeBreakout(volume_multiplier_threshold=1)])
+    expected = in_memory(panel, Backtest(), strategies)
+    result = StreamingBacktest(Backtest(), strategies).run(chunks)
+    assert len(result.trades) > 0
+    assert_same_result(result, expected)
+    assert result.positions["open_positions"].max() <= 2
+
+
+def test_database_stream_matches_portfolio_backtest(db_session):
+    """Test streaming from the database equals run_portfolio_backtest"""
+    panel = indicator_panel(symbols=3, periods=250)
+    for symbol in panel_symbols(panel):
+        frame = from_panel(panel, symbol).dropna(subset=["close"])
+        for ts, row in frame.iterrows():
+            db_session.add(
+                RawPrice(
+                    symbol=symbol,
+                    timestamp=ts,
+                    open=row["close"],
+                    high=row["close"],
+                    low=row["close"],
+                    close=row["close"],
+                    volume=100,
+                )
+            )
+            values = row[["sma_20", "ema_50", "rsi_14"]].dropna().to_dict()
+            db_session.add(Indicator(symbol=symbol, timestamp=ts, values=values))
+    db_session.commit()
+    symbols = ["S0", "S1", "S2", "MISSING"]
+    expected = run_portfolio_backtest(
+        db_session, symbols, "2020-01-01", "2020-12-31", runner()
+    )
+    result = run_streaming_backtest(
+        db_session,
+        symbols,
+        "2020-01-01",
+        "2020-12-31",
+        runner(),
+        chunk_bars=40,
+        trace_memory=True,
+    )
+    assert result.chunks == 7
+    assert_same_result(result, expected)
+    open_positions = (expected.positions == 1).sum(axis=1)
+    assert (result.positions["open_positions"] == open_positions).all()
+    assert result.peak_memory > 0
+    assert (
+        run_streaming_backtest(
+            db_session, ["MISSING"], "2020-01-01", "2020-12-31", runner()
+        )
+        is None
+    )
+
+
+def test_indicator_state_carries_across_chunks():
+    """Test indicators computed chunk by chunk match the full history"""
+    rng = np.random.default_rng(2)
+    index = pd.bdate_range("2015-01-01", periods=1500)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(index)))
+    panel = to_panel({"AAPL": pd.DataFrame({"close": close}, index=index)})
+    streamed = pd.concat(iter_indicator_panels(iter_panel_chunks(panel, 250)))
+    expected = calculate_indicators(from_panel(panel, "AAPL").copy())
+    for column in ("sma_20", "ema_50", "rsi_14"):
+        np.testing.assert_allclose(
+            streamed[(column, "AAPL")].to_numpy(),
+            expected[column].to_numpy(),
+            rtol=1e-9,
+        )
+
+
+def test_peak_memory_is_bounded_by_chunk_size():
+    """Test small chunks keep the traced peak well below a whole-history run"""
+    panel = indicator_panel(symbols=20, periods=8000)
+    whole = StreamingBacktest(Backtest(), runner(), trace_memory=True).run([panel])
+    streamed = StreamingBacktest(Backtest(), runner(), trace_memory=True).run(
+        iter_panel_chunks(panel, 500)
+    )
+    assert streamed.peak_memory < whole.peak_memory / 3
+    assert_same_result(streamed, whole)
+
+
+def test_chunks_must_be_in_time_order():
+    """Test overlapping or unordered chunks are rejected"""
+    panel = indicator_panel()
+    chunks = [panel.iloc[100:200], panel.iloc[:100]]
+    with pytest.raises(ValueError):
+        StreamingBacktest(Backtest(), runner()).run(chunks)
+    with pytest.raises(ValueError):
+        StreamingBacktest(Backtest(), runner()).run([])
@@ -0,0 +1,130 @@
+"""Tests for the parallel parameter sweep."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp import sweep
+from stockapp.sweep import (
+    SharedPanel,
+    evaluate_ma_rsi,
+    expand_grid,
+    ma_periods_ordered,
+    parse_grid,
+    prune,
+    run_sweep,
+)
+
+GRID = {"sma_period": [5, 10, 20], "ema_period": [15, 30], "rsi_overbought": [70, 80]}
+
+
+def price_panel(days=400, symbols=5, seed=0):
+    """Random-walk closes for several symbols"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2020-01-01", periods=days)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.015, (days, symbols)), axis=0)
+    columns = pd.MultiIndex.from_product([["close"], [f"S{i}" for i in range(symbols)]])
+    return pd.DataFrame(close, index=index, columns=columns)
+
+
+def param_key(frame):
+    return frame[list(GRID)].apply(tuple, axis=1).tolist()
+
+
+def test_expand_grid_with_constraint():
+    """Test the grid expands to every valid combination"""
+    combos = expand_grid(GRID, ma_periods_ordered)
+    assert len(combos) == 10
+    assert {"sma_period": 20, "ema_period": 15, "rsi_overbought": 70} not in combos
+    assert parse_grid(["sma_period=5,10", "commission=0.001"]) == {
+        "sma_period": [5, 10],
+        "commission": [0.001],
+    }
+    with pytest.raises(ValueError):
+        parse_grid(["sma_period"])
+
+
+def test_shared_panel_round_trip():
+    """Test workers see the same prices through a read-only mapping"""
+    panel = price_panel(50, 3)
+    with SharedPanel.create(panel) as shared:
+        attached = SharedPanel.attach(shared.spec)
+        view = attached.fields(0, 10)["close"]
+        np.testing.assert_array_equal(view, panel["close"].to_numpy()[:10])
+        assert not view.flags.writeable
+        assert view.base is not None
+        attached.close()
+
+
+def test_sweep_matches_direct_evaluation(tmp_path):
+    """Test every result equals evaluating the combination directly"""
+    panel = price_panel()
+    path = tmp_path / "sweep.csv"
+    results = run_sweep(panel, GRID, workers=1, results_path=path)
+    assert len(results) == 12
+    assert results["sharpe_ratio"].is_monotonic_decreasing
+    symbols = list(panel["close"].columns)
+    for row in results.head(3).to_dict("records"):
+        params = {name: row[name] for name in GRID}
+        expected = evaluate_ma_rsi(
+            {"close": panel["close"].to_numpy()}, panel.index, symbols, params
+        )
+        assert row["total_return"] == pytest.approx(expected["total_return"])
+        assert row["trades"] == expected["trades"]
+    streamed = pd.read_csv(path)
+    assert len(streamed) == 12 and set(streamed["stage"]) == {"full"}
+
+
+def test_direct_evaluation_does_not_reuse_indicators():
+    """Test fresh price arrays outside a sweep never hit the indicator cache"""
+    params = {"sma_period": 5, "ema_period": 15}
+    results = {}
+    for seed in (1, 2):
+        panel = price_panel(seed=seed)
+        results[seed] = run_sweep(panel, {k: [v] for k, v in params.items()})
+        assert not sweep._indicator_cache
+        # A freed array's buffer address is often reused by the next one
+        close = panel["close"].to_numpy().copy()
+        symbols = list(panel["close"].columns)
+        metrics = evaluate_ma_rsi({"close": close}, panel.index, symbols, params)
+        assert metrics["total_return"] == pytest.approx(
+            results[seed].loc[0, "total_return"]
+        )
+        del close
+    assert not sweep._indicator_cache
+    assert results[1].loc[0, "total_return"] != results[2].loc[0, "total_return"]
+
+
+def test_process_pool_matches_inline():
+    """Test the pool produces the same results as running inline"""
+    panel = price_panel(300, 4)
+    inline = run_sweep(panel, GRID, workers=1)
+    pooled = run_sweep(panel, GRID, workers=2)
+    merged = inline.merge(pooled, on=list(GRID), suffixes=("", "_pool"))
+    assert len(merged) == 12
+    np.testing.assert_allclose(merged["total_return"], merged["total_return_pool"])
+
+
+def test_screening_prunes_before_full_run(tmp_path):
+    """Test only the best screened combinations get a full evaluation"""
+    panel = price_panel()
+    path = tmp_path / "sweep.csv"
+    results = run_sweep(
+        panel, GRID, workers=1, results_path=path, screen_bars=150, keep=0.25
+    )
+    streamed = pd.read_csv(path)
+    screened = streamed[streamed["stage"] == "screen"]
+    assert len(screened) == 12
+    assert len(results) == 3
+    best = screened.nlargest(3, "sharpe_ratio")
+    assert sorted(param_key(results)) == sorted(param_key(best))
+
+
+def test_prune_thresholds():
+    """Test pruning by fraction, minimum score and missing scores"""
+    rows = [{"a": i, "sharpe_ratio": s} for i, s in enumerate([1.0, -0.5, np.nan, 2.0])]
+    assert [r["a"] for r in prune(rows, keep=0.5)] == [3, 0]
+    assert [r["a"] for r in prune(rows, keep=1.0, min_score=0)] == [3, 0]
+    assert prune(rows, min_score=5) == []
+    with pytest.raises(ValueError):
+        run_sweep(price_panel(50, 2), {"sma_period": []})
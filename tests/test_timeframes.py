@@ -0,0 +1,100 @@
+"""Tests for multi-timeframe bar views."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.indicator_cache import IndicatorCache
+from stockapp.timeframes import MultiTimeframeBars, resample_bars
+
+
+def create_minute_bars(start="2023-01-02 09:30", periods=600):
+    """Create sample minute bars"""
+    dates = pd.date_range(start=start, periods=periods, freq="min")
+    close = 100 + np.cumsum(np.random.normal(0, 0.1, periods))
+    return pd.DataFrame(
+        {
+            "open": close,
+            "high": close + 0.05,
+            "low": close - 0.05,
+            "close": close,
+            "volume": np.random.randint(100, 1000, periods),
+        },
+        index=dates,
+    )
+
+
+def test_resample_ohlcv():
+    """Test OHLCV aggregation into 5-minute bars"""
+    bars = create_minute_bars(periods=10)
+    five = resample_bars(bars, "5Min")
+    assert len(five) == 2
+    first = bars.iloc[:5]
+    assert five["open"].iloc[0] == first["open"].iloc[0]
+    assert five["high"].iloc[0] == first["high"].max()
+    assert five["low"].iloc[0] == first["low"].min()
+    assert five["close"].iloc[0] == first["close"].iloc[-1]
+    assert five["volume"].iloc[0] == first["volume"].sum()
+
+
+def test_weekly_buckets_start_monday():
+    """Test weekly bars are labelled with the Monday of the week"""
+    dates = pd.date_range(start="2023-01-04", periods=10, freq="D")
+    bars = pd.DataFrame({"close": np.arange(10.0), "volume": 1}, index=dates)
+    weekly = resample_bars(bars, "1W")
+    assert list(weekly.index) == [
+        pd.Timestamp("2023-01-02"),
+        pd.Timestamp("2023-01-09"),
+    ]
+
+
+def test_lazy_and_cached():
+    """Test derived bars are only resampled on first request"""
+    mtf = MultiTimeframeBars("AAPL", create_minute_bars(), cache=IndicatorCache())
+    assert mtf.rows_resampled == {}
+    first = mtf.bars("15Min")
+    assert mtf.bars("15Min") is first
+    assert mtf.rows_resampled == {"15Min": 600}
+
+
+def test_incremental_append_matches_full_resample():
+    """Test appending bars only rebuilds the tail and matches a full resample"""
+    bars = create_minute_bars(periods=603)
+    mtf = MultiTimeframeBars("AAPL", bars.iloc[:600], cache=IndicatorCache())
+    for timeframe in ["5Min", "15Min", "1H"]:
+        mtf.bars(timeframe)
+    mtf.append(bars.iloc[600:])
+    for timeframe in ["5Min", "15Min", "1H"]:
+        pd.testing.assert_frame_equal(
+            mtf.bars(timeframe), resample_bars(bars, timeframe), check_freq=False
+        )
+        assert mtf.rows_resampled[timeframe] < 600 + 60 + 3
+
+
+def test_rejects_finer_timeframe():
+    """Test that finer views than the base bars are refused"""
+    mtf = MultiTimeframeBars("AAPL", create_minute_bars(), base_timeframe="5Min")
+    with pytest.raises(ValueError):
+        mtf.bars("1Min")
+
+
+def test_indicators_on_any_timeframe():
+    """Test indicators are computed on derived bars and cached"""
+    cache = IndicatorCache()
+    mtf = MultiTimeframeBars("AAPL", create_minute_bars(periods=1500), cache=cache)
+    five = mtf.indicators("5Min")
+    assert len(five) == 300
+    assert "sma_20" in five.columns
+    mtf.indicators("5Min")
+    assert cache.stats()["hits"] == 1
+
+
+def test_histories_with_different_starts_are_cached_apart():
+    """Test views ending at the same bar but starting apart keep their own warmup"""
+    cache = IndicatorCache()
+    bars = create_minute_bars(periods=1500)
+    full = MultiTimeframeBars("AAPL", bars, cache=cache).indicators("5Min")
+    short = MultiTimeframeBars("AAPL", bars.iloc[500:], cache=cache).indicators("5Min")
+    assert len(full) == 300 and len(short) == 200
+    expected = MultiTimeframeBars("AAPL", bars.iloc[500:]).indicators("5Min")
+    pd.testing.assert_frame_equal(short, expected)
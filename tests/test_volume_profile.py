@@ -0,0 +1,184 @@
+"""Tests for minute-of-day volume profiles."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp.panel import to_panel
+from stockapp.strategies.opening_range import OpeningRangeBreakout
+from stockapp.volume_profile import VolumeProfile
+
+SYMBOLS = ["AAPL", "MSFT", "TSLA"]
+
+
+def minute_panel(days, minutes=390, seed=0):
+    """Minute bars over whole sessions with random volume"""
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(
+        [
+            ts
+            for day in pd.bdate_range("2024-01-02", periods=days)
+            for ts in pd.date_range(
+                day + pd.Timedelta("09:30:00"), periods=minutes, freq="min"
+            )
+        ]
+    )
+    frames = {
+        symbol: pd.DataFrame(
+            {
+                "high": 101.0,
+                "low": 99.0,
+                "close": 100.0,
+                "volume": rng.integers(100, 1000, len(index)).astype(float),
+            },
+            index=index,
+        )
+        for symbol in SYMBOLS
+    }
+    return to_panel(frames)
+
+
+def expected_average(panel, symbol, sessions, minute):
+    """Brute-force average for one minute of day over the last sessions"""
+    volume = panel["volume"][symbol]
+    at_minute = volume[volume.index.time == minute.time()]
+    return at_minute.iloc[-sessions:].mean()
+
+
+def test_rolling_average_matches_brute_force():
+    """Test the ring buffer keeps the average of the last N sessions"""
+    panel = minute_panel(days=8)
+    profile = VolumeProfile.from_panel(panel, sessions=5)
+    assert profile.sessions_loaded == 5
+    ts = pd.Timestamp("2024-01-12 10:17")
+    for symbol in SYMBOLS:
+        assert profile.average(symbol, ts) == pytest.approx(
+            expected_average(panel, symbol, 5, ts)
+        )
+
+
+def test_incremental_update_skips_known_sessions():
+    """Test updating with overlapping history only adds new sessions"""
+    panel = minute_panel(days=8)
+    first_days = panel[panel.index < pd.Timestamp("2024-01-09")]
+    profile = VolumeProfile.from_panel(first_days, sessions=5)
+    assert profile.update(panel) == 3
+    full = VolumeProfile.from_panel(panel, sessions=5)
+    np.testing.assert_allclose(profile.mean, full.mean)
+
+
+def test_missing_bars_are_excluded():
+    """Test NaN volumes do not count towards the average"""
+    panel = minute_panel(days=3)
+    ts = pd.Timestamp("2024-01-03 09:31")
+    panel.loc[ts, ("volume", "AAPL")] = np.nan
+    profile = VolumeProfile.from_panel(panel, sessions=3)
+    expected = panel["volume"]["AAPL"][panel.index.time == ts.time()].mean()
+    next_day = pd.Timestamp("2024-01-05 09:31")
+    assert profile.average("AAPL", next_day) == pytest.approx(expected)
+
+
+def test_lookups_outside_session_or_universe():
+    """Test unknown minutes and symbols give NaN"""
+    profile = VolumeProfile.from_panel(minute_panel(days=2))
+    assert np.isnan(profile.average("AAPL", pd.Timestamp("2024-01-03 08:00")))
+    assert np.isnan(profile.average("NVDA", pd.Timestamp("2024-01-03 10:00")))
+    assert np.isnan(profile.averages(pd.Timestamp("2024-01-03 16:30"))).all()
+
+
+def test_baseline_aligns_with_panel():
+    """Test the panel baseline equals per-bar lookups"""
+    history = minute_panel(days=4)
+    profile = VolumeProfile.from_panel(history, sessions=4)
+    today = minute_panel(days=1, minutes=30, seed=1)
+    today.index = today.index + pd.Timedelta(days=7)
+    baseline = profile.baseline(today)
+    for t in [0, 7, 29]:
+        ts = today.index[t]
+        np.testing.assert_allclose(
+            baseline[t], [profile.average(s, ts) for s in SYMBOLS]
+        )
+
+
+def test_baseline_uses_only_earlier_sessions():
+    """Test backtesting the profile's own history never sees the same day"""
+    panel = minute_panel(days=6)
+    profile = VolumeProfile.from_panel(panel, sessions=3)
+    baseline = profile.baseline(panel)
+    sessions = panel.index.normalize().unique()
+    assert np.isnan(baseline[panel.index.normalize() == sessions[0]]).all()
+    for ts in [pd.Timestamp("2024-01-03 09:30"), pd.Timestamp("2024-01-09 15:59")]:
+        t = panel.index.get_loc(ts)
+        history = panel[panel.index.normalize() < ts.normalize()]
+        expected = [expected_average(history, s, 3, ts) for s in SYMBOLS]
+        np.testing.assert_allclose(baseline[t], expected)
+    # Lookups only have the stored sessions: two of the three kept precede ts
+    history = panel[panel.index.normalize() < ts.normalize()]
+    np.testing.assert_allclose(
+        [profile.average(s, ts) for s in SYMBOLS],
+        [expected_average(history, s, 2, ts) for s in SYMBOLS],
+    )
+
+
+def test_partial_session_is_refolded():
+    """Test a session ingested part way through keeps filling in"""
+    panel = minute_panel(days=3)
+    morning = panel[panel.index < pd.Timestamp("2024-01-04 12:00")]
+    profile = VolumeProfile.from_panel(morning, sessions=3)
+    assert profile.update(panel) == 0
+    np.testing.assert_allclose(
+        profile.mean, VolumeProfile.from_panel(panel, sessions=3).mean
+    )
+
+
+def test_lookups_during_newest_session_skip_history(monkeypatch):
+    """Test lookups in a partly refolded live session use the maintained
+    average of the earlier sessions instead of rescanning the buffer"""
+    panel = minute_panel(days=4)
+    profile = VolumeProfile.from_panel(panel[panel.index < "2024-01-05 11:00"], 3)
+    profile.update(panel[panel.index < "2024-01-05 12:00"])
+    history = panel[panel.index < "2024-01-05"]
+    monkeypatch.setattr(profile, "_slots", lambda: pytest.fail("history rescanned"))
+    ts = pd.Timestamp("2024-01-05 10:17")
+    expected = [expected_average(history, s, 2, ts) for s in SYMBOLS]
+    np.testing.assert_allclose(profile.averages(ts), expected)
+    assert profile.average("MSFT", ts) == pytest.approx(expected[1])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """Test persistence keeps averages and continues the ring buffer"""
+    panel = minute_panel(days=7)
+    profile = VolumeProfile.from_panel(panel[panel.index < "2024-01-10"], sessions=4)
+    path = tmp_path / "profile.npz"
+    profile.save(path)
+    loaded = VolumeProfile.load(path)
+    np.testing.assert_allclose(loaded.mean, profile.mean)
+    np.testing.assert_allclose(loaded.prior_mean, profile.prior_mean)
+    assert loaded.last_session == profile.last_session
+    loaded.update(panel)
+    profile.update(panel)
+    np.testing.assert_allclose(loaded.mean, profile.mean)
+
+
+def test_opening_range_uses_profile_baseline(tmp_path):
+    """Test the ORB strategy can confirm volume against the time-of-day average"""
+    history = minute_panel(days=3)
+    profile = VolumeProfile.from_panel(history)
+    # Volume at the profile average for 09:40 passes 1.0x but fails 1.5x
+    path = tmp_path / "profile.npz"
+    profile.save(path)
+    ts = pd.Timestamp("2024-01-08 09:40")
+    index = pd.date_range("2024-01-08 09:30", periods=15, freq="min")
+    bars = pd.DataFrame(
+        {"high": 101.0, "low": 99.0, "close": 100.0, "volume": 1e9}, index=index
+    )
+    bars.loc[ts] = [103.0, 100.0, 102.0, profile.average("AAPL", ts)]
+    panel = to_panel({"AAPL": bars})
+    strict = OpeningRangeBreakout(volume_profile=str(path))
+    loose = OpeningRangeBreakout(
+        volume_profile=str(path), volume_multiplier_threshold=1.0
+    )
+    assert strict.evaluate(panel).empty
+    assert list(loose.evaluate(panel)["timestamp"]) == [ts]
+    streamed = [loose.on_bar("AAPL", t, row.to_dict()) for t, row in bars.iterrows()]
+    assert [t for t, found in zip(bars.index, streamed) if found] == [ts]
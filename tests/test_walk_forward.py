@@ -0,0 +1,111 @@
+"""Tests for walk-forward optimization."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stockapp import sweep
+from stockapp.walk_forward import run_walk_forward, walk_forward_windows
+
+GRID = {"sma_period": [5, 10], "ema_period": [20, 40]}
+
+
+def price_panel(days=600, symbols=4, seed=0):
+    """Random-walk closes for several symbols"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2020-01-01", periods=days)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.015, (days, symbols)), axis=0)
+    columns = pd.MultiIndex.from_product([["close"], [f"S{i}" for i in range(symbols)]])
+    return pd.DataFrame(close, index=index, columns=columns)
+
+
+def test_rolling_and_anchored_windows():
+    """Test windows tile the history after the first train window"""
+    windows = walk_forward_windows(100, train_bars=40, test_bars=20)
+    assert [(w.train_start, w.test_start, w.test_end) for w in windows] == [
+        (0, 40, 60),
+        (20, 60, 80),
+        (40, 80, 100),
+    ]
+    anchored = walk_forward_windows(100, 40, 20, anchored=True)
+    assert {w.train_start for w in anchored} == {0}
+    assert len(walk_forward_windows(100, 40, 20, step=10)) == 5
+    assert walk_forward_windows(50, 40, 20) == []
+    with pytest.raises(ValueError):
+        walk_forward_windows(100, 0, 20)
+
+
+def test_each_window_trades_the_best_train_parameters():
+    """Test the chosen parameters win on train and are what is traded on test"""
+    panel = price_panel()
+    result = run_walk_forward(panel, GRID, train_bars=200, test_bars=100, workers=1)
+    assert len(result.windows) == 4
+    prices = {"close": panel["close"].to_numpy()}
+    symbols = list(panel["close"].columns)
+    for row, (start, stop) in zip(
+        result.windows.to_dict("records"), [(0, 200), (100, 300), (200, 400)]
+    ):
+        scores = {
+            (sma, ema): sweep.backtest_ma_rsi(
+                prices,
+                panel.index,
+                symbols,
+                {"sma_period": sma, "ema_period": ema},
+                start,
+                stop,
+            ).sharpe_ratio
+            for sma in GRID["sma_period"]
+            for ema in GRID["ema_period"]
+        }
+        assert (row["sma_period"], row["ema_period"]) == max(scores, key=scores.get)
+        test = sweep.backtest_ma_rsi(
+            prices,
+            panel.index,
+            symbols,
+            {"sma_period": row["sma_period"], "ema_period": row["ema_period"]},
+            stop,
+            stop + 100,
+        )
+        assert row["test_total_return"] == pytest.approx(test.total_return)
+
+
+def test_stitched_equity_is_out_of_sample_only():
+    """Test the equity curve chains every test window and nothing else"""
+    panel = price_panel()
+    result = run_walk_forward(panel, GRID, train_bars=200, test_bars=100, workers=1)
+    assert result.equity.index.equals(panel.index[200:600])
+    growth = np.prod(1 + result.windows["test_total_return"].to_numpy())
+    assert result.equity.iloc[-1] == pytest.approx(10000.0 * growth)
+    assert result.trades["pnl"].sum() == pytest.approx(result.equity.iloc[-1] - 10000)
+    assert result.metrics["total_return"] == pytest.approx(growth - 1)
+
+
+def test_parallel_matches_inline():
+    """Test windows run in a pool give the same out-of-sample curve"""
+    panel = price_panel(500, 3)
+    inline = run_walk_forward(panel, GRID, 200, 100, workers=1)
+    pooled = run_walk_forward(panel, GRID, 200, 100, workers=2)
+    pd.testing.assert_series_equal(inline.equity, pooled.equity)
+    pd.testing.assert_frame_equal(inline.windows, pooled.windows)
+
+
+def test_indicators_shared_between_windows(monkeypatch):
+    """Test each indicator is computed once, not once per window"""
+    calls = []
+    original = sweep.sweep_indicator
+
+    def counting(close, kind, period):
+        calls.append((kind, period))
+        return original(close, kind, period)
+
+    monkeypatch.setattr(sweep, "sweep_indicator", counting)
+    run_walk_forward(price_panel(), GRID, 200, 100, workers=1)
+    # Two SMA periods, two EMA periods and one RSI period over four windows
+    assert sorted(calls) == sorted(set(calls)) and len(calls) == 5
+    assert not sweep._indicator_cache
+
+
+def test_too_little_history():
+    """Test a history shorter than one window is rejected"""
+    with pytest.raises(ValueError):
+        run_walk_forward(price_panel(100, 2), GRID, 200, 100, workers=1)